@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Audio post-processing for generated TTS clips.
+
+Google TTS returns MP3s at a fixed bitrate with uneven loudness, and audio
+dominates the size of the final deck. This stage normalizes loudness to a
+target LUFS and re-encodes each clip (mono, lower bitrate) with ffmpeg in a
+process pool. Results are cached by the content hash of the input clip plus
+the processing settings, so re-runs only touch new or changed clips.
+"""
+
+import argparse
+import hashlib
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from diskcache import Cache
+from pydantic import BaseModel, Field
+
+
+class AudioPostProcessConfig(BaseModel):
+    """Settings for loudness normalization and re-encoding."""
+
+    target_lufs: float = Field(default=-16.0, description="Integrated loudness target (EBU R128 LUFS)")
+    true_peak: float = Field(default=-1.5, description="Maximum true peak in dBTP")
+    bitrate: str = Field(default="48k", description="MP3 bitrate passed to ffmpeg -b:a")
+    mono: bool = Field(default=True, description="Downmix to a single channel")
+    sample_rate: int = Field(default=24000, description="Output sample rate (Google TTS MP3s are 24 kHz)")
+    max_workers: Optional[int] = Field(default=None, description="Process pool size (None = CPU count)")
+
+    def signature(self) -> str:
+        """Settings that change the output bytes (part of the cache key)."""
+        return f"{self.target_lufs}|{self.true_peak}|{self.bitrate}|{self.mono}|{self.sample_rate}"
+
+
+def _ffmpeg_command(input_path: Path, output_path: Path, config: AudioPostProcessConfig) -> list[str]:
+    command = [
+        "ffmpeg", "-y", "-v", "error", "-i", str(input_path),
+        "-af", f"loudnorm=I={config.target_lufs}:TP={config.true_peak}:LRA=11",
+        "-ar", str(config.sample_rate),
+    ]
+    if config.mono:
+        command += ["-ac", "1"]
+    command += ["-codec:a", "libmp3lame", "-b:a", config.bitrate, str(output_path)]
+    return command
+
+
+def _process_clip(input_path: Path, output_path: Path, config: AudioPostProcessConfig) -> Tuple[str, bool, str]:
+    """
+    Worker: normalize and re-encode one clip (runs in a child process).
+
+    Returns:
+        (filename, success, error message)
+    """
+    try:
+        subprocess.run(_ffmpeg_command(input_path, output_path, config), check=True, capture_output=True)
+        return input_path.name, True, ""
+    except FileNotFoundError:
+        return input_path.name, False, "ffmpeg not found"
+    except subprocess.CalledProcessError as e:
+        return input_path.name, False, e.stderr.decode(errors="replace").strip()[:200]
+
+
+def ffmpeg_available() -> bool:
+    """Check whether ffmpeg is on PATH."""
+    return shutil.which("ffmpeg") is not None
+
+
+def postprocess_audio_files(
+    filenames: Iterable[str],
+    input_dir: Path,
+    output_dir: Path,
+    config: AudioPostProcessConfig | None = None,
+    cache_dir: Path | None = None,
+) -> Dict:
+    """
+    Normalize and re-encode clips from input_dir into output_dir (same filenames).
+
+    Clips already processed with the same settings are served from the cache.
+    Clips that cannot be processed (missing ffmpeg, decode errors) are copied
+    unchanged so the deck stays complete.
+
+    Args:
+        filenames: Clip filenames to process (e.g. media referenced by a deck)
+        input_dir: Directory with the original TTS clips
+        output_dir: Directory for processed clips
+        config: Post-processing settings (defaults if None)
+        cache_dir: Directory for the processed-clip cache (default: audio_postprocess_cache/)
+
+    Returns:
+        Statistics dictionary (clip counts, bytes before/after, seconds)
+    """
+    if config is None:
+        config = AudioPostProcessConfig()
+    if cache_dir is None:
+        cache_dir = Path("audio_postprocess_cache")
+
+    start_time = time.time()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stats = {"clips": 0, "processed": 0, "cached": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+
+    with Cache(str(cache_dir)) as cache:
+        pending: Dict[str, str] = {}  # filename -> cache key
+        for filename in filenames:
+            input_path = input_dir / filename
+            if not input_path.is_file():
+                continue
+            data = input_path.read_bytes()
+            stats["clips"] += 1
+            stats["bytes_before"] += len(data)
+
+            cache_key = hashlib.sha256(data + config.signature().encode()).hexdigest()
+            cached_audio = cache.get(cache_key)
+            if cached_audio is not None:
+                (output_dir / filename).write_bytes(cached_audio)
+                stats["cached"] += 1
+                stats["bytes_after"] += len(cached_audio)
+            else:
+                pending[filename] = cache_key
+
+        if pending:
+            if not ffmpeg_available():
+                print(f"⚠️  ffmpeg not found - copying {len(pending)} clips without post-processing")
+                results = [(filename, False, "ffmpeg not found") for filename in pending]
+            else:
+                print(f"🎚️  Post-processing {len(pending)} clips "
+                      f"({config.target_lufs} LUFS, {config.bitrate}, {'mono' if config.mono else 'stereo'})...")
+                results = []
+                with ProcessPoolExecutor(max_workers=config.max_workers) as executor:
+                    futures = [
+                        executor.submit(_process_clip, input_dir / filename, output_dir / filename, config)
+                        for filename in pending
+                    ]
+                    for done, future in enumerate(as_completed(futures), 1):
+                        results.append(future.result())
+                        if done % 500 == 0:
+                            print(f"   📊 Progress: {done}/{len(pending)} clips")
+
+            for filename, success, error in results:
+                output_path = output_dir / filename
+                if success:
+                    processed_audio = output_path.read_bytes()
+                    cache.set(pending[filename], processed_audio)
+                    stats["processed"] += 1
+                else:
+                    if error != "ffmpeg not found":
+                        print(f"⚠️  Warning: Failed to post-process {filename}: {error}")
+                    shutil.copy2(input_dir / filename, output_path)
+                    processed_audio = output_path.read_bytes()
+                    stats["failed"] += 1
+                stats["bytes_after"] += len(processed_audio)
+
+    stats["seconds"] = round(time.time() - start_time, 2)
+    saved_mb = (stats["bytes_before"] - stats["bytes_after"]) / (1024 * 1024)
+    print(f"   ✅ Post-processed {stats['clips']} clips - Processed: {stats['processed']}, "
+          f"Cached: {stats['cached']}, Failed: {stats['failed']}")
+    print(f"   📉 Audio: {stats['bytes_before'] / (1024 * 1024):.1f} MB → "
+          f"{stats['bytes_after'] / (1024 * 1024):.1f} MB (saved {saved_mb:.1f} MB) in {stats['seconds']}s")
+    return stats
+
+
+def main():
+    """Main function with command line argument parsing."""
+    parser = argparse.ArgumentParser(description="Normalize loudness and re-encode TTS clips")
+    parser.add_argument("--input-dir", "-i", type=Path, default=Path("audio_files"), help="Directory with TTS clips")
+    parser.add_argument("--output-dir", "-o", type=Path, default=Path("audio_files_processed"), help="Output directory")
+    parser.add_argument("--target-lufs", type=float, default=-16.0, help="Loudness target in LUFS")
+    parser.add_argument("--bitrate", default="48k", help="MP3 bitrate (e.g. 32k, 48k, 64k)")
+    parser.add_argument("--stereo", action="store_true", help="Keep stereo instead of downmixing to mono")
+    parser.add_argument("--workers", "-w", type=int, help="Number of ffmpeg processes")
+
+    args = parser.parse_args()
+
+    config = AudioPostProcessConfig(
+        target_lufs=args.target_lufs, bitrate=args.bitrate, mono=not args.stereo, max_workers=args.workers
+    )
+    filenames = sorted(path.name for path in args.input_dir.glob("*.mp3"))
+    stats = postprocess_audio_files(filenames, args.input_dir, args.output_dir, config)
+    print(f"📊 Statistics: {stats}")
+
+
+if __name__ == "__main__":
+    main()
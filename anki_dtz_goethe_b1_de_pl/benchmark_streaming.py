@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Peak-memory benchmark: list-based deck API vs streaming deck API.
+
+Builds synthetic decks of increasing size, then runs the same trivial stage
+(copy one field) through both code paths while tracemalloc records the peak
+Python heap:
+
+- list:      load_anki_deck → list of cards → save_anki_deck
+- streaming: iter_anki_cards → generator stage → AnkiDeckWriter
+
+The list path grows linearly with the number of cards; the streaming path
+should stay flat.
+"""
+
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from schema import AnkiCard, AnkiDeck
+from utilities import AnkiDeckWriter, iter_anki_cards, load_anki_deck, save_anki_deck
+
+
+def make_synthetic_card(i: int) -> AnkiCard:
+    """Create a card with every sentence pair and audio field filled, like a complete deck."""
+    fields = {
+        "note_id": 1_000_000 + i,
+        "model_id": 1607392319,
+        "original_guid": f"bench_{i}",
+        "frequency_rank": f"{i:05d}",
+        "full_source": f"das Beispielwort {i}",
+        "base_source": f"Beispielwort {i}",
+        "base_target": f"przykładowe słowo {i}",
+        "artikel_d": "das",
+        "plural_d": "Beispielwörter",
+        "original_order": str(i),
+        "full_source_audio": f"[sound:full_{i}.mp3]",
+        "base_audio": f"[sound:base_{i}.mp3]",
+        "base_target_audio": f"[sound:base_target_{i}.mp3]",
+    }
+    for n in range(1, 10):
+        fields[f"s{n}_source"] = f"Das ist der Beispielsatz Nummer {n} für das Wort {i}, etwas länger."
+        fields[f"s{n}_target"] = f"To jest przykładowe zdanie numer {n} dla słowa {i}, trochę dłuższe."
+        fields[f"s{n}_audio"] = f"[sound:s{n}_{i}.mp3]"
+        fields[f"s{n}_target_audio"] = f"[sound:s{n}_target_{i}.mp3]"
+    return AnkiCard(**fields)
+
+
+def build_deck(path: Path, num_cards: int) -> None:
+    """Write a synthetic deck of num_cards cards (streamed, so building itself stays cheap)."""
+    with AnkiDeckWriter(path) as writer:
+        for i in range(num_cards):
+            writer.add_card(make_synthetic_card(i))
+
+
+def mark_processed(card: AnkiCard) -> AnkiCard:
+    """Trivial per-card stage standing in for translation or audio generation."""
+    return card.model_copy(update={"audio_text_d": card.base_source})
+
+
+def run_list_pipeline(source: Path, output: Path) -> None:
+    deck = load_anki_deck(source)
+    processed_cards = [mark_processed(card) for card in deck.cards]
+    save_anki_deck(AnkiDeck(cards=processed_cards, name="bench", total_cards=len(processed_cards)), output)
+
+
+def run_streaming_pipeline(source: Path, output: Path) -> None:
+    def stage(cards: Iterable[AnkiCard]) -> Iterator[AnkiCard]:
+        for card in cards:
+            yield mark_processed(card)
+
+    with AnkiDeckWriter(output) as writer:
+        for card in stage(iter_anki_cards(source)):
+            writer.add_card(card)
+
+
+def measure_peak(pipeline: Callable[[Path, Path], None], source: Path, output: Path) -> Dict[str, float]:
+    """Run a pipeline with stdout silenced and return its peak traced memory and duration."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        start = time.perf_counter()
+        pipeline(source, output)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"peak_mb": peak / (1024 * 1024), "seconds": elapsed}
+
+
+def run_benchmark(sizes: List[int]) -> List[Dict]:
+    """
+    Benchmark both pipelines for each deck size.
+
+    Args:
+        sizes: Deck sizes (number of cards) to test
+
+    Returns:
+        One result row per size
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        for size in sizes:
+            source = tmp / f"source_{size}.apkg"
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                build_deck(source, size)
+
+            list_result = measure_peak(run_list_pipeline, source, tmp / f"list_{size}.apkg")
+            streaming_result = measure_peak(run_streaming_pipeline, source, tmp / f"stream_{size}.apkg")
+            results.append({"cards": size, "list": list_result, "streaming": streaming_result})
+    return results
+
+
+def main():
+    """Main function with command line argument parsing."""
+    parser = argparse.ArgumentParser(description="Compare peak memory of list-based and streaming deck processing")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[500, 2000, 8000],
+        help="Deck sizes (number of cards) to benchmark"
+    )
+    args = parser.parse_args()
+
+    print("📏 Peak memory benchmark (tracemalloc)")
+    print(f"   Deck sizes: {args.sizes}")
+
+    results = run_benchmark(args.sizes)
+
+    print(f"\n{'cards':>8} | {'list peak MB':>12} | {'stream peak MB':>14} | {'list s':>7} | {'stream s':>8}")
+    print("-" * 62)
+    for row in results:
+        print(
+            f"{row['cards']:>8} | {row['list']['peak_mb']:>12.1f} | {row['streaming']['peak_mb']:>14.1f} | "
+            f"{row['list']['seconds']:>7.2f} | {row['streaming']['seconds']:>8.2f}"
+        )
+
+    first, last = results[0], results[-1]
+    growth = last["cards"] / first["cards"]
+    print(f"\n📊 Deck size grew {growth:.0f}x:")
+    print(f"   list peak grew {last['list']['peak_mb'] / first['list']['peak_mb']:.1f}x")
+    print(f"   streaming peak grew {last['streaming']['peak_mb'] / first['streaming']['peak_mb']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
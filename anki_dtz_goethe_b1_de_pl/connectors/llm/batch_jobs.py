@@ -0,0 +1,185 @@
+"""
+Offline JSONL batch-job support for Gemini structured generation.
+
+Batch prediction is cheaper and has higher throughput than online
+``generate_content`` calls. The flow is:
+
+1. ``export_batch_requests`` writes every prompt that is not yet in ``.llm_cache``
+   to a batch-input JSONL file (Vertex AI Gemini batch format, one request per line).
+2. The file is submitted as a batch prediction job (or run through
+   ``run_local_batch`` for testing), which produces a batch-output JSONL file.
+3. ``import_batch_output`` validates each response against the schema and stores
+   it in ``.llm_cache`` under the same key an online call would use, so a normal
+   run afterwards finishes entirely from cache.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from connectors.llm.structured_gemini import cache, create_cache_key
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def build_batch_request(text: str, schema: Type[BaseModel]) -> Dict:
+    """
+    Build one batch-input line for a structured generation request.
+
+    Args:
+        text: The prompt text
+        schema: The expected response schema
+
+    Returns:
+        Dictionary in the Vertex AI batch prediction request format
+    """
+    return {
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": text}]}],
+            "generationConfig": {
+                "responseMimeType": "application/json",
+                "responseSchema": schema.model_json_schema(),
+            },
+        }
+    }
+
+
+def _request_text(request: Dict) -> str:
+    """Recover the prompt text from an (echoed) batch request."""
+    return "".join(
+        part.get("text", "")
+        for content in request.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def _response_text(response: Dict) -> str:
+    """Extract the generated text from a batch response."""
+    candidates = response.get("candidates") or []
+    if not candidates:
+        raise ValueError("Response has no candidates")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+def export_batch_requests(prompts: Iterable[str], schema: Type[BaseModel], output_path: Path, model: str) -> Dict:
+    """
+    Write all cache-missing prompts to a batch-input JSONL file.
+
+    Args:
+        prompts: Prompt texts (duplicates are written once)
+        schema: The expected response schema
+        output_path: Path of the JSONL file to create
+        model: Model name used for cache keys (must match the online client)
+
+    Returns:
+        Statistics dictionary (total, cached, exported)
+    """
+    stats = {"total": 0, "cached": 0, "exported": 0}
+    seen = set()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        for text in prompts:
+            stats["total"] += 1
+            cache_key = create_cache_key(model, text, schema)
+            if cache_key in seen:
+                continue
+            seen.add(cache_key)
+            if cache.get(cache_key) is not None:
+                stats["cached"] += 1
+                continue
+            f.write(json.dumps(build_batch_request(text, schema), ensure_ascii=False) + "\n")
+            stats["exported"] += 1
+
+    logger.info(f"Exported {stats['exported']} batch requests to {output_path}")
+    return stats
+
+
+def import_batch_output(output_path: Path, schema: Type[BaseModel], model: str) -> Dict:
+    """
+    Validate a batch-output JSONL file and store the responses in the LLM cache.
+
+    Args:
+        output_path: Batch-output JSONL file (each line echoes its request)
+        schema: The expected response schema
+        model: Model name used for cache keys (must match the online client)
+
+    Returns:
+        Statistics dictionary (lines, imported, failed, invalid)
+    """
+    stats = {"lines": 0, "imported": 0, "failed": 0, "invalid": 0}
+
+    with open(output_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            stats["lines"] += 1
+            try:
+                record = json.loads(line)
+                if record.get("status"):
+                    # The batch service reports per-request errors in "status"
+                    logger.warning(f"Line {line_number}: request failed in batch job: {record['status']}")
+                    stats["failed"] += 1
+                    continue
+                text = _request_text(record["request"])
+                parsed = schema.model_validate_json(_response_text(record["response"]))
+            except (json.JSONDecodeError, KeyError, ValueError, ValidationError) as e:
+                logger.warning(f"Line {line_number}: invalid batch output: {e}")
+                stats["invalid"] += 1
+                continue
+
+            cache.set(create_cache_key(model, text, schema), parsed.model_dump())
+            stats["imported"] += 1
+
+    logger.info(f"Imported {stats['imported']} batch responses from {output_path}")
+    return stats
+
+
+def run_local_batch(
+    input_path: Path,
+    output_path: Path,
+    schema: Type[T],
+    responder: Callable[[str, Type[T]], T],
+) -> int:
+    """
+    Local stand-in for the batch prediction service.
+
+    Reads a batch-input file and writes a batch-output file in the same format
+    the service produces, calling ``responder(prompt, schema)`` for each request.
+    A responder exception becomes a per-line error status, like a failed request.
+
+    Args:
+        input_path: Batch-input JSONL file
+        output_path: Batch-output JSONL file to create
+        schema: The expected response schema
+        responder: Callable producing a schema instance for a prompt
+
+    Returns:
+        Number of requests processed
+    """
+    processed = 0
+    with open(input_path, encoding="utf-8") as src, open(output_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            request = json.loads(line)["request"]
+            record: Dict = {"status": "", "request": request}
+            try:
+                result = responder(_request_text(request), schema)
+                record["response"] = {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": result.model_dump_json()}]},
+                        "finishReason": "STOP",
+                    }]
+                }
+            except Exception as e:
+                record["status"] = f"{type(e).__name__}: {e}"
+            dst.write(json.dumps(record, ensure_ascii=False) + "\n")
+            processed += 1
+    return processed
@@ -1,6 +1,8 @@
 import logging
 import hashlib
 import os
+import threading
+import time
 from typing import Type, TypeVar
 
 import diskcache as dc
@@ -24,12 +26,51 @@ T = TypeVar("T", bound=BaseModel)
 cache = dc.Cache('.llm_cache', size_limit=1_000_000_000)  # 1GB cache limit
 
 
+def create_cache_key(model: str, text: str, schema: Type[BaseModel]) -> str:
+    """
+    Create the cache key for an LLM request (shared by online calls and batch import).
+
+    Args:
+        model: Model name
+        text: The prompt text
+        schema: The expected response schema
+
+    Returns:
+        str: Unique cache key
+    """
+    # Create hash of model + text + schema that uniquely identifies the request
+    content_to_hash = f"{model}|{text}|{schema.__name__}"
+    return hashlib.sha256(content_to_hash.encode()).hexdigest()
+
+
 class VertexAIConfig(BaseModel):
     """Configuration for Vertex AI Gemini client."""
 
     project_id: str = os.getenv("VERTEX_AI_PROJECT_ID", "")
     location: str = os.getenv("VERTEX_AI_LOCATION", "us-central1")
     llm_model: str = os.getenv("VERTEX_AI_MODEL", "gemini-2.0-flash")
+    requests_per_minute: int = int(os.getenv("VERTEX_AI_REQUESTS_PER_MINUTE", "60"))
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing API calls evenly to stay under a requests-per-minute quota."""
+
+    def __init__(self, requests_per_minute: int) -> None:
+        self.min_interval: float = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot: float = 0.0
+
+    def acquire(self) -> None:
+        """Block until the caller may issue the next request."""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
 
 
 class LLMClient:
@@ -38,6 +79,8 @@ class LLMClient:
         self.location: str = config.location
         self.model: str = config.llm_model
         self.config = config  # Store config for cache key generation
+        # Shared by every thread using this client, so concurrent callers respect one quota
+        self.rate_limiter = RateLimiter(config.requests_per_minute)
         self.client = genai.Client(
             vertexai=True,
             project=self.project,
@@ -56,9 +99,7 @@ class LLMClient:
         Returns:
             str: Unique cache key
         """
-        # Create hash of model + text + schema that uniquely identifies the request
-        content_to_hash = f"{self.model}|{text}|{schema.__name__}"
-        return hashlib.sha256(content_to_hash.encode()).hexdigest()
+        return create_cache_key(self.model, text, schema)
     
     def get_cache_stats(self) -> dict:
         """Get cache statistics for monitoring."""
@@ -73,8 +114,19 @@ class LLMClient:
             logger.warning(f"Failed to get cache stats: {e}")
             return {"error": str(e)}
 
-    def generate(self, text: str, schema: Type[T]) -> T:
-        
+    def generate(self, text: str, schema: Type[T], refresh: bool = False) -> T:
+        """
+        Generate a structured response, served from the disk cache when possible.
+
+        Args:
+            text: The prompt text
+            schema: The expected response schema
+            refresh: Skip the cache lookup and overwrite the cached response
+                (used to re-translate cards that failed quality checks)
+
+        Returns:
+            Parsed response of type schema
+        """
         try:
             logger.debug(f"Generating content for text: {text[:100]}{'...' if len(text) > 100 else ''}")
             
@@ -86,7 +138,7 @@ class LLMClient:
             
             # Create cache key and check for cached response
             cache_key = self._create_cache_key(text, schema)
-            cached_result = cache.get(cache_key)
+            cached_result = None if refresh else cache.get(cache_key)
             
             if cached_result is not None:
                 logger.debug(f"🎯 Cache hit for {schema.__name__} - using cached response")
@@ -101,6 +153,7 @@ class LLMClient:
             logger.debug(f"Using model: {self.model}")
             logger.debug(f"Expected response schema: {schema.__name__}")
             
+            self.rate_limiter.acquire()
             try:
                 response: GenerateContentResponse = self.client.models.generate_content(
                     model=self.model,
@@ -5,15 +5,17 @@ Converts AnkiDeck to/from CSV + media format for easy community contribution.
 """
 
 import argparse
+import json
 import pandas as pd
 import shutil
 import zipfile
-import tempfile
+import zlib
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Optional, Tuple
 from schema import AnkiCard, AnkiDeck
-from utilities import load_anki_deck, save_anki_deck
+from utilities import iter_anki_cards, save_anki_deck
 
 
 def export_deck_to_csv(deck: AnkiDeck, output_path: Path) -> None:
@@ -89,51 +91,112 @@ def export_deck_to_csv(deck: AnkiDeck, output_path: Path) -> None:
     print(f"   File size: {output_path.stat().st_size / 1024:.1f} KB")
 
 
-def export_media_files(apkg_path: Path, media_output_dir: Path) -> List[str]:
+# Media file extensions recognised when a package has no media map entry for a member
+MEDIA_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.m4a')
+
+
+def _media_members(z: zipfile.ZipFile) -> List[Tuple[zipfile.ZipInfo, str]]:
+    """
+    Pair each media member of an .apkg with the filename the cards reference.
+
+    Args:
+        z: Open .apkg zip file
+
+    Returns:
+        List of (zip member info, media filename)
+    """
+    media_map = json.loads(z.read("media")) if "media" in z.namelist() else {}
+    members = []
+    for info in z.infolist():
+        if info.is_dir() or info.filename in ('collection.anki2', 'collection.anki21', 'media'):
+            continue
+        if info.filename in media_map:
+            members.append((info, os.path.basename(media_map[info.filename])))
+        elif info.filename.isdigit() or info.filename.lower().endswith(MEDIA_EXTENSIONS):
+            members.append((info, info.filename))
+    return members
+
+
+def _file_matches_member(path: Path, info: zipfile.ZipInfo) -> bool:
+    """Check size first, then the CRC32 stored in the zip, without decompressing the member."""
+    if not path.is_file() or path.stat().st_size != info.file_size:
+        return False
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc == info.CRC
+
+
+def _copy_media_members(apkg_path: Path, members: List[Tuple[zipfile.ZipInfo, str]], media_output_dir: Path) -> Tuple[int, int]:
+    """
+    Worker: stream a batch of zip members into the media directory.
+
+    Each worker opens its own handle on the .apkg so reads don't contend.
+
+    Returns:
+        (files written, files skipped because they already match)
     """
-    Extract media files from .apkg file to media directory.
+    written = skipped = 0
+    with zipfile.ZipFile(apkg_path, 'r') as z:
+        for info, filename in members:
+            output_file = media_output_dir / filename
+            if _file_matches_member(output_file, info):
+                skipped += 1
+                continue
+            # Write to a temp name and rename, so an interrupted export never leaves a truncated file
+            tmp_file = output_file.with_name(output_file.name + '.tmp')
+            with z.open(info) as src, open(tmp_file, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(tmp_file, output_file)
+            written += 1
+    return written, skipped
+
+
+def export_media_files(apkg_path: Path, media_output_dir: Path, max_workers: int = 8) -> List[str]:
+    """
+    Stream media files from .apkg file to media directory.
+
+    Zip members are copied directly (no temporary extraction) by a thread pool,
+    under the filenames the cards reference. Files that already exist with the
+    same size and CRC32 are skipped, so re-exports only write what changed.
     
     Args:
         apkg_path: Path to the .apkg file
         media_output_dir: Directory to save media files
+        max_workers: Number of concurrent copy threads
         
     Returns:
-        List of extracted media file names
+        List of media file names in the package (written or already up to date)
     """
-    print(f"🎵 Extracting media files from {apkg_path} to {media_output_dir}")
+    print(f"🎵 Exporting media files from {apkg_path} to {media_output_dir}")
     
     # Ensure media directory exists
     media_output_dir.mkdir(parents=True, exist_ok=True)
     
-    extracted_files = []
-    
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Extract .apkg file
-            with zipfile.ZipFile(apkg_path, "r") as z:
-                z.extractall(tmpdir)
-            
-            # Find and copy media files (typically numbered files)
-            for item in os.listdir(tmpdir):
-                item_path = os.path.join(tmpdir, item)
-                
-                # Skip database files, only copy media
-                if os.path.isfile(item_path) and item not in ['collection.anki2', 'media']:
-                    # Check if it's likely a media file (numbered or has audio extension)
-                    if (item.isdigit() or 
-                        any(item.lower().endswith(ext) for ext in ['.mp3', '.wav', '.ogg', '.m4a'])):
-                        
-                        output_file = media_output_dir / item
-                        shutil.copy2(item_path, output_file)
-                        extracted_files.append(item)
-                        print(f"  📁 Extracted: {item}")
+        with zipfile.ZipFile(apkg_path, "r") as z:
+            members = _media_members(z)
+
+        # Round-robin batches, one per worker
+        batches = [members[i::max_workers] for i in range(max_workers)]
+        written = skipped = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_copy_media_members, apkg_path, batch, media_output_dir)
+                for batch in batches if batch
+            ]
+            for future in as_completed(futures):
+                batch_written, batch_skipped = future.result()
+                written += batch_written
+                skipped += batch_skipped
     
     except Exception as e:
         print(f"⚠️  Warning: Could not extract media files: {e}")
         return []
     
-    print(f"✅ Successfully extracted {len(extracted_files)} media files")
-    return extracted_files
+    print(f"✅ Exported {len(members)} media files ({written} written, {skipped} unchanged)")
+    return [filename for _, filename in members]
 
 
 def load_deck_from_csv(csv_path: Path, media_dir: Optional[Path] = None) -> AnkiDeck:
@@ -258,16 +321,21 @@ def export_contribution_package(apkg_path: Path, output_dir: Path) -> Tuple[Path
     # Ensure output directory exists
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Load deck from .apkg
-    deck = load_anki_deck(apkg_path)
-    
-    # Export CSV
     csv_path = output_dir / "cards.csv"
-    export_deck_to_csv(deck, csv_path)
-    
-    # Export media files
     media_dir = output_dir / "media"
-    extracted_files = export_media_files(apkg_path, media_dir)
+
+    def export_csv() -> AnkiDeck:
+        # Stream cards (only collection.anki2 is extracted, media stays in the zip)
+        cards = list(iter_anki_cards(apkg_path))
+        deck = AnkiDeck(cards=cards, name=apkg_path.stem, total_cards=len(cards))
+        export_deck_to_csv(deck, csv_path)
+        return deck
+
+    # Write the CSV while the media copy runs
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        csv_future = executor.submit(export_csv)
+        extracted_files = export_media_files(apkg_path, media_dir)
+        deck = csv_future.result()
     
     # Create README for contributors
     readme_path = output_dir / "README.md"
@@ -6,60 +6,74 @@ Supports parameterized source/target languages for contribution workflow.
 """
 
 import argparse
+import hashlib
+from itertools import islice
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, Tuple
+from audio_postprocess import AudioPostProcessConfig, postprocess_audio_files
 from tts_engine import TTSGenerator
-from utilities import load_anki_deck, save_anki_deck
-from schema import AnkiCard, AnkiDeck
+from utilities import AnkiDeckReader, AnkiDeckWriter
+from schema import AnkiCard
 
 
-def generate_complete_audio_for_card(card: AnkiCard, tts_generator: TTSGenerator, audio_dir: Path, source_lang: str = "german", target_lang: str = "polish") -> AnkiCard:
+# Text field -> audio field with speaking rate.
+# Source language fields: slow for learning, normal for examples
+SOURCE_AUDIO_FIELDS = [
+    ('audio_text_d', 'full_source_audio', 1.00),
+    ('base_source', 'base_audio', 0.95),
+    ('s1_source', 's1_audio', 1.07),
+    ('s2_source', 's2_audio', 1.08),
+    ('s3_source', 's3_audio', 1.08),
+    ('s4_source', 's4_audio', 1.08),
+    ('s5_source', 's5_audio', 1.12),
+    ('s6_source', 's6_audio', 1.12),
+    ('s7_source', 's7_audio', 1.15),
+    ('s8_source', 's8_audio', 1.15),
+    ('s9_source', 's9_audio', 1.15),
+]
+
+# Target language fields: slow for translation, quick for examples
+TARGET_AUDIO_FIELDS = [
+    ('base_target', 'base_target_audio', 1.00),
+    ('s1_target', 's1_target_audio', 1.25),
+    ('s2_target', 's2_target_audio', 1.20),
+    ('s3_target', 's3_target_audio', 1.20),
+    ('s4_target', 's4_target_audio', 1.20),
+    ('s5_target', 's5_target_audio', 1.25),
+    ('s6_target', 's6_target_audio', 1.25),
+    ('s7_target', 's7_target_audio', 1.30),
+    ('s8_target', 's8_target_audio', 1.30),
+    ('s9_target', 's9_target_audio', 1.30),
+]
+
+
+def generate_audio_for_fields(
+    card: AnkiCard,
+    fields: List[Tuple[str, str, float]],
+    language: str,
+    tts_generator: TTSGenerator,
+    audio_dir: Path,
+) -> Tuple[AnkiCard, int, int]:
     """
-    Generate TTS audio for ALL text fields in an Anki card.
-    
+    Generate TTS audio for one group of text fields sharing a language.
+
     Args:
         card: AnkiCard to generate audio for
+        fields: (text_field, audio_field, speed) tuples, e.g. SOURCE_AUDIO_FIELDS
+        language: TTS language key ('german', 'polish', ...)
         tts_generator: TTSGenerator instance with caching
         audio_dir: Directory to save audio files
-        
+
     Returns:
-        Updated AnkiCard with audio file references
+        Tuple of (updated card, newly generated count, cached count)
     """
     # Create a copy of the card to modify
     updated_card = card.model_copy()
-    
-    # Define all text fields that need audio generation with variable speeds
-    audio_fields = [
-        # Source language fields -> source audio (slow for learning, normal for examples)
-        ('audio_text_d', source_lang, 'full_source_audio', 1.00),
-        ('base_source', source_lang, 'base_audio', 0.95),
-        ('s1_source', source_lang, 's1_audio', 1.07),
-        ('s2_source', source_lang, 's2_audio', 1.08),
-        ('s3_source', source_lang, 's3_audio', 1.08),
-        ('s4_source', source_lang, 's4_audio', 1.08),
-        ('s5_source', source_lang, 's5_audio', 1.12),
-        ('s6_source', source_lang, 's6_audio', 1.12),
-        ('s7_source', source_lang, 's7_audio', 1.15),
-        ('s8_source', source_lang, 's8_audio', 1.15),
-        ('s9_source', source_lang, 's9_audio', 1.15),
-        
-        # Target language fields -> target audio (slow for translation, quick for examples)
-        ('base_target', target_lang, 'base_target_audio', 1.00),
-        ('s1_target', target_lang, 's1_target_audio', 1.25),
-        ('s2_target', target_lang, 's2_target_audio', 1.20),
-        ('s3_target', target_lang, 's3_target_audio', 1.20),
-        ('s4_target', target_lang, 's4_target_audio', 1.20),
-        ('s5_target', target_lang, 's5_target_audio', 1.25),
-        ('s6_target', target_lang, 's6_target_audio', 1.25),
-        ('s7_target', target_lang, 's7_target_audio', 1.30),
-        ('s8_target', target_lang, 's8_target_audio', 1.30),
-        ('s9_target', target_lang, 's9_target_audio', 1.30),
-    ]
-    
+
     generated_count = 0
     cached_count = 0
-    
-    for text_field, language, audio_field, speed in audio_fields:
+
+    for text_field, audio_field, speed in fields:
         # Get text content
         text_content = getattr(card, text_field, "")
         
@@ -69,7 +83,6 @@ def generate_complete_audio_for_card(card: AnkiCard, tts_generator: TTSGenerator
             continue
         
         # Generate filename based on content hash (for consistency)
-        import hashlib
         content_hash = hashlib.md5(f"{text_content}_{language}".encode()).hexdigest()[:12]
         audio_filename = f"{content_hash}.mp3"
         audio_path = audio_dir / audio_filename
@@ -91,6 +104,31 @@ def generate_complete_audio_for_card(card: AnkiCard, tts_generator: TTSGenerator
         else:
             # Set empty if generation failed
             setattr(updated_card, audio_field, "")
+
+    return updated_card, generated_count, cached_count
+
+
+def generate_complete_audio_for_card(card: AnkiCard, tts_generator: TTSGenerator, audio_dir: Path, source_lang: str = "german", target_lang: str = "polish") -> AnkiCard:
+    """
+    Generate TTS audio for ALL text fields in an Anki card.
+    
+    Args:
+        card: AnkiCard to generate audio for
+        tts_generator: TTSGenerator instance with caching
+        audio_dir: Directory to save audio files
+        
+    Returns:
+        Updated AnkiCard with audio file references
+    """
+    updated_card, source_generated, source_cached = generate_audio_for_fields(
+        card, SOURCE_AUDIO_FIELDS, source_lang, tts_generator, audio_dir
+    )
+    updated_card, target_generated, target_cached = generate_audio_for_fields(
+        updated_card, TARGET_AUDIO_FIELDS, target_lang, tts_generator, audio_dir
+    )
+
+    generated_count = source_generated + target_generated
+    cached_count = source_cached + target_cached
     
     if generated_count > 0 or cached_count > 0:
         print(f"   ✅ Generated: {generated_count}, Cached: {cached_count} audio files")
@@ -98,22 +136,63 @@ def generate_complete_audio_for_card(card: AnkiCard, tts_generator: TTSGenerator
     return updated_card
 
 
+def iter_cards_with_audio(
+    cards: Iterable[AnkiCard],
+    tts_generator: TTSGenerator,
+    audio_dir: Path,
+    source_lang: str = "german",
+    target_lang: str = "polish",
+    total_cards: int | None = None,
+) -> Iterator[AnkiCard]:
+    """
+    Streaming stage: consume cards and yield them with audio, one at a time.
+
+    Args:
+        cards: Any iterable of cards (e.g. utilities.iter_anki_cards)
+        tts_generator: TTSGenerator instance with caching
+        audio_dir: Directory to save audio files
+        source_lang: TTS language key for the source fields
+        target_lang: TTS language key for the target fields
+        total_cards: Optional total for progress output
+
+    Yields:
+        Updated AnkiCard with audio file references
+    """
+    total_label = f"/{total_cards}" if total_cards else ""
+    for i, card in enumerate(cards, 1):
+        print(f"\n🎤 Processing card {i}{total_label}: {card.base_source}")
+
+        yield generate_complete_audio_for_card(card, tts_generator, audio_dir, source_lang, target_lang)
+
+        # Show progress every 50 cards
+        if i % 50 == 0:
+            cache_info = tts_generator.cache_info()
+            print(f"   📊 Progress: {i}{total_label} cards processed")
+            print(f"   💾 Cache: {cache_info['cache_size']} items, {cache_info['cache_volume_mb']:.1f} MB")
+
+
 def generate_audio_for_entire_deck(
     input_deck_path: Path, 
     output_deck_path: Path,
     audio_dir: Path |None = None,
     limit_cards: int|None = None,
     source_lang: str = "german",
-    target_lang: str = "polish"
+    target_lang: str = "polish",
+    postprocess: AudioPostProcessConfig | None = None,
 ) -> Dict:
     """
     Generate TTS audio for an entire Anki deck.
+
+    Cards are streamed from the input deck through the audio stage into the
+    output deck, so memory use stays constant regardless of deck size.
     
     Args:
         input_deck_path: Path to input .apkg file
         output_deck_path: Path to save output .apkg file  
         audio_dir: Directory to save audio files (default: audio_files/)
         limit_cards: Optional limit for testing (None = all cards)
+        postprocess: Optional loudness normalization / re-encoding settings; processed
+            clips go to <audio_dir>_processed/ and are packaged instead of the raw TTS output
         
     Returns:
         Statistics dictionary
@@ -127,75 +206,91 @@ def generate_audio_for_entire_deck(
     print(f"   Input: {input_deck_path}")
     print(f"   Output: {output_deck_path}")
     print(f"   Audio directory: {audio_dir}")
+
+    # Raw TTS clips stay in audio_dir (TTS cache output); the deck packages processed copies
+    media_dir = audio_dir if postprocess is None else audio_dir.parent / f"{audio_dir.name}_processed"
+    postprocess_stats = None
     
-    # Load the frequency-sorted deck
-    print("\n📂 Loading deck...")
-    deck = load_anki_deck(input_deck_path)
-    print(f"   Loaded {len(deck.cards)} cards")
-    
-    # Limit cards for testing if specified
-    cards_to_process = deck.cards
-    if limit_cards:
-        cards_to_process = deck.cards[:limit_cards]
-        print(f"   Limited to first {len(cards_to_process)} cards for testing")
-    
-    # Initialize TTS generator with caching
-    with TTSGenerator() as tts:
-        # Show initial cache info
-        cache_info = tts.cache_info()
-        print("\n💾 Cache info (before):")
-        print(f"   Cached items: {cache_info['cache_size']}")
-        print(f"   Cache size: {cache_info['cache_volume_mb']:.2f} MB")
-        
-        # Process all cards
-        processed_cards = []
-        
-        for i, card in enumerate(cards_to_process, 1):
-            print(f"\n🎤 Processing card {i}/{len(cards_to_process)}: {card.base_source}")
-            
-            updated_card = generate_complete_audio_for_card(card, tts, audio_dir, source_lang, target_lang)
-            processed_cards.append(updated_card)
-            
-            # Show progress every 50 cards
-            if i % 50 == 0:
-                cache_info = tts.cache_info()
-                print(f"   📊 Progress: {i}/{len(cards_to_process)} cards processed")
-                print(f"   💾 Cache: {cache_info['cache_size']} items, {cache_info['cache_volume_mb']:.1f} MB")
-        
-        # Final cache info
-        cache_info = tts.cache_info()
-        print("\n💾 Cache info (after):")
-        print(f"   Cached items: {cache_info['cache_size']}")
-        print(f"   Cache size: {cache_info['cache_volume_mb']:.2f} MB")
-    
-    # Create new deck with audio
-    audio_deck = AnkiDeck(
-        cards=processed_cards,
-        name=f"{deck.name}_WithAudio",
-        total_cards=len(processed_cards)
-    )
-    
-    # Save the deck with audio
-    print("\n💾 Saving deck with audio...")
-    save_anki_deck(audio_deck, output_deck_path, input_deck_path, audio_dir)
+    # Open the frequency-sorted deck for streaming
+    print("\n📂 Opening deck...")
+    with AnkiDeckReader(input_deck_path) as reader:
+        input_cards = len(reader)
+        print(f"   Found {input_cards} cards")
+
+        # Limit cards for testing if specified
+        cards_to_process: Iterable[AnkiCard] = reader
+        total_to_process = input_cards
+        if limit_cards:
+            cards_to_process = islice(reader, limit_cards)
+            total_to_process = min(limit_cards, input_cards)
+            print(f"   Limited to first {total_to_process} cards for testing")
+
+        # Initialize TTS generator with caching
+        with TTSGenerator() as tts:
+            # Show initial cache info
+            cache_info = tts.cache_info()
+            print("\n💾 Cache info (before):")
+            print(f"   Cached items: {cache_info['cache_size']}")
+            print(f"   Cache size: {cache_info['cache_volume_mb']:.2f} MB")
+
+            # Reader → audio stage → writer, one card at a time
+            with AnkiDeckWriter(output_deck_path, input_deck_path, media_dir) as writer:
+                for card in iter_cards_with_audio(
+                    cards_to_process, tts, audio_dir, source_lang, target_lang, total_to_process
+                ):
+                    writer.add_card(card)
+
+                if postprocess is not None:
+                    print("\n🎚️  Post-processing referenced audio...")
+                    postprocess_stats = postprocess_audio_files(writer.referenced_media(), audio_dir, media_dir, postprocess)
+                print("\n💾 Saving deck with audio...")
+
+            # Final cache info
+            cache_info = tts.cache_info()
+            print("\n💾 Cache info (after):")
+            print(f"   Cached items: {cache_info['cache_size']}")
+            print(f"   Cache size: {cache_info['cache_volume_mb']:.2f} MB")
     
     # Count audio files generated
     audio_files = list(audio_dir.glob("*.mp3"))
     
     stats = {
-        'input_cards': len(deck.cards),
-        'processed_cards': len(processed_cards),
+        'input_cards': input_cards,
+        'processed_cards': writer.cards_written,
         'audio_files_created': len(audio_files),
         'cache_items': cache_info['cache_size'],
         'cache_size_mb': cache_info['cache_volume_mb'],
         'audio_dir_size_mb': sum(f.stat().st_size for f in audio_files) / (1024 * 1024)
     }
+
+    if postprocess_stats is not None:
+        apkg_bytes = output_deck_path.stat().st_size
+        bytes_before, bytes_after = postprocess_stats['bytes_before'], postprocess_stats['bytes_after']
+        # Estimate only (no raw deck is built): MP3 data barely compresses in the zip,
+        # so the measured audio bytes saved ≈ .apkg bytes saved
+        apkg_bytes_raw = apkg_bytes + bytes_before - bytes_after
+        stats['postprocess'] = {
+            **postprocess_stats,
+            'apkg_size_mb': apkg_bytes / (1024 * 1024),
+            'audio_size_reduction_pct': 100 * (1 - bytes_after / bytes_before) if bytes_before else 0.0,
+            'estimated_apkg_size_without_postprocess_mb': apkg_bytes_raw / (1024 * 1024),
+            'estimated_apkg_size_reduction_pct': 100 * (1 - apkg_bytes / apkg_bytes_raw) if apkg_bytes_raw else 0.0,
+        }
     
     print("\n🎯 COMPLETION SUMMARY:")
     print(f"   📊 Processed: {stats['processed_cards']}/{stats['input_cards']} cards")
     print(f"   🎵 Audio files: {stats['audio_files_created']} files")
     print(f"   💾 Cache: {stats['cache_items']} items ({stats['cache_size_mb']:.1f} MB)")
     print(f"   📁 Audio size: {stats['audio_dir_size_mb']:.1f} MB")
+    if 'postprocess' in stats:
+        post = stats['postprocess']
+        print(f"   🎚️  Post-processing: {post['clips']} clips in {post['seconds']}s "
+              f"({post['processed']} processed, {post['cached']} cached)")
+        print(f"   📉 Packaged audio: {post['bytes_before'] / (1024 * 1024):.1f} MB raw → "
+              f"{post['bytes_after'] / (1024 * 1024):.1f} MB (-{post['audio_size_reduction_pct']:.0f}%, measured)")
+        print(f"   📦 .apkg size: {post['apkg_size_mb']:.1f} MB "
+              f"(estimated {post['estimated_apkg_size_without_postprocess_mb']:.1f} MB without post-processing, "
+              f"-{post['estimated_apkg_size_reduction_pct']:.0f}%)")
     print(f"   ✅ Deck saved: {output_deck_path}")
     
     return stats
@@ -229,6 +324,32 @@ def main():
         type=int,
         help="Limit number of cards for testing"
     )
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="Normalize loudness and re-encode clips with ffmpeg before packaging"
+    )
+    parser.add_argument(
+        "--target-lufs",
+        type=float,
+        default=-16.0,
+        help="Loudness target in LUFS (with --normalize)"
+    )
+    parser.add_argument(
+        "--bitrate",
+        default="48k",
+        help="MP3 bitrate for re-encoded clips (with --normalize)"
+    )
+    parser.add_argument(
+        "--stereo",
+        action="store_true",
+        help="Keep stereo instead of downmixing to mono (with --normalize)"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        help="Number of ffmpeg processes (with --normalize, default: CPU count)"
+    )
     parser.add_argument(
         "--no-confirm", 
         action="store_true",
@@ -265,7 +386,10 @@ def main():
         audio_dir=args.audio_dir,
         limit_cards=args.limit,
         source_lang="german",
-        target_lang="polish"
+        target_lang="polish",
+        postprocess=AudioPostProcessConfig(
+            target_lufs=args.target_lufs, bitrate=args.bitrate, mono=not args.stereo, max_workers=args.workers
+        ) if args.normalize else None,
     )
     
     print(f"\n🎉 Complete! Import {args.target} into Anki to test the enhanced cards.")
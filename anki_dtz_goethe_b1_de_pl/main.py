@@ -1,11 +1,15 @@
 from pathlib import Path
-from utilities import load_anki_deck, save_anki_deck
+from typing import Iterable, Iterator
+from utilities import iter_anki_cards, load_anki_deck, save_anki_deck
+from connectors.llm.batch_jobs import export_batch_requests, import_batch_output
 from connectors.llm.structured_gemini import LLMClient, VertexAIConfig
 from prompt import create_text_translation_prompt
 from schema import AnkiCard, AnkiDeck, AnkiCardTextFields
 
 
-def translate_card_with_llm(card: AnkiCard, llm_client: LLMClient) -> AnkiCard:
+def translate_card_with_llm(
+    card: AnkiCard, llm_client: LLMClient, target_language: str = "Polish", refresh_cache: bool = False
+) -> AnkiCard:
     """
     Translate a single AnkiCard from German-English to German-Polish using LLM.
     Uses text-only model for LLM translation to improve efficiency and accuracy.
@@ -13,17 +17,22 @@ def translate_card_with_llm(card: AnkiCard, llm_client: LLMClient) -> AnkiCard:
     Args:
         card: Original AnkiCard with German-English content
         llm_client: Configured LLM client
+        target_language: English name of the target language (default: Polish)
+        refresh_cache: Ignore a cached response and request a fresh translation
 
     Returns:
-        AnkiCard: Translated card with German-Polish content, metadata preserved
+        AnkiCard: Translated card with German-<target> content, metadata preserved
     """
     try:
         # Convert to text-only model for LLM translation
         text_model = card.to_text_model()
-        prompt = create_text_translation_prompt(text_model)
+        prompt = create_text_translation_prompt(text_model, target_language)
 
         # Translate using text-only model (faster, cheaper, more accurate)
-        translated_text_model = llm_client.generate(prompt, AnkiCardTextFields)
+        if refresh_cache:
+            translated_text_model = llm_client.generate(prompt, AnkiCardTextFields, refresh=True)
+        else:
+            translated_text_model = llm_client.generate(prompt, AnkiCardTextFields)
         
         # Convert back to full AnkiCard with preserved metadata and audio fields
         translated_card = card.from_text_model(translated_text_model)
@@ -31,7 +40,7 @@ def translate_card_with_llm(card: AnkiCard, llm_client: LLMClient) -> AnkiCard:
         return translated_card
     except Exception as e:
         import traceback
-        print(f"\n❌ ERROR translating card {card.note_id}")
+        print(f"\n❌ ERROR translating card {card.note_id} to {target_language}")
         print(f"Error type: {type(e).__name__}")
         print(f"Error message: {str(e)}")
         print("\n🔍 Full traceback:")
@@ -41,15 +50,93 @@ def translate_card_with_llm(card: AnkiCard, llm_client: LLMClient) -> AnkiCard:
         return card
 
 
+def iter_translated_cards(cards: Iterable[AnkiCard], llm_client: LLMClient, target_language: str = "Polish") -> Iterator[AnkiCard]:
+    """
+    Streaming stage: consume cards and yield translated cards, one at a time.
+
+    Args:
+        cards: Any iterable of cards (e.g. utilities.iter_anki_cards)
+        llm_client: Configured LLM client
+        target_language: English name of the target language (default: Polish)
+
+    Yields:
+        Translated AnkiCard (the original card if translation failed)
+    """
+    for card in cards:
+        yield translate_card_with_llm(card, llm_client, target_language)
+
+
+def export_translation_batch(cards: Iterable[AnkiCard], output_path: Path, model: str, target_language: str = "Polish") -> dict:
+    """
+    Write the translation requests of all cache-missing cards to a batch-input JSONL file.
+
+    Prompts are built exactly like translate_card_with_llm, so the imported
+    batch results are cache hits for a normal run.
+
+    Args:
+        cards: Cards to translate
+        output_path: Batch-input JSONL file to create
+        model: Model name (must match VertexAIConfig.llm_model of the later run)
+        target_language: English name of the target language (default: Polish)
+
+    Returns:
+        Statistics dictionary (total, cached, exported)
+    """
+    prompts = (create_text_translation_prompt(card.to_text_model(), target_language) for card in cards)
+    return export_batch_requests(prompts, AnkiCardTextFields, output_path, model)
+
+
+def import_translation_batch(batch_output_path: Path, model: str) -> dict:
+    """
+    Validate a batch-output JSONL file and load the translations into .llm_cache.
+
+    Args:
+        batch_output_path: Batch-output JSONL file
+        model: Model name (must match VertexAIConfig.llm_model of the later run)
+
+    Returns:
+        Statistics dictionary (lines, imported, failed, invalid)
+    """
+    return import_batch_output(batch_output_path, AnkiCardTextFields, model)
+
+
 def main():
-    """Test translation of 3 random Anki cards and save as new deck."""
+    """Translate the original deck (or export/import a batch job) and save as new deck."""
+    import argparse
     import traceback
 
+    parser = argparse.ArgumentParser(description="Translate the German-English deck to German-Polish")
+    parser.add_argument(
+        "--export-batch",
+        type=Path,
+        help="Write cache-missing translation requests to this batch-input JSONL file and exit"
+    )
+    parser.add_argument(
+        "--import-batch",
+        type=Path,
+        help="Load a batch-output JSONL file into .llm_cache and exit"
+    )
+    args = parser.parse_args()
+
+    # Load original deck
+    original_deck_path = Path(
+        "data/B1_Wortliste_DTZ_Goethe_vocabsentensesaudiotranslation.apkg"
+    )
+
+    if args.import_batch:
+        stats = import_translation_batch(args.import_batch, VertexAIConfig().llm_model)
+        print(f"📥 Imported {stats['imported']}/{stats['lines']} batch responses "
+              f"({stats['failed']} failed, {stats['invalid']} invalid)")
+        print("   Run without --import-batch to build the deck from cache")
+        return
+
+    if args.export_batch:
+        stats = export_translation_batch(iter_anki_cards(original_deck_path), args.export_batch, VertexAIConfig().llm_model)
+        print(f"📤 Exported {stats['exported']} requests to {args.export_batch} "
+              f"({stats['cached']} already cached, {stats['total']} cards)")
+        return
+
     try:
-        # Load original deck
-        original_deck_path = Path(
-            "data/B1_Wortliste_DTZ_Goethe_vocabsentensesaudiotranslation.apkg"
-        )
         print(f"Loading deck from {original_deck_path}...")
 
         original_deck = load_anki_deck(original_deck_path)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Fan-out translation of one German-English source deck into many target languages.
+
+The source deck is loaded once and German audio is generated once, then shared
+by every output deck. Translations for all target languages run concurrently
+through one rate-limited LLM client, and all target decks are written at the end.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from connectors.llm.structured_gemini import LLMClient, VertexAIConfig
+from generate_all_audio import SOURCE_AUDIO_FIELDS, TARGET_AUDIO_FIELDS, generate_audio_for_fields
+from main import translate_card_with_llm
+from schema import AnkiCard, AnkiDeck
+from tts_engine import TTSGenerator
+from utilities import load_anki_deck, save_anki_deck
+
+
+# Target language key (also the TTS voice key) -> prompt name and deck file code
+TARGET_LANGUAGES: Dict[str, Dict[str, str]] = {
+    "polish": {"name": "Polish", "code": "PL"},
+    "ukrainian": {"name": "Ukrainian", "code": "UK"},
+    "turkish": {"name": "Turkish", "code": "TR"},
+    "arabic": {"name": "Arabic", "code": "AR"},
+}
+
+# Polish keeps the original GUIDs so existing study progress survives re-imports
+DEFAULT_TARGET_LANGUAGE = "polish"
+
+
+def _language_guid(base_guid: str, language: str) -> str:
+    """Derive a per-language GUID so decks for different languages don't overwrite each other in Anki."""
+    if language == DEFAULT_TARGET_LANGUAGE:
+        return base_guid
+    return f"{base_guid}_{TARGET_LANGUAGES[language]['code'].lower()}"
+
+
+def generate_source_audio(cards: List[AnkiCard], tts_generator: TTSGenerator, audio_dir: Path, source_lang: str = "german") -> List[AnkiCard]:
+    """
+    Generate German audio once for every card; the result is shared by all target decks.
+
+    Args:
+        cards: Source cards
+        tts_generator: TTSGenerator instance with caching
+        audio_dir: Directory to save audio files
+        source_lang: TTS language key for the source fields
+
+    Returns:
+        Cards with source audio fields populated
+    """
+    cards_with_audio = []
+    generated_total = 0
+    cached_total = 0
+    for card in cards:
+        updated_card, generated, cached = generate_audio_for_fields(
+            card, SOURCE_AUDIO_FIELDS, source_lang, tts_generator, audio_dir
+        )
+        cards_with_audio.append(updated_card)
+        generated_total += generated
+        cached_total += cached
+
+    print(f"   ✅ Source audio - Generated: {generated_total}, Cached: {cached_total}")
+    return cards_with_audio
+
+
+def translate_cards_to_languages(
+    cards: List[AnkiCard],
+    languages: List[str],
+    llm_client: LLMClient,
+    max_workers: int = 8,
+) -> Dict[str, List[AnkiCard]]:
+    """
+    Translate every card into every target language concurrently.
+
+    All (card, language) pairs share one worker pool and one LLM client, so the
+    client's rate limiter and disk cache apply across languages.
+
+    Args:
+        cards: Source cards (German-English)
+        languages: Target language keys from TARGET_LANGUAGES
+        llm_client: Shared, rate-limited LLM client
+        max_workers: Number of concurrent translation requests
+
+    Returns:
+        Dictionary mapping language key to translated cards in source order
+    """
+    results: Dict[str, List[Optional[AnkiCard]]] = {
+        language: [None] * len(cards) for language in languages
+    }
+    total_jobs = len(cards) * len(languages)
+    completed = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                translate_card_with_llm, card, llm_client, TARGET_LANGUAGES[language]["name"]
+            ): (language, idx)
+            for language in languages
+            for idx, card in enumerate(cards)
+        }
+
+        for future in as_completed(futures):
+            language, idx = futures[future]
+            # translate_card_with_llm never raises; it returns the original card on failure
+            results[language][idx] = future.result()
+            completed += 1
+            if completed % 50 == 0 or completed == total_jobs:
+                print(f"   📊 Progress: {completed}/{total_jobs} translations")
+
+    return {language: [card for card in translated if card is not None] for language, translated in results.items()}
+
+
+def multi_target_pipeline(
+    source_deck_path: Path,
+    output_dir: Path,
+    languages: List[str],
+    audio_dir: Optional[Path] = None,
+    with_audio: bool = False,
+    limit_cards: Optional[int] = None,
+    max_workers: int = 8,
+    llm_client: Optional[LLMClient] = None,
+    tts_generator: Optional[TTSGenerator] = None,
+) -> Dict:
+    """
+    Translate one source deck into several target-language decks in a single pass.
+
+    Args:
+        source_deck_path: Original German-English .apkg
+        output_dir: Directory for the generated decks
+        languages: Target language keys from TARGET_LANGUAGES
+        audio_dir: Directory for TTS audio (default: audio_files/)
+        with_audio: Generate German audio once and target audio per language
+        limit_cards: Optional limit for testing (None = all cards)
+        max_workers: Number of concurrent translation requests
+        llm_client: Optional pre-configured LLM client (created from env if None)
+        tts_generator: Optional TTSGenerator (created if None and with_audio is set)
+
+    Returns:
+        Statistics dictionary
+    """
+    unknown = [language for language in languages if language not in TARGET_LANGUAGES]
+    if unknown:
+        raise ValueError(f"Unsupported target languages: {unknown}. Choose from {sorted(TARGET_LANGUAGES)}")
+
+    if audio_dir is None:
+        audio_dir = Path("audio_files")
+
+    start_time = time.time()
+
+    print("🌍 Multi-target translation")
+    print(f"   Source: {source_deck_path}")
+    print(f"   Targets: {', '.join(languages)}")
+    print(f"   Output directory: {output_dir}")
+
+    # 1. Load the source deck once
+    print("\n📂 Loading source deck...")
+    deck = load_anki_deck(source_deck_path)
+    cards = [card.model_copy() for card in deck.cards]
+    if limit_cards:
+        cards = cards[:limit_cards]
+        print(f"   Limited to first {len(cards)} cards for testing")
+    # Source GUIDs, taken before any stage can hand back (and share) a source card
+    base_guids = [card.original_guid or str(card.note_id) for card in cards]
+
+    owns_tts = False
+    if with_audio and tts_generator is None:
+        tts_generator = TTSGenerator()
+        owns_tts = True
+
+    try:
+        # 2. German audio once, shared by every target deck
+        if with_audio and tts_generator is not None:
+            audio_dir.mkdir(parents=True, exist_ok=True)
+            print("\n🎤 Generating shared German audio...")
+            cards = generate_source_audio(cards, tts_generator, audio_dir)
+
+        # 3. All translations concurrently through the same client
+        if llm_client is None:
+            llm_client = LLMClient(VertexAIConfig())
+        print(f"\n=== TRANSLATING {len(cards)} CARDS INTO {len(languages)} LANGUAGES WITH {llm_client.model} ===")
+        translated = translate_cards_to_languages(cards, languages, llm_client, max_workers)
+
+        # 4. Target audio per language (only the target fields are synthesized)
+        if with_audio and tts_generator is not None:
+            for language in languages:
+                print(f"\n🎤 Generating {language} audio...")
+                translated[language] = [
+                    generate_audio_for_fields(card, TARGET_AUDIO_FIELDS, language, tts_generator, audio_dir)[0]
+                    for card in translated[language]
+                ]
+    finally:
+        if owns_tts and tts_generator is not None:
+            tts_generator.close()
+
+    # 5. Write all target decks in one go
+    print("\n=== SAVING TARGET DECKS ===")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stats: Dict = {"source_cards": len(cards), "languages": {}}
+
+    for language in languages:
+        code = TARGET_LANGUAGES[language]["code"]
+        language_cards = []
+        failed_cards = 0
+        for original_card, base_guid, translated_card in zip(cards, base_guids, translated[language]):
+            # Unchanged target text means the translation fell back to the original card
+            if translated_card.base_target == original_card.base_target:
+                failed_cards += 1
+            # A failed translation is the shared source card itself: never modify it in place
+            language_cards.append(
+                translated_card.model_copy(update={"original_guid": _language_guid(base_guid, language)})
+            )
+
+        output_path = output_dir / f"DTZ_Goethe_B1_DE_{code}.apkg"
+        target_deck = AnkiDeck(
+            cards=language_cards,
+            name=f"DTZ_Goethe_B1_DE_{code}",
+            total_cards=len(language_cards),
+        )
+        save_anki_deck(target_deck, output_path, source_deck_path, audio_dir if with_audio else None)
+
+        stats["languages"][language] = {
+            "output": str(output_path),
+            "cards": len(language_cards),
+            "failed_translations": failed_cards,
+        }
+
+    stats["elapsed_seconds"] = round(time.time() - start_time, 1)
+
+    print("\n🎯 MULTI-TARGET SUMMARY:")
+    print(f"   📊 Source cards: {stats['source_cards']}")
+    for language, language_stats in stats["languages"].items():
+        print(f"   {language}: {language_stats['cards']} cards, "
+              f"{language_stats['failed_translations']} failed → {language_stats['output']}")
+    print(f"   ⏱️  Elapsed: {stats['elapsed_seconds']}s")
+
+    return stats
+
+
+def main():
+    """Main function with command line argument parsing."""
+    parser = argparse.ArgumentParser(
+        description="Translate one German-English deck into several target languages in one pass"
+    )
+    parser.add_argument(
+        "--source", "-s",
+        type=Path,
+        default=Path("data/B1_Wortliste_DTZ_Goethe_vocabsentensesaudiotranslation.apkg"),
+        help="Source .apkg file path"
+    )
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        default=list(TARGET_LANGUAGES),
+        choices=list(TARGET_LANGUAGES),
+        help="Target languages to generate"
+    )
+    parser.add_argument(
+        "--output-dir", "-o",
+        type=Path,
+        default=Path("data/multi_target"),
+        help="Directory for the generated decks"
+    )
+    parser.add_argument(
+        "--audio-dir", "-a",
+        type=Path,
+        default=Path("audio_files"),
+        help="Directory to save audio files"
+    )
+    parser.add_argument(
+        "--with-audio",
+        action="store_true",
+        help="Generate shared German audio and per-language target audio"
+    )
+    parser.add_argument(
+        "--limit", "-l",
+        type=int,
+        help="Limit number of cards for testing"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=8,
+        help="Number of concurrent translation requests"
+    )
+
+    args = parser.parse_args()
+
+    if not args.source.exists():
+        print(f"❌ Source file not found: {args.source}")
+        exit(1)
+
+    stats = multi_target_pipeline(
+        args.source,
+        args.output_dir,
+        args.targets,
+        audio_dir=args.audio_dir,
+        with_audio=args.with_audio,
+        limit_cards=args.limit,
+        max_workers=args.workers,
+    )
+    print(f"📊 Statistics: {stats}")
+
+
+if __name__ == "__main__":
+    main()
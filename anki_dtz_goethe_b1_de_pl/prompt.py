@@ -1,23 +1,27 @@
 from schema import AnkiCard, AnkiCardTextFields
 
 
-def create_text_translation_prompt(text_model: AnkiCardTextFields) -> str:
+def create_text_translation_prompt(text_model: AnkiCardTextFields, target_language: str = "Polish") -> str:
     """
-    Create a prompt for translating AnkiCardTextFields from German-English to German-Polish.
+    Create a prompt for translating AnkiCardTextFields from German-English to German-<target language>.
     This is more efficient than translating the full AnkiCard since it excludes metadata.
 
+    The default target language produces exactly the original German-Polish prompt,
+    so existing cache entries stay valid.
+
     Args:
         text_model: The text-only AnkiCardTextFields with German-English content
+        target_language: English name of the target language (e.g. "Polish", "Ukrainian")
 
     Returns:
         str: Formatted prompt for LLM translation
     """
 
-    prompt = f"""You are a professional German-Polish translator working on creating German-Polish language learning flashcards for DTZ (Deutsch-Test für Zuwanderer) Goethe B1 level vocabulary.
+    prompt = f"""You are a professional German-{target_language} translator working on creating German-{target_language} language learning flashcards for DTZ (Deutsch-Test für Zuwanderer) Goethe B1 level vocabulary.
 
-Your task is to provide DIRECT Polish translations for ALL German content. The English translations are provided as reference context to help you understand the meaning, but you should translate FROM GERMAN TO POLISH directly, not from English to Polish.
+Your task is to provide DIRECT {target_language} translations for ALL German content. The English translations are provided as reference context to help you understand the meaning, but you should translate FROM GERMAN TO {target_language.upper()} directly, not from English to {target_language}.
 
-IMPORTANT: Translate German → Polish directly. Use English only as reference context to understand meaning.
+IMPORTANT: Translate German → {target_language} directly. Use English only as reference context to understand meaning.
 
 ORIGINAL FLASHCARD DATA:
 - German word/phrase (full_source): {text_model.full_source}
@@ -48,21 +52,21 @@ German example sentences with English reference context:
   English reference: {text_model.s9_target} ← USE AS CONTEXT ONLY
 
 TRANSLATION APPROACH:
-1. **Primary task**: Translate each German text DIRECTLY to Polish
+1. **Primary task**: Translate each German text DIRECTLY to {target_language}
 2. **English role**: Use English translations only as reference context to understand meaning and nuance
-3. **Avoid translation chains**: Do NOT translate English to Polish - translate German to Polish
-4. **Quality goal**: Produce natural, idiomatic Polish that accurately conveys the German meaning
+3. **Avoid translation chains**: Do NOT translate English to {target_language} - translate German to {target_language}
+4. **Quality goal**: Produce natural, idiomatic {target_language} that accurately conveys the German meaning
 
 TRANSLATION REQUIREMENTS:
-1. Provide direct German→Polish translations for ALL target fields (base_target, s1_target, s2_target, s3_target, s4_target, s5_target, s6_target, s7_target, s8_target, s9_target)
+1. Provide direct German→{target_language} translations for ALL target fields (base_target, s1_target, s2_target, s3_target, s4_target, s5_target, s6_target, s7_target, s8_target, s9_target)
 2. Keep ALL German source content exactly the same (full_source, base_source, artikel_d, plural_d, audio_text_d, s1_source, s2_source, s3_source, s4_source, s5_source, s6_source, s7_source, s8_source, s9_source)
 3. Use English translations as context to understand meaning, register, and nuance
-4. Ensure Polish translations are natural, idiomatic, and appropriate for B1 level learners
+4. Ensure {target_language} translations are natural, idiomatic, and appropriate for B1 level learners
 5. Match the formality and register of the German original (not the English)
-6. For grammar terms or linguistic concepts, use standard Polish linguistic terminology
-7. If a German source field is empty, leave the corresponding Polish target field empty
+6. For grammar terms or linguistic concepts, use standard {target_language} linguistic terminology
+7. If a German source field is empty, leave the corresponding {target_language} target field empty
 
-CONTEXT: This is for German language learners who speak Polish as their native language, studying for the DTZ (Deutsch-Test für Zuwanderer) at B1 level. They need accurate, natural Polish translations that help them understand German vocabulary and usage patterns.
+CONTEXT: This is for German language learners who speak {target_language} as their native language, studying for the DTZ (Deutsch-Test für Zuwanderer) at B1 level. They need accurate, natural {target_language} translations that help them understand German vocabulary and usage patterns.
 
 Please provide the complete result with all fields filled out appropriately using the same field names (source/target structure)."""
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Audio post-processing validation
+
+Business Objective: Generated clips are loudness-normalized and re-encoded to
+a smaller mono MP3 in parallel, unchanged clips are never processed twice,
+and the deck is still complete when ffmpeg is unavailable.
+"""
+
+import hashlib
+import json
+import shutil
+import subprocess
+import zipfile
+import pytest
+from unittest.mock import MagicMock
+from diskcache import Cache
+from schema import AnkiCard
+import audio_postprocess
+from audio_postprocess import AudioPostProcessConfig, postprocess_audio_files
+from generate_all_audio import generate_audio_for_entire_deck
+from tts_engine import TTSGenerator
+from utilities import AnkiDeckWriter
+
+
+class TestAudioPostProcess:
+    """Test suite for the parallel loudness/bitrate post-processing stage."""
+
+    def test_cached_clips_skip_processing(self, tmp_path, monkeypatch):
+        """A clip whose content hash is cached is served from the cache without ffmpeg."""
+        input_dir, output_dir, cache_dir = tmp_path / "in", tmp_path / "out", tmp_path / "cache"
+        input_dir.mkdir()
+        (input_dir / "clip.mp3").write_bytes(b"raw tts audio")
+
+        config = AudioPostProcessConfig()
+        key = hashlib.sha256(b"raw tts audio" + config.signature().encode()).hexdigest()
+        with Cache(str(cache_dir)) as cache:
+            cache.set(key, b"small")
+
+        monkeypatch.setattr(audio_postprocess, "ProcessPoolExecutor", MagicMock(side_effect=AssertionError("pool used")))
+        stats = postprocess_audio_files(["clip.mp3"], input_dir, output_dir, config, cache_dir)
+
+        assert (output_dir / "clip.mp3").read_bytes() == b"small"
+        assert stats["cached"] == 1 and stats["processed"] == 0
+        assert stats["bytes_before"] == len(b"raw tts audio") and stats["bytes_after"] == len(b"small")
+
+        # Different settings must not reuse the cached result
+        other = AudioPostProcessConfig(bitrate="32k")
+        assert other.signature() != config.signature()
+
+    def test_missing_ffmpeg_copies_clips(self, tmp_path, monkeypatch):
+        """Without ffmpeg, clips are copied unchanged so the deck stays complete."""
+        input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+        input_dir.mkdir()
+        (input_dir / "a.mp3").write_bytes(b"aaa")
+        monkeypatch.setattr(audio_postprocess, "ffmpeg_available", lambda: False)
+
+        stats = postprocess_audio_files(["a.mp3", "missing.mp3"], input_dir, output_dir, cache_dir=tmp_path / "cache")
+
+        assert (output_dir / "a.mp3").read_bytes() == b"aaa"
+        assert stats["clips"] == 1 and stats["failed"] == 1
+
+    @pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+    def test_ffmpeg_normalizes_to_smaller_mono(self, tmp_path):
+        """Real ffmpeg run: output is mono, smaller, and a second run is fully cached."""
+        input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+        input_dir.mkdir()
+        for i in range(3):
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency={300 + i * 100}:duration=2",
+                "-ac", "2", "-b:a", "128k", str(input_dir / f"tone_{i}.mp3"),
+            ], check=True)
+        filenames = [f"tone_{i}.mp3" for i in range(3)]
+        config = AudioPostProcessConfig(bitrate="32k", max_workers=2)
+
+        stats = postprocess_audio_files(filenames, input_dir, output_dir, config, tmp_path / "cache")
+        assert stats["processed"] == 3
+        assert stats["bytes_after"] < stats["bytes_before"]
+
+        probe = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "stream=channels", "-of", "csv=p=0", str(output_dir / "tone_0.mp3")],
+            capture_output=True, text=True, check=True,
+        )
+        assert probe.stdout.strip() == "1"
+
+        rerun = postprocess_audio_files(filenames, input_dir, output_dir, config, tmp_path / "cache")
+        assert rerun["cached"] == 3 and rerun["processed"] == 0
+
+    def test_deck_packages_processed_audio(self, tmp_path, monkeypatch):
+        """generate_audio_for_entire_deck packages the processed clips and reports the size change."""
+        monkeypatch.chdir(tmp_path)
+        source = tmp_path / "source.apkg"
+        with AnkiDeckWriter(source) as writer:
+            writer.add_card(AnkiCard(note_id=1, model_id=1, base_source="Frau", base_target="kobieta"))
+
+        tts = MagicMock(spec=TTSGenerator)
+        tts.cache = MagicMock()
+        tts.cache.get.return_value = None
+        tts.cache_info.return_value = {"cache_size": 0, "cache_volume_mb": 0.0}
+        tts.__enter__ = MagicMock(return_value=tts)
+        tts.__exit__ = MagicMock(return_value=None)
+
+        def fake_synthesize(text, language, output_path, speaking_rate=1.0):
+            output_path.write_bytes(b"raw-" + text.encode())
+            return True
+
+        tts.synthesize_speech.side_effect = fake_synthesize
+        monkeypatch.setattr("generate_all_audio.TTSGenerator", MagicMock(return_value=tts))
+        # Deterministic "processing": pretend ffmpeg halves every clip
+        monkeypatch.setattr(audio_postprocess, "ffmpeg_available", lambda: True)
+
+        def fake_process(input_path, output_path, config):
+            data = input_path.read_bytes()
+            output_path.write_bytes(data[: len(data) // 2])
+            return input_path.name, True, ""
+
+        monkeypatch.setattr(audio_postprocess, "_process_clip", fake_process)
+        monkeypatch.setattr(audio_postprocess, "ProcessPoolExecutor", _InlineExecutor)
+
+        output = tmp_path / "output.apkg"
+        stats = generate_audio_for_entire_deck(
+            source, output, audio_dir=tmp_path / "audio", postprocess=AudioPostProcessConfig()
+        )
+
+        post = stats["postprocess"]
+        assert post["processed"] == 2
+        assert post["bytes_after"] < post["bytes_before"]
+        assert post["audio_size_reduction_pct"] > 0
+        assert post["estimated_apkg_size_without_postprocess_mb"] > post["apkg_size_mb"]
+
+        with zipfile.ZipFile(output) as z:
+            media = json.loads(z.read("media"))
+            packaged = {name: z.read(idx) for idx, name in media.items()}
+        for name, data in packaged.items():
+            if name.endswith(".mp3") and not name.startswith("_"):
+                raw = (tmp_path / "audio" / name).read_bytes()
+                assert data == raw[: len(raw) // 2], "Deck should contain the processed clip"
+
+
+class _InlineExecutor:
+    """Synchronous stand-in for ProcessPoolExecutor (monkeypatched callables don't pickle)."""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(fn(*args))
+        return future
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Offline batch-job translation validation
+
+Business Objective: Bulk translation can run as a cheaper batch job. Requests
+are exported to JSONL, batch results are validated into the LLM cache, and the
+normal translation run then completes without a single online API call.
+"""
+
+import json
+import re
+import pytest
+import diskcache as dc
+from unittest.mock import MagicMock
+import connectors.llm.batch_jobs as batch_jobs
+import connectors.llm.structured_gemini as structured_gemini
+from connectors.llm.batch_jobs import run_local_batch
+from connectors.llm.structured_gemini import LLMClient, RateLimiter
+from main import export_translation_batch, import_translation_batch, translate_card_with_llm
+from schema import AnkiCard, AnkiCardTextFields
+
+MODEL = "gemini-test"
+
+
+class TestBatchJobs:
+    """Test suite for JSONL batch export/import around .llm_cache."""
+
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, monkeypatch):
+        """Point the shared LLM cache at a temporary directory."""
+        test_cache = dc.Cache(str(tmp_path / "llm_cache"))
+        monkeypatch.setattr(structured_gemini, "cache", test_cache)
+        monkeypatch.setattr(batch_jobs, "cache", test_cache)
+        yield test_cache
+        test_cache.close()
+
+    @pytest.fixture
+    def cards(self):
+        return [
+            AnkiCard(note_id=7000 + i, model_id=7000, full_source=f"das Haus {i}", base_source=f"Haus {i}",
+                     base_target=f"house {i}", s1_source=f"Das Haus {i} ist alt.", s1_target=f"The house {i} is old.")
+            for i in range(4)
+        ]
+
+    @staticmethod
+    def local_translator(prompt, schema):
+        """Stand-in model: 'translates' by tagging the German fields from the prompt."""
+        base = re.search(r"- German base form \(base_source\): (.*)", prompt).group(1)
+        sentence = re.search(r"- German sentence 1: (.*)", prompt).group(1)
+        if base.endswith("3"):
+            raise RuntimeError("quota exceeded")
+        return schema(base_source=base, base_target=f"PL {base}", s1_source=sentence, s1_target=f"PL {sentence}")
+
+    @staticmethod
+    def offline_client():
+        """LLMClient whose API must never be called."""
+        client = LLMClient.__new__(LLMClient)
+        client.model = MODEL
+        client.rate_limiter = RateLimiter(0)
+        client.client = MagicMock()
+        client.client.models.generate_content.side_effect = AssertionError("online API call")
+        return client
+
+    def test_export_run_import_then_translate_from_cache(self, tmp_path, cards):
+        """Full round trip: export → local batch → import → translation served from cache."""
+        batch_input = tmp_path / "batch_input.jsonl"
+        batch_output = tmp_path / "batch_output.jsonl"
+
+        stats = export_translation_batch(cards, batch_input, MODEL)
+        assert stats == {"total": 4, "cached": 0, "exported": 4}
+        request = json.loads(batch_input.read_text().splitlines()[0])["request"]
+        assert request["generationConfig"]["responseMimeType"] == "application/json"
+
+        assert run_local_batch(batch_input, batch_output, AnkiCardTextFields, self.local_translator) == 4
+
+        imported = import_translation_batch(batch_output, MODEL)
+        assert imported == {"lines": 4, "imported": 3, "failed": 1, "invalid": 0}
+
+        client = self.offline_client()
+        for card in cards[:3]:
+            translated = translate_card_with_llm(card, client)
+            assert translated.base_target == f"PL {card.base_source}"
+
+        # Only the failed request is exported again
+        assert export_translation_batch(cards, batch_input, MODEL) == {"total": 4, "cached": 3, "exported": 1}
+
+    def test_invalid_responses_are_not_cached(self, tmp_path, cards, isolated_cache):
+        """Responses that don't validate against the schema are rejected."""
+        batch_input = tmp_path / "batch_input.jsonl"
+        batch_output = tmp_path / "batch_output.jsonl"
+        export_translation_batch(cards[:1], batch_input, MODEL)
+
+        request = json.loads(batch_input.read_text())["request"]
+        bad = {"status": "", "request": request, "response": {"candidates": [
+            {"content": {"parts": [{"text": '{"base_target": ["not", "a", "string"]}'}]}}
+        ]}}
+        batch_output.write_text(json.dumps(bad) + "\n" + "not json\n")
+
+        assert import_translation_batch(batch_output, MODEL) == {"lines": 2, "imported": 0, "failed": 0, "invalid": 2}
+        assert len(isolated_cache) == 0
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Contribution package export validation
+
+Business Objective: Exporting the deck for community editing writes the CSV and
+the referenced audio files directly from the .apkg, and re-exporting after small
+edits only rewrites what changed.
+"""
+
+import pandas as pd
+from schema import AnkiCard
+from utilities import AnkiDeckWriter
+import csv_export
+from csv_export import export_contribution_package, export_media_files
+
+
+class TestContributionExport:
+    """Test suite for the streamed contribution export."""
+
+    def _build_deck(self, tmp_path, audio_payloads):
+        """Write a deck whose cards reference the given audio files."""
+        audio_dir = tmp_path / "audio"
+        audio_dir.mkdir(exist_ok=True)
+        for name, payload in audio_payloads.items():
+            (audio_dir / name).write_bytes(payload)
+
+        apkg_path = tmp_path / "deck.apkg"
+        with AnkiDeckWriter(apkg_path, additional_media_dir=audio_dir) as writer:
+            for i, name in enumerate(sorted(audio_payloads)):
+                writer.add_card(AnkiCard(
+                    note_id=6000 + i, model_id=6000, base_source=f"Wort {i}", base_target=f"słowo {i}",
+                    base_audio=f"[sound:{name}]",
+                ))
+        return apkg_path
+
+    def test_export_writes_csv_and_named_media(self, tmp_path):
+        """CSV and media are exported together; media keeps the names referenced by the cards."""
+        payloads = {f"word_{i}.mp3": f"audio {i}".encode() * 100 for i in range(12)}
+        apkg_path = self._build_deck(tmp_path, payloads)
+
+        csv_path, media_dir = export_contribution_package(apkg_path, tmp_path / "package")
+
+        df = pd.read_csv(csv_path)
+        assert len(df) == 12
+        assert set(df["base_audio"]) == {f"[sound:{name}]" for name in payloads}
+        for name, payload in payloads.items():
+            assert (media_dir / name).read_bytes() == payload
+        assert not list(media_dir.glob("*.tmp"))
+        assert (tmp_path / "package" / "README.md").exists()
+
+    def test_reexport_skips_unchanged_files(self, tmp_path, monkeypatch):
+        """Only files whose size or CRC differ are rewritten on re-export."""
+        payloads = {f"word_{i}.mp3": f"audio {i}".encode() * 100 for i in range(10)}
+        apkg_path = self._build_deck(tmp_path, payloads)
+        media_dir = tmp_path / "media"
+
+        # 10 word clips + the template silence file
+        assert len(export_media_files(apkg_path, media_dir)) == 11
+
+        # Same-size edit (only the CRC differs) and one deleted file
+        (media_dir / "word_3.mp3").write_bytes(b"X" * len(payloads["word_3.mp3"]))
+        (media_dir / "word_7.mp3").unlink()
+
+        copied = []
+        original_copy = csv_export.shutil.copyfileobj
+
+        def tracking_copy(src, dst, length=0):
+            copied.append(src.name)
+            return original_copy(src, dst, length)
+
+        monkeypatch.setattr(csv_export.shutil, "copyfileobj", tracking_copy)
+        names = export_media_files(apkg_path, media_dir)
+
+        assert len(names) == 11
+        assert len(copied) == 2, "Only the edited and the missing file should be rewritten"
+        assert (media_dir / "word_3.mp3").read_bytes() == payloads["word_3.mp3"]
+        assert (media_dir / "word_7.mp3").read_bytes() == payloads["word_7.mp3"]
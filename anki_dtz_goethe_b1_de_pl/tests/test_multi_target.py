@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Multi-target translation validation
+
+Business Objective: One source deck fans out into several target-language decks
+while German parsing and German TTS happen only once.
+"""
+
+import re
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock
+from schema import AnkiCard, AnkiCardTextFields, AnkiDeck
+from prompt import create_text_translation_prompt
+from utilities import load_anki_deck, save_anki_deck
+from tts_engine import TTSGenerator
+from multi_target import multi_target_pipeline
+
+
+class TestMultiTarget:
+    """Test suite for the multi-target fan-out pipeline."""
+
+    @pytest.fixture
+    def source_deck_path(self):
+        """Save a small German-English deck to disk."""
+        cards = [
+            AnkiCard(
+                note_id=4000 + i, model_id=4000, original_guid=f"guid_{i}",
+                full_source=f"das Wort {i}", base_source=f"Wort {i}", base_target=f"word {i}",
+                s1_source=f"Das ist Wort {i}.", s1_target=f"This is word {i}.",
+                original_order=str(i),
+            )
+            for i in range(3)
+        ]
+        path = Path("test_output/multi_target_source.apkg")
+        path.parent.mkdir(exist_ok=True)
+        save_anki_deck(AnkiDeck(cards=cards, name="MultiTargetSource", total_cards=len(cards)), path)
+        return path
+
+    @pytest.fixture
+    def mock_llm_client(self):
+        """LLM client that 'translates' by prefixing the target language name."""
+        client = MagicMock()
+        client.model = "mock-model"
+
+        def mock_generate(prompt, schema):
+            language = re.search(r"professional German-(\w+) translator", prompt).group(1)
+            fields = {}
+            for line in prompt.splitlines():
+                match = re.match(r"- German word/phrase \(full_source\): (.*)", line)
+                if match:
+                    fields["full_source"] = match.group(1)
+                match = re.match(r"- German base form \(base_source\): (.*)", line)
+                if match:
+                    fields["base_source"] = match.group(1)
+                match = re.match(r"- German sentence 1: (.*)", line)
+                if match:
+                    fields["s1_source"] = match.group(1)
+            return AnkiCardTextFields(
+                **fields,
+                base_target=f"{language}: {fields['base_source']}",
+                s1_target=f"{language}: {fields['s1_source']}",
+            )
+
+        client.generate.side_effect = mock_generate
+        return client
+
+    @pytest.fixture
+    def mock_tts_generator(self):
+        """TTS generator that records calls instead of hitting the API."""
+        generator = MagicMock(spec=TTSGenerator)
+        generator.cache = MagicMock()
+        generator.cache.get.return_value = None
+        generator.synthesize_speech.return_value = True
+        return generator
+
+    def test_default_prompt_is_unchanged_polish(self):
+        """The parameterized prompt keeps Polish as default and swaps only the language name."""
+        text_model = AnkiCardTextFields(full_source="die Frau", base_source="Frau", base_target="woman")
+
+        polish_prompt = create_text_translation_prompt(text_model)
+        assert polish_prompt == create_text_translation_prompt(text_model, "Polish")
+        assert "German-Polish" in polish_prompt
+
+        ukrainian_prompt = create_text_translation_prompt(text_model, "Ukrainian")
+        assert "German-Ukrainian" in ukrainian_prompt
+        assert "Polish" not in ukrainian_prompt
+        assert "FROM GERMAN TO UKRAINIAN" in ukrainian_prompt
+
+    def test_fan_out_shares_source_work(self, source_deck_path, mock_llm_client, mock_tts_generator):
+        """German audio is generated once while every language gets its own deck."""
+        languages = ["polish", "ukrainian", "turkish"]
+        output_dir = Path("test_output/multi_target")
+
+        stats = multi_target_pipeline(
+            source_deck_path,
+            output_dir,
+            languages,
+            audio_dir=Path("test_output/audio"),
+            with_audio=True,
+            max_workers=4,
+            llm_client=mock_llm_client,
+            tts_generator=mock_tts_generator,
+        )
+
+        # One translation per card per language
+        assert mock_llm_client.generate.call_count == 3 * len(languages)
+
+        # German fields: audio_text_d is empty, so base_source + s1_source per card, once
+        german_calls = [c for c in mock_tts_generator.synthesize_speech.call_args_list if c[0][1] == "german"]
+        assert len(german_calls) == 3 * 2
+
+        # Target fields: base_target + s1_target per card per language
+        for language in languages:
+            language_calls = [c for c in mock_tts_generator.synthesize_speech.call_args_list if c[0][1] == language]
+            assert len(language_calls) == 3 * 2
+
+        guids = set()
+        for language in languages:
+            language_stats = stats["languages"][language]
+            assert language_stats["failed_translations"] == 0
+            deck = load_anki_deck(Path(language_stats["output"]))
+            assert len(deck.cards) == 3
+            name = language.capitalize()
+            for card in deck.cards:
+                assert card.base_target.startswith(f"{name}: ")
+                assert card.base_audio, "Shared German audio should be present in every deck"
+                assert card.base_target_audio, "Target audio should be generated per language"
+                guids.add(card.original_guid)
+
+        # Polish keeps the original GUIDs, other languages get their own
+        assert "guid_0" in guids
+        assert len(guids) == 3 * len(languages)
+
+    def test_failed_language_keeps_other_guids(self, source_deck_path, mock_llm_client):
+        """A failed translation returns the source card; no other language's GUID may build on it."""
+        translate = mock_llm_client.generate.side_effect
+
+        def fail_ukrainian(prompt, schema):
+            if "German-Ukrainian" in prompt:
+                raise RuntimeError("quota exceeded")
+            return translate(prompt, schema)
+
+        mock_llm_client.generate.side_effect = fail_ukrainian
+        languages = ["polish", "ukrainian", "turkish"]
+
+        stats = multi_target_pipeline(
+            source_deck_path, Path("test_output/multi_target"), languages, max_workers=1, llm_client=mock_llm_client
+        )
+
+        assert stats["languages"]["ukrainian"]["failed_translations"] == 3
+        expected = {"polish": "guid_{}", "ukrainian": "guid_{}_uk", "turkish": "guid_{}_tr"}
+        for language in languages:
+            deck = load_anki_deck(Path(stats["languages"][language]["output"]))
+            guids = sorted(card.original_guid for card in deck.cards)
+            assert guids == [expected[language].format(i) for i in range(3)]
+
+    def test_unknown_language_rejected(self, source_deck_path, mock_llm_client):
+        """Unsupported target languages fail before any work is done."""
+        with pytest.raises(ValueError):
+            multi_target_pipeline(source_deck_path, Path("test_output/multi_target"), ["klingon"], llm_client=mock_llm_client)
+        mock_llm_client.generate.assert_not_called()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Streaming deck API validation
+
+Business Objective: Very large decks can be read, transformed and written one
+card at a time, producing the same .apkg as the list-based API while peak
+memory stays flat.
+"""
+
+import json
+import zipfile
+import tracemalloc
+from pathlib import Path
+from unittest.mock import MagicMock
+from schema import AnkiCard, AnkiDeck
+from utilities import AnkiDeckReader, AnkiDeckWriter, iter_anki_cards, load_anki_deck, save_anki_deck
+from generate_all_audio import iter_cards_with_audio
+from tts_engine import TTSGenerator
+from benchmark_streaming import build_deck, make_synthetic_card, run_streaming_pipeline
+
+
+class TestStreamingDeck:
+    """Test suite for the iterator-based deck reader, stages and writer."""
+
+    def test_roundtrip_matches_list_api(self):
+        """Cards written by AnkiDeckWriter load identically through both readers."""
+        cards = [make_synthetic_card(i) for i in range(25)]
+        streamed_path = Path("test_output/streaming_roundtrip.apkg")
+        listed_path = Path("test_output/list_roundtrip.apkg")
+        streamed_path.parent.mkdir(exist_ok=True)
+
+        with AnkiDeckWriter(streamed_path) as writer:
+            for card in cards:
+                writer.add_card(card)
+        save_anki_deck(AnkiDeck(cards=cards, name="ListRoundtrip", total_cards=len(cards)), listed_path)
+
+        with AnkiDeckReader(streamed_path) as reader:
+            assert len(reader) == 25
+            streamed_cards = list(reader)
+        listed_cards = load_anki_deck(listed_path).cards
+
+        ignore = {"note_id"}
+        assert [c.model_dump(exclude=ignore) for c in streamed_cards] == \
+               [c.model_dump(exclude=ignore) for c in listed_cards]
+        assert [c.model_dump(exclude=ignore) for c in iter_anki_cards(streamed_path)] == \
+               [c.model_dump(exclude=ignore) for c in listed_cards]
+
+    def test_writer_packages_only_referenced_media(self, tmp_path):
+        """Referenced audio comes from the media dir or the original package; unreferenced files are skipped."""
+        audio_dir = tmp_path / "audio"
+        audio_dir.mkdir()
+        (audio_dir / "new_audio.mp3").write_bytes(b"new")
+        (audio_dir / "unused.mp3").write_bytes(b"unused")
+        (audio_dir / "_1-minute-of-silence.mp3").write_bytes(b"silence")
+
+        # Original package that ships "original_audio.mp3" (not present in audio_dir)
+        original_audio_dir = tmp_path / "original_audio"
+        original_audio_dir.mkdir()
+        (original_audio_dir / "original_audio.mp3").write_bytes(b"original")
+        original_path = tmp_path / "original.apkg"
+        with AnkiDeckWriter(original_path, additional_media_dir=original_audio_dir) as writer:
+            writer.add_card(AnkiCard(note_id=1, model_id=1, base_source="alt", base_audio="[sound:original_audio.mp3]"))
+
+        output_path = tmp_path / "output.apkg"
+        with AnkiDeckWriter(output_path, original_path, audio_dir) as writer:
+            writer.add_card(AnkiCard(
+                note_id=2, model_id=1, base_source="neu",
+                base_audio="[sound:original_audio.mp3]", s1_audio="[sound:new_audio.mp3]",
+            ))
+
+        with zipfile.ZipFile(output_path) as z:
+            media = json.loads(z.read("media"))
+            contents = {name: z.read(idx) for idx, name in media.items()}
+
+        assert contents["new_audio.mp3"] == b"new"
+        assert contents["original_audio.mp3"] == b"original"
+        assert "_1-minute-of-silence.mp3" in contents, "Template silence file should be packaged"
+        assert "unused.mp3" not in contents
+
+    def test_stages_are_lazy(self, tmp_path):
+        """The audio stage pulls one card at a time instead of draining its input."""
+        pulled = []
+
+        def source():
+            for i in range(3):
+                pulled.append(i)
+                yield AnkiCard(note_id=i, model_id=1, base_source=f"Wort {i}", base_target=f"słowo {i}")
+
+        tts = MagicMock(spec=TTSGenerator)
+        tts.cache = MagicMock()
+        tts.cache.get.return_value = None
+        tts.synthesize_speech.return_value = True
+
+        stage = iter_cards_with_audio(source(), tts, tmp_path)
+        first = next(stage)
+
+        assert pulled == [0]
+        assert first.base_audio and first.base_target_audio
+
+    def test_streaming_peak_memory_is_flat(self, tmp_path):
+        """Peak traced memory of the streaming pipeline does not grow with deck size."""
+        peaks = {}
+        for size in (100, 1000):
+            source = tmp_path / f"source_{size}.apkg"
+            build_deck(source, size)
+            tracemalloc.start()
+            run_streaming_pipeline(source, tmp_path / f"output_{size}.apkg")
+            _, peaks[size] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        print(f"   📊 Peak memory: 100 cards {peaks[100] / 1024:.0f} KB, 1000 cards {peaks[1000] / 1024:.0f} KB")
+        assert peaks[1000] < peaks[100] * 2, "10x more cards should not double peak memory"
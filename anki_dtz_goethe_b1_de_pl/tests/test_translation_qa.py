@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Deck-level translation QA validation
+
+Business Objective: Bad translations (German left over, copies, truncations,
+leaked media tags, placeholders) are found across the whole deck in one pass,
+and exactly the affected cards are queued for re-translation.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from schema import AnkiCard, AnkiCardTextFields
+from translation_qa import find_translation_issues, cards_to_frame, retranslate_flagged_cards, validate_deck_translations
+
+
+class TestTranslationQA:
+    """Test suite for vectorized translation quality checks."""
+
+    @pytest.fixture
+    def clean_cards(self):
+        """A deck of well-translated cards with consistent length ratios."""
+        return [
+            AnkiCard(
+                note_id=5000 + i, model_id=5000,
+                full_source=f"die Aufgabe {i}", base_source=f"Aufgabe {i}", base_target=f"zadanie {i}",
+                s1_source=f"Die Aufgabe {i} ist heute nicht schwer.",
+                s1_target=f"Zadanie {i} nie jest dzisiaj trudne.",
+                s2_source=f"Wir lösen die Aufgabe {i} zusammen.",
+                s2_target=f"Rozwiązujemy zadanie {i} razem.",
+                base_audio=f"[sound:base_{i}.mp3]",
+            )
+            for i in range(40)
+        ]
+
+    def test_clean_deck_has_no_issues(self, clean_cards):
+        """A correctly translated deck produces an empty report."""
+        report = validate_deck_translations(clean_cards, clean_cards)
+
+        assert report.total_cards == 40
+        assert report.checked_pairs == 40 * 3
+        assert report.issue_counts == {}
+        assert report.retranslate_note_ids == []
+        print(report.summary())
+
+    def test_each_check_flags_the_broken_card(self, clean_cards):
+        """Every kind of defect is reported once, on the right card and field."""
+        broken = [card.model_copy() for card in clean_cards]
+        broken[1].s1_target = broken[1].s1_source                          # untranslated copy
+        broken[2].s2_target = "Wir lösen die Aufgabe zusammen und mit"     # German left in target
+        broken[3].base_target = ""                                         # empty translation
+        broken[4].s1_target = "Nie."                                       # truncated
+        broken[5].s2_target = "Rozwiązujemy [sound:s2_5.mp3]"              # leaked media tag
+        broken[6].s1_target = "string"                                     # LLM placeholder
+        broken[7].base_audio = "null"                                      # audio hallucination
+
+        issues = find_translation_issues(cards_to_frame(broken), cards_to_frame(clean_cards))
+        found = {(row.check, row.note_id, row.field) for row in issues.itertuples()}
+
+        assert ("identical_to_source", 5001, "s1_target") in found
+        assert ("german_in_target", 5002, "s2_target") in found
+        assert ("empty_translation", 5003, "base_target") in found
+        assert ("length_ratio", 5004, "s1_target") in found
+        assert ("leaked_sound_tag", 5005, "s2_target") in found
+        assert ("placeholder", 5006, "s1_target") in found
+        assert ("audio_placeholder", 5007, "base_audio") in found
+        assert ("audio_changed", 5007, "base_audio") in found
+
+        report = validate_deck_translations(broken, clean_cards)
+        # Audio problems are fixed by copying from the original, not by re-translating
+        assert report.retranslate_note_ids == [5001, 5002, 5003, 5004, 5005, 5006]
+        assert report.flagged_cards == 7
+
+    def test_loanword_base_forms_are_not_flagged(self, clean_cards):
+        """Base words that are identical across languages (e.g. 'Hotel' → 'hotel') are legitimate."""
+        cards = [card.model_copy() for card in clean_cards]
+        cards[0].base_source = "Hotel"
+        cards[0].base_target = "hotel"
+
+        report = validate_deck_translations(cards)
+        assert "identical_to_source" not in report.issue_counts
+
+    def test_retranslate_bypasses_cache_for_flagged_cards_only(self, clean_cards):
+        """Only flagged cards are sent to the LLM, with the cache refreshed."""
+        llm_client = MagicMock()
+        llm_client.generate.return_value = AnkiCardTextFields(base_source="Aufgabe 1", base_target="zadanie 1")
+
+        updated = retranslate_flagged_cards(clean_cards, clean_cards, [5001], llm_client)
+
+        assert llm_client.generate.call_count == 1
+        assert llm_client.generate.call_args.kwargs == {"refresh": True}
+        assert updated[1].base_target == "zadanie 1"
+        assert updated[0] is clean_cards[0]
+
+    def test_retranslate_uses_original_card_prompt(self, clean_cards):
+        """The fresh translation is requested with the original card's prompt, refreshing its cache entry."""
+        from prompt import create_text_translation_prompt
+
+        originals = [
+            card.model_copy(update={"base_target": "task", "s1_target": "Task is not hard today."})
+            for card in clean_cards
+        ]
+        llm_client = MagicMock()
+        llm_client.generate.return_value = AnkiCardTextFields(base_source="Aufgabe 1", base_target="zadanie 1")
+
+        updated = retranslate_flagged_cards(clean_cards, reversed(originals), [5001, 9999], llm_client)
+
+        prompt = llm_client.generate.call_args.args[0]
+        assert prompt == create_text_translation_prompt(originals[1].to_text_model(), "Polish")
+        assert "Task is not hard today." in prompt
+        assert updated[1].note_id == 5001
+        assert len(updated) == len(clean_cards)
+
+    def test_retranslate_copies_only_text_fields(self, clean_cards):
+        """Fields of the translated card outside the translation (audio, order) are kept."""
+        cards = [card.model_copy(update={"base_target_audio": "[sound:pl.mp3]", "original_order": "7"}) for card in clean_cards]
+        llm_client = MagicMock()
+        llm_client.generate.return_value = AnkiCardTextFields(base_source="Aufgabe 1", base_target="zadanie 1")
+
+        updated = retranslate_flagged_cards(cards, clean_cards, [5001], llm_client)
+
+        assert updated[1].base_target == "zadanie 1"
+        assert updated[1].base_target_audio == "[sound:pl.mp3]"
+        assert updated[1].original_order == "7"
+
+    def test_failed_retranslation_keeps_existing_translation(self, clean_cards):
+        """A failed LLM call must not replace a flagged translation with the English original."""
+        originals = [card.model_copy(update={"base_target": "task"}) for card in clean_cards]
+        llm_client = MagicMock()
+        llm_client.generate.side_effect = RuntimeError("quota exceeded")
+
+        updated = retranslate_flagged_cards(clean_cards, originals, [5001], llm_client)
+
+        assert updated[1] is clean_cards[1]
+        assert updated[1].base_target == "zadanie 1"
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Deck-level translation quality checks.
+
+All checks run as pandas column operations over the whole deck at once instead
+of looping over cards and field lists. The result is a compact report plus the
+note IDs whose translations should be regenerated.
+
+Checks (per source/target pair):
+- empty_translation:   source has text but the target is empty
+- identical_to_source: sentence target is a verbatim copy of the German source
+- german_in_target:    German-only characters or several German function words in the target
+- length_ratio:        target/source length ratio is a deck-level outlier
+- leaked_sound_tag:    a [sound:...] tag ended up in a text field
+- placeholder:         LLM placeholder values such as 'string' or 'null' in a target field
+- audio_placeholder:   the same placeholder values in an audio field
+- audio_changed:       audio field differs from the original deck (only with an original deck)
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+
+from schema import AnkiCard
+from utilities import AUDIO_FIELDS, iter_anki_cards
+
+
+# (source field, target field) pairs that carry a translation
+TRANSLATION_PAIRS = [("base_source", "base_target")] + [(f"s{i}_source", f"s{i}_target") for i in range(1, 10)]
+
+# Plain-text fields that must never contain media tags
+TEXT_FIELDS = ["full_source", "artikel_d", "plural_d", "audio_text_d"] + [
+    field for pair in TRANSLATION_PAIRS for field in pair
+]
+
+# Values LLMs emit instead of real content
+PLACEHOLDER_VALUES = ['string', 'none', 'null', 'empty', '""', "''", 'undefined']
+
+# German-only letters (absent from Polish, Ukrainian, Turkish and Arabic)
+GERMAN_CHARS_PATTERN = r"[äÄß]"
+
+# Frequent German function words; two or more in one target means untranslated German
+GERMAN_WORDS_PATTERN = (
+    r"(?i)\b(?:der|die|das|und|ist|nicht|ein|eine|einen|mit|auf|für|sich|zu|dem|des|"
+    r"wird|haben|sind|werden|oder|aber)\b"
+)
+
+# Length ratio outliers: robust z-score on log(target/source) beyond this many MADs...
+LENGTH_RATIO_MAX_Z = 3.5
+# ...and outside this absolute ratio band (avoids flagging normal variation when MAD is tiny)
+LENGTH_RATIO_BOUNDS = (0.4, 2.5)
+
+# Checks that a fresh translation can fix (audio issues are fixed by copying from the original)
+RETRANSLATE_CHECKS = {
+    "empty_translation", "identical_to_source", "german_in_target",
+    "length_ratio", "leaked_sound_tag", "placeholder",
+}
+
+
+class TranslationQAReport(BaseModel):
+    """Compact result of a deck-level translation quality run."""
+
+    total_cards: int = Field(description="Number of cards checked")
+    checked_pairs: int = Field(description="Number of non-empty source/target pairs checked")
+    issue_counts: Dict[str, int] = Field(default_factory=dict, description="Number of issues per check")
+    flagged_cards: int = Field(default=0, description="Cards with at least one issue")
+    retranslate_note_ids: List[int] = Field(default_factory=list, description="Note IDs to translate again")
+    examples: Dict[str, List[str]] = Field(default_factory=dict, description="A few example issues per check")
+
+    def summary(self) -> str:
+        """Human-readable multi-line summary."""
+        lines = [
+            f"🔎 Translation QA: {self.total_cards} cards, {self.checked_pairs} translation pairs",
+            f"   Flagged cards: {self.flagged_cards}, to re-translate: {len(self.retranslate_note_ids)}",
+        ]
+        if not self.issue_counts:
+            lines.append("   ✅ No issues found")
+        for check, count in sorted(self.issue_counts.items(), key=lambda item: -item[1]):
+            lines.append(f"   ⚠️  {check}: {count}")
+            for example in self.examples.get(check, []):
+                lines.append(f"      - {example}")
+        return "\n".join(lines)
+
+
+def cards_to_frame(cards: Iterable[AnkiCard]) -> pd.DataFrame:
+    """
+    Build a DataFrame with one row per card and one column per AnkiCard field.
+
+    Args:
+        cards: Cards to convert (list or streaming iterator)
+
+    Returns:
+        DataFrame indexed by position, missing values filled with ""
+    """
+    df = pd.DataFrame([card.model_dump() for card in cards])
+    if df.empty:
+        return pd.DataFrame(columns=list(AnkiCard.model_fields))
+    return df.fillna("")
+
+
+def _pairs_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Stack all translation pairs into one long frame: note_id, field, kind, source, target."""
+    frames = []
+    for source_field, target_field in TRANSLATION_PAIRS:
+        frames.append(pd.DataFrame({
+            "note_id": df["note_id"].to_numpy(),
+            "field": target_field,
+            "kind": "base" if target_field == "base_target" else "sentence",
+            "source": df[source_field].astype(str).str.strip().to_numpy(),
+            "target": df[target_field].astype(str).str.strip().to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _issues(mask: pd.Series, frame: pd.DataFrame, check: str, field: pd.Series | str, value: pd.Series) -> pd.DataFrame:
+    """Collect rows where mask is set as issue records."""
+    if not mask.any():
+        return pd.DataFrame(columns=["note_id", "field", "check", "value"])
+    selected = frame.loc[mask]
+    return pd.DataFrame({
+        "note_id": selected["note_id"].to_numpy(),
+        "field": field[mask].to_numpy() if isinstance(field, pd.Series) else field,
+        "check": check,
+        "value": value[mask].astype(str).str.slice(0, 60).to_numpy(),
+    })
+
+
+def find_translation_issues(df: pd.DataFrame, original_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Run every check over the whole deck.
+
+    Args:
+        df: Translated deck as returned by cards_to_frame
+        original_df: Optional original deck (same format) for audio field comparison
+
+    Returns:
+        Long-form DataFrame with columns note_id, field, check, value (one row per issue)
+    """
+    found: List[pd.DataFrame] = []
+    if df.empty:
+        return pd.DataFrame(columns=["note_id", "field", "check", "value"])
+
+    pairs = _pairs_frame(df)
+    has_source = pairs["source"].str.len() > 0
+    has_target = pairs["target"].str.len() > 0
+
+    # Source has text but target is empty
+    found.append(_issues(has_source & ~has_target, pairs, "empty_translation", pairs["field"], pairs["source"]))
+
+    # Verbatim copies; base words are skipped because loanwords ("Hotel" → "hotel") are legitimate
+    identical = (
+        has_target
+        & (pairs["kind"] == "sentence")
+        & (pairs["target"].str.casefold() == pairs["source"].str.casefold())
+    )
+    found.append(_issues(identical, pairs, "identical_to_source", pairs["field"], pairs["target"]))
+
+    # German left in the target text
+    german = has_target & ~identical & (
+        pairs["target"].str.contains(GERMAN_CHARS_PATTERN, regex=True)
+        | (pairs["target"].str.count(GERMAN_WORDS_PATTERN) >= 2)
+    )
+    found.append(_issues(german, pairs, "german_in_target", pairs["field"], pairs["target"]))
+
+    # Length ratio outliers, robust statistics computed separately for base words and sentences
+    both = has_source & has_target
+    log_ratio = pd.Series(np.nan, index=pairs.index)
+    log_ratio[both] = np.log(pairs.loc[both, "target"].str.len() / pairs.loc[both, "source"].str.len())
+    median = log_ratio.groupby(pairs["kind"]).transform("median")
+    mad = (log_ratio - median).abs().groupby(pairs["kind"]).transform("median") * 1.4826
+    # A zero MAD (perfectly uniform ratios) leaves only the absolute bounds in effect
+    robust_z = (log_ratio - median).abs() / mad.where(mad > 0, 1e-9)
+    low, high = np.log(LENGTH_RATIO_BOUNDS[0]), np.log(LENGTH_RATIO_BOUNDS[1])
+    outlier = both & (robust_z > LENGTH_RATIO_MAX_Z) & ((log_ratio < low) | (log_ratio > high))
+    ratio_text = np.exp(log_ratio).round(2).astype(str) + "x: " + pairs["target"]
+    found.append(_issues(outlier, pairs, "length_ratio", pairs["field"], ratio_text))
+
+    # Media tags and placeholders, checked column by column over the wide frame
+    for field in TEXT_FIELDS:
+        column = df[field].astype(str)
+        found.append(_issues(column.str.contains("[sound:", regex=False), df, "leaked_sound_tag", field, column))
+    for check, fields in (("placeholder", [target for _, target in TRANSLATION_PAIRS]), ("audio_placeholder", AUDIO_FIELDS)):
+        for field in fields:
+            column = df[field].astype(str)
+            placeholder = column.str.strip().str.lower().isin(PLACEHOLDER_VALUES)
+            found.append(_issues(placeholder, df, check, field, column))
+
+    # Audio fields must match the original deck
+    if original_df is not None and not original_df.empty:
+        original = original_df.drop_duplicates("note_id").set_index("note_id")
+        for field in AUDIO_FIELDS:
+            original_values = df["note_id"].map(original[field]).fillna("").astype(str)
+            column = df[field].astype(str)
+            changed = (original_values != "") & (column != original_values)
+            found.append(_issues(changed, df, "audio_changed", field, column))
+
+    found = [frame for frame in found if not frame.empty]
+    if not found:
+        return pd.DataFrame(columns=["note_id", "field", "check", "value"])
+    return pd.concat(found, ignore_index=True)
+
+
+def validate_deck_translations(
+    cards: Iterable[AnkiCard],
+    original_cards: Optional[Iterable[AnkiCard]] = None,
+    max_examples: int = 3,
+) -> TranslationQAReport:
+    """
+    Validate all translations in a deck and list the cards to re-translate.
+
+    Args:
+        cards: Translated cards
+        original_cards: Optional original cards for audio field comparison
+        max_examples: Example issues kept per check in the report
+
+    Returns:
+        TranslationQAReport
+    """
+    df = cards_to_frame(cards)
+    original_df = cards_to_frame(original_cards) if original_cards is not None else None
+    issues = find_translation_issues(df, original_df)
+
+    pairs_checked = 0
+    if not df.empty:
+        pairs_checked = int(sum((df[source].astype(str).str.strip() != "").sum() for source, _ in TRANSLATION_PAIRS))
+
+    examples: Dict[str, List[str]] = {}
+    for check, group in issues.groupby("check"):
+        examples[check] = [
+            f"note {row.note_id} {row.field}: {row.value}" for row in group.head(max_examples).itertuples()
+        ]
+
+    retranslate = issues.loc[issues["check"].isin(RETRANSLATE_CHECKS), "note_id"]
+    return TranslationQAReport(
+        total_cards=len(df),
+        checked_pairs=pairs_checked,
+        issue_counts={check: int(count) for check, count in issues["check"].value_counts().items()},
+        flagged_cards=int(issues["note_id"].nunique()),
+        retranslate_note_ids=sorted(int(note_id) for note_id in retranslate.unique()),
+        examples=examples,
+    )
+
+
+def retranslate_flagged_cards(
+    cards: List[AnkiCard],
+    original_cards: Iterable[AnkiCard],
+    note_ids: Iterable[int],
+    llm_client,
+    target_language: str = "Polish",
+) -> List[AnkiCard]:
+    """
+    Request fresh translations (bypassing the LLM cache) for flagged cards.
+
+    Flagged cards are translated again from their original German-English
+    card, so the prompt is the one the first translation used and the fresh
+    response replaces the bad cached one. Only the translated text fields are
+    copied onto the existing card (its other fields, e.g. audio references,
+    are kept); a card whose re-translation fails keeps its old translation.
+
+    Args:
+        cards: All translated cards
+        original_cards: Original German-English cards, matched by note_id
+        note_ids: Note IDs from TranslationQAReport.retranslate_note_ids
+        llm_client: Configured LLM client
+        target_language: English name of the target language
+
+    Returns:
+        Cards in the same order, flagged ones updated with their new translation
+    """
+    from main import translate_card_with_llm
+
+    flagged = set(note_ids)
+    originals = {card.note_id: card for card in original_cards if card.note_id in flagged}
+    missing = flagged - originals.keys()
+    if missing:
+        print(f"⚠️  {len(missing)} flagged cards are not in the original deck and keep their translation: {sorted(missing)}")
+
+    print(f"🔁 Re-translating {len(originals)} flagged cards...")
+    updated, failed = [], 0
+    for card in cards:
+        original = originals.get(card.note_id)
+        if original is None:
+            updated.append(card)
+            continue
+        retranslated = translate_card_with_llm(original, llm_client, target_language, refresh_cache=True)
+        # translate_card_with_llm returns the original (German-English) card itself on failure
+        if retranslated is original:
+            failed += 1
+            updated.append(card)
+            continue
+        updated.append(card.model_copy(update=retranslated.to_text_model().model_dump()))
+
+    if failed:
+        print(f"⚠️  Re-translation failed for {failed} cards; they keep their previous translation")
+    return updated
+
+
+def main():
+    """Main function with command line argument parsing."""
+    parser = argparse.ArgumentParser(description="Run deck-level translation quality checks")
+    parser.add_argument(
+        "--source", "-s",
+        type=Path,
+        default=Path("data/DTZ_Goethe_B1_DE_PL_Sample.apkg"),
+        help="Translated .apkg file to check"
+    )
+    parser.add_argument(
+        "--original", "-o",
+        type=Path,
+        help="Original .apkg to compare audio fields against"
+    )
+    parser.add_argument(
+        "--report-json",
+        type=Path,
+        help="Write the report as JSON to this path"
+    )
+    parser.add_argument(
+        "--retranslate",
+        action="store_true",
+        help="Re-translate flagged cards from --original and save the result to --target"
+    )
+    parser.add_argument(
+        "--target", "-t",
+        type=Path,
+        help="Output .apkg for --retranslate (default: overwrite --source)"
+    )
+    parser.add_argument(
+        "--language", "-l",
+        default="Polish",
+        help="Target language name used in the translation prompt"
+    )
+
+    args = parser.parse_args()
+
+    if args.retranslate and not args.original:
+        parser.error("--retranslate requires --original (cards are re-translated from the original deck)")
+    if not args.source.exists():
+        print(f"❌ Source file not found: {args.source}")
+        exit(1)
+
+    cards = list(iter_anki_cards(args.source))
+    original_cards = list(iter_anki_cards(args.original)) if args.original else None
+    report = validate_deck_translations(cards, original_cards)
+    print(report.summary())
+
+    if args.report_json:
+        args.report_json.write_text(json.dumps(report.model_dump(), indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"📝 Report saved: {args.report_json}")
+
+    if args.retranslate and report.retranslate_note_ids:
+        from connectors.llm.structured_gemini import LLMClient, VertexAIConfig
+        from schema import AnkiDeck
+        from utilities import save_anki_deck
+
+        cards = retranslate_flagged_cards(
+            cards, original_cards, report.retranslate_note_ids, LLMClient(VertexAIConfig()), args.language
+        )
+        print(validate_deck_translations(cards, original_cards).summary())
+
+        target = args.target or args.source
+        save_anki_deck(AnkiDeck(cards=cards, name=target.stem, total_cards=len(cards)), target, args.original)
+
+
+if __name__ == "__main__":
+    main()
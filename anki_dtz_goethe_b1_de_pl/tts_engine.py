@@ -37,7 +37,21 @@ class TTSGenerator:
                 language_code="pl-PL", 
                 name="pl-PL-Standard-G",  # Polish Standard voice (sounds great)
                 # ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-            )
+            ),
+            # Additional target languages for multi-target decks (see multi_target.py).
+            # Explicit voice names keep cache keys distinct from the unnamed German voice.
+            'ukrainian': texttospeech.VoiceSelectionParams(
+                language_code="uk-UA",
+                name="uk-UA-Standard-A",
+            ),
+            'turkish': texttospeech.VoiceSelectionParams(
+                language_code="tr-TR",
+                name="tr-TR-Standard-A",
+            ),
+            'arabic': texttospeech.VoiceSelectionParams(
+                language_code="ar-XA",
+                name="ar-XA-Standard-A",
+            ),
         }
         
         # Audio configuration
@@ -81,7 +95,7 @@ class TTSGenerator:
         
         Args:
             text: Text to synthesize
-            language: 'german' or 'polish'
+            language: 'german', 'polish' or another key of self.voices
             output_path: Path to save MP3 file
             speaking_rate: Speech speed (0.25-2.0, default 1.0)
             
@@ -3,9 +3,12 @@ import zipfile
 import tempfile
 import os
 import json
+import re
+import time
+import itertools
 import genanki
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 from schema import AnkiCard, AnkiDeck
 from card_templates import (
     DTZ_MODEL_FIELDS, DTZ_CARD_TEMPLATES, DTZ_CARD_CSS,
@@ -13,6 +16,18 @@ from card_templates import (
     DTZ_LISTENING_TEMPLATES, DTZ_SENTENCE_PRODUCTION_TEMPLATES
 )
 
+# Card fields that hold [sound:...] references
+AUDIO_FIELDS = [
+    'full_source_audio', 'base_audio', 's1_audio', 's2_audio', 's3_audio', 's4_audio',
+    's5_audio', 's6_audio', 's7_audio', 's8_audio', 's9_audio',
+    'base_target_audio', 's1_target_audio', 's2_target_audio', 's3_target_audio',
+    's4_target_audio', 's5_target_audio', 's6_target_audio', 's7_target_audio',
+    's8_target_audio', 's9_target_audio'
+]
+
+# Pattern to match Anki sound references: [sound:filename.mp3]
+_SOUND_PATTERN = re.compile(r'\[sound:([^\]]+)\]')
+
 
 def _map_fields_to_schema(raw_fields_dict: Dict[str, Any], note_id: int, model_id: int) -> Dict[str, Any]:
     """
@@ -199,6 +214,107 @@ def _map_fields_to_schema(raw_fields_dict: Dict[str, Any], note_id: int, model_i
         }
 
 
+def _read_model_fields(models_json: str) -> Dict[int, List[str]]:
+    """
+    Parse the models JSON from the col table into a model_id -> field names mapping.
+
+    Args:
+        models_json: Raw JSON string from the ``models`` column
+
+    Returns:
+        Dictionary mapping model ID to ordered field names
+    """
+    models = json.loads(models_json)
+    return {int(model_id): [field["name"] for field in model["flds"]] for model_id, model in models.items()}
+
+
+def _note_to_card(note_id: int, model_id: int, flds: str, guid: str, model_fields: Dict[int, List[str]]) -> AnkiCard:
+    """
+    Convert one row of the notes table into an AnkiCard.
+
+    Args:
+        note_id: Note ID
+        model_id: Model ID of the note
+        flds: Field values joined by the 0x1f separator
+        guid: Note GUID
+        model_fields: Mapping from model ID to field names (see _read_model_fields)
+
+    Returns:
+        AnkiCard with fields mapped to the current schema
+    """
+    field_names = model_fields.get(model_id, [])
+
+    # Create a dictionary mapping old field names to values
+    raw_fields_dict = {"note_id": note_id, "model_id": model_id, "original_guid": guid}
+    for i, field_value in enumerate(flds.split("\x1f")):
+        field_name = field_names[i] if i < len(field_names) else f"field_{i}"
+        raw_fields_dict[field_name] = field_value
+
+    return AnkiCard(**_map_fields_to_schema(raw_fields_dict, note_id, model_id))
+
+
+def _card_to_note_fields(card: AnkiCard) -> List[str]:
+    """
+    Convert an AnkiCard into the ordered genanki note field list.
+
+    Args:
+        card: AnkiCard to convert
+
+    Returns:
+        Field values as strings, in DTZ_MODEL_FIELDS order
+    """
+    # IMPORTANT: Order must match DTZ_MODEL_FIELDS exactly!
+    return [
+        str(getattr(card, 'frequency_rank', '') or ""),         # 0
+        str(card.full_source or ""),                            # 1
+        str(card.base_target or ""),                            # 2
+        str(card.base_source or ""),                            # 3
+        str(card.artikel_d or ""),                              # 4
+        str(card.plural_d or ""),                               # 5
+        str(card.audio_text_d or ""),                           # 6
+        str(card.s1_source or ""),                              # 7
+        str(card.s1_target or ""),                              # 8
+        str(card.s2_source or ""),                              # 9
+        str(card.s2_target or ""),                              # 10
+        str(card.s3_source or ""),                              # 11
+        str(card.s3_target or ""),                              # 12
+        str(card.s4_source or ""),                              # 13
+        str(card.s4_target or ""),                              # 14
+        str(card.s5_source or ""),                              # 15
+        str(card.s5_target or ""),                              # 16
+        str(card.s6_source or ""),                              # 17
+        str(card.s6_target or ""),                              # 18
+        str(card.s7_source or ""),                              # 19
+        str(card.s7_target or ""),                              # 20
+        str(card.s8_source or ""),                              # 21
+        str(card.s8_target or ""),                              # 22
+        str(card.s9_source or ""),                              # 23
+        str(card.s9_target or ""),                              # 24
+        str(card.original_order or ""),                         # 25
+        str(getattr(card, 'full_source_audio', '') or ""),      # 26 - CRITICAL: full_source_audio
+        str(card.base_audio or ""),                             # 27
+        str(card.s1_audio or ""),                               # 28
+        str(card.s2_audio or ""),                               # 29
+        str(card.s3_audio or ""),                               # 30
+        str(card.s4_audio or ""),                               # 31
+        str(card.s5_audio or ""),                               # 32
+        str(card.s6_audio or ""),                               # 33
+        str(card.s7_audio or ""),                               # 34
+        str(card.s8_audio or ""),                               # 35
+        str(card.s9_audio or ""),                               # 36
+        str(getattr(card, 'base_target_audio', '') or ""),      # 37
+        str(getattr(card, 's1_target_audio', '') or ""),        # 38
+        str(getattr(card, 's2_target_audio', '') or ""),        # 39
+        str(getattr(card, 's3_target_audio', '') or ""),        # 40
+        str(getattr(card, 's4_target_audio', '') or ""),        # 41
+        str(getattr(card, 's5_target_audio', '') or ""),        # 42
+        str(getattr(card, 's6_target_audio', '') or ""),        # 43
+        str(getattr(card, 's7_target_audio', '') or ""),        # 44
+        str(getattr(card, 's8_target_audio', '') or ""),        # 45
+        str(getattr(card, 's9_target_audio', '') or ""),        # 46
+    ]
+
+
 def load_anki_deck(path: Path) -> AnkiDeck:
     """
     Load an Anki deck from a .apkg file.
@@ -256,14 +372,9 @@ def load_anki_deck(path: Path) -> AnkiDeck:
                 if not models_result:
                     raise RuntimeError("No models found in collection")
                 
-                models_json = models_result[0]
-                models = json.loads(models_json)
-
                 # Create a mapping of model_id to field names
-                model_fields = {}
-                for model_id, model in models.items():
-                    field_names = [field["name"] for field in model["flds"]]
-                    model_fields[int(model_id)] = field_names
+                model_fields = _read_model_fields(models_result[0])
+                for model_id, field_names in model_fields.items():
                     print(f"  Model {model_id}: {len(field_names)} fields")
 
                 # Get the note and card information
@@ -277,19 +388,11 @@ def load_anki_deck(path: Path) -> AnkiDeck:
                 field_scheme_detected = False
                 for note_idx, (note_id, model_id, flds, guid) in enumerate(notes):
                     try:
-                        fields = flds.split("\x1f")
-                        field_names = model_fields.get(model_id, [])
-
-                        # Create a dictionary mapping old field names to values
-                        raw_fields_dict = {"note_id": note_id, "model_id": model_id, "original_guid": guid}
-                        for i, field_value in enumerate(fields):
-                            field_name = field_names[i] if i < len(field_names) else f"field_{i}"
-                            raw_fields_dict[field_name] = field_value
-
-                        # Detect field naming scheme and map accordingly (only print detection once)
+                        # Detect field naming scheme (only print detection once)
                         if not field_scheme_detected:
-                            has_old_fields = any(field in raw_fields_dict for field in ['full_d', 'base_d', 'base_e'])
-                            has_new_fields = any(field in raw_fields_dict for field in ['full_source', 'base_source', 'base_target'])
+                            field_names = model_fields.get(model_id, [])
+                            has_old_fields = any(field in field_names for field in ['full_d', 'base_d', 'base_e'])
+                            has_new_fields = any(field in field_names for field in ['full_source', 'base_source', 'base_target'])
                             if has_new_fields and not has_old_fields:
                                 print("  📋 Detected new field naming scheme (full_source, base_target, etc.)")
                             elif has_old_fields:
@@ -297,12 +400,8 @@ def load_anki_deck(path: Path) -> AnkiDeck:
                             else:
                                 print("  ⚠️  Could not detect field naming scheme - using fallback mapping")
                             field_scheme_detected = True
-                        
-                        mapped_fields = _map_fields_to_schema(raw_fields_dict, note_id, model_id)
 
-                        # Create AnkiCard instance with mapped fields
-                        card = AnkiCard(**mapped_fields)
-                        cards.append(card)
+                        cards.append(_note_to_card(note_id, model_id, flds, guid, model_fields))
                         
                     except Exception as e:
                         print(f"⚠️  Warning: Failed to parse note {note_id} (#{note_idx+1}): {e}")
@@ -324,6 +423,98 @@ def load_anki_deck(path: Path) -> AnkiDeck:
         raise
 
 
+class AnkiDeckReader:
+    """
+    Stream cards from a .apkg file one at a time.
+
+    Only collection.anki2 is extracted (media stays in the zip), and notes are
+    read through a SQLite cursor, so memory use does not grow with deck size.
+
+    Usage:
+        with AnkiDeckReader(path) as reader:
+            print(f"{len(reader)} notes")
+            for card in reader:
+                ...
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Path to the .apkg file
+        """
+        self.path = path
+        self._tmpdir: tempfile.TemporaryDirectory | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._model_fields: Dict[int, List[str]] = {}
+
+    def __enter__(self) -> "AnkiDeckReader":
+        if not self.path.exists():
+            raise FileNotFoundError(f"Anki deck file not found: {self.path}")
+
+        if not self.path.suffix.lower() == '.apkg':
+            raise ValueError(f"Expected .apkg file, got: {self.path.suffix}")
+
+        self._tmpdir = tempfile.TemporaryDirectory()
+        try:
+            with zipfile.ZipFile(self.path, "r") as z:
+                if "collection.anki2" not in z.namelist():
+                    raise FileNotFoundError("collection.anki2 not found in .apkg file")
+                z.extract("collection.anki2", self._tmpdir.name)
+        except zipfile.BadZipFile as e:
+            self._tmpdir.cleanup()
+            raise ValueError(f"Invalid .apkg file (corrupted zip): {e}")
+        except Exception:
+            self._tmpdir.cleanup()
+            raise
+
+        self._conn = sqlite3.connect(os.path.join(self._tmpdir.name, "collection.anki2"))
+        models_result = self._conn.execute("SELECT models FROM col").fetchone()
+        if not models_result:
+            self.close()
+            raise RuntimeError("No models found in collection")
+        self._model_fields = _read_model_fields(models_result[0])
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def __iter__(self) -> Iterator[AnkiCard]:
+        # Iterating the cursor fetches rows lazily instead of fetchall()
+        cursor = self._conn.execute("SELECT id, mid, flds, guid FROM notes")
+        for note_idx, (note_id, model_id, flds, guid) in enumerate(cursor):
+            try:
+                yield _note_to_card(note_id, model_id, flds, guid, self._model_fields)
+            except Exception as e:
+                print(f"⚠️  Warning: Failed to parse note {note_id} (#{note_idx+1}): {e}")
+                continue
+
+    def close(self) -> None:
+        """Close the database connection and remove the extracted collection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+
+def iter_anki_cards(path: Path) -> Iterator[AnkiCard]:
+    """
+    Yield cards from a .apkg file one at a time (constant-memory alternative to load_anki_deck).
+
+    Args:
+        path: Path to the .apkg file
+
+    Yields:
+        AnkiCard for each note, in the same order as load_anki_deck
+    """
+    with AnkiDeckReader(path) as reader:
+        yield from reader
+
+
 def save_anki_deck_4subdecks(
     deck: AnkiDeck, output_path: Path, original_apkg_path: Path | None = None, additional_media_dir: Path | None = None
 ) -> None:
@@ -433,56 +624,7 @@ def save_anki_deck_4subdecks(
         for card_idx, card in enumerate(deck.cards):
             try:
                 # Prepare field values (same for all note types)
-                # IMPORTANT: Order must match DTZ_MODEL_FIELDS exactly!
-                fields = [
-                    str(getattr(card, 'frequency_rank', '') or ""),         # 0
-                    str(card.full_source or ""),                            # 1
-                    str(card.base_target or ""),                            # 2
-                    str(card.base_source or ""),                            # 3
-                    str(card.artikel_d or ""),                              # 4
-                    str(card.plural_d or ""),                               # 5
-                    str(card.audio_text_d or ""),                           # 6
-                    str(card.s1_source or ""),                              # 7
-                    str(card.s1_target or ""),                              # 8
-                    str(card.s2_source or ""),                              # 9
-                    str(card.s2_target or ""),                              # 10
-                    str(card.s3_source or ""),                              # 11
-                    str(card.s3_target or ""),                              # 12
-                    str(card.s4_source or ""),                              # 13
-                    str(card.s4_target or ""),                              # 14
-                    str(card.s5_source or ""),                              # 15
-                    str(card.s5_target or ""),                              # 16
-                    str(card.s6_source or ""),                              # 17
-                    str(card.s6_target or ""),                              # 18
-                    str(card.s7_source or ""),                              # 19
-                    str(card.s7_target or ""),                              # 20
-                    str(card.s8_source or ""),                              # 21
-                    str(card.s8_target or ""),                              # 22
-                    str(card.s9_source or ""),                              # 23
-                    str(card.s9_target or ""),                              # 24
-                    str(card.original_order or ""),                         # 25
-                    str(getattr(card, 'full_source_audio', '') or ""),      # 26 - CRITICAL: full_source_audio
-                    str(card.base_audio or ""),                             # 27
-                    str(card.s1_audio or ""),                               # 28
-                    str(card.s2_audio or ""),                               # 29
-                    str(card.s3_audio or ""),                               # 30
-                    str(card.s4_audio or ""),                               # 31
-                    str(card.s5_audio or ""),                               # 32
-                    str(card.s6_audio or ""),                               # 33
-                    str(card.s7_audio or ""),                               # 34
-                    str(card.s8_audio or ""),                               # 35
-                    str(card.s9_audio or ""),                               # 36
-                    str(getattr(card, 'base_target_audio', '') or ""),      # 37
-                    str(getattr(card, 's1_target_audio', '') or ""),        # 38
-                    str(getattr(card, 's2_target_audio', '') or ""),        # 39
-                    str(getattr(card, 's3_target_audio', '') or ""),        # 40
-                    str(getattr(card, 's4_target_audio', '') or ""),        # 41
-                    str(getattr(card, 's5_target_audio', '') or ""),        # 42
-                    str(getattr(card, 's6_target_audio', '') or ""),        # 43
-                    str(getattr(card, 's7_target_audio', '') or ""),        # 44
-                    str(getattr(card, 's8_target_audio', '') or ""),        # 45
-                    str(getattr(card, 's9_target_audio', '') or ""),        # 46
-                ]
+                fields = _card_to_note_fields(card)
 
                 # Extract base GUID, removing any existing subdeck suffixes
                 raw_guid = card.original_guid or str(card.note_id)
@@ -715,56 +857,7 @@ def save_anki_deck(
         for card_idx, card in enumerate(deck.cards):
             try:
                 # Ensure all fields are strings and handle None/empty values
-                # IMPORTANT: Order must match DTZ_MODEL_FIELDS exactly!
-                fields = [
-                    str(getattr(card, 'frequency_rank', '') or ""),         # 0
-                    str(card.full_source or ""),                            # 1
-                    str(card.base_target or ""),                            # 2
-                    str(card.base_source or ""),                            # 3
-                    str(card.artikel_d or ""),                              # 4
-                    str(card.plural_d or ""),                               # 5
-                    str(card.audio_text_d or ""),                           # 6
-                    str(card.s1_source or ""),                              # 7
-                    str(card.s1_target or ""),                              # 8
-                    str(card.s2_source or ""),                              # 9
-                    str(card.s2_target or ""),                              # 10
-                    str(card.s3_source or ""),                              # 11
-                    str(card.s3_target or ""),                              # 12
-                    str(card.s4_source or ""),                              # 13
-                    str(card.s4_target or ""),                              # 14
-                    str(card.s5_source or ""),                              # 15
-                    str(card.s5_target or ""),                              # 16
-                    str(card.s6_source or ""),                              # 17
-                    str(card.s6_target or ""),                              # 18
-                    str(card.s7_source or ""),                              # 19
-                    str(card.s7_target or ""),                              # 20
-                    str(card.s8_source or ""),                              # 21
-                    str(card.s8_target or ""),                              # 22
-                    str(card.s9_source or ""),                              # 23
-                    str(card.s9_target or ""),                              # 24
-                    str(card.original_order or ""),                         # 25
-                    str(getattr(card, 'full_source_audio', '') or ""),      # 26 - CRITICAL: full_source_audio
-                    str(card.base_audio or ""),                             # 27
-                    str(card.s1_audio or ""),                               # 28
-                    str(card.s2_audio or ""),                               # 29
-                    str(card.s3_audio or ""),                               # 30
-                    str(card.s4_audio or ""),                               # 31
-                    str(card.s5_audio or ""),                               # 32
-                    str(card.s6_audio or ""),                               # 33
-                    str(card.s7_audio or ""),                               # 34
-                    str(card.s8_audio or ""),                               # 35
-                    str(card.s9_audio or ""),                               # 36
-                    str(getattr(card, 'base_target_audio', '') or ""),      # 37
-                    str(getattr(card, 's1_target_audio', '') or ""),        # 38
-                    str(getattr(card, 's2_target_audio', '') or ""),        # 39
-                    str(getattr(card, 's3_target_audio', '') or ""),        # 40
-                    str(getattr(card, 's4_target_audio', '') or ""),        # 41
-                    str(getattr(card, 's5_target_audio', '') or ""),        # 42
-                    str(getattr(card, 's6_target_audio', '') or ""),        # 43
-                    str(getattr(card, 's7_target_audio', '') or ""),        # 44
-                    str(getattr(card, 's8_target_audio', '') or ""),        # 45
-                    str(getattr(card, 's9_target_audio', '') or ""),        # 46
-                ]
+                fields = _card_to_note_fields(card)
 
                 # Preserve original GUID to maintain study progress
                 
@@ -851,6 +944,213 @@ def save_anki_deck(
         raise
 
 
+class AnkiDeckWriter:
+    """
+    Incrementally write cards to a .apkg file without holding the deck in memory.
+
+    Produces the same structure as save_anki_deck (parent deck + 4 subdecks, one
+    DTZ model), but each card is written to the SQLite collection as soon as it
+    is added. Referenced media filenames are tracked in a temporary SQLite table
+    and media files are streamed into the zip when the writer is closed.
+
+    Usage:
+        with AnkiDeckWriter(output_path, original_apkg_path, audio_dir) as writer:
+            for card in cards:
+                writer.add_card(card)
+    """
+
+    # Commit the collection every N cards to keep the SQLite journal small
+    COMMIT_EVERY = 500
+
+    def __init__(
+        self, output_path: Path, original_apkg_path: Path | None = None, additional_media_dir: Path | None = None
+    ):
+        """
+        Args:
+            output_path: Path for the output .apkg file
+            original_apkg_path: Optional original .apkg to copy referenced media from
+            additional_media_dir: Optional directory containing new media files (e.g., TTS audio)
+        """
+        self.output_path = output_path
+        self.original_apkg_path = original_apkg_path
+        self.additional_media_dir = additional_media_dir
+        self.cards_written = 0
+        self.failed_cards = 0
+        self.media_files_written = 0
+        self._db_path: str | None = None
+        self._conn: sqlite3.Connection | None = None
+
+    def __enter__(self) -> "AnkiDeckWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._cleanup()
+
+    def open(self) -> None:
+        """Create the temporary collection with the DTZ model and deck structure."""
+        from card_templates import DECK_ID_MAIN, DECK_ID_RECOGNITION, DECK_ID_PRODUCTION, DECK_ID_LISTENING, DECK_ID_SENTENCE_PROD
+
+        print(f"💾 Streaming deck to: {self.output_path}")
+        if not str(self.output_path).endswith('.apkg'):
+            print(f"⚠️  Warning: Output path doesn't end with .apkg: {self.output_path}")
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._model = genanki.Model(
+            1607392319,  # Model ID (same as save_anki_deck)
+            "DTZ Goethe B1 German-Polish Model",
+            fields=DTZ_MODEL_FIELDS,
+            templates=DTZ_CARD_TEMPLATES,
+            css=DTZ_CARD_CSS,
+        )
+        parent_deck = genanki.Deck(DECK_ID_MAIN, "DTZ Goethe B1 German-Polish Model")
+        parent_deck.add_model(self._model)
+        all_decks = [
+            parent_deck,
+            genanki.Deck(DECK_ID_RECOGNITION, "DTZ Goethe B1 German-Polish Model::01 Recognition"),
+            genanki.Deck(DECK_ID_PRODUCTION, "DTZ Goethe B1 German-Polish Model::02 Production"),
+            genanki.Deck(DECK_ID_LISTENING, "DTZ Goethe B1 German-Polish Model::03 Listening Comprehension"),
+            genanki.Deck(DECK_ID_SENTENCE_PROD, "DTZ Goethe B1 German-Polish Model::04 Sentence Production"),
+        ]
+        self._deck_id = DECK_ID_MAIN
+
+        db_fd, self._db_path = tempfile.mkstemp(suffix=".anki2")
+        os.close(db_fd)
+        self._conn = sqlite3.connect(self._db_path)
+        self._cursor = self._conn.cursor()
+
+        self._timestamp = time.time()
+        self._id_gen = itertools.count(int(self._timestamp * 1000))
+        # Writes schema, collection config, decks and the model (decks hold no notes yet)
+        genanki.Package(all_decks).write_to_db(self._cursor, self._timestamp, self._id_gen)
+
+        # TEMP tables live outside collection.anki2, so they never end up in the package
+        self._cursor.execute("CREATE TEMP TABLE media_refs (filename TEXT PRIMARY KEY)")
+        for template in DTZ_CARD_TEMPLATES:
+            for format_key in ['qfmt', 'afmt']:
+                self._add_media_refs(_SOUND_PATTERN.findall(template.get(format_key, "")))
+
+    def add_card(self, card: AnkiCard) -> bool:
+        """
+        Append one card to the deck.
+
+        Args:
+            card: AnkiCard to write
+
+        Returns:
+            True if the card was written, False if it failed to convert
+        """
+        try:
+            note = genanki.Note(
+                model=self._model,
+                fields=_card_to_note_fields(card),
+                guid=card.original_guid or str(card.note_id),  # Use original GUID to preserve progress
+                sort_field=0,
+            )
+            note.write_to_db(self._cursor, self._timestamp, self._deck_id, self._id_gen)
+        except Exception as e:
+            self.failed_cards += 1
+            print(f"⚠️  Warning: Failed to convert card {self.cards_written + self.failed_cards} (note_id={getattr(card, 'note_id', 'unknown')}): {e}")
+            return False
+
+        for field_name in AUDIO_FIELDS:
+            self._add_media_refs(_SOUND_PATTERN.findall(getattr(card, field_name, "") or ""))
+
+        self.cards_written += 1
+        if self.cards_written % self.COMMIT_EVERY == 0:
+            self._conn.commit()
+        return True
+
+    def close(self) -> None:
+        """Finish the collection and write the .apkg with referenced media."""
+        import shutil
+
+        try:
+            if self.cards_written == 0:
+                raise ValueError("Cannot save empty deck - no cards provided")
+
+            self._conn.commit()
+
+            # Resolve media: new media directory first, then the original package
+            silence_file = "_1-minute-of-silence.mp3"
+            if self.additional_media_dir and self.additional_media_dir.exists():
+                silence_path = self.additional_media_dir / silence_file
+                if self._has_media_ref(silence_file) and not silence_path.exists():
+                    print(f"🔇 Creating silence file for audio control: {silence_file}")
+                    _create_silence_file(silence_path)
+
+            original_zip = None
+            original_members: Dict[str, str] = {}
+            if self.original_apkg_path and self.original_apkg_path.exists():
+                original_zip = zipfile.ZipFile(self.original_apkg_path, "r")
+                if "media" in original_zip.namelist():
+                    original_members = {
+                        name: member for member, name in json.loads(original_zip.read("media")).items()
+                    }
+
+            missing_files = 0
+            try:
+                with zipfile.ZipFile(self.output_path, "w") as outzip:
+                    outzip.write(self._db_path, "collection.anki2")
+
+                    media_index = []
+                    for (filename,) in self._conn.execute("SELECT filename FROM temp.media_refs ORDER BY filename"):
+                        zip_name = str(len(media_index))
+                        new_path = self.additional_media_dir / filename if self.additional_media_dir else None
+                        if new_path is not None and new_path.is_file():
+                            outzip.write(new_path, zip_name)
+                        elif original_zip is not None and filename in original_members:
+                            with original_zip.open(original_members[filename]) as src, outzip.open(zip_name, "w") as dst:
+                                shutil.copyfileobj(src, dst)
+                        else:
+                            missing_files += 1
+                            if missing_files <= 5:
+                                print(f"     - missing media: {filename}")
+                            continue
+                        media_index.append(filename)
+
+                    outzip.writestr("media", json.dumps(dict(enumerate(media_index))))
+            finally:
+                if original_zip is not None:
+                    original_zip.close()
+
+            self.media_files_written = len(media_index)
+            if missing_files:
+                print(f"⚠️  Warning: {missing_files} referenced media files not found")
+            if self.failed_cards > 0:
+                print(f"⚠️  {self.failed_cards} cards failed to convert and were skipped")
+
+            file_size = self.output_path.stat().st_size
+            print(f"✅ Successfully saved {self.cards_written} cards to {self.output_path}")
+            print(f"   Media files: {self.media_files_written}, File size: {file_size / (1024*1024):.1f} MB")
+        finally:
+            self._cleanup()
+
+    def referenced_media(self) -> Iterator[str]:
+        """Yield every media filename referenced so far (cards and templates)."""
+        yield from (row[0] for row in self._conn.execute("SELECT filename FROM temp.media_refs ORDER BY filename"))
+
+    def _add_media_refs(self, filenames: List[str]) -> None:
+        if filenames:
+            self._cursor.executemany(
+                "INSERT OR IGNORE INTO temp.media_refs (filename) VALUES (?)", [(name,) for name in filenames]
+            )
+
+    def _has_media_ref(self, filename: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM temp.media_refs WHERE filename = ?", (filename,)).fetchone() is not None
+
+    def _cleanup(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._db_path is not None:
+            os.remove(self._db_path)
+            self._db_path = None
+
+
 def _extract_media_files(apkg_path: Path) -> List[str]:
     """
     Extract media files from an existing .apkg file.
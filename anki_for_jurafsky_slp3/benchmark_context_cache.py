@@ -0,0 +1,85 @@
+"""
+Benchmark of static-prefix context caching for card extraction.
+
+The sections of a cleaned chapter are sent to the extraction model twice,
+bypassing the disk cache: once with the whole prompt inline and once with
+the fixed instructions referenced as a cached context. Responses are
+streamed to measure time to first token; billed input tokens are taken from
+the usage metadata (cached tokens at CACHED_TOKEN_PRICE of the input price,
+storage of the cached context not included).
+
+Usage:
+    python benchmark_context_cache.py --chapter 8
+    python benchmark_context_cache.py --chapter 8 --sections 5
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from connectors.llm.structured_gemini import CACHED_TOKEN_PRICE, LLMClient
+from src.models.cards import AtomicCards
+from src.processing.atomic_chunker import extraction_instructions
+from src.processing.semantic_chunker import split_markdown_into_sections
+
+
+def run(client: LLMClient, chunks: List[str], use_cache: bool) -> Dict[str, float]:
+    """Mean time to first token and total input tokens of one extraction call per chunk."""
+    instructions = extraction_instructions()
+    first_token, prompt_tokens, cached_tokens = [], 0, 0
+    for chunk in chunks:
+        contents, config = client._request(
+            instructions + chunk, AtomicCards, static_prefix=instructions if use_cache else None
+        )
+        start = time.perf_counter()
+        usage = None
+        for i, response in enumerate(
+            client.client.models.generate_content_stream(model=client.model, contents=contents, config=config)
+        ):
+            if i == 0:
+                first_token.append(time.perf_counter() - start)
+            usage = response.usage_metadata or usage
+        if usage is not None:
+            prompt_tokens += usage.prompt_token_count or 0
+            cached_tokens += usage.cached_content_token_count or 0
+
+    return {
+        "ttft": sum(first_token) / max(len(first_token), 1),
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "billed_tokens": prompt_tokens - cached_tokens * (1 - CACHED_TOKEN_PRICE),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline and cached extraction prompt prefixes")
+    parser.add_argument("--data-dir", type=Path, default=Path("data/slp3"), help="Base SLP3 data directory")
+    parser.add_argument("--chapter", type=int, required=True, help="Chapter number with cleaned text")
+    parser.add_argument("--sections", type=int, default=10, help="Sections sent per mode")
+    args = parser.parse_args()
+
+    cleaned_file = args.data_dir / "cleaned_txt" / f"chapter_{args.chapter}.txt"
+    if not cleaned_file.exists():
+        print(f"❌ Cleaned text not found: {cleaned_file}. Run python main.py -c first.")
+        return
+
+    chunks = [
+        f"# {section['heading']}\n\n{section['content']}"
+        for section in split_markdown_into_sections(cleaned_file.read_text(encoding="utf-8"))
+        if len(section.get("content", "").strip()) >= 50
+    ][: args.sections]
+
+    client = LLMClient()
+    print(f"📊 {len(chunks)} sections of chapter {args.chapter}, model {client.model}")
+    print(f"{'mode':<10} {'TTFT':>8} {'input tokens':>14} {'cached':>10} {'billed':>10}")
+    for mode, use_cache in (("inline", False), ("cached", True)):
+        result = run(client, chunks, use_cache)
+        print(
+            f"{mode:<10} {result['ttft']:>7.2f}s {result['prompt_tokens']:>14,} "
+            f"{result['cached_tokens']:>10,} {result['billed_tokens']:>10,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
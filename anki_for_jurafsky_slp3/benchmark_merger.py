@@ -0,0 +1,165 @@
+"""
+Benchmark of chunk merging: SequenceMatcher + string concatenation (previous
+implementation) vs. k-gram anchors + piece buffer (src.processing.merger).
+
+Chapters from data/slp3/txt are split like the pipeline does, every chunk gets
+LLM-like cleaning noise (re-joined lines, dropped words), and both mergers
+rebuild the chapter. Quality is measured on word 5-gram shingles of the raw
+chapter: coverage (text lost) and duplication (overlap text kept twice).
+LLM fallbacks are counted instead of calling the API.
+
+Usage:
+    python benchmark_merger.py                    # all chapters in data/slp3/txt
+    python benchmark_merger.py --noise 0.02 --chapters 3 8
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import re
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src.processing import merger
+from src.processing.splitter import split_to_chunks
+
+SHINGLE_SIZE = 5
+
+
+def legacy_merge_chunks(cleaned_chunks: List[str], overlap: int, fallbacks: List[int]) -> str:
+    """The previous merge_chunks/merge_overlapping_chunks (LLM fallback replaced by a counter)."""
+    if not cleaned_chunks:
+        return ""
+    merged_document = cleaned_chunks[0]
+    for chunk2 in cleaned_chunks[1:]:
+        chunk1 = merged_document
+        search_window = min(len(chunk1), len(chunk2), overlap)
+        overlap1 = chunk1[-search_window:]
+        overlap2 = chunk2[:search_window]
+        match = SequenceMatcher(None, overlap1, overlap2, autojunk=False).find_longest_match(
+            0, len(overlap1), 0, len(overlap2)
+        )
+        if match.size < 20:
+            fallbacks.append(1)
+            merged_document = chunk1[:-search_window] + overlap1 + chunk2[search_window:]
+            continue
+        cut_point_in_chunk1 = len(chunk1) - search_window + match.a
+        merged_document = chunk1[:cut_point_in_chunk1] + chunk2[match.b :]
+    return merged_document
+
+
+def synthetic_chapters(count: int = 5, size: int = 80_000) -> Dict[str, str]:
+    """Textbook-like chapters used when no extracted SLP3 text is available."""
+    rng = random.Random(0)
+    words = (
+        "the model attention token vector embedding probability language sequence training "
+        "loss gradient layer softmax weight input output corpus word sentence parser tree "
+        "grammar decoding beam search transformer encoder decoder context window"
+    ).split()
+    chapters = {}
+    for n in range(1, count + 1):
+        parts, length, section = [f"{n} Chapter {n}\n"], 0, 0
+        while length < size:
+            if rng.random() < 0.05:
+                section += 1
+                parts.append(f"\n{n}.{section} Section heading {section}\n")
+            line = " ".join(rng.choice(words) for _ in range(rng.randint(8, 14))) + ".\n"
+            parts.append(line)
+            length += len(line)
+        chapters[f"chapter_{n}"] = "".join(parts)
+    return chapters
+
+
+def load_chapters(txt_dir: Path, chapter_numbers: List[int] | None) -> Dict[str, str]:
+    files = sorted(txt_dir.glob("chapter_*.txt"), key=lambda path: int(path.stem.split("_")[1]))
+    if chapter_numbers:
+        files = [path for path in files if int(path.stem.split("_")[1]) in chapter_numbers]
+    return {path.stem: path.read_text(encoding="utf-8") for path in files}
+
+
+def add_cleaning_noise(chunk: str, rng: random.Random, rate: float) -> str:
+    """Imitate the LLM cleaner: re-join hard line breaks, drop headers/page numbers."""
+    tokens = re.split(r"(\s+)", chunk)
+    out = []
+    for token in tokens:
+        if token.isspace():
+            out.append(" " if "\n" in token and rng.random() < 0.5 else token)
+        elif token and rng.random() < rate:
+            continue
+        else:
+            out.append(token)
+    return "".join(out)
+
+
+def shingles(text: str) -> List[Tuple[str, ...]]:
+    words = text.split()
+    return [tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def quality(reference: str, merged: str) -> Tuple[float, float]:
+    """(coverage of reference shingles, fraction of merged shingles that are repeats)."""
+    reference_set = set(shingles(reference))
+    merged_list = shingles(merged)
+    merged_set = set(merged_list)
+    coverage = len(reference_set & merged_set) / max(len(reference_set), 1)
+    duplication = 1 - len(merged_set) / max(len(merged_list), 1)
+    return coverage, duplication
+
+
+def run_benchmark(chapters: Dict[str, str], window_size: int, overlap: int, noise: float) -> None:
+    fallbacks: List[int] = []
+    merger._llm_merge_overlap = lambda overlap1, overlap2: fallbacks.append(1) or overlap1
+
+    print(f"{'chapter':<12} {'chars':>8} {'chunks':>6} | {'legacy s':>9} {'cov':>6} {'dup':>6} {'llm':>4} | "
+          f"{'new s':>8} {'cov':>6} {'dup':>6} {'llm':>4} | {'speedup':>7} {'same':>5}")
+    totals = {"legacy": 0.0, "new": 0.0}
+    for name, text in chapters.items():
+        rng = random.Random(name)
+        chunks = [add_cleaning_noise(chunk, rng, noise) for chunk in split_to_chunks(text, window_size, overlap)]
+
+        legacy_fallbacks: List[int] = []
+        start = time.perf_counter()
+        legacy = legacy_merge_chunks(chunks, overlap, legacy_fallbacks)
+        legacy_time = time.perf_counter() - start
+
+        fallbacks.clear()
+        start = time.perf_counter()
+        # merge_chunks prints one line per merge; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            new = merger.merge_chunks(chunks, overlap)
+        new_time = time.perf_counter() - start
+
+        legacy_cov, legacy_dup = quality(text, legacy)
+        new_cov, new_dup = quality(text, new)
+        totals["legacy"] += legacy_time
+        totals["new"] += new_time
+        print(f"{name:<12} {len(text):>8,} {len(chunks):>6} | {legacy_time:>9.3f} {legacy_cov:>6.3f} {legacy_dup:>6.3f} "
+              f"{len(legacy_fallbacks):>4} | {new_time:>8.3f} {new_cov:>6.3f} {new_dup:>6.3f} {len(fallbacks):>4} | "
+              f"{legacy_time / max(new_time, 1e-9):>6.1f}x {str(legacy == new):>5}")
+
+    print(f"\n⏱️  Total: legacy {totals['legacy']:.2f}s, new {totals['new']:.2f}s "
+          f"({totals['legacy'] / max(totals['new'], 1e-9):.1f}x faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunk merging against the previous implementation")
+    parser.add_argument("--txt-dir", type=Path, default=Path("data/slp3/txt"), help="Extracted chapter texts")
+    parser.add_argument("--chapters", type=int, nargs="*", help="Chapter numbers (default: all)")
+    parser.add_argument("--window-size", type=int, default=6000)
+    parser.add_argument("--overlap", type=int, default=3000)
+    parser.add_argument("--noise", type=float, default=0.01, help="Fraction of words the fake cleaner drops")
+    args = parser.parse_args()
+
+    chapters = load_chapters(args.txt_dir, args.chapters)
+    if not chapters:
+        print(f"⚠️ No chapters in {args.txt_dir} (run python main.py -f -s slp3) - using synthetic chapters")
+        chapters = synthetic_chapters()
+
+    run_benchmark(chapters, args.window_size, args.overlap, args.noise)
+
+
+if __name__ == "__main__":
+    main()
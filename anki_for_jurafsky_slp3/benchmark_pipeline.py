@@ -0,0 +1,293 @@
+"""
+Offline end-to-end benchmark of the card pipelines.
+
+record: run a pipeline once against the LLM (cache hits are free) and export
+every response it used, together with its input, to a fixture bundle.
+
+replay: run the same pipeline offline from the bundle (connectors.llm.replay)
+with synthetic latency and injected errors, and report per-stage wall and CPU
+time, concurrency and the CPU hotspots of all threads. Hotspots come from
+sampling the stacks of every thread (cProfile can only follow one thread),
+skipping threads that wait on the synthetic latency, locks or the event loop.
+
+Usage:
+    python benchmark_pipeline.py record --chapter 8
+    python benchmark_pipeline.py record --neetcode --limit 20
+    python benchmark_pipeline.py replay --fixtures data/fixtures/chapter_8.jsonl.gz --latency 2 --jitter 0.5
+    python benchmark_pipeline.py replay --fixtures data/fixtures/chapter_8.jsonl.gz --error-rate 0.05 --max-concurrency 16
+"""
+
+import argparse
+import contextlib
+import functools
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType, ModuleType
+from typing import Any, Callable, Dict, Iterator, List
+
+import connectors.llm.structured_gemini as structured_gemini
+import slp3_pipeline
+from connectors.llm.replay import ReplaySettings, disable_replay, enable_replay
+from src.models.leetcode_cards import FetchedLeetcodeProblem
+from src.processing import leetcode_card_creation
+from src.utils.cache import export_fixtures, load_fixtures, start_recording, stop_recording
+from src.utils.telemetry import telemetry
+
+# Module-level functions timed as pipeline stages
+STAGES: Dict[str, tuple[ModuleType, List[str]]] = {
+    "slp3": (
+        slp3_pipeline,
+        ["clean_chapter_text", "merge_chunks", "extract_atomic_cards", "fix_content", "fix_formatting", "fix_formatting_batch"],
+    ),
+    "neetcode": (leetcode_card_creation, ["create_leetcode_card"]),
+}
+# A thread whose innermost frame is in one of these files is waiting, not computing
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py", "nap.py", "replay.py", "rate_limiter.py")
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+class StageProfiler:
+    """Wall time, CPU time and concurrency of pipeline stages."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, StageStats] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        stats = self.stages.setdefault(name, StageStats())
+
+        @functools.wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                stats.calls += 1
+                stats.in_flight += 1
+                stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+                with self._lock:
+                    stats.wall += wall
+                    stats.cpu += cpu
+                    stats.in_flight -= 1
+                    self.in_flight -= 1
+
+        return timed
+
+    @contextlib.contextmanager
+    def instrument(self, module: ModuleType, names: List[str]) -> Iterator[None]:
+        originals = {name: getattr(module, name) for name in names}
+        for name, func in originals.items():
+            setattr(module, name, self.wrap(name, func))
+        try:
+            yield
+        finally:
+            for name, func in originals.items():
+                setattr(module, name, func)
+
+    def report(self, wall: float) -> None:
+        print(f"\n{'stage':<22} {'calls':>6} {'wall s':>9} {'mean s':>8} {'CPU s':>8} {'max conc.':>10}")
+        for name, stats in self.stages.items():
+            if stats.calls:
+                print(
+                    f"{name:<22} {stats.calls:>6} {stats.wall:>9.2f} {stats.wall / stats.calls:>8.3f} "
+                    f"{stats.cpu:>8.3f} {stats.max_in_flight:>10}"
+                )
+        stage_wall = sum(stats.wall for stats in self.stages.values())
+        print(
+            f"\n⏱️ Total {wall:.2f}s, stage time {stage_wall:.2f}s → mean concurrency {stage_wall / max(wall, 1e-9):.1f}, "
+            f"max {self.max_in_flight} stage calls in flight"
+        )
+
+
+class HotspotSampler:
+    """Statistical profiler over all threads: counts the functions on busy stacks."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.own: Counter = Counter()
+        self.inclusive: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _function(frame: FrameType) -> str:
+        code = frame.f_code
+        return f"{Path(code.co_filename).name}:{code.co_firstlineno}({code.co_qualname})"
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                self.samples += 1
+                self.own[self._function(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    function = self._function(frame)
+                    if function not in seen:
+                        seen.add(function)
+                        self.inclusive[function] += 1
+                    frame = frame.f_back
+
+    def __enter__(self) -> "HotspotSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, top: int) -> None:
+        if not self.samples:
+            return
+        print(f"\n🔥 CPU hotspots ({self.samples} busy samples every {self.interval * 1000:.0f} ms, all threads):")
+        print(f"{'own %':>7} {'total %':>8}  function")
+        for function, count in self.own.most_common(top):
+            print(f"{count / self.samples:>7.1%} {self.inclusive[function] / self.samples:>8.1%}  {function}")
+
+
+def run_pipeline(metadata: Dict[str, Any], data_dir: Path, max_concurrency: int) -> int:
+    """Run the recorded pipeline on its recorded input; returns the number of cards."""
+    if metadata["pipeline"] == "neetcode":
+        problems = [FetchedLeetcodeProblem(**problem) for problem in metadata["problems"]]
+        return len(leetcode_card_creation.process_leetcode_problems(problems))
+    cards = slp3_pipeline.chapter_pipeline(
+        metadata["text"],
+        metadata["chapter_name"],
+        data_dir=data_dir,
+        max_concurrency=max_concurrency,
+        **metadata["options"],
+    )
+    return len(cards)
+
+
+def record(args: argparse.Namespace) -> None:
+    if args.neetcode:
+        from neetcode_pipeline import NEETCODE_150_IDS, filter_problems_by_ids
+
+        problems = filter_problems_by_ids(
+            leetcode_card_creation.load_and_validate_problems(str(args.problems_file)), NEETCODE_150_IDS
+        )[: args.limit]
+        metadata = {"pipeline": "neetcode", "problems": [problem.model_dump() for problem in problems]}
+        fixtures = args.fixtures or Path("data/fixtures/neetcode.jsonl.gz")
+    else:
+        chapter_file = args.data_dir / "txt" / f"chapter_{args.chapter}.txt"
+        if not chapter_file.exists():
+            print(f"❌ Chapter file not found: {chapter_file}. Run python main.py -f -s slp3 first.")
+            return
+        metadata = {
+            "pipeline": "slp3",
+            "chapter_name": f"chapter_{args.chapter}",
+            "text": chapter_file.read_text(encoding="utf-8"),
+            "options": {
+                "deduplicate": not args.no_dedup,
+                "source_retrieval": args.retrieval_source,
+                "cascade": args.cascade,
+                "pack_sections": not args.no_pack_sections,
+                "llm_formatting": args.llm_formatting,
+            },
+        }
+        fixtures = args.fixtures or Path(f"data/fixtures/chapter_{args.chapter}.jsonl.gz")
+
+    print("⚠️ Prompts missing from .llm_cache are sent to the LLM API")
+    start_recording()
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            run_pipeline(metadata, Path(data_dir), args.max_concurrency)
+    finally:
+        keys = stop_recording()
+    exported = export_fixtures(fixtures, keys, metadata)
+    print(f"💾 Exported {exported} recorded responses to {fixtures}")
+
+
+def replay(args: argparse.Namespace) -> None:
+    _, metadata = load_fixtures(args.fixtures)
+    settings = ReplaySettings(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, retry_wait=args.retry_wait, seed=args.seed
+    )
+    client = enable_replay(args.fixtures, settings)
+    module, stage_names = STAGES[metadata["pipeline"]]
+    profiler = StageProfiler()
+    telemetry.reset()
+    try:
+        with tempfile.TemporaryDirectory() as data_dir, profiler.instrument(module, stage_names):
+            start = time.perf_counter()
+            with HotspotSampler() as sampler:
+                cards = run_pipeline(metadata, Path(data_dir), args.max_concurrency)
+            wall = time.perf_counter() - start
+        usage = {model: resources.usage for model, resources in structured_gemini._registry.items()}
+    finally:
+        disable_replay()
+
+    print(
+        f"\n📊 {metadata['pipeline']} replay: {cards} cards, {client.calls} LLM calls "
+        f"({client.injected_errors} injected errors, {len(client.missed_keys)} prompts not in the fixtures)"
+    )
+    for model, stats in usage.items():
+        print(f"   {model}: {stats.summary()}")
+    print(f"\n{telemetry.report()}")
+    profiler.report(wall)
+    sampler.report(args.top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay LLM responses for offline pipeline benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Run a pipeline and export the LLM responses it used")
+    source = record_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--chapter", type=int, help="SLP3 chapter number (data/slp3/txt/chapter_N.txt)")
+    source.add_argument("--neetcode", action="store_true", help="NeetCode 150 problems")
+    record_parser.add_argument("--data-dir", type=Path, default=Path("data/slp3"), help="Base SLP3 data directory")
+    record_parser.add_argument(
+        "--problems-file", type=Path, default=Path("data/neetcode/neetcode_problems.json"), help="Fetched problems"
+    )
+    record_parser.add_argument("--limit", type=int, help="Record only the first N NeetCode problems")
+    record_parser.add_argument("--fixtures", type=Path, help="Bundle path (default: data/fixtures/<input>.jsonl.gz)")
+    record_parser.add_argument("--max-concurrency", type=int, default=slp3_pipeline.DEFAULT_MAX_CONCURRENCY)
+    record_parser.add_argument("--no-dedup", action="store_true")
+    record_parser.add_argument("--retrieval-source", action="store_true")
+    record_parser.add_argument("--cascade", action="store_true")
+    record_parser.add_argument("--no-pack-sections", action="store_true")
+    record_parser.add_argument("--llm-formatting", action="store_true")
+
+    replay_parser = commands.add_parser("replay", help="Run a recorded pipeline offline and report timings")
+    replay_parser.add_argument("--fixtures", type=Path, required=True, help="Bundle written by record")
+    replay_parser.add_argument("--latency", type=float, default=1.0, help="Mean synthetic latency per LLM call (s)")
+    replay_parser.add_argument("--jitter", type=float, default=0.3, help="Standard deviation of the latency (s)")
+    replay_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with a 503")
+    replay_parser.add_argument("--retry-wait", type=float, default=0.05, help="Wait before retrying a failed call (s)")
+    replay_parser.add_argument("--max-concurrency", type=int, default=slp3_pipeline.DEFAULT_MAX_CONCURRENCY)
+    replay_parser.add_argument("--seed", type=int, default=0)
+    replay_parser.add_argument("--top", type=int, default=15, help="Hotspots to list")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args)
+    else:
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of clean_anki_text: single scan vs. the three separate passes.
+
+Every text field of every card of every chapter (data/slp3/cards/*/atomic_cards.json
+and the content-fixed cards in tmp_fix_cards_step, which are cleaned by
+fix_formatting) is cleaned with both implementations. Outputs are compared and
+the time per card is reported.
+
+Usage:
+    python benchmark_text_cleaning.py
+    python benchmark_text_cleaning.py --repeat 20 --files src/utils/atomic_cards.json
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from src.utils.text_processing import (
+    clean_anki_text,
+    escape_html_operators,
+    fix_mathjax_cloze_conflicts,
+    fix_mathjax_operator_spacing,
+)
+
+
+def three_passes(text: str) -> str:
+    """The previous clean_anki_text (without its print calls)."""
+    if not text:
+        return ""
+    return fix_mathjax_cloze_conflicts(fix_mathjax_operator_spacing(escape_html_operators(text)))
+
+
+def card_fields(card: dict) -> List[str]:
+    return [card.get("q", ""), card.get("a", ""), card.get("text", ""), card.get("prompt", ""), *card.get("items", [])]
+
+
+def load_texts(files: List[Path]) -> tuple[int, List[str]]:
+    """Number of cards and their non-empty text fields."""
+    cards = []
+    for file in files:
+        data = json.loads(file.read_text(encoding="utf-8"))
+        cards.extend(data["cards"] if isinstance(data, dict) else data)
+    return len(cards), [text for card in cards for text in card_fields(card) if text]
+
+
+def time_cleaner(cleaner: Callable[[str], str], texts: List[str], repeat: int) -> float:
+    """Best time of one run over all texts."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            cleaner(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_anki_text")
+    parser.add_argument("--data-dir", type=Path, default=Path("data/slp3"), help="Base SLP3 data directory")
+    parser.add_argument("--files", type=Path, nargs="*", help="Card JSON files (default: all chapters)")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per implementation (best is reported)")
+    args = parser.parse_args()
+
+    files = args.files or sorted(args.data_dir.glob("cards/*/atomic_cards.json")) + sorted(
+        args.data_dir.glob("tmp_fix_cards_step/*_02_fixed_content_card.json")
+    )
+    if not files:
+        print(f"❌ No card files found in {args.data_dir}. Run python main.py -c first or pass --files.")
+        return
+
+    card_count, texts = load_texts(files)
+    mismatches = sum(clean_anki_text(text) != three_passes(text) for text in texts)
+    print(f"📊 {card_count:,} cards ({len(texts):,} text fields, {sum(map(len, texts)):,} characters) from {len(files)} files")
+    print(f"🔍 Outputs differ for {mismatches} text fields")
+
+    before = time_cleaner(three_passes, texts, args.repeat)
+    after = time_cleaner(clean_anki_text, texts, args.repeat)
+    print(f"⏱️ three passes: {before * 1000:.1f} ms ({before / card_count * 1e6:.1f} µs/card)")
+    print(f"⏱️ single pass:  {after * 1000:.1f} ms ({after / card_count * 1e6:.1f} µs/card), {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
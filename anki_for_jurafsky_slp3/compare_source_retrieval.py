@@ -0,0 +1,94 @@
+"""
+Report of retrieval-scoped fix_content context on a sample chapter.
+
+Cards are extracted from the sections of a cleaned chapter (cache hits after a
+pipeline run), then:
+
+- token savings: source characters sent to fix_content for every card with
+  the whole section vs. the BM25-selected passages,
+- quality diff: a random sample of cards is fixed with both contexts and the
+  resulting cards are compared (identical, text similarity, unified diff).
+
+The diffs are written to data/slp3/retrieval_report/<chapter>.md.
+
+Usage:
+    python compare_source_retrieval.py --chapter 8
+    python compare_source_retrieval.py --chapter 8 --sample 20 --top-k 4
+    python compare_source_retrieval.py --chapter 8 --sample 0   # token savings only
+"""
+
+import argparse
+import difflib
+import random
+from pathlib import Path
+
+from src.processing.atomic_chunker import extract_atomic_cards, fix_content
+from src.processing.dedup import card_text
+from src.processing.retrieval import SourceContextSelector
+from src.processing.semantic_chunker import split_markdown_into_sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-section and retrieved fix_content context")
+    parser.add_argument("--data-dir", type=Path, default=Path("data/slp3"), help="Base SLP3 data directory")
+    parser.add_argument("--chapter", type=int, required=True, help="Chapter number with cleaned text")
+    parser.add_argument("--sample", type=int, default=10, help="Cards fixed with both contexts (pro model calls x2)")
+    parser.add_argument("--top-k", type=int, default=3, help="Passages per card")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chapter_name = f"chapter_{args.chapter}"
+    cleaned_file = args.data_dir / "cleaned_txt" / f"{chapter_name}.txt"
+    if not cleaned_file.exists():
+        print(f"❌ Cleaned text not found: {cleaned_file}. Run python main.py -c first.")
+        return
+
+    # Same sections as the pipeline
+    cards = []
+    for section in split_markdown_into_sections(cleaned_file.read_text(encoding="utf-8")):
+        content = section.get("content", "")
+        if len(content.strip()) < 50:
+            continue
+        section_text = f"# {section['heading']}\n\n{content}"
+        cards.extend((section_text, card) for card in extract_atomic_cards(section_text))
+
+    selector = SourceContextSelector(top_k=args.top_k)
+    contexts = [selector.select(section_text, card) for section_text, card in cards]
+    print(f"🔎 {chapter_name}: {len(cards)} cards, {selector.stats.summary()}")
+
+    sample = random.Random(args.seed).sample(range(len(cards)), min(args.sample, len(cards)))
+    if not sample:
+        return
+
+    report = [f"# fix_content context: {chapter_name}\n", f"{selector.stats.summary()}\n"]
+    identical, similarities = 0, []
+    for index in sorted(sample):
+        section_text, card = cards[index]
+        with_section = fix_content(section_text, card)
+        with_passages = fix_content(contexts[index], card)
+
+        similarity = difflib.SequenceMatcher(None, card_text(with_section), card_text(with_passages)).ratio()
+        similarities.append(similarity)
+        identical += with_section == with_passages
+        diff = difflib.unified_diff(
+            with_section.model_dump_json(indent=2).splitlines(),
+            with_passages.model_dump_json(indent=2).splitlines(),
+            "full section",
+            "retrieved passages",
+            lineterm="",
+        )
+        report.append(f"## Card {index} (similarity {similarity:.2f})\n\n```diff\n" + "\n".join(diff) + "\n```\n")
+
+    print(
+        f"📋 Sample of {len(sample)} cards: {identical} identical, "
+        f"mean text similarity {sum(similarities) / len(similarities):.2f}, min {min(similarities):.2f}"
+    )
+    output_dir = args.data_dir / "retrieval_report"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"{chapter_name}.md"
+    output_file.write_text("\n".join(report), encoding="utf-8")
+    print(f"💾 Card diffs saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Offline replay of recorded LLM responses.
+
+In replay mode every LLMClient talks to a ReplayClient instead of Gemini.
+It answers from a fixture bundle exported from .llm_cache (see
+src.utils.cache.export_fixtures), looked up by the full-prompt cache key,
+after a synthetic latency and with optional injected server errors.
+The disk cache is swapped for an empty temporary one (and the in-memory one
+emptied), so every call goes through the full client path (semaphores, rate
+limiter, retries).
+
+    enable_replay(Path("fixtures/chapter_8.jsonl.gz"), ReplaySettings(latency=2.0, error_rate=0.02))
+    chapter_pipeline(...)
+    disable_replay()
+"""
+
+import asyncio
+import logging
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict
+
+import diskcache as dc
+from google.genai import errors
+from pydantic import TypeAdapter
+from tenacity import wait_fixed
+
+import connectors.llm.structured_gemini as structured_gemini
+import src.utils.cache as cache_module
+from src.processing.splitter import CHARS_PER_TOKEN
+from src.utils.cache import create_cache_key, load_fixtures
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMiss(LookupError):
+    """No recorded response for a prompt."""
+
+
+@dataclass
+class ReplaySettings:
+    # Mean and standard deviation of the synthetic latency per call (seconds)
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Fraction of calls failing with an injected 503 (retried like real errors)
+    error_rate: float = 0.0
+    # Wait between retries instead of the connector's 20-360s backoff
+    retry_wait: float = 0.05
+    seed: int = 0
+
+
+class ReplayClient:
+    """Stand-in for genai.Client that answers from recorded responses."""
+
+    def __init__(self, responses: Dict[str, Any], settings: ReplaySettings) -> None:
+        self.responses = responses
+        self.settings = settings
+        self.calls = 0
+        self.injected_errors = 0
+        self.missed_keys: set = set()
+        self._cached_contents: Dict[str, Any] = {}
+        self._random = random.Random(settings.seed)
+        self._lock = threading.Lock()
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+        self.caches = SimpleNamespace(create=self._create_cache, update=lambda name, config: None)
+
+    def _create_cache(self, model: str, config: Any) -> SimpleNamespace:
+        with self._lock:
+            name = f"cachedContents/replay-{len(self._cached_contents)}"
+            self._cached_contents[name] = config.contents[0]
+        return SimpleNamespace(name=name)
+
+    def _draw(self) -> tuple[float, bool]:
+        """Latency and whether to fail, from the seeded generator."""
+        with self._lock:
+            self.calls += 1
+            latency = max(0.0, self._random.gauss(self.settings.latency, self.settings.jitter))
+            fail = self._random.random() < self.settings.error_rate
+            self.injected_errors += fail
+        return latency, fail
+
+    def _respond(self, model: str, contents: str, config: Dict[str, Any], fail: bool) -> SimpleNamespace:
+        if fail:
+            raise errors.ServerError(503, {"error": {"message": "injected replay error", "status": "UNAVAILABLE"}})
+
+        prefix = self._cached_contents.get(config.get("cached_content"), "")
+        text = prefix + contents
+        schema = str if config.get("response_mime_type") == "text/plain" else config["response_schema"]
+        key = create_cache_key(model, text, schema)
+        if key not in self.responses:
+            with self._lock:
+                self.missed_keys.add(key)
+            raise ReplayMiss(f"No recorded {model} response for prompt {key[:12]} ({text[:60]!r}...)")
+
+        value = self.responses[key]
+        usage = SimpleNamespace(
+            prompt_token_count=len(text) // CHARS_PER_TOKEN,
+            cached_content_token_count=len(prefix) // CHARS_PER_TOKEN,
+        )
+        if schema is str:
+            return SimpleNamespace(text=value, parsed=None, usage_metadata=usage)
+        return SimpleNamespace(text="", parsed=TypeAdapter(schema).validate_python(value), usage_metadata=usage)
+
+    def _generate(self, model: str, contents: str, config: Dict[str, Any]) -> SimpleNamespace:
+        latency, fail = self._draw()
+        time.sleep(latency)
+        return self._respond(model, contents, config, fail)
+
+    async def _agenerate(self, model: str, contents: str, config: Dict[str, Any]) -> SimpleNamespace:
+        latency, fail = self._draw()
+        await asyncio.sleep(latency)
+        return self._respond(model, contents, config, fail)
+
+
+_saved_state: Dict[str, Any] | None = None
+
+
+def enable_replay(fixtures: Path, settings: ReplaySettings | None = None) -> ReplayClient:
+    """
+    Serve every LLMClient from a fixture bundle.
+
+    Returns:
+        The client shared by all models (calls, injected errors, missed prompts)
+    """
+    global _saved_state
+    settings = settings or ReplaySettings()
+    responses, _ = load_fixtures(fixtures)
+    client = ReplayClient(responses, settings)
+
+    if _saved_state is None:
+        _saved_state = {
+            "cache": cache_module.cache,
+            "waits": [method.retry.wait for method in _retrying_methods()],
+        }
+    else:
+        cache_module.cache.close()
+    cache_module.cache = dc.Cache(tempfile.mkdtemp(prefix="llm_replay_cache_"))
+    cache_module.memory_cache.clear()
+    for method in _retrying_methods():
+        method.retry.wait = wait_fixed(settings.retry_wait)
+    structured_gemini.set_client_factory(lambda: client)
+
+    logger.info(f"Replaying {len(responses)} recorded responses from {fixtures}")
+    return client
+
+
+def disable_replay() -> None:
+    """Restore the real API client, disk cache and retry backoff."""
+    global _saved_state
+    if _saved_state is None:
+        return
+    cache_module.cache.close()
+    cache_module.cache = _saved_state["cache"]
+    cache_module.memory_cache.clear()
+    for method, wait in zip(_retrying_methods(), _saved_state["waits"]):
+        method.retry.wait = wait
+    structured_gemini.set_client_factory(None)
+    _saved_state = None
+
+
+def _retrying_methods() -> list:
+    return [structured_gemini.LLMClient._generate_with_retry, structured_gemini.LLMClient._agenerate_with_retry]
@@ -1,17 +1,27 @@
+import asyncio
+import hashlib
 import logging
 import os
-from typing import Any, Dict, Type, TypeVar
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple, Type, TypeVar
 
 from google import genai
-from google.genai.types import GenerateContentResponse
+from google.genai import errors
+from google.genai.types import CreateCachedContentConfig, GenerateContentResponse, UpdateCachedContentConfig
 from pydantic import BaseModel
 from tenacity import (
+    RetryCallState,
     retry,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
-from src.utils.cache import disk_cache
+from src.utils.cache import async_disk_cache, disk_cache, prompt_stage
+from src.utils.rate_limiter import RateLimiter
+from src.utils.telemetry import CACHED_TOKEN_PRICE, LLMCall, telemetry
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,26 +29,324 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=BaseModel)
 
+# Defaults for every model: API requests per minute (0 = unlimited; cache hits
+# are not limited) and concurrent in-flight requests per model.
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+DEFAULT_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "16"))
+
+# Static prompt prefixes are registered as cached contents for this long (seconds)
+CONTEXT_CACHE_TTL = int(os.getenv("LLM_CONTEXT_CACHE_TTL", "3600"))
+# A cached context is refreshed when less than this fraction of its TTL is left
+CONTEXT_CACHE_REFRESH = 0.2
+# Shorter prefixes are sent inline: ~1024 tokens is the smallest cacheable context
+# (some models need more; a refused prefix is sent inline from then on)
+MIN_CACHED_PREFIX_CHARS = int(os.getenv("LLM_MIN_CACHED_PREFIX_CHARS", "4096"))
+# After a transient failure (quota, server or network error) a prefix is sent
+# inline for this long (seconds) before caching it is tried again
+CONTEXT_CACHE_RETRY_DELAY = 60.0
+
+
+class ContextCache:
+    """
+    Static prompt prefixes of one model, registered once as cached contents.
+
+    A prefix is uploaded on first use and referenced by its handle afterwards.
+    The TTL is extended when it is about to run out; an expired or rejected
+    handle is re-created on the next call. If the API refuses to cache a
+    prefix (a 400, e.g. too short for the model), it is sent inline from then
+    on; after other errors caching is tried again after CONTEXT_CACHE_RETRY_DELAY.
+
+    The network calls run outside the lock: while one thread uploads or
+    refreshes a prefix, the others use the current handle or send it inline.
+    """
+
+    def __init__(self, client: genai.Client, model: str, ttl: int = CONTEXT_CACHE_TTL) -> None:
+        self.client = client
+        self.model = model
+        self.ttl = ttl
+        self.clock: Callable[[], float] = time.monotonic
+        self._handles: Dict[str, Tuple[str, float]] = {}  # prefix hash -> (name, expires at)
+        self._uncacheable: set = set()
+        self._in_flight: set = set()
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode()).hexdigest()
+
+    @staticmethod
+    def _is_refusal(error: Exception) -> bool:
+        """The API will never cache this prefix (bad request, e.g. below the minimum token count)."""
+        return isinstance(error, errors.ClientError) and error.code == 400
+
+    def handle(self, prefix: str) -> str | None:
+        """Name of the cached content holding prefix (None: send the prefix inline)."""
+        key = self._key(prefix)
+        with self._lock:
+            if key in self._uncacheable:
+                return None
+            now = self.clock()
+            entry = self._handles.get(key)
+            if entry is not None and entry[1] - now > self.ttl * CONTEXT_CACHE_REFRESH:
+                return entry[0]
+            current = entry[0] if entry is not None and entry[1] > now else None
+            if key in self._in_flight or self._retry_at.get(key, 0.0) > now:
+                # Another thread is uploading or refreshing it, or the last attempt failed recently
+                return current
+            self._in_flight.add(key)
+
+        ttl = f"{self.ttl}s"
+        try:
+            if current is not None:
+                self.client.caches.update(name=current, config=UpdateCachedContentConfig(ttl=ttl))
+                name = current
+            else:
+                cached = self.client.caches.create(
+                    model=self.model,
+                    config=CreateCachedContentConfig(contents=[prefix], ttl=ttl, display_name=f"prefix-{key[:12]}"),
+                )
+                name = cached.name
+        except Exception as e:
+            with self._lock:
+                self._in_flight.discard(key)
+                self._handles.pop(key, None)
+                if current is None and self._is_refusal(e):
+                    self._uncacheable.add(key)
+                elif current is None:
+                    self._retry_at[key] = now + CONTEXT_CACHE_RETRY_DELAY
+            logger.warning(f"Context caching failed for {self.model}, sending the prompt prefix inline: {e}")
+            return None
+
+        with self._lock:
+            self._in_flight.discard(key)
+            self._retry_at.pop(key, None)
+            self._handles[key] = (name, now + self.ttl)
+        logger.debug(f"Cached prompt prefix {key[:12]} of {self.model} as {name}")
+        return name
+
+    def invalidate(self, prefix: str) -> None:
+        """Forget the handle of prefix (re-created on the next call)."""
+        with self._lock:
+            self._handles.pop(self._key(prefix), None)
+
+
+@dataclass
+class UsageStats:
+    """Latency and input tokens of the API calls of one model."""
+
+    latencies: List[float] = field(default_factory=list)
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, latency: float, response: GenerateContentResponse) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            self.latencies.append(latency)
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_token_count or 0
+                self.cached_tokens += usage.cached_content_token_count or 0
+
+    @property
+    def billed_input_tokens(self) -> float:
+        """Input tokens weighted by price (cached tokens at CACHED_TOKEN_PRICE)."""
+        return self.prompt_tokens - self.cached_tokens * (1 - CACHED_TOKEN_PRICE)
+
+    def summary(self) -> str:
+        calls = max(len(self.latencies), 1)
+        return (
+            f"{len(self.latencies)} calls, mean latency {sum(self.latencies) / calls:.2f}s, "
+            f"{self.prompt_tokens:,} input tokens ({self.cached_tokens:,} from cached contexts), "
+            f"{self.billed_input_tokens:,.0f} billed"
+        )
+
+
+class ModelResources:
+    """
+    Process-wide state shared by every LLMClient of one model.
+
+    One genai.Client (and so one HTTP connection pool) per model, one rate
+    limiter and one concurrency bound, so concurrent callers reuse connections
+    and back off together.
+    """
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.client = (_client_factory or genai.Client)()
+        self.rate_limiter = RateLimiter(DEFAULT_REQUESTS_PER_MINUTE)
+        self.max_concurrent_requests = DEFAULT_MAX_CONCURRENT_REQUESTS
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrent_requests)
+        self.context_cache = ContextCache(self.client, model)
+        self.usage = UsageStats()
+        # asyncio primitives belong to one event loop, so keep one per loop
+        self._async_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+
+
+_registry: Dict[str, ModelResources] = {}
+_registry_lock = threading.Lock()
+# Creates the API client of every model (None: genai.Client); see set_client_factory
+_client_factory: Callable[[], Any] | None = None
+
+
+def get_model_resources(model: str) -> ModelResources:
+    """Return the shared client, rate limiter and semaphores for a model (created once)."""
+    with _registry_lock:
+        resources = _registry.get(model)
+        if resources is None:
+            resources = ModelResources(model)
+            _registry[model] = resources
+        return resources
+
+
+def set_client_factory(factory: Callable[[], Any] | None) -> None:
+    """
+    Create the API clients of all models with factory (e.g. a replay client).
+
+    Drops the shared resources of every model, so clients created from now on
+    use the new factory. None restores genai.Client.
+    """
+    global _client_factory
+    with _registry_lock:
+        _client_factory = factory
+        _registry.clear()
+
+
+def configure_model(
+    model: str, requests_per_minute: float | None = None, max_concurrent_requests: int | None = None
+) -> None:
+    """
+    Override the rate limit and/or concurrency bound of one model.
+
+    Args:
+        model: Model name (e.g. "gemini-2.5-pro")
+        requests_per_minute: API requests per minute (0 = unlimited)
+        max_concurrent_requests: Maximum in-flight requests
+    """
+    resources = get_model_resources(model)
+    if requests_per_minute is not None:
+        resources.rate_limiter.set_rate(requests_per_minute)
+    if max_concurrent_requests is not None:
+        resources.max_concurrent_requests = max_concurrent_requests
+        resources.semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+        resources._async_semaphores = weakref.WeakKeyDictionary()
+
+
+def _share_quota_backoff(retry_state: RetryCallState) -> None:
+    """On a quota error, make every caller of the model wait as long as this retry."""
+    exception = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(exception, errors.APIError) and exception.code == 429:
+        client: LLMClient = retry_state.args[0]
+        seconds = retry_state.next_action.sleep if retry_state.next_action else 0
+        logger.warning(f"Quota exceeded for {client.model}, all callers back off for {seconds:.0f}s")
+        client.rate_limiter.backoff(seconds)
+
 
 class LLMClient:
     def __init__(self, model: str | None = None) -> None:
         self.model: str = model or os.getenv("LLM_MODEL", "gemini-2.5-flash")
-        self.client = genai.Client()
+        self._resources = get_model_resources(self.model)
+        self.client = self._resources.client
+        self.rate_limiter = self._resources.rate_limiter
 
-    def _make_api_call(
-        self, text: str, schema: Any, generation_config: Dict[str, Any] | None = None
-    ) -> GenerateContentResponse:
+    def _build_config(self, schema: Any, generation_config: Dict[str, Any] | None) -> Dict[str, Any]:
         if generation_config is None:
-            config: dict[str, Any] = {
+            return {
                 "response_mime_type": "application/json",
                 "response_schema": schema,
             }
-        else:
-            config = generation_config
+        return generation_config
 
-        response = self.client.models.generate_content(
-            model=self.model, contents=text, config=config
-        )
+    def _request(
+        self,
+        text: str,
+        schema: Any,
+        generation_config: Dict[str, Any] | None = None,
+        static_prefix: str | None = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Contents and config of one request.
+
+        If text starts with a long enough static_prefix, only the rest of the
+        prompt is sent and the prefix is referenced as a cached context.
+        """
+        config = self._build_config(schema, generation_config)
+        text = str(text)  # a cache Prompt is sent as plain text
+        if not static_prefix or len(static_prefix) < MIN_CACHED_PREFIX_CHARS or not text.startswith(static_prefix):
+            return text, config
+        handle = self._resources.context_cache.handle(static_prefix)
+        if handle is None:
+            return text, config
+        return text[len(static_prefix) :], {**config, "cached_content": handle}
+
+    def _expire_cached_prefix(self, error: errors.ClientError, config: Dict[str, Any], static_prefix: str | None) -> None:
+        """Drop a handle the API no longer knows (expired or deleted); the retry re-creates it."""
+        if "cached_content" in config and static_prefix is not None and error.code in (403, 404):
+            self._resources.context_cache.invalidate(static_prefix)
+
+    def _make_api_call(
+        self,
+        text: str,
+        schema: Any,
+        generation_config: Dict[str, Any] | None = None,
+        static_prefix: str | None = None,
+        call: LLMCall | None = None,
+    ) -> GenerateContentResponse:
+        contents, config = self._request(text, schema, generation_config, static_prefix)
+
+        with self._resources.semaphore:
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            if call is not None:
+                call.attempts += 1
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model, contents=contents, config=config
+                )
+            except errors.ClientError as e:
+                self._expire_cached_prefix(e, config, static_prefix)
+                raise
+            latency = time.perf_counter() - start
+            self._resources.usage.add(latency, response)
+            if call is not None:
+                call.add_response(latency, response)
+
+        return response
+
+    async def _amake_api_call(
+        self,
+        text: str,
+        schema: Any,
+        generation_config: Dict[str, Any] | None = None,
+        static_prefix: str | None = None,
+        call: LLMCall | None = None,
+    ) -> GenerateContentResponse:
+        contents, config = await asyncio.to_thread(self._request, text, schema, generation_config, static_prefix)
+
+        async with self._resources.async_semaphore():
+            await self.rate_limiter.acquire_async()
+            start = time.perf_counter()
+            if call is not None:
+                call.attempts += 1
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model, contents=contents, config=config
+                )
+            except errors.ClientError as e:
+                self._expire_cached_prefix(e, config, static_prefix)
+                raise
+            latency = time.perf_counter() - start
+            self._resources.usage.add(latency, response)
+            if call is not None:
+                call.add_response(latency, response)
 
         return response
 
@@ -56,21 +364,82 @@ class LLMClient:
         stop=stop_after_attempt(10),
         wait=wait_exponential(multiplier=5, min=20, max=360),
         retry=retry_if_exception_type(Exception),
+        before_sleep=_share_quota_backoff,
         reraise=True,
     )
     def _generate_with_retry(
-        self, text: str, schema: Any, generation_config: Dict[str, Any] | None = None
+        self,
+        text: str,
+        schema: Any,
+        generation_config: Dict[str, Any] | None = None,
+        static_prefix: str | None = None,
+        call: LLMCall | None = None,
     ) -> GenerateContentResponse:
-        return self._make_api_call(text, schema, generation_config)
+        return self._make_api_call(text, schema, generation_config, static_prefix, call)
+
+    @retry(
+        stop=stop_after_attempt(10),
+        wait=wait_exponential(multiplier=5, min=20, max=360),
+        retry=retry_if_exception_type(Exception),
+        before_sleep=_share_quota_backoff,
+        reraise=True,
+    )
+    async def _agenerate_with_retry(
+        self,
+        text: str,
+        schema: Any,
+        generation_config: Dict[str, Any] | None = None,
+        static_prefix: str | None = None,
+        call: LLMCall | None = None,
+    ) -> GenerateContentResponse:
+        return await self._amake_api_call(text, schema, generation_config, static_prefix, call)
 
     @disk_cache
-    def generate(self, text: str, schema: Type[T]) -> T:
-        if schema is str:
-            response = self._generate_with_retry(
-                text, str, {"response_mime_type": "text/plain"}
-            )
-            return response.text
-        else:
-            response = self._generate_with_retry(text, schema)
-            parsed_response = self._parse_basemodel_response(response, schema)
-            return parsed_response
+    def generate(self, text: str, schema: Type[T], static_prefix: str | None = None) -> T:
+        """
+        Generate a response to the prompt text (cached on disk, see src.utils.cache).
+
+        Args:
+            text: Full prompt
+            schema: Response type (str for plain text)
+            static_prefix: Leading part of text shared by many calls, e.g. fixed
+                instructions and examples; sent once as a cached context
+
+        Every call that reaches the API is recorded in src.utils.telemetry.
+        """
+        call = LLMCall(self.model, prompt_stage(text))
+        try:
+            if schema is str:
+                response = self._generate_with_retry(
+                    text, str, {"response_mime_type": "text/plain"}, static_prefix, call
+                )
+                return response.text
+            else:
+                response = self._generate_with_retry(text, schema, static_prefix=static_prefix, call=call)
+                parsed_response = self._parse_basemodel_response(response, schema)
+                return parsed_response
+        except Exception as e:
+            call.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            telemetry.record(call.finish())
+
+    @async_disk_cache
+    async def agenerate(self, text: str, schema: Type[T], static_prefix: str | None = None) -> T:
+        """Async generate: same cache entries, retries sleep without blocking the event loop."""
+        call = LLMCall(self.model, prompt_stage(text))
+        try:
+            if schema is str:
+                response = await self._agenerate_with_retry(
+                    text, str, {"response_mime_type": "text/plain"}, static_prefix, call
+                )
+                return response.text
+            else:
+                response = await self._agenerate_with_retry(text, schema, static_prefix=static_prefix, call=call)
+                parsed_response = self._parse_basemodel_response(response, schema)
+                return parsed_response
+        except Exception as e:
+            call.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            telemetry.record(call.finish())
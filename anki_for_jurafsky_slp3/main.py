@@ -1,6 +1,8 @@
 import argparse
+import importlib
 import sys
 import json
+import time
 import asyncio
 from pathlib import Path
 from pick import pick
@@ -20,43 +22,25 @@ def run_fetch_command(source: str):
 
 
 async def fetch_neetcode_problems():
-    """Fetch NeetCode 150 problems from LeetCode."""
-    from src.fetch_data.fetch_leetcode import LeetcodeData
+    """Fetch NeetCode 150 problems from LeetCode (cached problems are only re-downloaded if changed)."""
+    from neetcode_pipeline import NEETCODE_150_IDS
+    from src.fetch_data.fetch_leetcode import LeetcodeProblemFetcher
     
     print("🚀 Fetching NeetCode 150 problems...")
     
-    # NeetCode 150 list ID
-    neetcode_list_id = "plakya4j"
-    
-    # Initialize LeetCode data fetcher for all problems in the list
-    leetcode_data = LeetcodeData(
-        start=0,
-        stop=2**64,  # Get all problems
-        page_size=500,
-        list_id=neetcode_list_id
+    # Fetch only the NeetCode 150 problems, by ID
+    fetcher = LeetcodeProblemFetcher()
+    start = time.perf_counter()
+    problems = await asyncio.to_thread(fetcher.fetch, NEETCODE_150_IDS)
+    print(
+        f"📊 Fetched {len(problems)} of {len(NEETCODE_150_IDS)} NeetCode 150 problems in {time.perf_counter() - start:.1f}s "
+        f"({fetcher.downloaded} downloaded, {fetcher.reused} unchanged from cache, {fetcher.requests} API requests)"
     )
     
-    # Get all problem handles (slugs)
-    problem_handles = await leetcode_data.all_problems_handles()
-    print(f"📊 Found {len(problem_handles)} problems in NeetCode 150")
-    
     # Create output directory
     output_dir = Path("data/neetcode")
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Save problem data
-    problems_data = []
-    for handle in problem_handles:
-        problem_data = {
-            "slug": handle,
-            "title": await leetcode_data.title(handle),
-            "problem_id": await leetcode_data.problem_id(handle),
-            "description": await leetcode_data.description(handle),
-            "difficulty": await leetcode_data.difficulty(handle),
-            "category": await leetcode_data.category(handle),
-            "tags": await leetcode_data.tags(handle)
-        }
-        problems_data.append(problem_data)
+    problems_data = [problem.model_dump() for problem in problems]
     
     # Save to JSON file
     output_file = output_dir / "neetcode_problems.json"
@@ -66,14 +50,16 @@ async def fetch_neetcode_problems():
     print(f"✅ Saved {len(problems_data)} problems to {output_file}")
 
 
-def run_process_leetcode_command(source: str):
+def run_process_leetcode_command(source: str, max_concurrency: int | None = None, resume: bool = False):
     """Process LeetCode problems and generate cards using LLM."""
     if source.lower() == "neetcode":
         print("🚀 Starting NeetCode 150 processing...")
         
         # Import and run the neetcode pipeline
         import neetcode_pipeline
-        neetcode_pipeline.main()
+        neetcode_pipeline.main(
+            max_concurrency=max_concurrency or neetcode_pipeline.DEFAULT_MAX_CONCURRENCY, resume=resume
+        )
         
         print("✅ NeetCode processing completed!")
     else:
@@ -108,9 +94,19 @@ def run_make_deck_command(source: str, chapter_num: int = None):
         sys.exit(1)
 
 
-def run_create_cards_command(skip_if_cleaned: bool = False):
+def run_create_cards_command(
+    skip_if_cleaned: bool = False,
+    max_concurrency: int | None = None,
+    layout_text: bool = False,
+    deduplicate: bool = True,
+    source_retrieval: bool = False,
+    cascade: bool = False,
+    pack_sections: bool = True,
+    llm_formatting: bool = False,
+    resume: bool = False,
+):
     """Interactive chapter selection and card creation."""
-    from slp3_pipeline import create_cards_for_chapters
+    from slp3_pipeline import DEFAULT_MAX_CONCURRENCY, create_cards_for_chapters
 
     # Check if data directory exists
     data_dir = Path("data/slp3/txt")
@@ -160,7 +156,18 @@ def run_create_cards_command(skip_if_cleaned: bool = False):
     print(f"\n✅ Selected chapters: {selected_chapters}")
 
     # Process selected chapters
-    create_cards_for_chapters(selected_chapters, skip_if_cleaned=skip_if_cleaned)
+    create_cards_for_chapters(
+        selected_chapters,
+        skip_if_cleaned=skip_if_cleaned,
+        max_concurrency=max_concurrency or DEFAULT_MAX_CONCURRENCY,
+        layout_text=layout_text,
+        deduplicate=deduplicate,
+        source_retrieval=source_retrieval,
+        cascade=cascade,
+        pack_sections=pack_sections,
+        llm_formatting=llm_formatting,
+        resume=resume,
+    )
 
 
 def run_make_slp3_deck_command(chapter_num: int):
@@ -208,6 +215,27 @@ def run_make_slp3_deck_command(chapter_num: int):
     create_anki_deck(cards, deck_name, output_filename)
 
 
+def run_cache_command(prune: bool, prune_untagged: bool):
+    """Report LLM cache entries per prompt template version and prune stale ones."""
+    from src.utils.cache import is_stale, prune_cache, template_report
+
+    # Importing the prompt modules registers their current template versions
+    for module in ("atomic_chunker", "leetcode_card_creation", "merger", "preprocessor"):
+        importlib.import_module(f"src.processing.{module}")
+
+    print(f"{'template':<32} {'entries':>8} {'MB':>9}  status")
+    for usage in template_report():
+        if usage.tag is None:
+            status = "full-prompt keys"
+        else:
+            status = "stale" if is_stale(usage.tag) else "current"
+        print(f"{usage.tag or '(untagged)':<32} {usage.entries:>8} {usage.size / 1e6:>9.1f}  {status}")
+
+    if prune or prune_untagged:
+        removed = prune_cache(untagged=prune_untagged)
+        print(f"🧹 Removed {removed} cache entries")
+
+
 def create_parser():
     """Create and configure the argument parser."""
     epilog = """
@@ -216,11 +244,24 @@ examples:
   python main.py -f -s slp3          # Fetch
   python main.py -c                  # Create cards (interactive)
   python main.py -c --skip-if-cleaned  # Create cards (skip cleaning if possible)
+  python main.py -c --max-concurrency 16  # Create cards with 16 concurrent LLM calls
+  python main.py -c --layout-text    # Create cards from layout-extracted PDF text (no LLM cleaning)
+  python main.py -c --no-dedup       # Create cards without dropping near-duplicates
+  python main.py -c --retrieval-source  # Verify cards against retrieved passages instead of whole sections
+  python main.py -c --cascade        # Fix cards with flash, escalate flagged ones to pro
+  python main.py -c --no-pack-sections  # One extraction call per section
+  python main.py -c --llm-formatting # Format cards with the LLM, 25 cards per call
+  python main.py -c --resume         # Continue an interrupted run from its checkpoints
   python main.py -m -s slp3 -ch 8    # Make deck
 
+  LLM cache:
+  python main.py --cache-report      # Entries per prompt template version
+  python main.py --prune-cache       # Delete entries of outdated template versions
+
   NeetCode:
   python main.py -f -s neetcode      # Fetch
   python main.py -pl -s neetcode     # Process with LLM
+  python main.py -pl -s neetcode --resume  # Continue an interrupted run from its checkpoint
   python main.py -m -s neetcode      # Make deck
 """
     
@@ -256,6 +297,47 @@ examples:
         action="store_true",
         help="Skip expensive cleaning steps and use existing cleaned text",
     )
+    parser.add_argument(
+        "--layout-text",
+        action="store_true",
+        help="Use layout-aware PDF extraction instead of LLM cleaning of the raw text",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Keep near-duplicate cards (sends every extracted card to the gemini-2.5-pro fix stage)",
+    )
+    parser.add_argument(
+        "--retrieval-source",
+        action="store_true",
+        help="Send fix_content only the passages retrieved for each card instead of the whole section "
+        "(experimental: check with compare_source_retrieval.py first)",
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Fix card content with gemini-2.5-flash and escalate to gemini-2.5-pro only when validators flag it",
+    )
+    parser.add_argument(
+        "--no-pack-sections",
+        action="store_true",
+        help="Extract cards from every section separately instead of size-balanced section packs",
+    )
+    parser.add_argument(
+        "--llm-formatting",
+        action="store_true",
+        help="Format cards with gemini-2.5-flash-lite in batched calls (default: local text fixes only)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted card creation run (-c or -pl), skipping work already checkpointed",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        help="Maximum concurrent LLM calls when creating cards with -c or -pl (default: 8)",
+    )
     parser.add_argument(
         "--make-deck",
         "-m",
@@ -265,6 +347,21 @@ examples:
     parser.add_argument(
         "--chapter", "-ch", type=int, help="Chapter number for deck creation"
     )
+    parser.add_argument(
+        "--cache-report",
+        action="store_true",
+        help="Report LLM cache entries and size per prompt template version",
+    )
+    parser.add_argument(
+        "--prune-cache",
+        action="store_true",
+        help="Delete LLM cache entries of prompt template versions older than the current ones",
+    )
+    parser.add_argument(
+        "--prune-untagged",
+        action="store_true",
+        help="Also delete LLM cache entries keyed on the full prompt (untemplated or pre-versioning entries)",
+    )
     return parser
 
 
@@ -282,14 +379,26 @@ def main():
         if not args.source:
             print("❌ --source is required when using --process-leetcode")
             sys.exit(1)
-        run_process_leetcode_command(args.source)
+        run_process_leetcode_command(args.source, args.max_concurrency, args.resume)
     elif args.create_cards:
-        run_create_cards_command(skip_if_cleaned=args.skip_if_cleaned)
+        run_create_cards_command(
+            skip_if_cleaned=args.skip_if_cleaned,
+            max_concurrency=args.max_concurrency,
+            layout_text=args.layout_text,
+            deduplicate=not args.no_dedup,
+            source_retrieval=args.retrieval_source,
+            cascade=args.cascade,
+            pack_sections=not args.no_pack_sections,
+            llm_formatting=args.llm_formatting,
+            resume=args.resume,
+        )
     elif args.make_deck:
         if not args.source:
             print("❌ --source is required when using --make-deck")
             sys.exit(1)
         run_make_deck_command(args.source, args.chapter)
+    elif args.cache_report or args.prune_cache or args.prune_untagged:
+        run_cache_command(args.prune_cache, args.prune_untagged)
     else:
         parser.print_help()
 
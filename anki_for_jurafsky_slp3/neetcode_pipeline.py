@@ -12,7 +12,12 @@ from pathlib import Path
 from typing import List
 
 from src.models.leetcode_cards import FetchedLeetcodeProblem, LeetcodeCard, AnkiLeetcodeCard, create_leetcode_anki_cards
-from src.processing.leetcode_card_creation import load_and_validate_problems, process_leetcode_problems
+from src.processing.leetcode_card_creation import (
+    DEFAULT_MAX_CONCURRENCY,
+    load_and_validate_problems,
+    process_leetcode_problems,
+)
+from src.utils.telemetry import telemetry
 
 
 # NeetCode 150 problem IDs
@@ -74,12 +79,19 @@ def save_anki_cards_to_json(anki_cards: List[AnkiLeetcodeCard], output_path: str
     print(f"💾 Saved {len(cards_data)} AnkiLeetcodeCard objects to {output_path}")
 
 
-def main():
-    """Main pipeline execution."""
+def main(max_concurrency: int = DEFAULT_MAX_CONCURRENCY, resume: bool = False):
+    """
+    Main pipeline execution.
+
+    Args:
+        max_concurrency: Cards generated concurrently
+        resume: Keep the cards of an interrupted run from its checkpoint
+    """
     print("🚀 Starting NeetCode 150 pipeline...")
     
     # Input and output paths
     input_file = "data/neetcode/neetcode_problems.json"
+    checkpoint_file = Path("data/neetcode/neetcode_150_checkpoint.jsonl")
     llm_output_file = "data/neetcode/neetcode_150_llm_solutions.json"
     anki_output_file = "data/neetcode/neetcode_150_anki_cards.json"
     
@@ -91,6 +103,7 @@ def main():
         # Filter for NeetCode 150 problems
         print(f"🔍 Filtering for NeetCode 150 problems ({len(NEETCODE_150_IDS)} total)")
         target_problems = filter_problems_by_ids(all_problems, NEETCODE_150_IDS)
+        target_problems.sort(key=lambda problem: int(problem.problem_id))
         
         if not target_problems:
             print("❌ No target problems found! Check if the problem IDs exist in the dataset.")
@@ -98,9 +111,14 @@ def main():
         
         # Generate cards using LLM
         print("🤖 Generating LeetCode cards using LLM...")
-        cards_dict = process_leetcode_problems(target_problems)
+        telemetry.reset()
+        cards_dict = process_leetcode_problems(
+            target_problems, max_concurrency=max_concurrency, checkpoint_path=checkpoint_file, resume=resume
+        )
+        print(f"📈 LLM calls by stage:\n{telemetry.report()}")
+        print(f"📈 LLM telemetry summary saved to {telemetry.write_summary(Path('data/neetcode/telemetry'))}")
         
-        # Convert to list for processing
+        # Convert to list for processing (ordered by problem ID)
         cards_list = list(cards_dict.values())
         
         if not cards_list:
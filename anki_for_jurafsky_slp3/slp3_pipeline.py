@@ -1,220 +1,785 @@
 """
 SLP3 Pipeline - End-to-end processing of textbook chapters into atomic flashcards.
+
+The stages run as a dependency graph on an asyncio event loop. Every LLM-bound
+stage (chunk cleaning, card extraction, content fix, formatting fix) runs in a
+worker thread and holds one slot of a semaphore shared by all chapters, so:
+
+- all chunks of a chapter are cleaned concurrently and merged in order,
+- sections are packed into size-balanced extraction requests (small siblings
+  merged, oversized sections split, heading breadcrumbs kept), and extraction
+  of every request starts as soon as the merged text is ready,
+- near-duplicate cards (within the chapter and against cards kept from earlier
+  chapters) are dropped before the expensive fix_content stage; chapters
+  deduplicate in chapter-number order, so the same cards are kept on every
+  run; without
+  deduplication each card streams through fix_content → fix_formatting while
+  other sections are still being extracted,
+- with source retrieval (opt-in until compare_source_retrieval.py has shown
+  the cards keep their quality), fix_content gets only the section passages
+  relevant to the card (BM25), falling back to the whole section when
+  retrieval is not confident,
+- in cascade mode fix_content runs on the fast model and is repeated on the pro
+  model only when local validators flag the result,
+- with LLM formatting, fixed cards are formatted in batches of FORMAT_BATCH_SIZE
+  per call instead of one call per card,
+- several chapters run at once under one concurrency bound, and the API request
+  rate is capped process-wide by the LLM connector (LLM_REQUESTS_PER_MINUTE).
+
+Outputs keep the sequential order (section order, then card order).
 """
 
+import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
-from src.processing.splitter import split_to_chunks
+from typing import Any, Callable, Coroutine, Dict, List, Tuple, TypeVar
+
+from pydantic import TypeAdapter
+
+from src.processing.splitter import (
+    CHARS_PER_TOKEN,
+    STRUCTURED_OVERLAP,
+    chunking_stats,
+    split_to_chunks,
+    split_to_structured_chunks,
+)
+from src.fetch_data.pdf_layout import extract_layout_markdown
 from src.processing.preprocessor import clean_chapter_text
 from src.processing.merger import merge_chunks
 from src.processing.semantic_chunker import split_markdown_into_sections
-from src.processing.atomic_chunker import extract_atomic_cards, fix_content, fix_formatting
+from src.processing.section_planner import plan_sections, plan_stats
+from src.processing.atomic_chunker import (
+    content_prompt,
+    extract_atomic_cards,
+    fix_content,
+    fix_formatting,
+    fix_formatting_batch,
+)
+from src.processing.cascade import (
+    FAST_MODEL,
+    PRO_MODEL,
+    CascadeRecord,
+    CascadeStats,
+    estimate_cost,
+    validate_fixed_card,
+)
+from src.processing.dedup import CardDeduplicator
+from src.processing.retrieval import SourceContextSelector
 from src.models.cards import CardType, ClozeCard, EnumerationCard, QACard
+from src.utils.checkpoint import Checkpoint, stable_id, stream_records
+from src.utils.telemetry import telemetry
 from tqdm import tqdm
 import traceback
 
+T = TypeVar("T")
 
-def chapter_pipeline(
+# Default number of LLM stage calls in flight at once (across all chapters)
+DEFAULT_MAX_CONCURRENCY = 8
+# Cards per batched formatting call
+FORMAT_BATCH_SIZE = 25
+
+_CARD_ADAPTER: TypeAdapter[CardType] = TypeAdapter(CardType)
+
+
+def _run_with_workers(coro: Coroutine[Any, Any, T], max_concurrency: int) -> T:
+    """Run a coroutine on a fresh event loop whose thread pool fits the concurrency bound."""
+
+    async def runner() -> T:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_concurrency))
+        return await coro
+
+    return asyncio.run(runner())
+
+
+async def _run_stage(semaphore: asyncio.Semaphore, func: Callable[..., T], *args: Any) -> T:
+    """Run one blocking stage call in a worker thread, holding a slot of the shared semaphore."""
+    async with semaphore:
+        return await asyncio.to_thread(func, *args)
+
+
+async def _clean_chapter(
+    raw_chapter_text: str,
+    chapter_name: str,
+    window_size: int,
+    overlap: int,
+    semaphore: asyncio.Semaphore,
+    fixed_windows: bool = False,
+) -> str:
+    """Steps 1-3: split, clean all chunks concurrently, merge them in order."""
+    fixed_chunks = list(split_to_chunks(raw_chapter_text, window_size, overlap))
+    if fixed_windows:
+        chunks = fixed_chunks
+    else:
+        chunks = list(split_to_structured_chunks(raw_chapter_text, window_size // CHARS_PER_TOKEN))
+        # The merger searches a window around the (small) overlap
+        overlap = 2 * STRUCTURED_OVERLAP
+
+    stats = chunking_stats(raw_chapter_text, chunks)
+    fixed_stats = chunking_stats(raw_chapter_text, fixed_chunks)
+    print(
+        f"📦 {chapter_name}: {stats['chunks']} chunks, {stats['chars_sent']:,} chars to clean "
+        f"({stats['ratio']:.2f}x chapter; fixed windows: {fixed_stats['ratio']:.2f}x)"
+    )
+
+    progress = tqdm(total=len(chunks), desc=f"Cleaning chunks of {chapter_name}")
+
+    async def clean(chunk: str) -> str:
+        cleaned_chunk = await _run_stage(semaphore, clean_chapter_text, chapter_name, chunk)
+        _advance(progress)
+        return cleaned_chunk
+
+    try:
+        # gather keeps chunk order regardless of completion order
+        cleaned_chunks = await asyncio.gather(*(clean(chunk) for chunk in chunks))
+    finally:
+        progress.close()
+
+    return await asyncio.to_thread(merge_chunks, cleaned_chunks, overlap)
+
+
+def _advance(progress: tqdm) -> None:
+    """Count one finished item and show the running LLM totals of the run."""
+    progress.set_postfix(telemetry.postfix(), refresh=False)
+    progress.update(1)
+
+
+def _timed(func: Callable[..., T], *args: Any) -> Tuple[T, float]:
+    """Call func and return its result with the call duration in seconds."""
+    start = time.monotonic()
+    result = func(*args)
+    return result, time.monotonic() - start
+
+
+async def _fix_content_cascade(
+    source: str, card: CardType, semaphore: asyncio.Semaphore, cascade_stats: CascadeStats
+) -> CardType:
+    """fix_content on the fast model, repeated on the pro model if a local validator flags the result."""
+    prompt_chars = len(content_prompt(source, card))
+    try:
+        fixed_card, latency = await _run_stage(semaphore, _timed, fix_content, source, card, FAST_MODEL)
+        issues = validate_fixed_card(card, fixed_card)
+        cost = estimate_cost(FAST_MODEL, prompt_chars, len(fixed_card.model_dump_json()))
+    except Exception as e:
+        issues, latency, cost = [f"{FAST_MODEL} failed: {e}"], 0.0, estimate_cost(FAST_MODEL, prompt_chars, 0)
+
+    if issues:
+        fixed_card, pro_latency = await _run_stage(semaphore, _timed, fix_content, source, card, PRO_MODEL)
+        latency += pro_latency
+        cost += estimate_cost(PRO_MODEL, prompt_chars, len(fixed_card.model_dump_json()))
+
+    cascade_stats.add(CascadeRecord(escalated=bool(issues), issues=issues, latency=latency, cost=cost))
+    return fixed_card
+
+
+@dataclass
+class _CardStages:
+    """Per-chapter state shared by the section and card stages."""
+
+    semaphore: asyncio.Semaphore
+    checkpoint: Checkpoint
+    context_selector: SourceContextSelector | None = None
+    cascade_stats: CascadeStats | None = None
+    # False: cards are formatted later in batches
+    format_cards: bool = True
+
+
+class DedupTurns:
+    """
+    Makes chapters sharing a CardDeduplicator deduplicate in a fixed order.
+
+    Extraction still runs concurrently; a chapter only waits for the earlier
+    chapters' deduplication (not their fix stages) before its own, so which
+    copy of a repeated card is kept does not depend on completion order.
+    """
+
+    def __init__(self, chapter_names: List[str]):
+        self._order = list(chapter_names)
+        self._done = {name: asyncio.Event() for name in self._order}
+
+    async def wait(self, chapter_name: str) -> None:
+        """Wait until every chapter before chapter_name has deduplicated (or given up)."""
+        for name in self._order[: self._order.index(chapter_name)]:
+            await self._done[name].wait()
+
+    def finish(self, chapter_name: str) -> None:
+        """Release the later chapters (safe to call more than once)."""
+        self._done[chapter_name].set()
+
+
+def _card_id(section_id: str, card: Dict[str, Any]) -> str:
+    """Stable ID of an extracted card (same section and raw card → same ID on every run)."""
+    return stable_id(section_id, json.dumps(card, sort_keys=True, ensure_ascii=False))
+
+
+async def _fix_card(
+    section_text: str, card: CardType, stages: _CardStages, progress: tqdm
+) -> Tuple[str, CardType]:
+    """
+    Stream one card through fix_content → fix_formatting, checkpointing each stage.
+
+    Stages already in the checkpoint (on resume) are not run again.
+
+    Returns:
+        (card ID, fixed card)
+    """
+    card_id = _card_id(stable_id(section_text), card.model_dump())
+    checkpoint = stages.checkpoint
+
+    final = checkpoint.get("final", card_id)
+    if final is not None:
+        _advance(progress)
+        return card_id, _CARD_ADAPTER.validate_python(final)
+
+    content = checkpoint.get("content", card_id)
+    fixed_content_card: QACard | ClozeCard | EnumerationCard
+    if content is not None:
+        fixed_content_card = _CARD_ADAPTER.validate_python(content)
+    else:
+        source = stages.context_selector.select(section_text, card) if stages.context_selector else section_text
+        if stages.cascade_stats is None:
+            fixed_content_card = await _run_stage(stages.semaphore, fix_content, source, card)
+        else:
+            fixed_content_card = await _fix_content_cascade(source, card, stages.semaphore, stages.cascade_stats)
+        # fix_formatting edits the card in place, so snapshot it first
+        checkpoint.record("content", card_id, fixed_content_card.model_dump())
+
+    if not stages.format_cards:
+        _advance(progress)
+        return card_id, fixed_content_card
+
+    fixed_card: QACard | ClozeCard | EnumerationCard = await _run_stage(
+        stages.semaphore, fix_formatting, fixed_content_card
+    )
+    checkpoint.record("final", card_id, fixed_card.model_dump())
+
+    _advance(progress)
+    return card_id, fixed_card
+
+
+async def _extract_section(heading: str, section_text: str, stages: _CardStages) -> List[CardType]:
+    """Extract cards from one section ([] if extraction fails), or read them from the checkpoint."""
+    section_id = stable_id(section_text)
+    extracted = stages.checkpoint.get("extracted", section_id)
+    if extracted is not None:
+        return [_CARD_ADAPTER.validate_python(card) for card in extracted]
+
+    try:
+        cards = await _run_stage(stages.semaphore, extract_atomic_cards, section_text)
+    except Exception as e:
+        # Log error but continue processing other sections
+        print(f"Warning: Failed to extract cards from section '{heading}': {e}")
+        return []
+
+    stages.checkpoint.record("extracted", section_id, [card.model_dump() for card in cards])
+    return cards
+
+
+async def _process_section(
+    heading: str, section_text: str, stages: _CardStages, progress: tqdm
+) -> List[Tuple[str, CardType]]:
+    """Extract cards from one section and fix each card as soon as extraction finishes."""
+    cards = await _extract_section(heading, section_text, stages)
+
+    progress.total = (progress.total or 0) + len(cards)
+    progress.refresh()
+    return await asyncio.gather(*(_fix_card(section_text, card, stages, progress) for card in cards))
+
+
+async def _process_sections_deduplicated(
+    sections: List[Tuple[str, str]],
+    chapter_name: str,
+    stages: _CardStages,
+    deduplicator: CardDeduplicator,
+    intermediate_cards_dir: Path,
+    dedup_turns: DedupTurns | None = None,
+) -> List[Tuple[str, CardType]]:
+    """Extract cards of all sections, drop near-duplicates, then fix the remaining cards."""
+    section_cards = await asyncio.gather(
+        *(_extract_section(heading, section_text, stages) for heading, section_text in sections)
+    )
+    extracted = [
+        (section_text, card) for (_, section_text), cards in zip(sections, section_cards) for card in cards
+    ]
+
+    if dedup_turns is not None:
+        await dedup_turns.wait(chapter_name)
+    try:
+        within, across = deduplicator.duplicates_within, deduplicator.duplicates_across
+        kept, duplicates = deduplicator.deduplicate([card for _, card in extracted])
+        within, across = deduplicator.duplicates_within - within, deduplicator.duplicates_across - across
+    finally:
+        if dedup_turns is not None:
+            dedup_turns.finish(chapter_name)
+    print(
+        f"🧹 {chapter_name}: {len(extracted)} cards, dropped {len(duplicates)} near-duplicates "
+        f"({within} within chapter, {across} across chapters) → {len(duplicates)} gemini-2.5-pro calls avoided"
+    )
+
+    intermediate_cards_dir.mkdir(parents=True, exist_ok=True)
+    with open(intermediate_cards_dir / f"{chapter_name}_00_duplicates.json", "w", encoding="utf-8") as f:
+        json.dump(
+            [{"card": extracted[index][1].model_dump(), "duplicate_of": kept_text} for index, kept_text in duplicates],
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+    progress = tqdm(total=len(kept), desc=f"Fixing cards of {chapter_name}", smoothing=0.1)
+    try:
+        return await asyncio.gather(
+            *(_fix_card(extracted[index][0], extracted[index][1], stages, progress) for index in kept)
+        )
+    finally:
+        progress.close()
+
+
+async def _format_in_batches(
+    results: List[Tuple[str, CardType]], chapter_name: str, stages: _CardStages
+) -> None:
+    """Format the content-fixed cards not yet in the checkpoint, one LLM call per FORMAT_BATCH_SIZE cards."""
+    pending = [(card_id, card) for card_id, card in results if stages.checkpoint.get("final", card_id) is None]
+    batches = [pending[i : i + FORMAT_BATCH_SIZE] for i in range(0, len(pending), FORMAT_BATCH_SIZE)]
+
+    async def format_batch(batch: List[Tuple[str, CardType]]) -> None:
+        formatted = await _run_stage(stages.semaphore, fix_formatting_batch, [card for _, card in batch])
+        for (card_id, _), card in zip(batch, formatted):
+            stages.checkpoint.record("final", card_id, card.model_dump())
+
+    await asyncio.gather(*(format_batch(batch) for batch in batches))
+    print(f"🎨 {chapter_name}: formatted {len(pending)} cards in {len(batches)} batched calls")
+
+
+def _assemble_outputs(
+    checkpoint_path: Path, card_ids: List[str], intermediate_cards_dir: Path, chapter_name: str
+) -> List[CardType]:
+    """
+    Write the per-stage card files by streaming the checkpoint.
+
+    Returns:
+        Final cards in card_ids order
+    """
+    wanted = set(card_ids)
+    stage_cards: Dict[str, Dict[str, Any]] = {"raw": {}, "content": {}, "final": {}}
+    for record in stream_records(checkpoint_path):
+        if record["stage"] == "extracted":
+            for card in record["data"]:
+                card_id = _card_id(record["key"], card)
+                if card_id in wanted:
+                    stage_cards["raw"][card_id] = card
+        elif record["key"] in wanted:
+            stage_cards[record["stage"]][record["key"]] = record["data"]
+
+    for stage, suffix in (("raw", "01_raw"), ("content", "02_fixed_content_card"), ("final", "03_fixed_card")):
+        cards_json = [json.dumps(stage_cards[stage][card_id], indent=2, ensure_ascii=False) for card_id in card_ids]
+        with open(intermediate_cards_dir / f"{chapter_name}_{suffix}.json", "w", encoding="utf-8") as f:
+            f.write("[\n" + ",\n".join(cards_json) + "\n]")
+
+    return [_CARD_ADAPTER.validate_python(stage_cards["final"][card_id]) for card_id in card_ids]
+
+
+async def achapter_pipeline(
     raw_chapter_text: str,
     chapter_name: str,
     window_size: int = 6000,
     overlap: int = 3000,
     data_dir: Path | None = None,
     skip_if_cleaned: bool = False,
+    semaphore: asyncio.Semaphore | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    fixed_windows: bool = False,
+    layout_text: bool = False,
+    deduplicator: CardDeduplicator | None = None,
+    source_retrieval: bool = False,
+    cascade: bool = False,
+    pack_sections: bool = True,
+    llm_formatting: bool = False,
+    resume: bool = False,
+    dedup_turns: DedupTurns | None = None,
 ) -> List[CardType]:
     """
-    Process a raw chapter text through the complete pipeline to generate atomic flashcards.
+    Async version of chapter_pipeline; see chapter_pipeline for the arguments.
 
     Args:
-        raw_chapter_text: Raw text extracted from PDF
-        chapter_name: Name of the chapter (e.g., "chapter_8")
-        window_size: Size of chunks for processing (default: 6000)
-        overlap: Overlap between chunks (default: 3000)
-        data_dir: Base data directory (defaults to ./data/slp3)
-        skip_if_cleaned: If True, skip cleaning steps (1-3) and use existing cleaned text
+        semaphore: Concurrency bound shared with other chapters (created from
+            max_concurrency if None)
+        max_concurrency: Number of concurrent stage calls when semaphore is None
+        deduplicator: Drops near-duplicate cards before fix_content; share one
+            between chapters to also drop cards kept in other chapters (no
+            deduplication if None)
+        dedup_turns: Order in which chapters sharing the deduplicator use it
+            (the chapter is released when it finishes or fails)
 
     Returns:
         List of atomic flashcards extracted from all sections of the chapter
     """
-    
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
     if data_dir is None:
         data_dir = Path("data/slp3")
 
     # Check if we should skip cleaning steps and use existing cleaned text
     cleaned_txt_dir = data_dir / "cleaned_txt"
     cleaned_file = cleaned_txt_dir / f"{chapter_name}.txt"
-    
-    if skip_if_cleaned and cleaned_file.exists():
+
+    if layout_text:
+        # Layout-aware extraction already removed headers/footers and line breaks
+        print(f"📐 Using layout-extracted text for {chapter_name} (LLM cleaning skipped)")
+        merged_text = raw_chapter_text
+    elif (skip_if_cleaned or resume) and cleaned_file.exists():
         print(f"📄 Using existing cleaned text: {cleaned_file}")
         with open(cleaned_file, "r", encoding="utf-8") as f:
             merged_text = f.read()
     else:
-        # Step 1: Split into overlapping chunks
-        chunks = list(split_to_chunks(raw_chapter_text, window_size, overlap))
-
-        # Step 2: Clean chunks with LLM
-        cleaned_chunks = []
-        for chunk in tqdm(chunks, desc=f"Cleaning chunks of {chapter_name}"):
-            cleaned_chunk = clean_chapter_text(chapter_name, chunk)
-            cleaned_chunks.append(cleaned_chunk)
-
-        # Step 3: Merge cleaned chunks
-        merged_text = merge_chunks(cleaned_chunks, overlap)
-        
+        # Steps 1-3: Split, clean chunks concurrently, merge in order
+        merged_text = await _clean_chapter(
+            raw_chapter_text, chapter_name, window_size, overlap, semaphore, fixed_windows
+        )
+
         # Save cleaned text
         cleaned_txt_dir.mkdir(parents=True, exist_ok=True)
-        
+
         with open(cleaned_file, "w", encoding="utf-8") as f:
             f.write(merged_text)
-        
+
         print(f"💾 Saved cleaned text to: {cleaned_file}")
 
     # Step 4: Split into semantic sections
     sections = split_markdown_into_sections(merged_text)
 
-    # Step 5: Extract atomic cards from each section
-    all_cards = []
-
-    for section in tqdm(sections, desc=f"Extracting cards from {chapter_name}"):
-        heading = section["heading"]
-        content = section.get("content", "")
+    section_texts = []
+    if pack_sections:
+        requests = plan_sections(sections)
+        section_texts = [(request.heading, request.render()) for request in requests]
+        stats = plan_stats(sections, requests)
+        print(
+            f"🗂️ {chapter_name}: {stats['sections']} sections → {stats['planned_calls']} extraction calls "
+            f"(one per section: {stats['section_calls']}, largest request ~{stats['max_request_tokens']:,} tokens)"
+        )
+    else:
+        for section in sections:
+            heading = section["heading"]
+            content = section.get("content", "")
 
-        # Skip very short sections
-        if len(content.strip()) < 50:
-            continue
+            # Skip very short sections
+            if len(content.strip()) < 50:
+                continue
 
-        # Extract cards from this section
-        try:
-            section_text = f"# {heading}\n\n{content}"
-            cards = extract_atomic_cards(section_text)
-            card_info = [(section_text, card) for card in cards]
-            all_cards.extend(card_info)
-        except Exception as e:
-            # Log error but continue processing other sections
-            print(f"Warning: Failed to extract cards from section '{heading}': {e}")
-            continue
+            section_texts.append((heading, f"# {heading}\n\n{content}"))
 
     intermediate_cards_dir = data_dir / "tmp_fix_cards_step"
+    checkpoint_path = intermediate_cards_dir / f"{chapter_name}_checkpoint.jsonl"
+
+    with Checkpoint(checkpoint_path, resume=resume) as checkpoint:
+        if checkpoint.resumed:
+            print(f"⏩ Resuming {chapter_name}: {checkpoint.resumed} finished stage results in {checkpoint_path}")
+        stages = _CardStages(
+            semaphore=semaphore,
+            checkpoint=checkpoint,
+            context_selector=SourceContextSelector() if source_retrieval else None,
+            cascade_stats=CascadeStats() if cascade else None,
+            format_cards=not llm_formatting,
+        )
+
+        if deduplicator is not None:
+            # Step 5: Extract atomic cards from all sections, drop near-duplicates, fix the rest
+            results = await _process_sections_deduplicated(
+                section_texts, chapter_name, stages, deduplicator, intermediate_cards_dir, dedup_turns
+            )
+        else:
+            # Step 5: Extract atomic cards from each section and stream them through the fix stages
+            progress = tqdm(total=0, desc=f"Extracting and fixing cards of {chapter_name}", smoothing=0.1)
+            try:
+                section_results = await asyncio.gather(
+                    *(_process_section(heading, section_text, stages, progress) for heading, section_text in section_texts)
+                )
+            finally:
+                progress.close()
+            results = [result for section_result in section_results for result in section_result]
+
+        if llm_formatting and results:
+            await _format_in_batches(results, chapter_name, stages)
+
+    context_selector, cascade_stats = stages.context_selector, stages.cascade_stats
+    if context_selector is not None and context_selector.stats.cards:
+        print(f"🔎 {chapter_name} fix_content context: {context_selector.stats.summary()}")
+    if cascade_stats is not None and cascade_stats.records:
+        print(f"🪜 {chapter_name} fix_content cascade: {cascade_stats.summary()}")
+
     intermediate_cards_dir.mkdir(parents=True, exist_ok=True)
-    
-    raw_cards = []
-    content_fixed_cards = []
-    final_cards = []
-    new_cards = []
-    
-    for section_text, card in tqdm(all_cards, desc="Fixing extracted cards", smoothing=0.1):
-        raw_cards.append(json.dumps(card.model_dump(), indent=2, ensure_ascii=False))
-        
-        fixed_content_card: QACard | ClozeCard | EnumerationCard = fix_content(section_text, card)
-        content_fixed_cards.append(json.dumps(fixed_content_card.model_dump(), indent=2, ensure_ascii=False))
-        
-        fixed_card: QACard | ClozeCard | EnumerationCard = fix_formatting(fixed_content_card)
-        final_cards.append(json.dumps(fixed_card.model_dump(), indent=2, ensure_ascii=False))
-        
-        new_cards.append(fixed_card)
-    
-    with open(intermediate_cards_dir / f"{chapter_name}_01_raw.json", "w", encoding="utf-8") as f:
-        f.write("[\n" + ",\n".join(raw_cards) + "\n]")
-    
-    with open(intermediate_cards_dir / f"{chapter_name}_02_fixed_content_card.json", "w", encoding="utf-8") as f:
-        f.write("[\n" + ",\n".join(content_fixed_cards) + "\n]")
-        
-    with open(intermediate_cards_dir / f"{chapter_name}_03_fixed_card.json", "w", encoding="utf-8") as f:
-        f.write("[\n" + ",\n".join(final_cards) + "\n]")
-
-    all_cards = new_cards
-
-    return all_cards
+    new_cards = _assemble_outputs(
+        checkpoint_path, [card_id for card_id, _ in results], intermediate_cards_dir, chapter_name
+    )
+
+    if cascade_stats is not None:
+        with open(intermediate_cards_dir / f"{chapter_name}_cascade_log.json", "w", encoding="utf-8") as f:
+            json.dump(cascade_stats.to_dicts(), f, indent=2, ensure_ascii=False)
+
+    return new_cards
+
+
+def chapter_pipeline(
+    raw_chapter_text: str,
+    chapter_name: str,
+    window_size: int = 6000,
+    overlap: int = 3000,
+    data_dir: Path | None = None,
+    skip_if_cleaned: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    fixed_windows: bool = False,
+    layout_text: bool = False,
+    deduplicate: bool = True,
+    source_retrieval: bool = False,
+    cascade: bool = False,
+    pack_sections: bool = True,
+    llm_formatting: bool = False,
+    resume: bool = False,
+) -> List[CardType]:
+    """
+    Process a raw chapter text through the complete pipeline to generate atomic flashcards.
+
+    Args:
+        raw_chapter_text: Raw text extracted from PDF
+        chapter_name: Name of the chapter (e.g., "chapter_8")
+        window_size: Maximum chunk size in characters (default: 6000, ~1500 tokens)
+        overlap: Overlap between fixed windows (default: 3000; the structure-aware
+            splitter uses a small STRUCTURED_OVERLAP instead)
+        data_dir: Base data directory (defaults to ./data/slp3)
+        skip_if_cleaned: If True, skip cleaning steps (1-3) and use existing cleaned text
+        max_concurrency: Maximum number of LLM stage calls in flight (default: 8)
+        fixed_windows: Split at fixed character offsets (previous behaviour) instead
+            of heading/page/paragraph boundaries
+        layout_text: raw_chapter_text is layout-extracted markdown; skip LLM cleaning (1-3)
+        deduplicate: Drop near-duplicate cards before the gemini-2.5-pro fix_content stage
+        source_retrieval: Send fix_content only the passages relevant to each card
+            instead of the whole section (opt-in: not yet checked for card quality)
+        cascade: Fix content with the fast model first, escalating to the pro model
+            only when local validators flag the result
+        pack_sections: Merge small sibling sections and split oversized ones into
+            size-balanced extraction requests (one request per section if False)
+        llm_formatting: Format cards with the LLM, FORMAT_BATCH_SIZE cards per call
+            (otherwise only the local text fixes of fix_formatting are applied)
+        resume: Continue an interrupted run: reuse the cleaned text and skip the
+            sections and cards already in tmp_fix_cards_step/<chapter>_checkpoint.jsonl
+
+    Returns:
+        List of atomic flashcards extracted from all sections of the chapter
+    """
+    return _run_with_workers(
+        achapter_pipeline(
+            raw_chapter_text,
+            chapter_name,
+            window_size=window_size,
+            overlap=overlap,
+            data_dir=data_dir,
+            skip_if_cleaned=skip_if_cleaned,
+            max_concurrency=max_concurrency,
+            fixed_windows=fixed_windows,
+            layout_text=layout_text,
+            deduplicator=CardDeduplicator() if deduplicate else None,
+            source_retrieval=source_retrieval,
+            cascade=cascade,
+            pack_sections=pack_sections,
+            llm_formatting=llm_formatting,
+            resume=resume,
+        ),
+        max_concurrency,
+    )
+
+
+async def _create_chapter_cards(
+    chapter_num: int,
+    data_dir: Path,
+    skip_if_cleaned: bool,
+    semaphore: asyncio.Semaphore,
+    layout_text: bool = False,
+    deduplicator: CardDeduplicator | None = None,
+    source_retrieval: bool = False,
+    cascade: bool = False,
+    pack_sections: bool = True,
+    llm_formatting: bool = False,
+    resume: bool = False,
+    dedup_turns: DedupTurns | None = None,
+) -> None:
+    """Run the pipeline for one chapter and save its cards (errors are logged, not raised)."""
+    txt_dir = data_dir / "txt"
+    cards_dir = data_dir / "cards"
+
+    # Load chapter text
+    chapter_file = txt_dir / f"chapter_{chapter_num}.txt"
+    if layout_text:
+        chapter_file = data_dir / "layout_md" / f"chapter_{chapter_num}.md"
+        pdf_file = data_dir / "pdf" / f"chapter_{chapter_num}.pdf"
+        if not chapter_file.exists() and pdf_file.exists():
+            print(f"📐 Extracting layout text from {pdf_file}...")
+            chapter_file.parent.mkdir(parents=True, exist_ok=True)
+            chapter_file.write_text(await asyncio.to_thread(extract_layout_markdown, pdf_file), encoding="utf-8")
+    if not chapter_file.exists():
+        print(f"❌ Chapter {chapter_num} file not found: {chapter_file}")
+        return
+
+    print(f"📖 Loading chapter {chapter_num}...")
+    with open(chapter_file, "r", encoding="utf-8") as f:
+        raw_text = f.read()
+
+    print(f"📊 Chapter {chapter_num} size: {len(raw_text):,} characters")
+
+    # Process through pipeline
+    try:
+        print(f"⚙️ Running pipeline for chapter {chapter_num}... {skip_if_cleaned=}")
+        cards = await achapter_pipeline(
+            raw_text,
+            f"chapter_{chapter_num}",
+            data_dir=data_dir,
+            skip_if_cleaned=skip_if_cleaned,
+            semaphore=semaphore,
+            layout_text=layout_text,
+            deduplicator=deduplicator,
+            source_retrieval=source_retrieval,
+            cascade=cascade,
+            pack_sections=pack_sections,
+            llm_formatting=llm_formatting,
+            resume=resume,
+            dedup_turns=dedup_turns,
+        )
+
+        if not cards:
+            print(f"⚠️ No cards generated for chapter {chapter_num}")
+            return
+
+        print(f"🎯 Generated {len(cards)} atomic cards for chapter {chapter_num}")
+
+        # Count by type
+        card_counts = {"Q&A": 0, "Cloze": 0, "Enumeration": 0}
+        for card in cards:
+            card_counts[card.type] += 1
+
+        print(
+            f"📋 Chapter {chapter_num} card types: Q&A={card_counts['Q&A']}, Cloze={card_counts['Cloze']}, Enum={card_counts['Enumeration']}"
+        )
+
+        # Create chapter directory
+        chapter_cards_dir = cards_dir / f"chapter_{chapter_num}"
+        chapter_cards_dir.mkdir(exist_ok=True)
+
+        # Save cards as JSON
+        cards_data = []
+        for card in cards:
+            card_dict = card.model_dump()
+            cards_data.append(card_dict)
+
+        output_file = chapter_cards_dir / "atomic_cards.json"
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "chapter": chapter_num,
+                    "total_cards": len(cards),
+                    "card_counts": card_counts,
+                    "cards": cards_data,
+                },
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+
+        print(f"💾 Saved to: {output_file}")
+        print(f"✅ Chapter {chapter_num} completed successfully!")
+
+    except Exception as e:
+        traceback.print_exc()
+        print(f"❌ Error processing chapter {chapter_num}: {e}")
 
 
 def create_cards_for_chapters(
     chapter_numbers: List[int], 
     data_dir: Path | None = None,
     skip_if_cleaned: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    layout_text: bool = False,
+    deduplicate: bool = True,
+    source_retrieval: bool = False,
+    cascade: bool = False,
+    pack_sections: bool = True,
+    llm_formatting: bool = False,
+    resume: bool = False,
 ) -> None:
     """
     Create atomic cards for selected chapters and save them to organized directories.
 
+    All chapters are processed concurrently and share one concurrency bound
+    (and the connector's process-wide request rate limit). Deduplication runs
+    in chapter-number order, so a card repeated in a later chapter is dropped
+    there, whichever chapter finishes extraction first.
+
     Args:
         chapter_numbers: List of chapter numbers to process (e.g., [2, 8, 15])
         data_dir: Base data directory (defaults to ./data/slp3)
         skip_if_cleaned: If True, skip expensive cleaning steps and use existing cleaned text
+        max_concurrency: Maximum number of LLM stage calls in flight across all chapters
+        layout_text: Use layout-extracted markdown (data/slp3/layout_md) and skip LLM cleaning
+        deduplicate: Drop near-duplicate cards within and across the chapters before fix_content
+        source_retrieval: Send fix_content only the passages relevant to each card
+        cascade: Fix content with the fast model first and escalate flagged cards to the pro model
+        pack_sections: Pack sections into size-balanced extraction requests
+        llm_formatting: Format cards with the LLM in batches of FORMAT_BATCH_SIZE
+        resume: Continue interrupted runs from the per-chapter checkpoints
     """
     if data_dir is None:
         data_dir = Path("data/slp3")
 
-    txt_dir = data_dir / "txt"
     cards_dir = data_dir / "cards"
     cards_dir.mkdir(parents=True, exist_ok=True)
 
-    for chapter_num in chapter_numbers:
-        print(f"\n{'='*60}")
-        print(f"Processing Chapter {chapter_num}")
-        print(f"{'='*60}")
-
-        # Load chapter text
-        chapter_file = txt_dir / f"chapter_{chapter_num}.txt"
-        if not chapter_file.exists():
-            print(f"❌ Chapter {chapter_num} file not found: {chapter_file}")
-            continue
-
-        print(f"📖 Loading chapter {chapter_num}...")
-        with open(chapter_file, "r", encoding="utf-8") as f:
-            raw_text = f.read()
-
-        print(f"📊 Chapter size: {len(raw_text):,} characters")
-
-        # Process through pipeline
-        try:
-            print(f"⚙️ Running pipeline... {skip_if_cleaned=}")
-            cards = chapter_pipeline(raw_text, f"chapter_{chapter_num}", data_dir=data_dir, skip_if_cleaned=skip_if_cleaned)
-
-            if not cards:
-                print(f"⚠️ No cards generated for chapter {chapter_num}")
-                continue
-
-            print(f"🎯 Generated {len(cards)} atomic cards")
-
-            # Count by type
-            card_counts = {"Q&A": 0, "Cloze": 0, "Enumeration": 0}
-            for card in cards:
-                card_counts[card.type] += 1
-
-            print(
-                f"📋 Card types: Q&A={card_counts['Q&A']}, Cloze={card_counts['Cloze']}, Enum={card_counts['Enumeration']}"
-            )
-
-            # Create chapter directory
-            chapter_cards_dir = cards_dir / f"chapter_{chapter_num}"
-            chapter_cards_dir.mkdir(exist_ok=True)
-
-            # Save cards as JSON
-            cards_data = []
-            for card in cards:
-                card_dict = card.model_dump()
-                cards_data.append(card_dict)
-
-            output_file = chapter_cards_dir / "atomic_cards.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(
-                    {
-                        "chapter": chapter_num,
-                        "total_cards": len(cards),
-                        "card_counts": card_counts,
-                        "cards": cards_data,
-                    },
-                    f,
-                    indent=2,
-                    ensure_ascii=False,
+    print(f"\n{'='*60}")
+    print(f"Processing Chapters {chapter_numbers} ({max_concurrency} concurrent LLM calls)")
+    print(f"{'='*60}")
+
+    # One index for all chapters, so cards repeated in a later chapter are dropped too
+    deduplicator = CardDeduplicator() if deduplicate else None
+    telemetry.reset()
+
+    async def run_all() -> None:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        dedup_turns = (
+            DedupTurns([f"chapter_{chapter_num}" for chapter_num in sorted(set(chapter_numbers))])
+            if deduplicator is not None else None
+        )
+
+        async def run_chapter(chapter_num: int) -> None:
+            try:
+                await _create_chapter_cards(
+                    chapter_num,
+                    data_dir,
+                    skip_if_cleaned,
+                    semaphore,
+                    layout_text,
+                    deduplicator,
+                    source_retrieval,
+                    cascade,
+                    pack_sections,
+                    llm_formatting,
+                    resume,
+                    dedup_turns,
                 )
+            finally:
+                # A chapter that is missing or failed before deduplicating must not block the later ones
+                if dedup_turns is not None:
+                    dedup_turns.finish(f"chapter_{chapter_num}")
+
+        await asyncio.gather(*(run_chapter(chapter_num) for chapter_num in chapter_numbers))
 
-            print(f"💾 Saved to: {output_file}")
-            print(f"✅ Chapter {chapter_num} completed successfully!")
+    _run_with_workers(run_all(), max_concurrency)
 
-        except Exception as e:
-            traceback.print_exc()
-            print(f"❌ Error processing chapter {chapter_num}: {e}")
-            continue
+    if deduplicator is not None:
+        print(
+            f"🧹 Dropped {deduplicator.duplicates_removed} of {deduplicator.cards_seen} cards as near-duplicates "
+            f"({deduplicator.duplicates_within} within, {deduplicator.duplicates_across} across chapters): "
+            f"{deduplicator.duplicates_removed} gemini-2.5-pro fix_content calls avoided"
+        )
 
+    print(f"\n📈 LLM calls by stage:\n{telemetry.report()}")
+    print(f"📈 LLM telemetry summary saved to {telemetry.write_summary(data_dir / 'telemetry')}")
     print(f"\n🎉 Batch processing completed for chapters: {chapter_numbers}")
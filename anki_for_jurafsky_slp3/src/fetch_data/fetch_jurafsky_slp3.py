@@ -1,7 +1,16 @@
+import json
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Tuple
+
 import requests
 import fitz  # PyMuPDF
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 from pathlib import Path
+from urllib3.util.retry import Retry
 
 # Base configuration
 BASE_URL = "https://web.stanford.edu/~jurafsky/slp3/"
@@ -11,6 +20,10 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 PDF_DIR = PROJECT_ROOT / "data" / "slp3" / "pdf"
 TEXT_DIR = PROJECT_ROOT / "data" / "slp3" / "txt"
 
+# Concurrent downloads (one pooled connection each) and pages per extraction task
+MAX_DOWNLOAD_WORKERS = 8
+PAGES_PER_TASK = 8
+
 # Ensure directories exist
 PDF_DIR.mkdir(parents=True, exist_ok=True)
 TEXT_DIR.mkdir(parents=True, exist_ok=True)
@@ -29,78 +42,194 @@ def get_chapter_urls():
     return urls
 
 
-def download_and_extract_text(chapter_name, url):
-    """Downloads a PDF and extracts its text if not already done."""
-    pdf_path = PDF_DIR / f"{chapter_name}.pdf"
-    text_path = TEXT_DIR / f"{chapter_name}.txt"
+def create_session(pool_size: int = MAX_DOWNLOAD_WORKERS) -> requests.Session:
+    """HTTP session with a connection pool sized for the download workers and retries on 429/5xx."""
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-    # Check if text file already exists
-    if text_path.exists():
-        print(f"Text for {chapter_name} already exists. Skipping.")
-        with open(text_path, "r", encoding="utf-8") as f:
-            return f.read()
 
-    # Download PDF if it doesn't exist
-    if not pdf_path.exists():
-        print(f"Downloading {chapter_name}...")
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            with open(pdf_path, "wb") as f:
-                f.write(response.content)
-            print(f"✅ Downloaded {chapter_name}")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to download {chapter_name}: {e}")
-            return None
-
-    # Extract text from PDF
-    print(f"Extracting text from {chapter_name}...")
-    full_text = ""
+def _metadata_path(pdf_path: Path) -> Path:
+    return pdf_path.parent / f"{pdf_path.name}.meta.json"
+
+
+def download_pdf(session: requests.Session, url: str, pdf_path: Path) -> str:
+    """
+    Download a PDF unless the server reports it unchanged (conditional GET).
+
+    The ETag and Last-Modified headers of the last download are stored next to
+    the PDF (``<name>.pdf.meta.json``) and sent back as If-None-Match and
+    If-Modified-Since.
+
+    Returns:
+        "downloaded", "not_modified" or "failed"
+    """
+    headers = {}
+    metadata_path = _metadata_path(pdf_path)
+    if pdf_path.exists() and metadata_path.exists():
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
     try:
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                full_text += page.get_text()
+        response = session.get(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return "not_modified"
+        response.raise_for_status()  # Raise an exception for bad status codes
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Failed to download {pdf_path.stem}: {e}")
+        return "failed"
+
+    temp_path = pdf_path.parent / f"{pdf_path.name}.tmp"
+    temp_path.write_bytes(response.content)
+    os.replace(temp_path, pdf_path)
+    metadata_path.write_text(
+        json.dumps(
+            {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    return "downloaded"
 
-        with open(text_path, "w", encoding="utf-8") as f:
-            f.write(full_text)
 
-        print(f"✅ Extracted text from {chapter_name}")
-        return full_text
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> str:
+    """Worker: text of pages [start, stop) (runs in a child process)."""
+    with fitz.open(pdf_path) as doc:
+        return "".join(doc[page_number].get_text() for page_number in range(start, stop))
+
+
+def extract_text(pdf_path: Path, executor: Executor | None = None) -> str:
+    """
+    Extract the text of all pages, split into page ranges processed in parallel.
 
+    Args:
+        pdf_path: Path to the PDF
+        executor: Pool for the page ranges (extracted inline if None)
+
+    Returns:
+        Text of all pages in page order (same as concatenating page.get_text())
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    if executor is None:
+        parts = [_extract_page_range(str(pdf_path), start, stop) for start, stop in ranges]
+    else:
+        futures = [executor.submit(_extract_page_range, str(pdf_path), start, stop) for start, stop in ranges]
+        parts = [future.result() for future in futures]
+    return "".join(parts)
+
+
+def download_and_extract_text(
+    chapter_name: str,
+    url: str,
+    session: requests.Session | None = None,
+    executor: Executor | None = None,
+    pdf_dir: Path = PDF_DIR,
+    text_dir: Path = TEXT_DIR,
+) -> Tuple[str | None, str]:
+    """
+    Download a PDF if it changed and (re-)extract its text when needed.
+
+    Returns:
+        (text or None on failure, download status)
+    """
+    pdf_path = pdf_dir / f"{chapter_name}.pdf"
+    text_path = text_dir / f"{chapter_name}.txt"
+
+    status = download_pdf(session or create_session(1), url, pdf_path)
+    if status == "failed" and not pdf_path.exists():
+        return None, status
+
+    # Unchanged PDF with existing text: nothing to do
+    if status != "downloaded" and text_path.exists():
+        return text_path.read_text(encoding="utf-8"), status
+
+    try:
+        full_text = extract_text(pdf_path, executor)
+        text_path.write_text(full_text, encoding="utf-8")
+        print(f"✅ Extracted text from {chapter_name}")
+        return full_text, status
     except Exception as e:
         print(f"❌ Failed to extract text from {chapter_name}: {e}")
-        return None
+        return None, status
 
 
-def fetch_all_slp3_content():
+def fetch_all_slp3_content(
+    chapter_urls: Dict[str, str] | None = None,
+    pdf_dir: Path = PDF_DIR,
+    text_dir: Path = TEXT_DIR,
+    max_workers: int = MAX_DOWNLOAD_WORKERS,
+    extraction_workers: int | None = None,
+):
     """
     Main function to fetch all SLP3 content.
-    Downloads PDFs and extracts text for all chapters and appendices.
+    Downloads PDFs concurrently (only the ones that changed since the last run)
+    and extracts their text with page-level parallelism in a process pool.
+
+    Args:
+        chapter_urls: Mapping of chapter name to PDF URL (default: all SLP3 chapters)
+        pdf_dir: Directory for PDFs and their download metadata
+        text_dir: Directory for extracted text
+        max_workers: Number of concurrent downloads
+        extraction_workers: Number of extraction processes (default: CPU count)
 
     Returns:
         dict: Dictionary mapping chapter names to their text content
     """
     print("🚀 Starting SLP3 content fetching...")
-    print(f"📁 PDFs will be saved to: {PDF_DIR}")
-    print(f"📄 Text files will be saved to: {TEXT_DIR}")
+    print(f"📁 PDFs will be saved to: {pdf_dir}")
+    print(f"📄 Text files will be saved to: {text_dir}")
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+    text_dir.mkdir(parents=True, exist_ok=True)
 
-    chapter_urls = get_chapter_urls()
+    if chapter_urls is None:
+        chapter_urls = get_chapter_urls()
     all_texts = {}
+    statuses: Counter = Counter()
 
     print(f"📚 Found {len(chapter_urls)} chapters/appendices to process")
 
-    for name, url in tqdm(chapter_urls.items(), desc="Processing Chapters"):
-        try:
-            text_content = download_and_extract_text(name, url)
-            if text_content:
-                all_texts[name] = text_content
-        except Exception as e:
-            print(f"❌ Unexpected error processing {name}: {e}")
+    session = create_session(max_workers)
+    # Extraction jobs are submitted from the download threads; forking a threaded process can deadlock
+    extraction_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=extraction_workers, mp_context=extraction_context) as extraction_pool, ThreadPoolExecutor(
+        max_workers=max_workers
+    ) as download_pool:
+        futures = {
+            download_pool.submit(
+                download_and_extract_text, name, url, session, extraction_pool, pdf_dir, text_dir
+            ): name
+            for name, url in chapter_urls.items()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing Chapters"):
+            name = futures[future]
+            try:
+                text_content, status = future.result()
+                statuses[status] += 1
+                if text_content:
+                    all_texts[name] = text_content
+            except Exception as e:
+                print(f"❌ Unexpected error processing {name}: {e}")
+    session.close()
 
     print(
-        f"✅ Completed! Successfully processed {len(all_texts)} out of {len(chapter_urls)} items"
+        f"✅ Completed! Successfully processed {len(all_texts)} out of {len(chapter_urls)} items "
+        f"(downloaded: {statuses['downloaded']}, unchanged: {statuses['not_modified']}, failed: {statuses['failed']})"
     )
-    return all_texts
+    # Keep chapter order regardless of completion order
+    return {name: all_texts[name] for name in chapter_urls if name in all_texts}
 
 
 def get_available_chapters():
@@ -7,16 +7,26 @@ Adapted from https://github.com/fspv/leetcode-anki
 
 The original code is used to generate Anki decks with all LeetCode problems,
 but this adaptation focuses on data fetching only (slug + problem text).
+
+LeetcodeProblemFetcher fetches only the problems it is asked for (by ID or
+slug), concurrently under a token-bucket rate limit, and keeps their details
+in a disk cache with a TTL, so a refresh re-downloads only new, changed or
+expired problems.
 """
 
 import functools
+import hashlib
 import json
 import logging
 import math
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
-from typing import Any, Callable, Dict, List, Tuple, Type, TypeVar
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type, TypeVar
+
+import diskcache as dc
 
 # https://github.com/prius/python-leetcode
 import leetcode.api.default_api  # type: ignore
@@ -32,10 +42,26 @@ import urllib3  # type: ignore
 from tqdm import tqdm  # type: ignore
 from dotenv import load_dotenv
 
+from src.models.leetcode_cards import FetchedLeetcodeProblem
+from src.utils.rate_limiter import RateLimiter
+
 load_dotenv()
 
 CACHE_DIR = "cache"
 
+# Token bucket shared by every LeetCode API request of the process
+LEETCODE_REQUESTS_PER_MINUTE = float(os.getenv("LEETCODE_REQUESTS_PER_MINUTE", "120"))
+LEETCODE_BURST = int(os.getenv("LEETCODE_BURST", "10"))
+# Concurrent LeetCode API requests (page and problem detail fetches)
+FETCH_WORKERS = 8
+# Cached problem details are re-downloaded after this many seconds
+PROBLEM_CACHE_TTL = int(os.getenv("LEETCODE_CACHE_TTL", str(7 * 24 * 3600)))
+# The ID/slug index of all problems is re-downloaded after this many seconds
+INDEX_CACHE_TTL = int(os.getenv("LEETCODE_INDEX_TTL", str(24 * 3600)))
+INDEX_PAGE_SIZE = 1000
+
+_rate_limiter = RateLimiter(LEETCODE_REQUESTS_PER_MINUTE, burst=LEETCODE_BURST)
+
 
 def _get_leetcode_api_client() -> leetcode.api.default_api.DefaultApi:
     """
@@ -187,7 +213,7 @@ class LeetcodeData:
             operation_name="problemsetQuestionList",
         )
 
-        time.sleep(2)  # Leetcode has a rate limiter
+        _rate_limiter.acquire()  # Leetcode has a rate limiter
         data = api_instance.graphql_post(body=graphql_request).data
         total_count = data.problemset_question_list.total_num or 0
         
@@ -240,7 +266,7 @@ class LeetcodeData:
             operation_name="problemsetQuestionList",
         )
 
-        time.sleep(2)  # Leetcode has a rate limiter
+        _rate_limiter.acquire()  # Leetcode has a rate limiter
         data = api_instance.graphql_post(
             body=graphql_request
         ).data.problemset_question_list.questions
@@ -268,13 +294,16 @@ class LeetcodeData:
 
         logging.info("Fetching %s problems %s per page", stop - start + 1, page_size)
 
-        for page in tqdm(
-            range(math.ceil((stop - start + 1) / page_size)),
-            unit="problem",
-            unit_scale=page_size,
-        ):
-            data = self._get_problems_data_page(start, page_size, page)
-            problems.extend(data)
+        # Pages are requested concurrently; the rate limiter spaces them out
+        pages = range(math.ceil((stop - start + 1) / page_size))
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            for data in tqdm(
+                executor.map(lambda page: self._get_problems_data_page(start, page_size, page), pages),
+                total=len(pages),
+                unit="problem",
+                unit_scale=page_size,
+            ):
+                problems.extend(data)
 
         return problems
 
@@ -410,4 +439,212 @@ class LeetcodeData:
         Returns problem category title
         """
         data = self._get_problem_data(problem_slug)
-        return data.category_title
\ No newline at end of file
+        return data.category_title
+
+
+def problem_fingerprint(question: Any) -> str:
+    """Hash of the list fields of a problem that change when it is edited."""
+    fields = [
+        question.title,
+        question.difficulty,
+        question.category_title,
+        question.is_paid_only,
+        sorted(tag.slug for tag in question.topic_tags or []),
+    ]
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()[:16]
+
+
+def to_fetched_problem(question: leetcode.models.graphql_question_detail.GraphqlQuestionDetail) -> FetchedLeetcodeProblem:
+    tags = [tag.slug for tag in question.topic_tags or []]
+    tags.append(f"difficulty-{question.difficulty.lower()}-tag")
+    return FetchedLeetcodeProblem(
+        slug=question.title_slug,
+        title=question.title,
+        problem_id=question.question_frontend_id,
+        description=question.content or "No content",
+        difficulty=question.difficulty,
+        category=question.category_title,
+        tags=tags,
+    )
+
+
+class LeetcodeProblemFetcher:
+    """
+    Fetches the details of selected problems, cached on disk with a TTL.
+
+    Problems are selected by frontend ID ("1") or slug ("two-sum"). IDs are
+    resolved with an index of all problems (ID, slug and a fingerprint of the
+    list fields), itself cached for INDEX_CACHE_TTL. A cached problem is
+    reused until its TTL runs out or its fingerprint in the index changes;
+    all other problems are downloaded concurrently.
+    """
+
+    def __init__(
+        self,
+        api_instance: leetcode.api.default_api.DefaultApi | None = None,
+        cache_dir: str = CACHE_DIR,
+        ttl: float = PROBLEM_CACHE_TTL,
+        index_ttl: float = INDEX_CACHE_TTL,
+        rate_limiter: RateLimiter | None = None,
+    ) -> None:
+        self._api = api_instance
+        self._cache = dc.Cache(os.path.join(cache_dir, "leetcode"))
+        self._ttl = ttl
+        self._index_ttl = index_ttl
+        self._rate_limiter = rate_limiter or _rate_limiter
+        self.requests = 0
+        self.downloaded = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _api_instance(self) -> leetcode.api.default_api.DefaultApi:
+        if self._api is None:
+            self._api = _get_leetcode_api_client()
+        return self._api
+
+    def _post(self, graphql_request: leetcode.models.graphql_query.GraphqlQuery) -> Any:
+        self._rate_limiter.acquire()
+        with self._lock:
+            self.requests += 1
+        return self._api_instance.graphql_post(body=graphql_request).data
+
+    @retry(times=3, exceptions=(urllib3.exceptions.ProtocolError,), delay=5)
+    def _get_index_page(self, skip: int) -> Any:
+        graphql_request = leetcode.models.graphql_query.GraphqlQuery(
+            query="""
+            query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+              problemsetQuestionList: questionList(
+                categorySlug: $categorySlug
+                limit: $limit
+                skip: $skip
+                filters: $filters
+              ) {
+                totalNum
+                questions: data {
+                    questionFrontendId
+                    title
+                    titleSlug
+                    categoryTitle
+                    isPaidOnly
+                    difficulty
+                    topicTags {
+                      slug
+                    }
+                }
+              }
+            }
+            """,
+            variables=leetcode.models.graphql_query_problemset_question_list_variables.GraphqlQueryProblemsetQuestionListVariables(
+                category_slug="",
+                limit=INDEX_PAGE_SIZE,
+                skip=skip,
+                filters=leetcode.models.graphql_query_problemset_question_list_variables_filter_input.GraphqlQueryProblemsetQuestionListVariablesFilterInput(),
+            ),
+            operation_name="problemsetQuestionList",
+        )
+        return self._post(graphql_request).problemset_question_list
+
+    @retry(times=3, exceptions=(urllib3.exceptions.ProtocolError,), delay=5)
+    def _get_question(self, slug: str) -> leetcode.models.graphql_question_detail.GraphqlQuestionDetail:
+        graphql_request = leetcode.models.graphql_query.GraphqlQuery(
+            query="""
+            query getQuestionDetail($titleSlug: String!) {
+              question(titleSlug: $titleSlug) {
+                questionFrontendId
+                title
+                titleSlug
+                categoryTitle
+                content
+                isPaidOnly
+                difficulty
+                topicTags {
+                  name
+                  slug
+                }
+              }
+            }
+            """,
+            variables=leetcode.models.graphql_query_get_question_detail_variables.GraphqlQueryGetQuestionDetailVariables(
+                title_slug=slug
+            ),
+            operation_name="getQuestionDetail",
+        )
+        return self._post(graphql_request).question
+
+    def problem_index(self, refresh: bool = False) -> Dict[str, Tuple[str, str]]:
+        """
+        Slug -> (frontend ID, fingerprint) of every problem.
+
+        The first page reports the total, the remaining pages are requested concurrently.
+        """
+        index = None if refresh else self._cache.get("index")
+        if index is not None:
+            return index
+
+        first_page = self._get_index_page(0)
+        skips = range(INDEX_PAGE_SIZE, first_page.total_num or 0, INDEX_PAGE_SIZE)
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            pages = [first_page, *executor.map(self._get_index_page, skips)]
+
+        index = {
+            question.title_slug: (question.question_frontend_id, problem_fingerprint(question))
+            for page in pages
+            for question in page.questions or []
+        }
+        self._cache.set("index", index, expire=self._index_ttl)
+        return index
+
+    def _download(self, slug: str) -> FetchedLeetcodeProblem:
+        question = self._get_question(slug)
+        if question is None:
+            raise ValueError(f"Problem {slug} not found")
+        problem = to_fetched_problem(question)
+        self._cache.set(
+            f"problem:{slug}",
+            {"problem": problem.model_dump(), "fingerprint": problem_fingerprint(question)},
+            expire=self._ttl,
+        )
+        with self._lock:
+            self.downloaded += 1
+        return problem
+
+    def fetch(self, identifiers: Iterable[str], refresh_index: bool = False) -> List[FetchedLeetcodeProblem]:
+        """
+        Fetch problems by frontend ID or slug, in the given order.
+
+        Args:
+            identifiers: Problem IDs ("1") and/or slugs ("two-sum")
+            refresh_index: Re-download the ID/slug index even if it has not expired
+
+        Returns:
+            The problems found (unknown IDs and slugs are reported and skipped)
+        """
+        index = self.problem_index(refresh_index)
+        slug_by_id = {problem_id: slug for slug, (problem_id, _) in index.items()}
+
+        slugs = []
+        for identifier in identifiers:
+            slug = slug_by_id.get(identifier) if identifier.isdigit() else identifier
+            if slug is None or slug not in index:
+                print(f"⚠️  Unknown LeetCode problem: {identifier}")
+                continue
+            slugs.append(slug)
+
+        problems: Dict[str, FetchedLeetcodeProblem] = {}
+        stale = []
+        for slug in slugs:
+            cached = self._cache.get(f"problem:{slug}")
+            if cached is not None and cached["fingerprint"] == index[slug][1]:
+                problems[slug] = FetchedLeetcodeProblem(**cached["problem"])
+                self.reused += 1
+            else:
+                stale.append(slug)
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+                downloads = tqdm(executor.map(self._download, stale), total=len(stale), unit="problem")
+                for slug, problem in zip(stale, downloads):
+                    problems[slug] = problem
+
+        return [problems[slug] for slug in slugs]
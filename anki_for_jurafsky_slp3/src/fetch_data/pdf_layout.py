@@ -0,0 +1,217 @@
+"""
+Layout-aware text extraction for the SLP3 PDFs.
+
+Instead of concatenating ``page.get_text()``, this reads PyMuPDF's ``dict``
+output (blocks → lines → spans with font size and position) and:
+
+1. drops running headers/footers and page numbers: lines in the top/bottom
+   margin whose text (digits normalized) repeats on many pages,
+2. rejoins hard-wrapped lines into paragraphs and removes end-of-line hyphens,
+   also across page breaks,
+3. emits markdown headings, with levels from font-size statistics (sizes
+   clearly above the body text size, largest = ``#``).
+
+The result is close to what the LLM cleaning pass produces, so that pass can
+be skipped (``--layout-text``) or run on much cleaner input.
+"""
+
+import argparse
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import fitz  # PyMuPDF
+
+# Lines within this fraction of the page height from the top/bottom are header/footer candidates
+MARGIN_FRACTION = 0.08
+# A margin line repeating on at least this fraction of pages is a running header/footer
+RUNNING_LINE_MIN_PAGES = 0.3
+# Spans at least this much larger than the body text are headings
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_LEVELS = 3
+SENTENCE_END = (".", "!", "?", ":")
+SHINGLE_SIZE = 5
+
+
+class LayoutLine(NamedTuple):
+    page: int
+    block: int
+    text: str
+    size: float
+    y0: float
+    y1: float
+    page_height: float
+
+    @property
+    def in_margin(self) -> bool:
+        margin = self.page_height * MARGIN_FRACTION
+        return self.y0 < margin or self.y1 > self.page_height - margin
+
+
+def _normalize_margin_text(text: str) -> str:
+    return re.sub(r"\d+", "#", " ".join(text.split())).lower()
+
+
+def read_layout_lines(doc: fitz.Document) -> List[List[LayoutLine]]:
+    """Text lines of every page with their largest font size and vertical position."""
+    pages = []
+    for page_number, page in enumerate(doc):
+        height = page.rect.height
+        lines = []
+        for block in page.get_text("dict", sort=True)["blocks"]:
+            for line in block.get("lines", []):
+                text = "".join(span["text"] for span in line["spans"]).strip()
+                if not text:
+                    continue
+                size = max(round(span["size"], 1) for span in line["spans"] if span["text"].strip())
+                lines.append(LayoutLine(page_number, block["number"], text, size, line["bbox"][1], line["bbox"][3], height))
+        pages.append(lines)
+    return pages
+
+
+def detect_running_lines(pages: List[List[LayoutLine]]) -> Set[str]:
+    """Normalized margin texts that repeat on many pages (running headers/footers)."""
+    counts: Counter = Counter()
+    for lines in pages:
+        counts.update({_normalize_margin_text(line.text) for line in lines if line.in_margin})
+    threshold = max(2, math.ceil(RUNNING_LINE_MIN_PAGES * len(pages)))
+    return {text for text, count in counts.items() if count >= threshold}
+
+
+def heading_levels(pages: List[List[LayoutLine]]) -> Tuple[float, Dict[float, int]]:
+    """
+    Body font size (most characters) and markdown level of each heading size.
+
+    Returns:
+        (body size, {font size: heading level})
+    """
+    sizes: Counter = Counter()
+    for lines in pages:
+        for line in lines:
+            sizes[line.size] += len(line.text)
+    if not sizes:
+        return 0.0, {}
+    body_size = sizes.most_common(1)[0][0]
+    heading_sizes = sorted((size for size in sizes if size >= body_size * HEADING_SIZE_RATIO), reverse=True)
+    return body_size, {size: level for level, size in enumerate(heading_sizes[:MAX_HEADING_LEVELS], 1)}
+
+
+def _join_wrapped(text: str, continuation: str) -> str:
+    """Join a wrapped line, removing the hyphen of a word broken across lines."""
+    if text.endswith("-") and len(text) > 1 and text[-2].isalpha() and continuation[:1].islower():
+        return text[:-1] + continuation
+    return f"{text} {continuation}"
+
+
+def _is_page_number(line: LayoutLine) -> bool:
+    return line.in_margin and line.text.isdigit()
+
+
+def extract_layout_markdown(pdf_path: Path) -> str:
+    """
+    Extract a PDF as markdown without running headers/footers or hard line breaks.
+
+    Args:
+        pdf_path: Path to the PDF
+
+    Returns:
+        Markdown text (paragraphs separated by blank lines)
+    """
+    with fitz.open(pdf_path) as doc:
+        pages = read_layout_lines(doc)
+
+    running_lines = detect_running_lines(pages)
+    _, levels = heading_levels(pages)
+
+    # (level, text); level 0 is a body paragraph
+    paragraphs: List[List] = []
+    for lines in pages:
+        first_on_page = True
+        previous_block = None
+        for line in lines:
+            if _is_page_number(line) or (line.in_margin and _normalize_margin_text(line.text) in running_lines):
+                continue
+            level = levels.get(line.size, 0)
+            last = paragraphs[-1] if paragraphs else None
+
+            if level:
+                if last and last[0] == level and line.block == previous_block:
+                    last[1] = f"{last[1]} {line.text}"  # multi-line heading
+                else:
+                    paragraphs.append([level, line.text])
+            elif last and last[0] == 0 and line.block == previous_block:
+                last[1] = _join_wrapped(last[1], line.text)
+            elif (
+                last and last[0] == 0 and first_on_page
+                and not last[1].endswith(SENTENCE_END) and line.text[:1].islower()
+            ):
+                # Paragraph continues from the previous page
+                last[1] = _join_wrapped(last[1], line.text)
+            else:
+                paragraphs.append([0, line.text])
+
+            previous_block = line.block
+            first_on_page = False
+
+    return "\n\n".join(f"{'#' * level} {text}" if level else text for level, text in paragraphs) + "\n"
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = re.sub(r"[#*`]", " ", text).lower().split()
+    return {tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def compare_with_cleaned(layout_text: str, cleaned_text: str) -> Dict[str, float]:
+    """
+    Compare layout extraction with the LLM-cleaned text on word 5-gram shingles.
+
+    Returns:
+        recall (cleaned text found in the layout text), precision (layout text
+        found in the cleaned text) and heading counts of both
+    """
+    layout, cleaned = _shingles(layout_text), _shingles(cleaned_text)
+    common = len(layout & cleaned)
+    return {
+        "recall": common / max(len(cleaned), 1),
+        "precision": common / max(len(layout), 1),
+        "layout_headings": len(re.findall(r"^#+ ", layout_text, re.MULTILINE)),
+        "cleaned_headings": len(re.findall(r"^#+ ", cleaned_text, re.MULTILINE)),
+    }
+
+
+def main():
+    """Extract chapters with the layout-aware mode and compare them with the LLM-cleaned text."""
+    parser = argparse.ArgumentParser(description="Layout-aware SLP3 PDF extraction")
+    parser.add_argument("--data-dir", type=Path, default=Path("data/slp3"), help="Base SLP3 data directory")
+    parser.add_argument("--chapters", nargs="*", help="Chapter names, e.g. chapter_8 (default: all PDFs)")
+    args = parser.parse_args()
+
+    pdf_dir, cleaned_dir = args.data_dir / "pdf", args.data_dir / "cleaned_txt"
+    output_dir = args.data_dir / "layout_md"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    names = args.chapters or sorted(path.stem for path in pdf_dir.glob("*.pdf"))
+    if not names:
+        print(f"❌ No PDFs in {pdf_dir}. Run python main.py -f -s slp3 first.")
+        return
+
+    print(f"{'chapter':<14} {'chars':>8} {'recall':>7} {'precision':>9} {'headings':>9}")
+    for name in names:
+        layout_text = extract_layout_markdown(pdf_dir / f"{name}.pdf")
+        (output_dir / f"{name}.md").write_text(layout_text, encoding="utf-8")
+
+        cleaned_file = cleaned_dir / f"{name}.txt"
+        if not cleaned_file.exists():
+            print(f"{name:<14} {len(layout_text):>8,}       -         -         - (no cleaned text)")
+            continue
+        stats = compare_with_cleaned(layout_text, cleaned_file.read_text(encoding="utf-8"))
+        print(f"{name:<14} {len(layout_text):>8,} {stats['recall']:>7.3f} {stats['precision']:>9.3f} "
+              f"{stats['layout_headings']:>4}/{stats['cleaned_headings']:<4}")
+
+    print(f"💾 Layout markdown saved to: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -42,3 +42,16 @@ class AtomicCards(BaseModel):
     cards: List[CardType] = Field(
         ..., description="List of atomic flashcards extracted from the text."
     )
+
+
+class IndexedCard(BaseModel):
+    """A card with the ID it has within a batch request."""
+
+    id: int = Field(..., description="ID of the card in the request; return it unchanged.")
+    card: CardType
+
+
+class IndexedCards(BaseModel):
+    """Container for a batch of cards identified by their IDs."""
+
+    cards: List[IndexedCard] = Field(..., description="One entry per input card, with the same IDs.")
@@ -1,9 +1,19 @@
 from typing import List
 from connectors.llm.structured_gemini import LLMClient
-from src.models.cards import AtomicCards, CardType, ClozeCard, QACard, EnumerationCard
+from src.models.cards import AtomicCards, CardType, ClozeCard, IndexedCard, IndexedCards, QACard, EnumerationCard
+from src.processing.cascade import validate_fixed_card
+from src.utils.cache import PromptTemplate, get_cached, set_cached
 from src.utils.text_processing import clean_anki_text
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+FORMATTING_MODEL = "gemini-2.5-flash-lite"
+
+# Cached responses are keyed on these versions: bump one when its prompt text changes
+EXTRACTION_TEMPLATE = PromptTemplate("extract_atomic_cards", 1)
+CONTENT_TEMPLATE = PromptTemplate("fix_content", 1)
+FORMATTING_TEMPLATE = PromptTemplate("fix_formatting", 1)
+FORMATTING_BATCH_TEMPLATE = PromptTemplate("fix_formatting_batch", 1)
+
 
 @retry(
     stop=stop_after_attempt(3),
@@ -21,7 +31,17 @@ def extract_atomic_cards(chunk: str) -> List[CardType]:
         List of atomic flashcards extracted from the chunk
     """
     llm_client = LLMClient()
-    prompt = f"""You are an expert in cognitive science and learning, specializing in creating high-quality, atomic flashcards for spaced repetition systems like Anki. You are a mentor curating a study deck for a practicing Machine Learning Engineer. Your goal is to transform a given text chunk into a series of precise, effective flashcards that are useful for job interviews and on-the-job tasks.
+    # Fixed instructions and examples, the same for every chunk: sent once as a cached context
+    instructions = extraction_instructions()
+    prompt = EXTRACTION_TEMPLATE.prompt(instructions + chunk, chunk=chunk)
+
+    result = llm_client.generate(prompt, AtomicCards, static_prefix=instructions)
+    return result.cards
+
+
+def extraction_instructions() -> str:
+    """Instructions and examples of the card extraction prompt (the text chunk follows them)."""
+    return """You are an expert in cognitive science and learning, specializing in creating high-quality, atomic flashcards for spaced repetition systems like Anki. You are a mentor curating a study deck for a practicing Machine Learning Engineer. Your goal is to transform a given text chunk into a series of precise, effective flashcards that are useful for job interviews and on-the-job tasks.
 
 You must adhere to the following principles:
 
@@ -57,7 +77,7 @@ TASK
 Analyze the user-provided text chunk. Following all principles above, extract the learnable, practical, and atomic facts. Format these facts into a JSON structure containing a list of flashcard objects that strictly conforms to the specification below.
 
 OUTPUT SPECIFICATION
-Your response MUST be a single JSON object with one key, cards, which contains a list of flashcard objects. If no learnable information is found according to the principles above, return an empty list ({{"cards": []}}).
+Your response MUST be a single JSON object with one key, cards, which contains a list of flashcard objects. If no learnable information is found according to the principles above, return an empty list ({"cards": []}).
 
 Each flashcard object in the list must have a type and associated content:
 
@@ -68,7 +88,7 @@ Q&A Card: For conceptual understanding ("what," "why," "how").
 
 Cloze Deletion Card: For specific, factual details embedded within a sentence (keywords, numbers, formulas).
 - type: "Cloze"
-- text: (string) The full sentence with cloze syntax, e.g., The capital of France is {{{{c1::Paris}}}}.
+- text: (string) The full sentence with cloze syntax, e.g., The capital of France is {{c1::Paris}}.
 
 Enumeration Card: For ordered or unordered lists.
 - type: "Enumeration"
@@ -77,7 +97,7 @@ Enumeration Card: For ordered or unordered lists.
 - ordered: (boolean) Set to true if the order of items is crucial (e.g., steps in a process, chronological events). Otherwise, set to false.
 
 CRITICAL RULES
-- No Value, No Output: If the text chunk contains no information that passes the filtering principles (e.g., it is a list of surnames, a copyright page, or contains only trivial facts), you MUST respond with {{"cards": []}}.
+- No Value, No Output: If the text chunk contains no information that passes the filtering principles (e.g., it is a list of surnames, a copyright page, or contains only trivial facts), you MUST respond with {"cards": []}.
 - Atomicity is Non-Negotiable: Vigorously break down complex sentences.
 - Context is Key: Ensure each card has the minimum necessary context to be understood on its own.
 - Strict Schema: The output JSON must strictly follow the schema defined in the OUTPUT SPECIFICATION.
@@ -95,41 +115,38 @@ Decision: Discard. This is historical trivia and fails the "Job Interview Test."
 
 Input Sentence: "Because a byte has only 256 possible values, BPE on UTF-8 encoded text will result in no unknown tokens."
 Decision: Keep. This explains a key benefit and technical detail ("why") of using BPE on byte-level data. This is a high-value, foundational concept. **Defaulting to Cloze format.**
-Generated Card: {{"type": "Cloze", "text": "A key advantage of BPE on UTF-8 encoded text is that since a byte only has 256 possible values, it will result in {{{{c1::no unknown tokens}}}}."}}
+Generated Card: {"type": "Cloze", "text": "A key advantage of BPE on UTF-8 encoded text is that since a byte only has 256 possible values, it will result in {{c1::no unknown tokens}}."}
 
 Input Sentence: "The core intuition behind using multi-head attention is that each attention head can specialize in attending to different aspects of the input, allowing the model to jointly attend to information from different representation subspaces."
 Decision: Keep. This information explains the high-level "why" or "intuition" behind a complex architectural choice. It is not a simple fact. Attempting to force this into a cloze would lose the nuance and atomicity. 
 Generated Card:
-{{
+{
   "type": "Q&A",
   "q": "What is the core intuition behind using multi-head attention?",
   "a": "Each attention head can specialize in attending to different aspects of the input, allowing the model to jointly attend to information from different representation subspaces."
-}}
+}
 
 Input Sentence: "The similarity score in an attention mechanism is the scaled dot-product, calculated as (qi ⋅ kj) / √dk."
 Decision: Keep. This is a foundational formula. The formula itself is the key to understanding how attention mechanism works. 'll use block mathjax formatting for clarity.
 
 Generated Card:
-{{
+{
   "type": "Cloze",
-  "text": "The similarity score in a Transformer's self-attention is calculated using the scaled dot-product: {{{{c1::\\[\\frac{{q_i \\cdot k_j}}{{\\sqrt{{d_k}}}}\\]}}}}."
-}}
+  "text": "The similarity score in a Transformer's self-attention is calculated using the scaled dot-product: {{c1::\\[\\frac{q_i \\cdot k_j}{\\sqrt{d_k}}\\]}}."
+}
 
-Input Sentence: "In self-attention, the attention weights <math>\\alpha_{{ij}}</math> are computed by normalizing the similarity scores, <math>\\text{{score}}(x_i, x_j)</math>, using the softmax function. The formula is given by:<math>\\\\alpha_{{ij}} = \\text{{softmax}}(\\text{{score}}(x_i, x_j)) \\quad \\forall j <= i</math>"
+Input Sentence: "In self-attention, the attention weights <math>\\alpha_{ij}</math> are computed by normalizing the similarity scores, <math>\\text{score}(x_i, x_j)</math>, using the softmax function. The formula is given by:<math>\\\\alpha_{ij} = \\text{softmax}(\\text{score}(x_i, x_j)) \\quad \\forall j <= i</math>"
 Decision: Keep. This is a foundational concept defining a function and its corresponding formula. It's a single, atomic fact. This example also demonstrates cloze-deleting *both* instances of the same term ('softmax') using the same `c1` tag, which is a valid pattern for reinforcing a single concept.
 Generated Card:
-{{
+{
   "type": "Cloze",
-  "text": "In self-attention, the attention weights \\(\\alpha_{{ij}}\\) are computed by normalizing similarity scores using the {{{{c1::softmax}}}} function, as shown by the formula: \\[\\alpha_{{ij}} = {{{{c1::\\text {{softmax}} }}}}(\\text {{score}} (x_i, x_j)) \\quad \\forall j &le; i\\]."
-}}
+  "text": "In self-attention, the attention weights \\(\\alpha_{ij}\\) are computed by normalizing similarity scores using the {{c1::softmax}} function, as shown by the formula: \\[\\alpha_{ij} = {{c1::\\text {softmax} }}(\\text {score} (x_i, x_j)) \\quad \\forall j &le; i\\]."
+}
 
 BEGIN PROMPT
 Based on all the rules and examples above, process the following text chunk:
 
-{chunk}"""
-
-    result = llm_client.generate(prompt, AtomicCards)
-    return result.cards
+"""
 
 
 @retry(
@@ -137,21 +154,30 @@ Based on all the rules and examples above, process the following text chunk:
     wait=wait_exponential(multiplier=1, min=4, max=10),
     retry=retry_if_exception_type((TypeError, ValueError, AttributeError))
 )
-def fix_content(source: str, card: CardType) -> CardType:
+def fix_content(source: str, card: CardType, model: str = "gemini-2.5-pro") -> CardType:
     """
     Fix a card using two-stage improvement: content refinement followed by formatting.
 
     Args:
         source: Original source text for verification
         card: Card to be improved
+        model: Gemini model reviewing the card (the cascade tries a faster one first)
 
     Returns:
         Improved flashcard with better content and formatting
     """
-    llm_client = LLMClient(model="gemini-2.5-pro")
+    llm_client = LLMClient(model=model)
+
+    # Get content-improved card
+    fixed_card: CardType = llm_client.generate(content_prompt(source, card), CardType)
     
-    # Stage 1: Content improvement
-    content_prompt = f"""You are a meticulous Senior Machine Learning Engineer and expert educator, acting as a content reviewer for flashcards. 
+    return fixed_card
+
+
+def content_prompt(source: str, card: CardType) -> str:
+    """Prompt of the fix_content review of one card against its source."""
+    card_json = card.model_dump_json()
+    return CONTENT_TEMPLATE.prompt(f"""You are a meticulous Senior Machine Learning Engineer and expert educator, acting as a content reviewer for flashcards. 
     Your task is to review and improve a single flashcard by cross-referencing it against its original source text to ensure it is technically flawless, clear, and maximally effective for learning.
 
 You must analyze the given flashcard based on the following **Content Principles**:
@@ -181,14 +207,9 @@ You must analyze the given flashcard based on the following **Content Principles
 </Source Text>
 
 <Input Card>
-{card.model_dump_json()}
+{card_json}
 </Input Card>
-"""
-
-    # Get content-improved card
-    fixed_card: CardType = llm_client.generate(content_prompt, CardType)
-    
-    return fixed_card
+""", source=source, card=card_json)
 
 @retry(
     stop=stop_after_attempt(3),
@@ -205,9 +226,105 @@ def fix_formatting(card: CardType) -> CardType:
     Returns:
         Formatted flashcard
     """
-    smaller_client = LLMClient(model="gemini-2.5-flash-lite")
+    smaller_client = LLMClient(model=FORMATTING_MODEL)
+
+    # fixed_card: CardType = smaller_client.generate(formatting_prompt(card), CardType)
+    fixed_card = card
 
-    formatting_prompt = f"""You are an expert in educational formatting and presentation for ANKI flashcards. Your task is to take a technically accurate flashcard and apply proper formatting to make it visually clear and professional.
+    return clean_card_text(fixed_card)
+
+
+def fix_formatting_batch(cards: List[CardType]) -> List[CardType]:
+    """
+    Format many cards with one LLM call.
+
+    Cards are sent with their position as ID and matched back by ID. Every card
+    is cached under the key of its single-card formatting prompt, so cached
+    cards are not sent again. Items missing from the response or flagged by the
+    local validators are formatted again one by one; a card whose single call
+    fails too keeps its content-fixed text (with the local text fixes only).
+
+    Args:
+        cards: Cards to be formatted
+
+    Returns:
+        Formatted flashcards in input order
+    """
+    llm_client = LLMClient(model=FORMATTING_MODEL)
+    prompts = [formatting_prompt(card) for card in cards]
+    formatted: List[CardType | None] = [None] * len(cards)
+
+    pending = []
+    for i, prompt in enumerate(prompts):
+        hit, cached_card = get_cached(llm_client.model, prompt, CardType)
+        if hit:
+            formatted[i] = cached_card
+        else:
+            pending.append(i)
+
+    if pending:
+        batch = IndexedCards(cards=[IndexedCard(id=i, card=cards[i]) for i in pending])
+        try:
+            response = llm_client.generate(formatting_batch_prompt(batch), IndexedCards)
+            returned = {item.id: item.card for item in response.cards}
+        except Exception as e:
+            print(f"Warning: batch formatting of {len(pending)} cards failed, formatting one by one: {e}")
+            returned = {}
+
+        for i in pending:
+            card = returned.get(i)
+            if card is None or validate_fixed_card(cards[i], card):
+                # Malformed or missing item: retry this card on its own
+                try:
+                    card = llm_client.generate(prompts[i], CardType)
+                except Exception as e:
+                    print(f"Warning: formatting card {i} failed, keeping it with local text fixes only: {e}")
+                    card = cards[i]
+            else:
+                set_cached(llm_client.model, prompts[i], CardType, card)
+            formatted[i] = card
+
+    return [clean_card_text(card) for card in formatted]
+
+
+def clean_card_text(card: CardType) -> CardType:
+    """Apply all text fixes (HTML escaping and MathJax/Cloze conflicts) to every field of the card."""
+    match card:
+        case QACard():
+            card.q = clean_anki_text(card.q)
+            card.a = clean_anki_text(card.a)
+        case ClozeCard():
+            card.text = clean_anki_text(card.text)
+        case EnumerationCard():
+            card.prompt = clean_anki_text(card.prompt)
+            card.items = [clean_anki_text(item) for item in card.items]
+
+    return card
+
+
+def formatting_prompt(card: CardType) -> str:
+    """Prompt of the formatting pass of one card."""
+    card_json = card.model_dump_json()
+    return FORMATTING_TEMPLATE.prompt(f"""{formatting_instructions()}<Input Card>
+{card_json}
+</Input Card>
+""", card=card_json)
+
+
+def formatting_batch_prompt(batch: IndexedCards) -> str:
+    """Prompt of the formatting pass of many cards, identified by their IDs."""
+    batch_json = batch.model_dump_json()
+    return FORMATTING_BATCH_TEMPLATE.prompt(f"""{formatting_instructions()}Apply these rules to every card below. Each card has an "id": return exactly one entry per input card with the same "id" and the same card "type".
+
+<Input Cards>
+{batch_json}
+</Input Cards>
+""", batch=batch_json)
+
+
+def formatting_instructions() -> str:
+    """Formatting rules shared by the single-card and batch prompts."""
+    return """You are an expert in educational formatting and presentation for ANKI flashcards. Your task is to take a technically accurate flashcard and apply proper formatting to make it visually clear and professional.
 
 Focus ONLY on formatting improvements:
 
@@ -219,18 +336,18 @@ Focus ONLY on formatting improvements:
 
 2. Cloze Conflicts
 Dont add new cloze deletions or change content. Just fix conflicts between existing cloze deletions and MathJax.
-In Anki, Cloze deletions are terminated with }}}}, which can conflict with a }}}} appearing in your LaTeX. To prevent LaTeX from being interpreted as a closing cloze marker, you can put a space between any double closing braces that do not indicate the end of the cloze, so
+In Anki, Cloze deletions are terminated with }}, which can conflict with a }} appearing in your LaTeX. To prevent LaTeX from being interpreted as a closing cloze marker, you can put a space between any double closing braces that do not indicate the end of the cloze, so
 
-{{{{c1::[$]\frac{{foo}}{{\frac{{bar}}{{baz}}}}[/$] blah blah blah.}}}}
+{{c1::[$]\frac{foo}{\frac{bar}{baz}}[/$] blah blah blah.}}
 will not work, but
 
-{{{{c1::[$]\frac{{foo}}{{\frac{{bar}}{{baz}} }}[/$] blah blah blah.}}}}
+{{c1::[$]\frac{foo}{\frac{bar}{baz} }[/$] blah blah blah.}}
 will (and LaTeX ignores spaces in math mode, so your equation will render the same). If you want to avoid adding the extra space into the rendered text (for example, when you are making Cloze cards for learning programming languages), another option is to use a HTML comment when editing the card in HTML mode:
 
-{{{{c1::[$]\frac{{foo}}{{\frac{{bar}}{{baz}}<!-- -->}}[/$] blah blah blah.}}}}
+{{c1::[$]\frac{foo}{\frac{bar}{baz}<!-- -->}[/$] blah blah blah.}}
 You may use either workaround if you need to use the :: character sequence within the Cloze-deleted text. The first card generated for the following note text will read [type] in C++ is a type-safe union:
 
-{{{{c1::std:<!-- -->:variant::~type~}}}} in C++ is a {{{{c2::type-safe union}}}}
+{{c1::std:<!-- -->:variant::~type~}} in C++ is a {{c2::type-safe union}}
 
 
 2. **HTML Formatting - Convert ALL formatting to HTML:**
@@ -243,9 +360,9 @@ You may use either workaround if you need to use the :: character sequence withi
    * Use <pre><code>multi-line code</code></pre> for code blocks
    * Use the HTML entities &lt;, &gt; and &amp; to encode these characters so that the browser will not interpret them, but MathJax will.
    
-eg: "The vocabulary \\(V(p)\\) in <b>top-p sampling</b> is defined as the smallest set of words satisfying the condition: {{{{c1::\\sum_ {{ w \\in V(p) }} P(w|w_ {{ &lt;t }} ) \\geq p }}}}"
-or "P(w|w_ {{ \\lt t }} ) \\geq p"
-or "P(w|w_ {{ &lt;t }} ) \\geq p"
+eg: "The vocabulary \\(V(p)\\) in <b>top-p sampling</b> is defined as the smallest set of words satisfying the condition: {{c1::\\sum_ { w \\in V(p) } P(w|w_ { &lt;t } ) \\geq p }}"
+or "P(w|w_ { \\lt t } ) \\geq p"
+or "P(w|w_ { &lt;t } ) \\geq p"
    
    Same goes for other markdown elements. We aim to use their HTML equivalents like <h1>, <h2>, <ul>, <ol>, <li>, <a>, <hr>, <blockquote>, etc.
 
@@ -257,11 +374,11 @@ or "P(w|w_ {{ &lt;t }} ) \\geq p"
 **IMPORTANT:** Do NOT change the content, meaning, or technical accuracy. Only apply formatting improvements.
 
 <example card>
-The vocabulary V(p) in **top-p sampling** is defined as the smallest set of words satisfying the condition: {{{{c1::∑_{{w∈V(p)}}P(w|w_<t)≥p}}}}
+The vocabulary V(p) in **top-p sampling** is defined as the smallest set of words satisfying the condition: {{c1::∑_{w∈V(p)}P(w|w_<t)≥p}}
 </example card>
 
 <example result card1>
-The vocabulary \\(V(p)\\) in <b>top-p sampling</b> is defined as the smallest set of words satisfying the condition: {{{{c1::\\sum_ {{ w \\in V(p) }} P(w|w_ {{ &lt;t }} ) \\geq p }}}}
+The vocabulary \\(V(p)\\) in <b>top-p sampling</b> is defined as the smallest set of words satisfying the condition: {{c1::\\sum_ { w \\in V(p) } P(w|w_ { &lt;t } ) \\geq p }}
 </example result card1>
 
 <example card2>
@@ -272,24 +389,4 @@ In C++, a `std::variant` is a type-safe union that can hold one of several types
 In C++, a <code>std::variant</code> is a <b>type-safe union</b> that can hold one of several types at a time.
 </example result card2>
 
-<Input Card>
-{card.model_dump_json()}
-</Input Card>
 """
-
-
-    # fixed_card: CardType = smaller_client.generate(formatting_prompt, CardType)
-    fixed_card = card
-
-    # Apply all text fixes (HTML escaping and MathJax/Cloze conflicts)
-    match fixed_card:
-        case QACard():
-            fixed_card.q = clean_anki_text(fixed_card.q)
-            fixed_card.a = clean_anki_text(fixed_card.a)
-        case ClozeCard():
-            fixed_card.text = clean_anki_text(fixed_card.text)
-        case EnumerationCard():
-            fixed_card.prompt = clean_anki_text(fixed_card.prompt)
-            fixed_card.items = [clean_anki_text(item) for item in fixed_card.items]
-
-    return fixed_card
@@ -0,0 +1,143 @@
+"""
+Local validators and bookkeeping for the flash → pro fix_content cascade.
+
+In cascade mode a card is first fixed with the fast model. The result is
+escalated to the pro model only if a cheap check flags it:
+
+- schema drift: the card type changed or a required field came back empty,
+- cloze syntax: unterminated or malformed {{cN::...}} deletions, or a cloze
+  card without any deletion,
+- MathJax: unbalanced \\( \\) / \\[ \\] delimiters or braces inside math,
+- semantic drift: the fixed card shares too few words with the original.
+
+CascadeStats records the path, latency and estimated cost of every card.
+"""
+
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import List
+
+from src.models.cards import CardType, ClozeCard, EnumerationCard, QACard
+from src.processing.dedup import card_text
+from src.processing.splitter import CHARS_PER_TOKEN
+from src.utils.telemetry import MODEL_PRICES
+
+FAST_MODEL = "gemini-2.5-flash"
+PRO_MODEL = "gemini-2.5-pro"
+# Minimal word-set Jaccard between the original and the fixed card
+MIN_WORD_OVERLAP = 0.35
+
+_CLOZE_PATTERN = re.compile(r"\{\{c\d+::.+?\}\}", re.DOTALL)
+_MATH_PATTERN = re.compile(r"\\\((.*?)\\\)|\\\[(.*?)\\\]", re.DOTALL)
+
+
+def _card_fields(card: CardType) -> List[str]:
+    if isinstance(card, QACard):
+        return [card.q, card.a]
+    if isinstance(card, ClozeCard):
+        return [card.text]
+    return [card.prompt, *card.items]
+
+
+def cloze_errors(text: str) -> List[str]:
+    """Malformed cloze deletions in a cloze card text."""
+    errors = []
+    if not _CLOZE_PATTERN.search(text):
+        errors.append("no cloze deletion")
+    # Everything that looks like a cloze opener must be a complete {{cN::...}}
+    openers = len(re.findall(r"\{\{\s*c\d+", text))
+    if openers != len(re.findall(r"\{\{c\d+::", text)):
+        errors.append("malformed cloze opener")
+    remainder = _CLOZE_PATTERN.sub("", text)
+    if re.search(r"\{\{c\d+", remainder):
+        errors.append("unterminated cloze deletion")
+    return errors
+
+
+def mathjax_errors(text: str) -> List[str]:
+    """Unbalanced MathJax delimiters or braces inside math."""
+    errors = []
+    if text.count("\\(") != text.count("\\)") or text.count("\\[") != text.count("\\]"):
+        errors.append("unbalanced MathJax delimiters")
+    for match in _MATH_PATTERN.finditer(text):
+        math = (match.group(1) or match.group(2) or "").replace("\\{", "").replace("\\}", "")
+        depth = 0
+        for char in math:
+            depth += (char == "{") - (char == "}")
+            if depth < 0:
+                break
+        if depth != 0:
+            errors.append("unbalanced braces in math")
+            break
+    return errors
+
+
+def word_overlap(original: CardType, fixed: CardType) -> float:
+    a, b = set(card_text(original).split()), set(card_text(fixed).split())
+    return len(a & b) / max(len(a | b), 1)
+
+
+def validate_fixed_card(original: CardType, fixed: CardType) -> List[str]:
+    """
+    Cheap checks of a fast-model fix.
+
+    Returns:
+        List of issues; empty if the fix can be kept
+    """
+    if not isinstance(fixed, (QACard, ClozeCard, EnumerationCard)) or fixed.type != original.type:
+        return ["schema drift: card type changed"]
+
+    issues = []
+    fields = _card_fields(fixed)
+    if any(not value.strip() for value in fields) or (isinstance(fixed, EnumerationCard) and not fixed.items):
+        issues.append("schema drift: empty field")
+    if isinstance(fixed, ClozeCard):
+        issues.extend(cloze_errors(fixed.text))
+    for value in fields:
+        issues.extend(issue for issue in mathjax_errors(value) if issue not in issues)
+    if word_overlap(original, fixed) < MIN_WORD_OVERLAP:
+        issues.append("semantic drift")
+    return issues
+
+
+def estimate_cost(model: str, prompt_chars: int, output_chars: int) -> float:
+    """Estimated USD cost of one call from character counts."""
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES[PRO_MODEL])
+    return (prompt_chars * input_price + output_chars * output_price) / CHARS_PER_TOKEN / 1_000_000
+
+
+@dataclass
+class CascadeRecord:
+    escalated: bool
+    issues: List[str]
+    latency: float
+    cost: float
+
+
+@dataclass
+class CascadeStats:
+    records: List[CascadeRecord] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, record: CascadeRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    @property
+    def escalation_rate(self) -> float:
+        return sum(record.escalated for record in self.records) / max(len(self.records), 1)
+
+    def summary(self) -> str:
+        n = max(len(self.records), 1)
+        escalated = sum(record.escalated for record in self.records)
+        latency = sum(record.latency for record in self.records) / n
+        cost = sum(record.cost for record in self.records)
+        return (
+            f"{len(self.records) - escalated}/{len(self.records)} cards on {FAST_MODEL}, "
+            f"{escalated} escalated to {PRO_MODEL} ({self.escalation_rate:.0%}), "
+            f"mean latency {latency:.1f}s, est. cost ${cost:.4f} (${cost / n:.5f}/card)"
+        )
+
+    def to_dicts(self) -> List[dict]:
+        return [asdict(record) for record in self.records]
@@ -0,0 +1,176 @@
+"""
+Near-duplicate detection for extracted cards.
+
+Overlapping sections produce many cards that ask the same thing in slightly
+different words. Each card costs one gemini-2.5-pro call in fix_content, so
+duplicates are removed before that stage:
+
+1. card text is normalized (lowercase, cloze markup and punctuation removed)
+   and split into word 3-gram shingles,
+2. a MinHash signature per card is banded into LSH buckets, so only cards
+   sharing a bucket are compared,
+3. candidate pairs are confirmed with the exact shingle Jaccard similarity and
+   joined into clusters; each cluster keeps its medoid (the card most similar
+   to the others, earliest on ties).
+
+A CardDeduplicator keeps the representatives of previous batches, so a card
+duplicating one kept in an earlier chapter is dropped as well.
+"""
+
+import random
+import re
+import zlib
+from typing import Dict, FrozenSet, List, NamedTuple, Sequence, Tuple
+
+from src.models.cards import CardType, ClozeCard, QACard
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs above ~0.5 Jaccard are very likely to share a bucket
+LSH_BANDS = 16
+DEFAULT_SIMILARITY_THRESHOLD = 0.7
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_rng = random.Random(0)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+
+
+class Duplicate(NamedTuple):
+    index: int
+    kept: str  # normalized text of the kept card
+
+
+def card_text(card: CardType) -> str:
+    """Normalized text of a card: lowercase words without cloze markup or punctuation."""
+    if isinstance(card, QACard):
+        text = f"{card.q} {card.a}"
+    elif isinstance(card, ClozeCard):
+        # {{c1::answer::hint}} -> answer
+        text = re.sub(r"\{\{c\d+::(.*?)(?:::[^}]*)?\}\}", r"\1", card.text)
+    else:
+        text = " ".join([card.prompt, *card.items])
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Word SHINGLE_SIZE-grams (the whole text if it is shorter)."""
+    words = text.split()
+    if len(words) <= SHINGLE_SIZE:
+        return frozenset([text])
+    return frozenset(" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set: FrozenSet[str]) -> Tuple[int, ...]:
+    """MinHash signature from crc32 hashes (stable across processes)."""
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set] or [0]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    return [(band, signature[band * rows : (band + 1) * rows]) for band in range(LSH_BANDS)]
+
+
+class CardDeduplicator:
+    """LSH index of kept cards; deduplicate() clusters a batch against it."""
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.kept_texts: List[str] = []
+        self.kept_shingles: List[FrozenSet[str]] = []
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self.cards_seen = 0
+        self.duplicates_within = 0
+        self.duplicates_across = 0
+
+    @property
+    def duplicates_removed(self) -> int:
+        """Cards dropped so far, i.e. fix_content (gemini-2.5-pro) calls avoided."""
+        return self.duplicates_within + self.duplicates_across
+
+    def _similar_kept(self, keys: List[Tuple[int, Tuple[int, ...]]], shingle_set: FrozenSet[str]) -> int | None:
+        candidates = {kept for key in keys for kept in self.buckets.get(key, [])}
+        for kept in sorted(candidates):
+            if jaccard(shingle_set, self.kept_shingles[kept]) >= self.threshold:
+                return kept
+        return None
+
+    def deduplicate(self, cards: Sequence[CardType]) -> Tuple[List[int], List[Duplicate]]:
+        """
+        Remove near-duplicates from a batch of cards (e.g. one chapter).
+
+        Args:
+            cards: Cards in pipeline order
+
+        Returns:
+            (indices of the cards to keep in their original order, dropped cards
+            with the text of the card they duplicate)
+        """
+        texts = [card_text(card) for card in cards]
+        shingle_sets = [shingles(text) for text in texts]
+        keys = [_band_keys(minhash(shingle_set)) for shingle_set in shingle_sets]
+
+        # Union-find over confirmed candidate pairs within the batch
+        parent = list(range(len(cards)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        batch_buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        similarity: Dict[Tuple[int, int], float] = {}
+        for i, card_keys in enumerate(keys):
+            candidates = {j for key in card_keys for j in batch_buckets.get(key, [])}
+            for j in candidates:
+                score = jaccard(shingle_sets[i], shingle_sets[j])
+                if score >= self.threshold:
+                    similarity[(j, i)] = score
+                    parent[find(i)] = find(j)
+            for key in card_keys:
+                batch_buckets.setdefault(key, []).append(i)
+
+        clusters: Dict[int, List[int]] = {}
+        for i in range(len(cards)):
+            clusters.setdefault(find(i), []).append(i)
+
+        kept: List[int] = []
+        duplicates: List[Duplicate] = []
+        for members in clusters.values():
+            earlier = next(
+                (match for i in members if (match := self._similar_kept(keys[i], shingle_sets[i])) is not None), None
+            )
+            if earlier is not None:
+                # Already covered by a card kept from a previous batch
+                duplicates.extend(Duplicate(i, self.kept_texts[earlier]) for i in members)
+                self.duplicates_across += len(members)
+                continue
+
+            # Medoid: highest total similarity to the rest of the cluster
+            representative = max(
+                members,
+                key=lambda i: (
+                    sum(similarity.get((min(i, j), max(i, j)), 0.0) for j in members if j != i),
+                    -i,
+                ),
+            )
+            kept.append(representative)
+            duplicates.extend(Duplicate(i, texts[representative]) for i in members if i != representative)
+            self.duplicates_within += len(members) - 1
+
+            self.kept_texts.append(texts[representative])
+            self.kept_shingles.append(shingle_sets[representative])
+            for key in keys[representative]:
+                self.buckets.setdefault(key, []).append(len(self.kept_texts) - 1)
+
+        self.cards_seen += len(cards)
+        return sorted(kept), sorted(duplicates)
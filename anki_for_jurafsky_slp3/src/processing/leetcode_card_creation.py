@@ -6,10 +6,25 @@ flashcards using LLM analysis. The cards are designed for effective spaced
 repetition learning with multiple solution approaches.
 """
 
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from typing import Dict, List
 from tqdm import tqdm
 from src.models.leetcode_cards import LeetcodeCard, FetchedLeetcodeProblem
 from connectors.llm.structured_gemini import LLMClient
+from src.utils.cache import PromptTemplate
+from src.utils.checkpoint import Checkpoint, stable_id
+from src.utils.telemetry import telemetry
+
+# Cached cards are keyed on this version: bump it when the prompt changes
+LEETCODE_CARD_TEMPLATE = PromptTemplate("leetcode_card", 1)
+# Problems whose cards are generated at once (the connector's rate limit still applies)
+DEFAULT_MAX_CONCURRENCY = 8
+# Passes over the failed problems after the first one, the first after RETRY_DELAY seconds, doubling
+RETRY_PASSES = 2
+RETRY_DELAY = 30.0
 
 
 
@@ -29,7 +44,8 @@ def create_leetcode_card(problem_text: str) -> LeetcodeCard:
     llm_client = LLMClient()
     
     
-    LEETCODE_CARD_PROMPT = f"""
+    # Fixed instructions and examples, the same for every problem: sent once as a cached context
+    LEETCODE_CARD_INSTRUCTIONS = """
 Persona
 You are an expert programmer and computer science educator with deep knowledge of algorithms, data structures, and competitive programming. Your primary skill is breaking down complex problems into their core concepts and explaining them with clarity and precision. You are creating content for educational flashcards aimed at helping users learn and internalize algorithmic patterns.
 
@@ -66,18 +82,18 @@ Input: s = "aaab"
 Output: ""
 
 [Expected Output]
-{{
+{
   "problem_description": "Given a string <code>s</code>, rearrange its characters so that no two adjacent characters are the same. Return the rearranged string or an empty string if impossible. Constraints: <code>1 <= s.length <= 500</code>, <code>s</code> consists of lowercase English letters.",
   "solutions": [
-    {{
+    {
       "key_insight": "The rearrangement is impossible if any single character appears more than \\((n + 1) // 2\\) times. If the most frequent char <code>c</code> has \\(freq(c) > (n + 1) // 2\\), there aren't enough 'other' characters to place between its occurrences. If it's possible, a greedy approach of placing characters at alternating indices (first all even, then all odd) will guarantee separation.",
       "strategy": "1. Count character frequencies and sort them from most to least frequent.\n2. Check the impossibility condition: if the count of the most frequent character is greater than \\((n + 1) // 2\\), return <code>\\\"\\\"</code>.\n3. Create an empty result array <code>res</code> of size <code>n</code>.\n4. Iterate through the sorted characters. For each character, place its occurrences into the <code>res</code> array, starting at index 0 and skipping every other position (0, 2, 4, ...).\n5. If the end of the array is reached, wrap around to the first odd index (1, 3, 5, ...) and continue placing characters.\n6. Join and return the <code>res</code> array.",
       "complexity": "Time: \\(O(n + k \\log k)\\) where \\(n\\) is the length of the string and \\(k\\) is the number of unique characters (for counting and sorting frequencies).\nSpace: \\(O(n)\\) for the result array.",
       "code": "import collections\nclass Solution:\n    def reorganizeString(self, s: str) -> str:\n        n = len(s)\n        counts = collections.Counter(s)\n        most_common = counts.most_common()\n        \n        max_freq = most_common[0][1]\n        if 2 * max_freq > n + 1:\n            return \\\"\\\"\n\n        res = [\\\"\\\"]*n\n        idx = 0\n        \n        for char, count in most_common:\n            for _ in range(count):\n                if idx >= n:\n                    idx = 1\n                \n                res[idx] = char\n                idx += 2\n                \n        return \\\"\\\".join(res)",
       "solution_type": "greedy"
-    }}
+    }
   ]
-}}
+}
 
 Example 2: Two Sum
 [Problem Input]
@@ -95,36 +111,39 @@ Output: [0,1]
 Explanation: Because nums[0] + nums[1] == 9, we return [0, 1].
 
 [Expected Output]
-{{
+{
   "problem_description": "Given an array of integers <code>nums</code> and an integer <code>target</code>, find the indices of two numbers in the array that sum up to the <code>target</code>. Each input has exactly one solution, and the same element cannot be used twice.",
   "solutions": [
-    {{
+    {
       "key_insight": "The most straightforward approach is to check every possible pair of numbers in the array to see if they sum to the target.",
       "strategy": "1. Iterate through each element at index <code>i</code> in the array.\n2. For each element at <code>i</code>, iterate through the rest of the array starting from index <code>j = i + 1</code>.\n3. Check if <code>nums[i] + nums[j] == target</code>.\n4. If they sum to the target, return the indices <code>[i, j]</code>.",
       "complexity": "Time: \\(O(n^2)\\) because the nested loops check every pair of elements.\nSpace: \\(O(1)\\) as no extra space proportional to the input size is used.",
       "code": "class Solution:\n    def twoSum(self, nums, target):\n        n = len(nums)\n        for i in range(n):\n            for j in range(i + 1, n):\n                if nums[i] + nums[j] == target:\n                    return [i, j]",
       "solution_type": "brute force"
-    }},
-    {{
+    },
+    {
       "key_insight": "To find a complement (<code>target - current_num</code>) in constant time, we can use a hash map. By storing numbers we've already seen and their indices, we can check for the complement's existence in \\(O(1)\\) time as we iterate through the array.",
-      "strategy": "1. Initialize an empty hash map <code>seen_map</code> to store <code>{{value: index}}</code> pairs.\n2. Iterate through the <code>nums</code> array, getting both the index <code>i</code> and value <code>num</code>.\n3. For each number, calculate its required <code>complement = target - num</code>.\n4. Check if this <code>complement</code> already exists as a key in <code>seen_map</code>.\n5. If it exists, we have found our pair. Return its stored index and the current index: <code>[seen_map[complement], i]</code>.\n6. If it does not exist, add the current <code>num</code> and its index <code>i</code> to the <code>seen_map</code> for future checks.",
+      "strategy": "1. Initialize an empty hash map <code>seen_map</code> to store <code>{value: index}</code> pairs.\n2. Iterate through the <code>nums</code> array, getting both the index <code>i</code> and value <code>num</code>.\n3. For each number, calculate its required <code>complement = target - num</code>.\n4. Check if this <code>complement</code> already exists as a key in <code>seen_map</code>.\n5. If it exists, we have found our pair. Return its stored index and the current index: <code>[seen_map[complement], i]</code>.\n6. If it does not exist, add the current <code>num</code> and its index <code>i</code> to the <code>seen_map</code> for future checks.",
       "complexity": "Time: \\(O(n)\\) because we iterate through the list of $n$ elements only once. Each hash map operation (lookup and insertion) is \\(O(1)\\) on average.\nSpace: \\(O(n)\\) to store up to $n$ elements in the hash map in the worst case.",
-      "code": "class Solution:\n    def twoSum(self, nums, target):\n        seen = {{}}\n        for i, num in enumerate(nums):\n            complement = target - num\n            if complement in seen:\n                return [seen[complement], i]\n            seen[num] = i",
+      "code": "class Solution:\n    def twoSum(self, nums, target):\n        seen = {}\n        for i, num in enumerate(nums):\n            complement = target - num\n            if complement in seen:\n                return [seen[complement], i]\n            seen[num] = i",
       "solution_type": "hash map"
-    }}
+    }
   ]
-}}
+}
 
 Now analyze the following LeetCode problem and provide the structured output:
 
-{problem_text}
 """
     
-    formatted_prompt = LEETCODE_CARD_PROMPT
+    formatted_prompt = LEETCODE_CARD_TEMPLATE.prompt(
+        LEETCODE_CARD_INSTRUCTIONS + problem_text + "\n", problem_text=problem_text
+    )
     
     # Generate structured response
     try:
-        result: LeetcodeCard = llm_client.generate(formatted_prompt, LeetcodeCard)
+        result: LeetcodeCard = llm_client.generate(
+            formatted_prompt, LeetcodeCard, static_prefix=LEETCODE_CARD_INSTRUCTIONS
+        )
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -133,38 +152,113 @@ Now analyze the following LeetCode problem and provide the structured output:
     return result
 
 
-def process_leetcode_problems(problems_data: List[FetchedLeetcodeProblem]) -> Dict[str, LeetcodeCard]:
+def problem_prompt_text(problem: FetchedLeetcodeProblem) -> str:
+    """Problem text sent to create_leetcode_card."""
+    return f"""
+{problem.problem_id}. {problem.title}
+Difficulty: {problem.difficulty}
+Topics: {', '.join(problem.tags)}
+
+{problem.description}
+"""
+
+
+def _problem_key(problem: FetchedLeetcodeProblem) -> str:
+    """Checkpoint key: changes when the problem text does, so edited problems are regenerated."""
+    return stable_id(problem.slug, problem_prompt_text(problem))
+
+
+def _generation_pass(
+    problems: List[FetchedLeetcodeProblem],
+    checkpoint: Checkpoint,
+    cards: Dict[str, LeetcodeCard],
+    max_concurrency: int,
+    progress: tqdm,
+) -> List[FetchedLeetcodeProblem]:
+    """Generate cards concurrently, checkpointing each as it completes; returns the failed problems."""
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {
+            executor.submit(create_leetcode_card, problem_prompt_text(problem)): problem for problem in problems
+        }
+        # Completed cards are written from this thread only, in completion order
+        for future in as_completed(futures):
+            problem = futures[future]
+            try:
+                card = future.result()
+            except Exception as e:
+                tqdm.write(f"❌ Failed to generate card for {problem.slug}: {e}")
+                failed.append(problem)
+                continue
+            checkpoint.record("card", _problem_key(problem), card.model_dump())
+            cards[problem.slug] = card
+            tqdm.write(f"✅ Generated card for: {problem.title}")
+            progress.set_postfix(telemetry.postfix(), refresh=False)
+            progress.update(1)
+    return failed
+
+
+def process_leetcode_problems(
+    problems_data: List[FetchedLeetcodeProblem],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    checkpoint_path: Path | None = None,
+    resume: bool = False,
+    retry_passes: int = RETRY_PASSES,
+    retry_delay: float = RETRY_DELAY,
+) -> Dict[str, LeetcodeCard]:
     """
     Process multiple LeetCode problems and generate cards for each.
     
+    Up to max_concurrency cards are generated at once. Every finished card is
+    appended to a JSONL checkpoint (see src.utils.checkpoint); with resume,
+    problems already in it are not generated again. Failed problems are
+    retried in separate passes after a growing delay.
+    
     Args:
         problems_data: List of validated FetchedLeetcodeProblem objects
+        max_concurrency: Cards generated concurrently
+        checkpoint_path: JSONL checkpoint (default: a temporary file, deleted afterwards)
+        resume: Reuse the cards of an interrupted run from checkpoint_path
+        retry_passes: Passes over the failed problems after the first one
+        retry_delay: Seconds before the first retry pass (doubled for every further pass)
     
     Returns:
-        Dictionary mapping problem slugs to their generated LeetcodeCard objects
+        Dictionary mapping problem slugs to their generated LeetcodeCard objects, ordered by problem ID
     """
-    cards = {}
+    cards: Dict[str, LeetcodeCard] = {}
     
-    # Use tqdm for progress bar
-    for problem in tqdm(problems_data, desc="Generating cards", unit="problem"):
-        # Format problem text for the prompt
-        problem_text = f"""
-{problem.problem_id}. {problem.title}
-Difficulty: {problem.difficulty}
-Topics: {', '.join(problem.tags)}
-
-{problem.description}
-"""
-        
-        try:
-            card = create_leetcode_card(problem_text)
-            cards[problem.slug] = card
-            tqdm.write(f"✅ Generated card for: {problem.title}")
-        except Exception as e:
-            tqdm.write(f"❌ Failed to generate card for {problem.slug}: {e}")
-            continue
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        checkpoint_path = checkpoint_path or Path(temporary_dir) / "leetcode_checkpoint.jsonl"
+        with Checkpoint(checkpoint_path, resume) as checkpoint:
+            pending = []
+            for problem in problems_data:
+                done = checkpoint.get("card", _problem_key(problem))
+                if done is not None:
+                    cards[problem.slug] = LeetcodeCard(**done)
+                else:
+                    pending.append(problem)
+            if cards:
+                print(f"⏩ Resuming: {len(cards)} of {len(problems_data)} cards already in {checkpoint_path}")
+            
+            # Use tqdm for progress bar, with the running LLM totals
+            progress = tqdm(total=len(problems_data), initial=len(cards), desc="Generating cards", unit="problem")
+            try:
+                for attempt in range(retry_passes + 1):
+                    if attempt:
+                        delay = retry_delay * 2 ** (attempt - 1)
+                        tqdm.write(f"🔁 Retrying {len(pending)} failed problems in {delay:.0f}s (pass {attempt}/{retry_passes})")
+                        time.sleep(delay)
+                    pending = _generation_pass(pending, checkpoint, cards, max_concurrency, progress)
+                    if not pending:
+                        break
+            finally:
+                progress.close()
+    
+    if pending:
+        print(f"⚠️  No card for {len(pending)} problems: {', '.join(problem.slug for problem in pending)}")
     
-    return cards
+    problem_ids = {problem.slug: int(problem.problem_id) for problem in problems_data}
+    return dict(sorted(cards.items(), key=lambda item: problem_ids[item[0]]))
 
 
 def load_and_validate_problems(json_file_path: str) -> List[FetchedLeetcodeProblem]:
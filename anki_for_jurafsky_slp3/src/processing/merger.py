@@ -1,29 +1,145 @@
-from difflib import SequenceMatcher
-from typing import List
+from collections import Counter
+from typing import Dict, List, NamedTuple, Tuple
 from connectors.llm.structured_gemini import LLMClient
+from src.utils.cache import PromptTemplate
 
+# An exact common fragment at least this long is a trusted merge point
+MIN_MATCH_THRESHOLD = 20
+# Shorter k-grams used to vote for an alignment when no exact anchor exists
+FUZZY_ANCHOR_SIZE = 8
+# Skip k-grams this frequent in the second overlap (whitespace runs, "the of the")
+MAX_ANCHOR_OCCURRENCES = 4
+# Band (max. net insertions/deletions) of the edit-distance refinement
+BAND_WIDTH = 32
+# Minimal similarity of the band-aligned overlaps to merge without the LLM
+MIN_FUZZY_SIMILARITY = 0.8
+# Cached LLM merges are keyed on this version: bump it when the prompt changes
+MERGE_TEMPLATE = PromptTemplate("merge_overlap", 1)
 
-def merge_overlapping_chunks(chunk1: str, chunk2: str, overlap_size: int) -> str:
+
+class Match(NamedTuple):
+    a: int
+    b: int
+    size: int
+
+
+def _kgram_index(text: str, k: int) -> Dict[str, List[int]]:
+    """Map every k-gram of text to its start positions (hashed by the str hash)."""
+    index: Dict[str, List[int]] = {}
+    for j in range(len(text) - k + 1):
+        index.setdefault(text[j : j + k], []).append(j)
+    return index
+
+
+def find_longest_anchor(a: str, b: str, k: int = MIN_MATCH_THRESHOLD) -> Match:
     """
-    Merges two potentially slightly different, overlapping text chunks.
+    Longest common substring of a and b, if it is at least k characters long.
 
-    This is designed for cases where a non-deterministic process (like an LLM)
-    has cleaned or altered the chunks, so the overlapping text may not be identical.
-    It uses SequenceMatcher to find the best point of alignment.
+    Every common substring of length >= k contains a common k-gram, so exact
+    k-gram hits are used as seeds and extended to the right along their
+    diagonal; each diagonal segment is extended only once. Ties are broken like
+    SequenceMatcher.find_longest_match (earliest in a, then earliest in b).
+
+    Returns:
+        Match(a, b, size); size is 0 when no common k-gram exists
     """
-    search_window = min(len(chunk1), len(chunk2), overlap_size)
+    index = _kgram_index(b, k)
+    best = Match(0, 0, 0)
+    covered: Dict[int, int] = {}  # diagonal (i - j) -> end of the last extended match in a
 
-    overlap1 = chunk1[-search_window:]
-    overlap2 = chunk2[:search_window]
+    for i in range(len(a) - k + 1):
+        positions = index.get(a[i : i + k])
+        if not positions:
+            continue
+        for j in positions:
+            diagonal = i - j
+            if covered.get(diagonal, -1) > i:
+                continue
+            end = i + k
+            while end < len(a) and end - diagonal < len(b) and a[end] == b[end - diagonal]:
+                end += 1
+            covered[diagonal] = end
+            if end - i > best.size:
+                best = Match(i, j, end - i)
+
+    return best
+
+
+def banded_edit_distance(a: str, b: str, band: int = BAND_WIDTH) -> int:
+    """
+    Levenshtein distance between a and the best-matching prefix of b,
+    computing only cells with |i - j| <= band (O(len(a) * band)).
+
+    When b is more than band characters shorter than a, no path ends inside
+    the band and max(len(a), len(b)) is returned (no alignment).
+    """
+    n, m = len(a), len(b)
+    if n - m > band:
+        return max(n, m)
+    width = 2 * band + 1
+    infinity = n + m + 1
+
+    previous = [infinity] * width
+    for j in range(min(m, band) + 1):
+        previous[j + band] = j
+
+    for i in range(1, n + 1):
+        current = [infinity] * width
+        for j in range(max(0, i - band), min(m, i + band) + 1):
+            offset = j - i + band
+            if j == 0:
+                current[offset] = i
+                continue
+            best = previous[offset] + (a[i - 1] != b[j - 1])
+            if offset + 1 < width:
+                best = min(best, previous[offset + 1] + 1)
+            if offset > 0:
+                best = min(best, current[offset - 1] + 1)
+            current[offset] = best
+        previous = current
+
+    return min(previous[j - n + band] for j in range(max(0, n - band), min(m, n + band) + 1))
+
+
+def _fuzzy_alignment(overlap1: str, overlap2: str) -> Tuple[int, int, float] | None:
+    """
+    Align overlaps that share no exact anchor (e.g. the LLM changed whitespace).
+
+    Short k-gram hits vote for a diagonal; the aligned region starts at the
+    first hit within the band around the winning diagonal (indels drift the
+    diagonal), and a banded edit distance checks how well the overlaps agree
+    from there on.
+
+    Returns:
+        (start in overlap1, start in overlap2, similarity), or None without
+        votes or when the second region is too short to align within the band
+    """
+    index = _kgram_index(overlap2, FUZZY_ANCHOR_SIZE)
+    votes: Counter = Counter()
+    first_hit: Dict[int, Tuple[int, int]] = {}  # diagonal -> earliest (i, j)
+    for i in range(len(overlap1) - FUZZY_ANCHOR_SIZE + 1):
+        positions = index.get(overlap1[i : i + FUZZY_ANCHOR_SIZE])
+        if positions and len(positions) <= MAX_ANCHOR_OCCURRENCES:
+            for j in positions:
+                votes[i - j] += 1
+                first_hit.setdefault(i - j, (i, j))
+    if not votes:
+        return None
 
-    matcher = SequenceMatcher(None, overlap1, overlap2, autojunk=False)
-    match = matcher.find_longest_match(0, len(overlap1), 0, len(overlap2))
+    diagonal = votes.most_common(1)[0][0]
+    start1, start2 = min(hit for d, hit in first_hit.items() if abs(d - diagonal) <= BAND_WIDTH)
+    region1 = overlap1[start1:]
+    region2 = overlap2[start2 : start2 + len(region1) + BAND_WIDTH]
+    if len(region1) - len(region2) > BAND_WIDTH:
+        return None
 
-    min_match_threshold = 20
-    if match.size < min_match_threshold:
-        llm_client = LLMClient()
-        chunk1_unique = chunk1[:-search_window]
-        prompt = f"""You are a text-cleaning assistant. The following text are two consecutive chunks extracted from a PDF. They should be overlapping, but for some reason automatic merge mechanism failed.
+    distance = banded_edit_distance(region1, region2)
+    return start1, start2, 1 - distance / len(region1)
+
+
+def _llm_merge_overlap(overlap1: str, overlap2: str) -> str:
+    llm_client = LLMClient()
+    prompt = f"""You are a text-cleaning assistant. The following text are two consecutive chunks extracted from a PDF. They should be overlapping, but for some reason automatic merge mechanism failed.
 It may contain formatting errors like random headers, footers, and unnecessary line breaks that interrupt sentences.
 
 Your task is to:
@@ -42,32 +158,103 @@ Here is the second chunk:
 \"\"\"
 """
 
-        unified_overlap = llm_client.generate(prompt, schema=str)
-        merged_text = chunk1_unique + unified_overlap + chunk2[search_window:]
-        print(f"used llm to merge, common fragment length: {len(unified_overlap)}")
-        return merged_text
+    return llm_client.generate(MERGE_TEMPLATE.prompt(prompt, overlap1=overlap1, overlap2=overlap2), schema=str)
+
+
+class _PieceBuffer:
+    """Document under construction: a list of pieces joined once at the end."""
+
+    def __init__(self) -> None:
+        self.pieces: List[str] = []
+        self.length = 0
+
+    def append(self, text: str) -> None:
+        if text:
+            self.pieces.append(text)
+            self.length += len(text)
+
+    def tail(self, n: int) -> str:
+        """Last n characters (only touches the trailing pieces)."""
+        parts, needed = [], n
+        for piece in reversed(self.pieces):
+            if needed <= 0:
+                break
+            parts.append(piece[-needed:])
+            needed -= len(piece)
+        return "".join(reversed(parts))
+
+    def drop(self, n: int) -> None:
+        """Remove the last n characters."""
+        self.length -= n
+        while n > 0:
+            piece = self.pieces.pop()
+            if len(piece) > n:
+                self.pieces.append(piece[:-n])
+                break
+            n -= len(piece)
+
+    def join(self) -> str:
+        return "".join(self.pieces)
+
+
+def _merge_into(document: _PieceBuffer, chunk2: str, overlap_size: int) -> None:
+    """Append chunk2 to the document, aligning it on their overlap."""
+    search_window = min(document.length, len(chunk2), overlap_size)
+
+    overlap1 = document.tail(search_window)
+    overlap2 = chunk2[:search_window]
+
+    match = find_longest_anchor(overlap1, overlap2)
 
-    cut_point_in_chunk1 = len(chunk1) - search_window + match.a
-    start_point_in_chunk2 = match.b
+    if match.size < MIN_MATCH_THRESHOLD:
+        alignment = _fuzzy_alignment(overlap1, overlap2)
+        if alignment is not None and alignment[2] >= MIN_FUZZY_SIMILARITY:
+            start1, start2, similarity = alignment
+            document.drop(search_window - start1)
+            document.append(chunk2[start2:])
+            print(f"aligned overlap without exact anchor, similarity: {similarity:.2f}")
+            return
+
+        unified_overlap = _llm_merge_overlap(overlap1, overlap2)
+        document.drop(search_window)
+        document.append(unified_overlap)
+        document.append(chunk2[search_window:])
+        print(f"used llm to merge, common fragment length: {len(unified_overlap)}")
+        return
 
-    merged_text = chunk1[:cut_point_in_chunk1] + chunk2[start_point_in_chunk2:]
+    document.drop(search_window - match.a)
+    document.append(chunk2[match.b :])
     print(f"common fragment length: {match.size}")
-    return merged_text
+
+
+def merge_overlapping_chunks(chunk1: str, chunk2: str, overlap_size: int) -> str:
+    """
+    Merges two potentially slightly different, overlapping text chunks.
+
+    This is designed for cases where a non-deterministic process (like an LLM)
+    has cleaned or altered the chunks, so the overlapping text may not be identical.
+    The longest exact common fragment (found from hashed k-gram anchors) is the
+    merge point; without one, a banded edit distance checks a fuzzy alignment
+    before falling back to the LLM.
+    """
+    document = _PieceBuffer()
+    document.append(chunk1)
+    _merge_into(document, chunk2, overlap_size)
+    return document.join()
 
 
 def merge_chunks(cleaned_chunks: List[str], overlap: int) -> str:
-    """Merge a list of cleaned chunks into a single document."""
+    """Merge a list of cleaned chunks into a single document (joined once, linear in its length)."""
     if not cleaned_chunks:
         return ""
 
     if len(cleaned_chunks) == 1:
         return cleaned_chunks[0]
 
-    merged_document = cleaned_chunks[0]
+    document = _PieceBuffer()
+    document.append(cleaned_chunks[0])
 
     for i in range(1, len(cleaned_chunks)):
-        merged_document = merge_overlapping_chunks(
-            merged_document, cleaned_chunks[i], overlap
-        )
+        _merge_into(document, cleaned_chunks[i], overlap)
 
-    return merged_document
+    return document.join()
@@ -1,4 +1,8 @@
 from connectors.llm.structured_gemini import LLMClient
+from src.utils.cache import PromptTemplate
+
+# Cached cleanings are keyed on this version: bump it when the prompt changes
+CLEANING_TEMPLATE = PromptTemplate("clean_chapter_text", 1)
 
 
 def create_text_cleaning_prompt(chapter_name: str, text: str) -> str:
@@ -27,7 +31,7 @@ Here is the text:
 \"\"\"
 """
 
-    return prompt
+    return CLEANING_TEMPLATE.prompt(prompt, chapter_id=chapter_id, text=text)
 
 
 def clean_chapter_text(chapter_name: str, raw_text: str) -> str:
@@ -0,0 +1,170 @@
+"""
+Retrieval-scoped source context for fix_content.
+
+fix_content verifies each card against its source. Sending the whole section
+for every card repeats the same text on the pro model once per card, so the
+section is split into passages (paragraphs, long ones into sentence groups)
+and indexed with BM25. Each card gets only the top-k passages for its own
+terms, plus the section heading.
+
+The full section is used instead when retrieval is not confident: no passage
+matches, the selected passages cover too few of the card's terms that occur in
+the section, or they are almost the whole section anyway.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from src.models.cards import CardType
+from src.processing.dedup import card_text
+from src.processing.splitter import CHARS_PER_TOKEN
+
+DEFAULT_TOP_K = 3
+# Fraction of the card's (in-section) terms the selected passages must contain
+MIN_TERM_COVERAGE = 0.6
+# Above this fraction of the section, send the section itself
+MAX_CONTEXT_FRACTION = 0.8
+MAX_PASSAGE_CHARS = 800
+BM25_K1 = 1.5
+BM25_B = 0.75
+PASSAGE_SEPARATOR = "\n\n[...]\n\n"
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was "
+    "what when where which who why with does do can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+def split_passages(text: str, max_chars: int = MAX_PASSAGE_CHARS) -> List[str]:
+    """Paragraphs of the text; paragraphs longer than max_chars are split into sentence groups."""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            passages.append(paragraph)
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 over a small list of passages."""
+
+    def __init__(self, passages: List[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1, self.b = k1, b
+        self.term_counts = [Counter(tokenize(passage)) for passage in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / max(len(passages), 1)
+        document_frequency: Counter = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, query: List[str]) -> List[float]:
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / max(self.average_length, 1))
+            scores.append(
+                sum(
+                    self.idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                    for term in query
+                    if counts[term]
+                )
+            )
+        return scores
+
+
+class SectionRetriever:
+    """BM25 index of one section; context_for() picks the passages for a card."""
+
+    def __init__(self, section_text: str, top_k: int = DEFAULT_TOP_K):
+        self.section_text = section_text
+        self.top_k = top_k
+        lines = section_text.split("\n", 1)
+        # The "# heading" line always goes along as context
+        self.heading = lines[0] if lines[0].startswith("#") else ""
+        body = lines[1] if self.heading and len(lines) > 1 else section_text
+        self.passages = split_passages(body)
+        self.index = BM25Index(self.passages)
+
+    def context_for(self, card: CardType) -> Tuple[str, bool]:
+        """
+        Source context for one card.
+
+        Returns:
+            (context, whether the full section was used)
+        """
+        query = [term for term in dict.fromkeys(tokenize(card_text(card))) if term in self.index.idf]
+        if len(self.passages) <= self.top_k or not query:
+            return self.section_text, True
+
+        scores = self.index.scores(query)
+        ranked = sorted(range(len(self.passages)), key=lambda i: (-scores[i], i))
+        selected = sorted(i for i in ranked[: self.top_k] if scores[i] > 0)
+        if not selected:
+            return self.section_text, True
+
+        covered = set().union(*(self.index.term_counts[i].keys() for i in selected))
+        coverage = sum(term in covered for term in query) / len(query)
+        context = PASSAGE_SEPARATOR.join(
+            ([self.heading] if self.heading else []) + [self.passages[i] for i in selected]
+        )
+        if coverage < MIN_TERM_COVERAGE or len(context) > MAX_CONTEXT_FRACTION * len(self.section_text):
+            return self.section_text, True
+        return context, False
+
+
+@dataclass
+class ContextStats:
+    cards: int = 0
+    fallbacks: int = 0
+    full_chars: int = 0
+    sent_chars: int = 0
+
+    @property
+    def saved_fraction(self) -> float:
+        return 1 - self.sent_chars / max(self.full_chars, 1)
+
+    def summary(self) -> str:
+        return (
+            f"{self.sent_chars // CHARS_PER_TOKEN:,} source tokens instead of {self.full_chars // CHARS_PER_TOKEN:,} "
+            f"({self.saved_fraction:.0%} saved, {self.fallbacks}/{self.cards} cards used the full section)"
+        )
+
+
+class SourceContextSelector:
+    """Chooses the fix_content source of each card (retrievers are built once per section)."""
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self.retrievers: Dict[str, SectionRetriever] = {}
+        self.stats = ContextStats()
+
+    def select(self, section_text: str, card: CardType) -> str:
+        retriever = self.retrievers.get(section_text)
+        if retriever is None:
+            retriever = self.retrievers[section_text] = SectionRetriever(section_text, self.top_k)
+        context, full = retriever.context_for(card)
+        self.stats.cards += 1
+        self.stats.fallbacks += full
+        self.stats.full_chars += len(section_text)
+        self.stats.sent_chars += len(context)
+        return context
@@ -0,0 +1,133 @@
+"""
+Plan extraction requests from header-delimited sections.
+
+Every extract_atomic_cards call repeats a long instruction prompt, so sending
+each section on its own wastes most of the input on tiny sections, while huge
+sections produce oversized prompts and truncated card lists. The planner:
+
+1. builds the heading tree from the section levels, giving each section its
+   breadcrumb ("8 Transformers > 8.1 Attention > 8.1.1 Scaling"),
+2. splits sections above the token budget at paragraph boundaries (sentence
+   groups for very long paragraphs), each part keeping the breadcrumb,
+3. packs consecutive parts under the same parent heading into one request up
+   to the budget.
+
+Each part of a request starts with its breadcrumb as a markdown heading, so
+the extractor still sees where the text belongs.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from src.processing.retrieval import split_passages
+from src.processing.splitter import CHARS_PER_TOKEN
+
+# Content tokens per extraction request (the instruction prompt comes on top)
+DEFAULT_SECTION_TOKENS = 2000
+# Requests with less content than this are skipped (as single sections were before)
+MIN_CONTENT_CHARS = 50
+BREADCRUMB_SEPARATOR = " > "
+
+
+@dataclass
+class SectionPart:
+    breadcrumb: List[str]
+    content: str
+
+    @property
+    def parent(self) -> List[str]:
+        return self.breadcrumb[:-1]
+
+    def render(self) -> str:
+        return f"# {BREADCRUMB_SEPARATOR.join(self.breadcrumb)}\n\n{self.content}"
+
+
+@dataclass
+class SectionRequest:
+    parts: List[SectionPart] = field(default_factory=list)
+
+    @property
+    def heading(self) -> str:
+        headings = list(dict.fromkeys(part.breadcrumb[-1] for part in self.parts))
+        return headings[0] if len(headings) == 1 else f"{headings[0]} (+{len(headings) - 1} more)"
+
+    @property
+    def content_chars(self) -> int:
+        return sum(len(part.content) for part in self.parts)
+
+    def render(self) -> str:
+        return "\n\n".join(part.render() for part in self.parts)
+
+
+def section_breadcrumbs(sections: List[Dict[str, Any]]) -> List[List[str]]:
+    """Heading path of every section, from the levels of split_markdown_into_sections."""
+    stack: List[tuple] = []  # (level, heading)
+    breadcrumbs = []
+    for section in sections:
+        while stack and stack[-1][0] >= section["level"]:
+            stack.pop()
+        stack.append((section["level"], section["heading"]))
+        breadcrumbs.append([heading for _, heading in stack])
+    return breadcrumbs
+
+
+def _split_content(content: str, max_chars: int) -> List[str]:
+    """Split content into pieces of at most max_chars at paragraph (or sentence) boundaries."""
+    if len(content) <= max_chars:
+        return [content]
+    pieces, current = [], ""
+    for passage in split_passages(content, max_chars):
+        if current and len(current) + len(passage) + 2 > max_chars:
+            pieces.append(current)
+            current = passage
+        else:
+            current = f"{current}\n\n{passage}" if current else passage
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def plan_sections(
+    sections: List[Dict[str, Any]], max_tokens: int = DEFAULT_SECTION_TOKENS
+) -> List[SectionRequest]:
+    """
+    Group sections into size-balanced extraction requests.
+
+    Args:
+        sections: Output of split_markdown_into_sections
+        max_tokens: Content budget per request (CHARS_PER_TOKEN characters per token)
+
+    Returns:
+        Requests in document order; every non-empty section content is in exactly one
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    parts = [
+        SectionPart(breadcrumb, piece)
+        for section, breadcrumb in zip(sections, section_breadcrumbs(sections))
+        if section.get("content", "").strip()
+        for piece in _split_content(section["content"].strip(), max_chars)
+    ]
+
+    requests: List[SectionRequest] = []
+    current = SectionRequest()
+    for part in parts:
+        # Pack siblings (and their subsections) under the parent of the request's first part
+        same_parent = current.parts and part.breadcrumb[: len(current.parts[0].parent)] == current.parts[0].parent
+        if current.parts and (not same_parent or current.content_chars + len(part.content) > max_chars):
+            requests.append(current)
+            current = SectionRequest()
+        current.parts.append(part)
+    if current.parts:
+        requests.append(current)
+
+    return [request for request in requests if request.content_chars >= MIN_CONTENT_CHARS]
+
+
+def plan_stats(sections: List[Dict[str, Any]], requests: List[SectionRequest]) -> Dict[str, int]:
+    """Extraction calls before (one per section of 50+ characters) and after planning."""
+    return {
+        "sections": len(sections),
+        "section_calls": sum(len(section.get("content", "").strip()) >= MIN_CONTENT_CHARS for section in sections),
+        "planned_calls": len(requests),
+        "max_request_tokens": max((request.content_chars for request in requests), default=0) // CHARS_PER_TOKEN,
+    }
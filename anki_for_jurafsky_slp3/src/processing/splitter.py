@@ -1,4 +1,24 @@
-from typing import Generator
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, Generator, List
+
+# Rough token estimate for Gemini on English prose
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_CHUNK_TOKENS = 1500
+# Re-read this many characters of the previous chunk so the merger has an anchor
+STRUCTURED_OVERLAP = 400
+
+# Boundary scores: higher is a better place to cut
+LINE_BOUNDARY = 1
+PARAGRAPH_BOUNDARY = 2
+PAGE_BOUNDARY = 3
+HEADING_BOUNDARY = 4
+
+# Running page headers of the SLP3 PDFs, e.g. "4\nCHAPTER 8 • TRANSFORMERS" or "8.1 • ATTENTION"
+PAGE_HEADER_PATTERN = re.compile(r"^(?:\d+\s+)?(?:CHAPTER\s+\d+|APPENDIX\s+[A-Z]|\d+(?:\.\d+)*)\s+•[^\n]*$", re.MULTILINE)
+# Numbered (sub)section headings, e.g. "8.1\nAttention" or "8.1.2 The Transformer block",
+# and markdown headings of layout-extracted text
+HEADING_PATTERN = re.compile(r"^(?:(?:[A-Z]|\d+)(?:\.\d+)+\s+[A-Z][^\n•]{0,80}|#{1,6} [^\n]+)$", re.MULTILINE)
 
 
 def split_to_chunks(
@@ -23,3 +43,93 @@ def _shift_start_backward(
     if text_length - pos < overlap and pos > 0:
         return max(0, text_length - window_size)
     return pos
+
+
+def find_boundaries(text: str) -> Dict[int, int]:
+    """
+    Score every line start of PyMuPDF text as a cut position.
+
+    Page breaks are form feeds or running page headers, headings are numbered
+    section titles, paragraphs end with a blank line or a sentence-final line.
+
+    Returns:
+        Mapping of character position (start of a line) to boundary score
+    """
+    boundaries: Dict[int, int] = {}
+    for match in re.finditer(r"\n", text):
+        position = match.end()
+        blank_line = position >= 2 and text[position - 2] == "\n"
+        line_end = text[max(0, position - 4) : position - 1].rstrip()[-1:]
+        score = PARAGRAPH_BOUNDARY if blank_line or line_end in (".", "!", "?", ":") else LINE_BOUNDARY
+        boundaries[position] = score
+    for match in re.finditer(r"\f", text):
+        boundaries[match.end()] = PAGE_BOUNDARY
+    for match in PAGE_HEADER_PATTERN.finditer(text):
+        boundaries[match.start()] = max(boundaries.get(match.start(), 0), PAGE_BOUNDARY)
+    for match in HEADING_PATTERN.finditer(text):
+        boundaries[match.start()] = HEADING_BOUNDARY
+    boundaries.pop(0, None)
+    return boundaries
+
+
+def split_to_structured_chunks(
+    text: str, max_tokens: int = DEFAULT_MAX_CHUNK_TOKENS, overlap: int = STRUCTURED_OVERLAP
+) -> Generator[str, None, None]:
+    """
+    Split text into chunks that end on heading, page or paragraph boundaries.
+
+    Each chunk stays within max_tokens (estimated as CHARS_PER_TOKEN characters
+    per token) and fills at least half of it. The cut is the best-scored
+    boundary in that range (the later one on ties). The next chunk starts
+    about `overlap` characters before the cut, at a line start, so consecutive
+    chunks share a small anchor for the merger and never begin mid-word.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    n = len(text)
+    if n <= max_chars:
+        yield text
+        return
+
+    boundaries = find_boundaries(text)
+    positions: List[int] = sorted(boundaries)
+
+    start = 0
+    while start + max_chars < n:
+        low, high = start + max_chars // 2, start + max_chars
+        candidates = positions[bisect_right(positions, low) : bisect_right(positions, high)]
+        if candidates:
+            cut = max(candidates, key=lambda position: (boundaries[position], position))
+        else:
+            # No line break in range: cut after the last space, or hard-cut
+            space = text.rfind(" ", low, high)
+            cut = space + 1 if space > low else high
+        yield text[start:cut]
+
+        # Restart at the first line start within the overlap (word start as fallback),
+        # keeping at least a quarter of the overlap as merge anchor
+        overlap_start = max(cut - overlap, start + 1)
+        index = bisect_left(positions, overlap_start)
+        if index < len(positions) and positions[index] <= max(cut - overlap // 4, overlap_start):
+            start = positions[index]
+        else:
+            space = text.find(" ", overlap_start, cut)
+            start = space + 1 if space != -1 else overlap_start
+
+    yield text[start:]
+
+
+def chunking_stats(text: str, chunks: List[str]) -> Dict[str, float]:
+    """
+    Characters sent to the cleaning LLM for a given split.
+
+    Returns:
+        Dictionary with chunk count, characters sent, ratio to the text length
+        and the estimated size of the largest chunk in tokens
+    """
+    chars_sent = sum(len(chunk) for chunk in chunks)
+    return {
+        "chunks": len(chunks),
+        "chars_sent": chars_sent,
+        "ratio": chars_sent / max(len(text), 1),
+        "max_chunk_tokens": max((len(chunk) for chunk in chunks), default=0) / CHARS_PER_TOKEN,
+    }
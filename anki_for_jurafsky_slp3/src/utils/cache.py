@@ -1,17 +1,166 @@
+"""
+Disk cache of LLM responses.
+
+Plain prompts are keyed on `model|full prompt|schema name`. Prompts built
+from a registered PromptTemplate are keyed on the template ID and version,
+a hash of the variables filled into it and a fingerprint of the response
+schema, and stored with the tag `<template id>@v<version>`. Editing a
+template therefore keeps its entries until its version is bumped, and stale
+versions can be reported and pruned by tag (python main.py --cache-report,
+--prune-cache).
+
+An optional in-process LRU of raw entries (LLM_MEMORY_CACHE_ENTRIES, off by
+default) sits in front of the disk cache.
+"""
+
+import gzip
 import hashlib
+import json
 import logging
-from functools import wraps
-from typing import Type, TypeVar, Callable, Union, get_origin, get_args
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, NamedTuple, Tuple, Type, TypeVar, Callable, Union, get_origin, get_args
 
 import diskcache as dc
 from pydantic import BaseModel, TypeAdapter
 
+from src.utils.telemetry import LLMCall, telemetry
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
 cache = dc.Cache(".llm_cache", size_limit=2_000_000_000)
 
+# Entries kept in memory in front of the disk cache (0: disabled)
+MEMORY_CACHE_ENTRIES = int(os.getenv("LLM_MEMORY_CACHE_ENTRIES", "0"))
+
+# Replay key (full-prompt key) -> cache key of every entry read or written since start_recording (None: not recording)
+_recorded_keys: Dict[str, str] | None = None
+
+# Registered templates by ID (see PromptTemplate)
+PROMPT_TEMPLATES: Dict[str, "PromptTemplate"] = {}
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt template whose responses are cached by version.
+
+    Bump the version whenever the template text changes in a way that should
+    invalidate its cached responses.
+    """
+
+    id: str
+    version: int
+
+    def __post_init__(self) -> None:
+        registered = PROMPT_TEMPLATES.setdefault(self.id, self)
+        if registered != self:
+            raise ValueError(f"Prompt template {self.id} is already registered with version {registered.version}")
+
+    @property
+    def tag(self) -> str:
+        return f"{self.id}@v{self.version}"
+
+    def prompt(self, text: str, **variables: str) -> "Prompt":
+        """
+        Wrap a prompt rendered from this template.
+
+        Args:
+            text: The rendered prompt
+            **variables: Everything filled into the template; together with the
+                version they must determine the text
+        """
+        return Prompt(text, self, variables)
+
+
+class Prompt(str):
+    """Rendered prompt text that remembers its template and variables."""
+
+    template: PromptTemplate
+    variables: Dict[str, str]
+
+    def __new__(cls, text: str, template: PromptTemplate, variables: Dict[str, str]) -> "Prompt":
+        prompt = super().__new__(cls, text)
+        prompt.template = template
+        prompt.variables = variables
+        return prompt
+
+
+def prompt_stage(text: str) -> str:
+    """Telemetry stage of a prompt: its template ID ("other" for plain prompts)."""
+    return text.template.id if isinstance(text, Prompt) else "other"
+
+
+class SchemaInfo(NamedTuple):
+    name: str
+    # Validates cached values into the schema (None: cached values are returned as stored)
+    adapter: TypeAdapter | None
+    fingerprint: str
+
+
+@lru_cache(maxsize=None)
+def schema_info(schema: Type[T]) -> SchemaInfo:
+    """Name, TypeAdapter and JSON schema fingerprint of a response schema, built once per schema."""
+    name = get_schema_name(schema)
+    is_pydantic_type = False
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        is_pydantic_type = True
+    elif get_origin(schema) is Union:
+        args = get_args(schema)
+        if args and all(isinstance(arg, type) and issubclass(arg, BaseModel) for arg in args if isinstance(arg, type)):
+            is_pydantic_type = True
+
+    if not is_pydantic_type:
+        return SchemaInfo(name, None, name)
+    adapter = TypeAdapter(schema)
+    json_schema = json.dumps(adapter.json_schema(), sort_keys=True)
+    return SchemaInfo(name, adapter, hashlib.sha256(json_schema.encode()).hexdigest()[:16])
+
+
+class _MemoryLRU:
+    """Thread-safe LRU of raw cache entries."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+memory_cache = _MemoryLRU(MEMORY_CACHE_ENTRIES)
+
+
+def configure_memory_cache(max_entries: int) -> None:
+    """Resize the in-process LRU (0 disables it); drops its entries."""
+    memory_cache.max_entries = max_entries
+    memory_cache.clear()
+
 
 def get_schema_name(schema: Type[T]) -> str:
     if hasattr(schema, '__name__'):
@@ -25,51 +174,206 @@ def create_cache_key(model: str, text: str, schema: Type[T]) -> str:
     return hashlib.sha256(content_to_hash.encode()).hexdigest()
 
 
-def disk_cache(func: Callable[..., T]) -> Callable[..., T]:
-    @wraps(func)
-    def wrapper(self, text: str, schema: Type[T]) -> T:
-        schema_name = get_schema_name(schema)
-        cache_key = create_cache_key(self.model, text, schema)
-        cached_result = cache.get(cache_key)
+def create_template_cache_key(model: str, prompt: Prompt, schema: Type[T]) -> str:
+    """Key of a templated prompt: template ID and version, hashed variables and schema fingerprint."""
+    variables = json.dumps(prompt.variables, sort_keys=True, ensure_ascii=False)
+    variables_hash = hashlib.sha256(variables.encode()).hexdigest()
+    content_to_hash = f"{model}|{prompt.template.tag}|{variables_hash}|{schema_info(schema).fingerprint}"
+    return hashlib.sha256(content_to_hash.encode()).hexdigest()
+
+
+def _cache_key(model: str, text: str, schema: Type[T]) -> Tuple[str, str | None]:
+    """Cache key and tag of a prompt."""
+    if isinstance(text, Prompt):
+        return create_template_cache_key(model, text, schema), text.template.tag
+    return create_cache_key(model, text, schema), None
+
+
+def _read(key: str) -> Any | None:
+    value = memory_cache.get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is not None:
+            memory_cache.put(key, value)
+    return value
 
+
+def _write(key: str, value: Any, tag: str | None) -> None:
+    cache.set(key, value, tag=tag)
+    memory_cache.put(key, value)
+
+
+def _record(model: str, text: str, schema: Type[T], key: str) -> None:
+    if _recorded_keys is not None:
+        _recorded_keys[create_cache_key(model, text, schema)] = key
+
+
+def get_cached(model: str, text: str, schema: Type[T]) -> tuple[bool, T | None]:
+    """Cached response of `model` to a prompt, as stored by LLMClient.generate; returns (hit, value)."""
+    info = schema_info(schema)
+    call = LLMCall(model, prompt_stage(text), cache_hit=True)
+    key, tag = _cache_key(model, text, schema)
+    cached_result = _read(key)
+
+    if cached_result is None and tag is not None:
+        # Entry written before the template was versioned: valid while the prompt text is unchanged
+        cached_result = cache.get(create_cache_key(model, text, schema))
         if cached_result is not None:
-            logger.debug(f"🎯 Cache hit for {schema_name} - using cached response")
-            try:
-                origin = get_origin(schema)
-                is_pydantic_type = False
-
-                if (isinstance(schema, type) and issubclass(schema, BaseModel)):
-                    is_pydantic_type = True
-                elif origin is Union:
-                    args = get_args(schema)
-                    if args and all(isinstance(arg, type) and issubclass(arg, BaseModel) for arg in args if isinstance(arg, type)):
-                        is_pydantic_type = True
-
-                if is_pydantic_type:
-                    adapter = TypeAdapter(schema)
-                    return adapter.validate_python(cached_result)
-                else:
-                    return cached_result
-                
-            except Exception as e:
-                logger.warning(
-                    f"Failed to deserialize cached response: {e}. Making fresh API call."
-                )
-        else:
-            logger.debug(f"🔄 Cache miss for {schema_name} - making API call")
-
-        result: T = func(self, text, schema)
+            _write(key, cached_result, tag)
 
+    if cached_result is None:
+        logger.debug(f"🔄 Cache miss for {info.name} - making API call")
+        return False, None
+
+    logger.debug(f"🎯 Cache hit for {info.name} - using cached response")
+    _record(model, text, schema, key)
+    if info.adapter is not None:
         try:
-            if hasattr(result, "model_dump"):
-                cache.set(cache_key, result.model_dump())
+            cached_result = info.adapter.validate_python(cached_result)
+        except Exception as e:
+            logger.warning(f"Failed to deserialize cached response: {e}. Making fresh API call.")
+            return False, None
+    telemetry.record(call.finish())
+    return True, cached_result
+
+
+def set_cached(model: str, text: str, schema: Type[T], result: T) -> None:
+    """Store a response under the key LLMClient.generate would use for this prompt."""
+    info = schema_info(schema)
+    key, tag = _cache_key(model, text, schema)
+    try:
+        _write(key, result.model_dump() if hasattr(result, "model_dump") else result, tag)
+        _record(model, text, schema, key)
+        logger.debug(f"💾 Cached {info.name} response")
+    except Exception as e:
+        logger.warning(f"Failed to cache response: {e}")
+
+
+class TemplateUsage(NamedTuple):
+    tag: str | None
+    entries: int
+    size: int
+
+
+def template_report() -> List[TemplateUsage]:
+    """Entries and bytes per template tag (None: full-prompt keys), largest first."""
+    with sqlite3.connect(Path(cache.directory) / "cache.db") as db:
+        rows = db.execute(
+            "SELECT tag, COUNT(*), SUM(size + COALESCE(LENGTH(value), 0)) FROM Cache GROUP BY tag"
+        ).fetchall()
+    return sorted((TemplateUsage(*row) for row in rows), key=lambda usage: usage.size, reverse=True)
+
+
+def is_stale(tag: str) -> bool:
+    """Whether a tag names an older (or newer) version of a registered template."""
+    template_id, _, version = tag.rpartition("@v")
+    template = PROMPT_TEMPLATES.get(template_id)
+    return template is not None and version != str(template.version)
+
+
+def prune_cache(untagged: bool = False) -> int:
+    """
+    Delete entries of stale template versions.
+
+    Args:
+        untagged: Also delete full-prompt entries (not templated or written before templates were versioned)
+
+    Returns:
+        Number of deleted entries
+    """
+    removed = sum(cache.evict(usage.tag) for usage in template_report() if usage.tag and is_stale(usage.tag))
+    if untagged:
+        with sqlite3.connect(Path(cache.directory) / "cache.db") as db:
+            keys = [key for (key,) in db.execute("SELECT key FROM Cache WHERE tag IS NULL")]
+        removed += sum(cache.delete(key) for key in keys)
+    memory_cache.clear()
+    return removed
+
+
+def start_recording() -> None:
+    """Remember every cache entry read or written from now on (for export_fixtures)."""
+    global _recorded_keys
+    _recorded_keys = {}
+
+
+def stop_recording() -> Dict[str, str]:
+    """Stop recording; returns replay key -> cache key of the entries used since start_recording."""
+    global _recorded_keys
+    keys, _recorded_keys = _recorded_keys or {}, None
+    return keys
+
+
+def export_fixtures(path: Path, keys: Dict[str, str] | None = None, metadata: Dict[str, Any] | None = None) -> int:
+    """
+    Write cached responses to a gzipped JSONL fixture bundle.
+
+    Responses are written under their replay key (the full-prompt key
+    connectors.llm.replay looks up), whatever key they are cached under.
+
+    Args:
+        path: Bundle file (e.g. fixtures/chapter_8.jsonl.gz)
+        keys: Replay key -> cache key, as returned by stop_recording (all
+            entries under their own keys if None)
+        metadata: Written as the first line, e.g. the inputs of the recorded run
+
+    Returns:
+        Number of exported responses
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if keys is None:
+        keys = {key: key for key in cache.iterkeys()}
+    exported = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        if metadata is not None:
+            f.write(json.dumps({"metadata": metadata}, ensure_ascii=False) + "\n")
+        for replay_key, cache_key in sorted(keys.items()):
+            value = cache.get(cache_key)
+            if value is None:
+                continue
+            f.write(json.dumps({"key": replay_key, "value": value}, ensure_ascii=False) + "\n")
+            exported += 1
+    return exported
+
+
+def load_fixtures(path: Path) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Responses (replay key -> cached value) and metadata of a fixture bundle."""
+    responses: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "metadata" in record:
+                metadata = record["metadata"]
             else:
-                cache.set(cache_key, result)
+                responses[record["key"]] = record["value"]
+    return responses, metadata
 
-            logger.debug(f"💾 Cached {schema_name} response")
-        except Exception as e:
-            logger.warning(f"Failed to cache response: {e}")
 
+def disk_cache(func: Callable[..., T]) -> Callable[..., T]:
+    @wraps(func)
+    def wrapper(self, text: str, schema: Type[T], **kwargs) -> T:
+        # Keyed on the prompt only; kwargs (e.g. static_prefix) change how it is sent, not the answer
+        hit, cached_result = get_cached(self.model, text, schema)
+        if hit:
+            return cached_result
+
+        result: T = func(self, text, schema, **kwargs)
+        set_cached(self.model, text, schema, result)
+        return result
+
+    return wrapper
+
+
+def async_disk_cache(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Same as disk_cache for coroutine methods; shares keys and entries with the sync path."""
+    @wraps(func)
+    async def wrapper(self, text: str, schema: Type[T], **kwargs) -> T:
+        hit, cached_result = get_cached(self.model, text, schema)
+        if hit:
+            return cached_result
+
+        result: T = await func(self, text, schema, **kwargs)
+        set_cached(self.model, text, schema, result)
         return result
 
     return wrapper
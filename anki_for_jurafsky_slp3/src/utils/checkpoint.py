@@ -0,0 +1,75 @@
+"""
+Append-only JSONL checkpoints of the chapter pipeline.
+
+Every finished stage of a section or card is appended as one line:
+
+    {"stage": "extracted", "key": "<section id>", "data": [...cards]}
+    {"stage": "content", "key": "<card id>", "data": {...card}}
+    {"stage": "final", "key": "<card id>", "data": {...card}}
+
+Lines are flushed as they are written, so an interrupted run loses at most
+the stage calls in flight. On resume the log is read back and finished
+stages are skipped by their stable IDs, without calling the LLM (or its
+cache). A truncated last line is ignored.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def stable_id(*parts: str) -> str:
+    """ID that stays the same across runs for the same inputs."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def stream_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Records of a checkpoint file in write order, skipping malformed lines."""
+    if not path.exists():
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed checkpoint line {line_number} in {path}")
+
+
+class Checkpoint:
+    """Finished stage results of one chapter, backed by a JSONL file."""
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = path
+        self.done: Dict[Tuple[str, str], Any] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            for record in stream_records(path):
+                self.done[(record["stage"], record["key"])] = record["data"]
+        elif path.exists():
+            path.unlink()
+        self.resumed = len(self.done)
+        self._file = open(path, "a", encoding="utf-8")
+        if resume and path.stat().st_size and not path.read_bytes().endswith(b"\n"):
+            # Terminate the truncated last line so the next record starts on its own line
+            self._file.write("\n")
+
+    def get(self, stage: str, key: str) -> Any | None:
+        return self.done.get((stage, key))
+
+    def record(self, stage: str, key: str, data: Any) -> None:
+        self._file.write(json.dumps({"stage": stage, "key": key, "data": data}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.done[(stage, key)] = data
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe request spacing shared by every caller in the process.
+
+    Each ``acquire()`` reserves the next free slot (``60 / requests_per_minute``
+    seconds after the previous one) and sleeps until it is reached, so any
+    number of concurrent workers together stay under the limit. With
+    ``burst`` > 1 it is a token bucket: up to ``burst`` unused slots are saved
+    up and can be spent at once. Threads use ``acquire()``, coroutines use
+    ``acquire_async()``; both draw from the same slots. ``backoff()`` pauses
+    every caller, e.g. after a quota error.
+    """
+
+    def __init__(self, requests_per_minute: float | None = None, burst: int = 1) -> None:
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.burst = max(burst, 1)
+        self.set_rate(requests_per_minute)
+
+    def set_rate(self, requests_per_minute: float | None) -> None:
+        """Change the limit; None or 0 disables rate limiting."""
+        with self._lock:
+            self.requests_per_minute = requests_per_minute or None
+            self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+
+    def _reserve(self) -> float:
+        """Reserve the next slot and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._interval and self._next_slot <= now:
+                return 0.0
+            # _next_slot may lag behind now by the saved-up slots (burst - 1)
+            slot = max(now - (self.burst - 1) * self._interval, self._next_slot)
+            self._next_slot = slot + self._interval
+        return max(slot - now, 0.0)
+
+    def acquire(self) -> float:
+        """
+        Block until the caller may send one request.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """
+        Wait (without blocking the event loop) until the caller may send one request.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def backoff(self, seconds: float) -> None:
+        """Make every caller wait at least ``seconds`` before its next request."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
@@ -0,0 +1,223 @@
+"""
+Per-call telemetry of LLM requests.
+
+Every LLMClient.generate / agenerate call is recorded as an LLMCall: model,
+stage (the ID of the prompt template, see src.utils.cache.PromptTemplate),
+input/output/cached tokens, latency, retries and whether the disk cache
+answered it. The process-wide `telemetry` aggregates the calls per stage and
+model into a run summary (write_summary) and a short tqdm postfix.
+
+With LLM_TELEMETRY_SPANS=<file> (or record_spans) every call is also appended
+to a JSONL file as an OpenTelemetry-style span, using the GenAI semantic
+convention attribute names where one exists.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, TextIO
+
+# USD per million (input, output) tokens, list prices (thinking tokens are billed as output)
+MODEL_PRICES: Dict[str, tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+# Cached input tokens are billed at this fraction of the input price
+CACHED_TOKEN_PRICE = 0.25
+
+
+@dataclass
+class LLMCall:
+    model: str
+    stage: str
+    cache_hit: bool = False
+    # API requests sent (0 for cache hits)
+    attempts: int = 0
+    # Latency of the request that answered; duration includes queueing and retries
+    latency: float = 0.0
+    duration: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    error: str | None = None
+    started: float = field(default_factory=time.time)
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+
+    @property
+    def cost(self) -> float:
+        """Estimated USD cost (0 for models without a known price)."""
+        input_price, output_price = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        billed_input = self.input_tokens - self.cached_tokens * (1 - CACHED_TOKEN_PRICE)
+        return (billed_input * input_price + self.output_tokens * output_price) / 1_000_000
+
+    def add_response(self, latency: float, response: Any) -> None:
+        """Take latency and token counts from the API response that answered."""
+        self.latency = latency
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        self.input_tokens = getattr(usage, "prompt_token_count", None) or 0
+        self.cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        self.output_tokens = (getattr(usage, "candidates_token_count", None) or 0) + (
+            getattr(usage, "thoughts_token_count", None) or 0
+        )
+
+    def finish(self) -> "LLMCall":
+        self.duration = time.time() - self.started
+        return self
+
+    def to_span(self, trace_id: str) -> Dict[str, Any]:
+        return {
+            "name": f"llm {self.stage}",
+            "trace_id": trace_id,
+            "span_id": secrets.token_hex(8),
+            "start_time_unix_nano": int(self.started * 1e9),
+            "end_time_unix_nano": int((self.started + self.duration) * 1e9),
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+            "attributes": {
+                "gen_ai.system": "gemini",
+                "gen_ai.request.model": self.model,
+                "gen_ai.usage.input_tokens": self.input_tokens,
+                "gen_ai.usage.output_tokens": self.output_tokens,
+                "gen_ai.usage.cached_tokens": self.cached_tokens,
+                "llm.stage": self.stage,
+                "llm.cache_hit": self.cache_hit,
+                "llm.retries": self.retries,
+                "llm.latency_s": round(self.latency, 4),
+                "llm.cost_usd": round(self.cost, 6),
+            },
+        }
+
+
+@dataclass
+class CallTotals:
+    calls: int = 0
+    cache_hits: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    # Summed over API calls
+    latency: float = 0.0
+    cost: float = 0.0
+
+    def add(self, call: LLMCall) -> None:
+        self.calls += 1
+        self.cache_hits += call.cache_hit
+        self.api_calls += not call.cache_hit
+        self.retries += call.retries
+        self.errors += call.error is not None
+        self.input_tokens += call.input_tokens
+        self.output_tokens += call.output_tokens
+        self.cached_tokens += call.cached_tokens
+        if not call.cache_hit:
+            self.latency += call.latency
+        self.cost += call.cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "cache_hit_rate": round(self.cache_hits / max(self.calls, 1), 4),
+            "mean_latency": round(self.latency / max(self.api_calls, 1), 3),
+            "cost": round(self.cost, 6),
+        }
+
+
+class Telemetry:
+    """Thread-safe record of the LLM calls of one run."""
+
+    def __init__(self, spans_path: Path | None = None) -> None:
+        self.calls: List[LLMCall] = []
+        self.total = CallTotals()
+        self.started = time.time()
+        self.trace_id = secrets.token_hex(16)
+        self._spans: TextIO | None = None
+        self._lock = threading.Lock()
+        self.record_spans(spans_path)
+
+    def reset(self) -> None:
+        """Start a new run (spans keep going to the same file, under a new trace ID)."""
+        with self._lock:
+            self.calls = []
+            self.total = CallTotals()
+            self.started = time.time()
+            self.trace_id = secrets.token_hex(16)
+
+    def record_spans(self, path: Path | None) -> None:
+        """Append a span per call to path from now on (None: stop)."""
+        with self._lock:
+            if self._spans is not None:
+                self._spans.close()
+                self._spans = None
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._spans = open(path, "a", encoding="utf-8")
+
+    def record(self, call: LLMCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+            self.total.add(call)
+            if self._spans is not None:
+                self._spans.write(json.dumps(call.to_span(self.trace_id), ensure_ascii=False) + "\n")
+                self._spans.flush()
+
+    def totals(self, by: str) -> Dict[str, CallTotals]:
+        """Totals per value of an LLMCall attribute ("stage" or "model")."""
+        with self._lock:
+            calls = list(self.calls)
+        totals: Dict[str, CallTotals] = {}
+        for call in calls:
+            totals.setdefault(getattr(call, by), CallTotals()).add(call)
+        return totals
+
+    def postfix(self) -> Dict[str, str]:
+        """Short running totals for tqdm.set_postfix."""
+        total = self.total
+        return {
+            "llm": f"{total.api_calls} calls/{total.cache_hits} hits",
+            "tok": f"{(total.input_tokens + total.output_tokens) / 1000:.0f}k",
+            "cost": f"${total.cost:.2f}",
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "duration": round(time.time() - self.started, 1),
+            "trace_id": self.trace_id,
+            "total": self.total.to_dict(),
+            "stages": {stage: totals.to_dict() for stage, totals in self.totals("stage").items()},
+            "models": {model: totals.to_dict() for model, totals in self.totals("model").items()},
+        }
+
+    def report(self) -> str:
+        """Table of the per-stage totals."""
+        lines = [f"{'stage':<24} {'calls':>6} {'hits':>6} {'retries':>7} {'in tok':>10} {'out tok':>9} {'mean s':>7} {'cost $':>8}"]
+        for stage, totals in sorted(self.totals("stage").items()):
+            lines.append(
+                f"{stage:<24} {totals.calls:>6} {totals.cache_hits:>6} {totals.retries:>7} {totals.input_tokens:>10,} "
+                f"{totals.output_tokens:>9,} {totals.latency / max(totals.api_calls, 1):>7.2f} {totals.cost:>8.4f}"
+            )
+        return "\n".join(lines)
+
+    def write_summary(self, directory: Path) -> Path:
+        """Write the run summary to directory/run_<start time>.json; returns the file."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"run_{datetime.fromtimestamp(self.started):%Y%m%d_%H%M%S}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+_spans_path = os.getenv("LLM_TELEMETRY_SPANS")
+telemetry = Telemetry(Path(_spans_path) if _spans_path else None)
@@ -6,8 +6,11 @@ handling common issues like stray HTML operators, MathJax/Cloze conflicts,
 and missing spaces after MathJax operators.
 """
 
+import logging
 import re
-from typing import Optional, Set
+from typing import List, Optional, Set
+
+logger = logging.getLogger(__name__)
 
 # --- HTML Escaping ---
 
@@ -184,6 +187,85 @@ def fix_mathjax_operator_spacing(text: Optional[str]) -> str:
     
     return MATHJAX_BLOCK_PATTERN.sub(_mathjax_operator_spacer, text)
 
+# --- Single-Pass Cleaner ---
+
+# Tokens outside MathJax blocks: stray-or-tag < >, block openers
+_OUTSIDE_TOKEN_PATTERN = re.compile(r'[<>]|\\[(\[]')
+# Tokens inside a MathJax block: operators directly followed by a non-space
+# character, non-escaped braces, stray-or-tag < >
+_MATH_TOKEN_PATTERN = re.compile(f'(?:{_operators_pattern})(?=[^\\s])|(?<!\\\\)[{{}}]|[<>]')
+_HTML_TAG_START_PATTERN = re.compile(r'</?\w+.*?>')
+_MATHJAX_CLOSERS = {'\\(': '\\)', '\\[': '\\]'}
+_BRACE_REPLACEMENTS = {'{': ' { ', '}': ' } '}
+
+
+def _clean_single_pass(text: str) -> tuple[str, bool, bool, bool]:
+    """
+    Apply the three fixes of clean_anki_text in one left-to-right scan.
+
+    Same result as escape_html_operators → fix_mathjax_operator_spacing →
+    fix_mathjax_cloze_conflicts. HTML tags and MathJax blocks are tracked
+    independently, as in the separate passes (a tag may contain a block
+    delimiter and the other way round).
+
+    Returns:
+        (cleaned text, HTML escaped, operators spaced, braces spaced)
+    """
+    out: List[str] = []
+    escaped = spaced_operators = spaced_braces = False
+    tag_end = 0  # < and > before this position belong to an HTML tag
+
+    def angle_bracket(char: str, position: int) -> str:
+        nonlocal tag_end, escaped
+        if position < tag_end:
+            return char
+        if char == '<':
+            tag = _HTML_TAG_START_PATTERN.match(text, position)
+            if tag:
+                tag_end = tag.end()
+                return char
+        escaped = True
+        return '&lt;' if char == '<' else '&gt;'
+
+    position = 0
+    for token in _OUTSIDE_TOKEN_PATTERN.finditer(text):
+        start = token.start()
+        if start < position:
+            continue
+        out.append(text[position:start])
+        char = token.group()
+        if char in '<>':
+            out.append(angle_bracket(char, start))
+            position = start + 1
+            continue
+
+        # Block opener: the block ends at the first matching closer
+        end = text.find(_MATHJAX_CLOSERS[char], start + 2)
+        if end == -1:
+            out.append(char)
+            position = start + 2
+            continue
+        out.append(char)
+        position = start + 2
+        # endpos makes operator lookahead stop at the end of the block content
+        for math_token in _MATH_TOKEN_PATTERN.finditer(text, position, end):
+            out.append(text[position:math_token.start()])
+            value = math_token.group()
+            if value in _BRACE_REPLACEMENTS:
+                out.append(_BRACE_REPLACEMENTS[value])
+                spaced_braces = True
+            elif value in '<>':
+                out.append(angle_bracket(value, math_token.start()))
+            else:
+                out.append(value + ' ')
+                spaced_operators = True
+            position = math_token.end()
+        out.append(text[position:end + 2])
+        position = end + 2
+
+    out.append(text[position:])
+    return ''.join(out), escaped, spaced_operators, spaced_braces
+
 # --- High-Level API ---
 
 def clean_anki_text(text: Optional[str]) -> str:
@@ -191,7 +273,7 @@ def clean_anki_text(text: Optional[str]) -> str:
     Apply all text cleaning operations for Anki card content.
     
     This is the main entry point for cleaning text that will be used in Anki cards.
-    It applies multiple fixes in the correct order:
+    It applies multiple fixes in the correct order, in a single scan of the text:
     1. Escape stray HTML operators (< and >)
     2. Fix missing spaces after MathJax operators (\\hatw → \\hat w)
     3. Fix MathJax/Cloze conflicts by spacing braces
@@ -209,22 +291,12 @@ def clean_anki_text(text: Optional[str]) -> str:
     if not text:
         return ""
     
-    # Apply HTML escaping first
-    cleaned = escape_html_operators(text)
-    if text != cleaned:
-        print("Applied HTML escaping.")
-        
-    # Then fix MathJax operator spacing
-    text = cleaned
-    cleaned = fix_mathjax_operator_spacing(cleaned)
-    if text != cleaned:
-        print("Applied MathJax operator spacing.")
-    
-    # Finally fix MathJax/Cloze conflicts
-    text = cleaned
-    cleaned = fix_mathjax_cloze_conflicts(cleaned)
-    if text != cleaned:
-        print("Applied MathJax/Cloze conflict fixes.")
-    
-    return cleaned
+    cleaned, escaped, spaced_operators, spaced_braces = _clean_single_pass(text)
+    if escaped:
+        logger.debug("Applied HTML escaping.")
+    if spaced_operators:
+        logger.debug("Applied MathJax operator spacing.")
+    if spaced_braces:
+        logger.debug("Applied MathJax/Cloze conflict fixes.")
 
+    return cleaned
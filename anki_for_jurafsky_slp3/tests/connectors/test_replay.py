@@ -0,0 +1,96 @@
+"""
+Tests for the record/replay LLM fixture mode.
+
+Responses are written to a temporary disk cache, recorded and exported to a
+fixture bundle, then served by ReplayClient through the full LLMClient path.
+"""
+
+import asyncio
+import time
+
+import diskcache as dc
+import pytest
+
+import connectors.llm.structured_gemini as structured_gemini
+import src.utils.cache as cache_module
+from connectors.llm.replay import ReplayMiss, ReplaySettings, disable_replay, enable_replay
+from connectors.llm.structured_gemini import LLMClient
+from src.models.cards import QACard
+from src.utils.cache import export_fixtures, get_cached, load_fixtures, set_cached, start_recording, stop_recording
+
+PREFIX = "Fixed instructions. " * 300
+CARD = QACard(type="Q&A", q="What is BPE?", a="Byte pair encoding.")
+
+
+@pytest.fixture
+def fixtures(tmp_path, monkeypatch):
+    monkeypatch.setattr(structured_gemini, "_registry", {})
+    test_cache = dc.Cache(str(tmp_path / "llm_cache"))
+    monkeypatch.setattr(cache_module, "cache", test_cache)
+    set_cached("gemini-test", "prompt", QACard, CARD)
+    set_cached("gemini-test", PREFIX + "chunk", QACard, CARD)
+    set_cached("gemini-test", "hello", str, "world")
+    set_cached("gemini-test", "not used by the run", str, "skipped")
+
+    start_recording()
+    for prompt, schema in (("prompt", QACard), (PREFIX + "chunk", QACard), ("hello", str)):
+        assert get_cached("gemini-test", prompt, schema)[0]
+    keys = stop_recording()
+
+    path = tmp_path / "fixtures.jsonl.gz"
+    assert export_fixtures(path, keys, {"pipeline": "test"}) == 3
+    yield path
+    disable_replay()
+    test_cache.close()
+
+
+class TestFixtureBundle:
+    """Recorded cache entries round-trip through a bundle."""
+
+    def test_export_and_load(self, fixtures):
+        responses, metadata = load_fixtures(fixtures)
+
+        assert metadata == {"pipeline": "test"}
+        assert len(responses) == 3
+        assert CARD.model_dump() in responses.values()
+
+
+class TestReplay:
+    """LLMClient answers from the bundle without the API or the disk cache."""
+
+    def test_serves_recorded_responses_with_latency(self, fixtures):
+        client = enable_replay(fixtures, ReplaySettings(latency=0.05))
+        llm = LLMClient(model="gemini-test")
+
+        start = time.perf_counter()
+        assert llm.generate("prompt", QACard) == CARD
+        assert time.perf_counter() - start >= 0.05
+        assert asyncio.run(llm.agenerate("hello", str)) == "world"
+        assert llm.generate(PREFIX + "chunk", QACard, static_prefix=PREFIX) == CARD
+        assert client.calls == 3
+
+    def test_injected_errors_are_retried(self, fixtures):
+        client = enable_replay(fixtures, ReplaySettings(error_rate=0.5, retry_wait=0, seed=0))
+
+        assert LLMClient(model="gemini-test").generate("prompt", QACard) == CARD
+        assert client.injected_errors > 0
+        assert client.calls == client.injected_errors + 1
+
+    def test_missing_prompt_raises(self, fixtures):
+        client = enable_replay(fixtures, ReplaySettings(retry_wait=0))
+
+        with pytest.raises(ReplayMiss):
+            LLMClient(model="gemini-test").generate("not used by the run", str)
+        assert len(client.missed_keys) == 1
+
+    def test_disable_restores_cache_and_backoff(self, fixtures):
+        cache = cache_module.cache
+        wait = LLMClient._generate_with_retry.retry.wait
+
+        enable_replay(fixtures)
+        assert cache_module.cache is not cache
+        disable_replay()
+
+        assert cache_module.cache is cache
+        assert LLMClient._generate_with_retry.retry.wait is wait
+        assert structured_gemini._client_factory is None
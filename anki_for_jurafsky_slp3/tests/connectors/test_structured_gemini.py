@@ -0,0 +1,328 @@
+"""
+Tests for the shared, async-capable LLMClient.
+
+genai.Client is replaced by a fake that counts instances, in-flight requests,
+API calls and cached contents, so no network access is needed.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import diskcache as dc
+import pytest
+from google.genai import errors
+from tenacity import stop_after_attempt, wait_fixed
+
+import connectors.llm.structured_gemini as structured_gemini
+import src.utils.cache as cache_module
+from connectors.llm.structured_gemini import LLMClient, configure_model
+from src.models.cards import QACard
+from src.utils.cache import PromptTemplate
+from src.utils.telemetry import Telemetry
+
+
+class FakeGenaiClient:
+    """Stand-in for genai.Client with sync and aio generate_content."""
+
+    instances = 0
+
+    def __init__(self):
+        FakeGenaiClient.instances += 1
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+        self.cached_contents = {}
+        self.cache_updates = 0
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+        self.caches = SimpleNamespace(create=self._create_cache, update=self._update_cache)
+
+    def _create_cache(self, model, config):
+        name = f"cachedContents/{len(self.cached_contents)}"
+        self.cached_contents[name] = config.contents[0]
+        return SimpleNamespace(name=name)
+
+    def _update_cache(self, name, config):
+        self.cache_updates += 1
+
+    def _response(self, contents, config):
+        self.calls += 1
+        self.requests.append((contents, config.get("cached_content")))
+        # Token counts like the API: the cached prefix counts as prompt and cached tokens
+        cached = len(self.cached_contents.get(config.get("cached_content"), "")) // 4
+        usage = SimpleNamespace(prompt_token_count=len(contents) // 4 + cached, cached_content_token_count=cached)
+        if config["response_mime_type"] == "text/plain":
+            return SimpleNamespace(text=f"echo: {contents}", parsed=None, usage_metadata=usage)
+        return SimpleNamespace(text="", parsed=QACard(type="Q&A", q=contents, a="answer"), usage_metadata=usage)
+
+    def _generate(self, model, contents, config):
+        return self._response(contents, config)
+
+    async def _agenerate(self, model, contents, config):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return self._response(contents, config)
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(tmp_path, monkeypatch):
+    FakeGenaiClient.instances = 0
+    monkeypatch.setattr(structured_gemini.genai, "Client", FakeGenaiClient)
+    monkeypatch.setattr(structured_gemini, "_registry", {})
+    test_cache = dc.Cache(str(tmp_path / "llm_cache"))
+    monkeypatch.setattr(cache_module, "cache", test_cache)
+    yield
+    test_cache.close()
+
+
+class TestClientRegistry:
+    """Clients of the same model share one genai.Client."""
+
+    def test_same_model_reuses_client(self):
+        first = LLMClient(model="gemini-test")
+        second = LLMClient(model="gemini-test")
+        other = LLMClient(model="gemini-other")
+
+        assert first.client is second.client
+        assert first.rate_limiter is second.rate_limiter
+        assert other.client is not first.client
+        assert FakeGenaiClient.instances == 2
+
+
+class TestAsyncGenerate:
+    """agenerate keeps disk_cache semantics and respects the per-model bound."""
+
+    def test_agenerate_structured_and_text(self):
+        client = LLMClient(model="gemini-test")
+
+        card = asyncio.run(client.agenerate("What is BPE?", QACard))
+        text = asyncio.run(client.agenerate("hello", str))
+
+        assert card == QACard(type="Q&A", q="What is BPE?", a="answer")
+        assert text == "echo: hello"
+
+    def test_cache_is_shared_between_sync_and_async(self):
+        client = LLMClient(model="gemini-test")
+
+        asyncio.run(client.agenerate("prompt", QACard))
+        assert client.generate("prompt", QACard).q == "prompt"
+        assert asyncio.run(client.agenerate("prompt", QACard)).q == "prompt"
+        assert client.client.calls == 1
+
+    def test_concurrent_callers_share_semaphore(self):
+        configure_model("gemini-test", max_concurrent_requests=3)
+
+        async def run_many():
+            # A fresh LLMClient per call, like the pipeline stages
+            return await asyncio.gather(
+                *(LLMClient(model="gemini-test").agenerate(f"prompt {i}", QACard) for i in range(20))
+            )
+
+        results = asyncio.run(run_many())
+
+        fake = structured_gemini.get_model_resources("gemini-test").client
+        assert [card.q for card in results] == [f"prompt {i}" for i in range(20)]
+        assert fake.calls == 20
+        assert 1 < fake.max_in_flight <= 3
+
+
+class TestQuotaBackoff:
+    """A 429 on one caller pauses every caller of the model."""
+
+    def test_quota_error_backs_off_shared_limiter(self):
+        client = LLMClient(model="gemini-test")
+        error = structured_gemini.errors.APIError(429, {"error": {"message": "quota", "status": "RESOURCE_EXHAUSTED"}})
+        retry_state = SimpleNamespace(
+            outcome=SimpleNamespace(exception=lambda: error),
+            args=(client,),
+            next_action=SimpleNamespace(sleep=0.2),
+        )
+
+        structured_gemini._share_quota_backoff(retry_state)
+
+        assert LLMClient(model="gemini-test").rate_limiter.acquire() > 0.1
+
+
+PREFIX = "Fixed instructions and examples. " * 200
+
+
+class TestContextCaching:
+    """Static prompt prefixes are sent once as a cached context."""
+
+    def test_prefix_is_registered_once(self):
+        client = LLMClient(model="gemini-test")
+
+        for i in range(3):
+            client.generate(PREFIX + f"chunk {i}", QACard, static_prefix=PREFIX)
+        asyncio.run(client.agenerate(PREFIX + "chunk 3", QACard, static_prefix=PREFIX))
+
+        assert list(client.client.cached_contents.values()) == [PREFIX]
+        assert client.client.requests == [(f"chunk {i}", "cachedContents/0") for i in range(4)]
+
+    def test_disk_cache_keys_on_full_prompt(self):
+        client = LLMClient(model="gemini-test")
+
+        client.generate(PREFIX + "chunk", QACard, static_prefix=PREFIX)
+        # Same logical prompt without a prefix: cache hit
+        assert client.generate(PREFIX + "chunk", QACard).q == "chunk"
+        # Same suffix after another prefix: a different prompt
+        client.generate("Other instructions. " * 300 + "chunk", QACard, static_prefix="Other instructions. " * 300)
+
+        assert client.client.calls == 2
+
+    def test_short_or_mismatched_prefix_is_sent_inline(self):
+        client = LLMClient(model="gemini-test")
+
+        client.generate("Short prefix. chunk", QACard, static_prefix="Short prefix. ")
+        client.generate("chunk without the prefix", QACard, static_prefix=PREFIX)
+
+        assert client.client.cached_contents == {}
+        assert [cached for _, cached in client.client.requests] == [None, None]
+
+    def test_ttl_refresh_and_expiry(self):
+        client = LLMClient(model="gemini-test")
+        context_cache = structured_gemini.get_model_resources("gemini-test").context_cache
+        now = [0.0]
+        context_cache.clock = lambda: now[0]
+
+        client.generate(PREFIX + "a", QACard, static_prefix=PREFIX)
+        now[0] = context_cache.ttl * 0.9  # inside the refresh window: TTL extended
+        client.generate(PREFIX + "b", QACard, static_prefix=PREFIX)
+        now[0] += context_cache.ttl + 1  # expired: created again
+        client.generate(PREFIX + "c", QACard, static_prefix=PREFIX)
+
+        assert client.client.cache_updates == 1
+        assert len(client.client.cached_contents) == 2
+        assert client.client.requests[-1] == ("c", "cachedContents/1")
+
+    def test_refused_prefix_falls_back_inline(self):
+        client = LLMClient(model="gemini-test")
+        attempts = []
+
+        def refuse(model, config):
+            attempts.append(model)
+            raise errors.ClientError(400, {"error": {"message": "cached content is too small", "status": "INVALID_ARGUMENT"}})
+
+        client.client.caches.create = refuse
+        client.generate(PREFIX + "a", QACard, static_prefix=PREFIX)
+        client.generate(PREFIX + "b", QACard, static_prefix=PREFIX)
+
+        assert client.client.requests == [(PREFIX + "a", None), (PREFIX + "b", None)]
+        assert len(attempts) == 1
+
+    def test_transient_failure_is_retried_later(self):
+        client = LLMClient(model="gemini-test")
+        context_cache = structured_gemini.get_model_resources("gemini-test").context_cache
+        now = [0.0]
+        context_cache.clock = lambda: now[0]
+        create = client.client.caches.create
+
+        def quota_exceeded(model, config):
+            raise errors.ClientError(429, {"error": {"message": "quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+
+        client.client.caches.create = quota_exceeded
+        client.generate(PREFIX + "a", QACard, static_prefix=PREFIX)
+        client.client.caches.create = create
+        client.generate(PREFIX + "b", QACard, static_prefix=PREFIX)
+        now[0] = structured_gemini.CONTEXT_CACHE_RETRY_DELAY + 1
+        client.generate(PREFIX + "c", QACard, static_prefix=PREFIX)
+
+        assert client.client.requests == [(PREFIX + "a", None), (PREFIX + "b", None), ("c", "cachedContents/0")]
+
+    def test_upload_does_not_block_other_threads(self):
+        client = LLMClient(model="gemini-test")
+        context_cache = structured_gemini.get_model_resources("gemini-test").context_cache
+        started, release = threading.Event(), threading.Event()
+        create = client.client.caches.create
+
+        def slow_create(model, config):
+            started.set()
+            release.wait(5)
+            return create(model, config)
+
+        client.client.caches.create = slow_create
+        uploader = threading.Thread(target=context_cache.handle, args=(PREFIX,))
+        uploader.start()
+        started.wait(5)
+        start = time.monotonic()
+        # Another thread sends the prefix inline instead of waiting for the upload
+        assert context_cache.handle(PREFIX) is None
+        assert time.monotonic() - start < 1
+        release.set()
+        uploader.join()
+
+        assert context_cache.handle(PREFIX) == "cachedContents/0"
+
+    def test_usage_reports_cached_tokens(self):
+        inline = LLMClient(model="gemini-inline")
+        cached = LLMClient(model="gemini-cached")
+
+        for i in range(5):
+            inline.generate(PREFIX + f"chunk {i}", QACard)
+            cached.generate(PREFIX + f"chunk {i}", QACard, static_prefix=PREFIX)
+
+        inline_usage = structured_gemini.get_model_resources("gemini-inline").usage
+        cached_usage = structured_gemini.get_model_resources("gemini-cached").usage
+        assert inline_usage.prompt_tokens == cached_usage.prompt_tokens
+        assert cached_usage.cached_tokens == 5 * (len(PREFIX) // 4)
+        assert cached_usage.billed_input_tokens < 0.3 * inline_usage.billed_input_tokens
+        assert "from cached contexts" in cached_usage.summary()
+
+
+class TestTelemetry:
+    """Every generate call is recorded with its stage, tokens, retries and cache hit."""
+
+    @pytest.fixture
+    def run_telemetry(self, monkeypatch):
+        run_telemetry = Telemetry()
+        monkeypatch.setattr(structured_gemini, "telemetry", run_telemetry)
+        monkeypatch.setattr(cache_module, "telemetry", run_telemetry)
+        monkeypatch.setattr(cache_module, "PROMPT_TEMPLATES", {})
+        monkeypatch.setattr(LLMClient._generate_with_retry.retry, "wait", wait_fixed(0))
+        return run_telemetry
+
+    def test_api_call_retry_and_cache_hit(self, run_telemetry):
+        client = LLMClient(model="gemini-2.5-flash")
+        generate_content = client.client.models.generate_content
+        failures = iter([structured_gemini.errors.ServerError(503, {"error": {"message": "busy"}})])
+
+        def flaky(**kwargs):
+            error = next(failures, None)
+            if error is not None:
+                raise error
+            return generate_content(**kwargs)
+
+        client.client.models.generate_content = flaky
+        prompt = PromptTemplate("review", 1).prompt("Review this card", card="bpe")
+
+        client.generate(prompt, QACard)
+        client.generate(prompt, QACard)
+
+        api_call, hit = run_telemetry.calls
+        assert (api_call.stage, api_call.cache_hit, api_call.retries) == ("review", False, 1)
+        assert api_call.input_tokens == len("Review this card") // 4 and api_call.cost > 0
+        assert (hit.stage, hit.cache_hit, hit.attempts, hit.cost) == ("review", True, 0, 0)
+        assert run_telemetry.totals("stage")["review"].cache_hits == 1
+
+    def test_failed_call_is_recorded(self, run_telemetry, monkeypatch):
+        monkeypatch.setattr(LLMClient._generate_with_retry.retry, "stop", stop_after_attempt(2))
+        client = LLMClient(model="gemini-test")
+
+        def failing(**kwargs):
+            raise structured_gemini.errors.ServerError(503, {"error": {"message": "busy"}})
+
+        client.client.models.generate_content = failing
+
+        with pytest.raises(structured_gemini.errors.ServerError):
+            client.generate("plain prompt", str)
+
+        (call,) = run_telemetry.calls
+        assert call.stage == "other" and call.attempts == 2 and "ServerError" in call.error
@@ -0,0 +1,129 @@
+"""
+Tests for the SLP3 PDF fetcher.
+
+Serves generated PDFs from a local HTTP server that honours If-None-Match,
+and checks concurrent downloads, conditional re-fetching and that the
+page-parallel extraction matches concatenating page.get_text().
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import fitz  # PyMuPDF
+import pytest
+
+from src.fetch_data import fetch_jurafsky_slp3
+from src.fetch_data.fetch_jurafsky_slp3 import extract_text, fetch_all_slp3_content
+
+
+def make_pdf(path, pages: int, label: str):
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 100), f"{label} page {page_number}", fontsize=11)
+        page.insert_text((72, 120), f"attention weights of token {page_number}", fontsize=11)
+    doc.save(path)
+
+
+class ETagHandler(SimpleHTTPRequestHandler):
+    """Static file handler with ETags; records the paths of 200 responses."""
+
+    downloads = []
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.downloads.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def pdf_server(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    for i, pages in enumerate((3, 20, 1), 2):
+        make_pdf(served / f"{i}.pdf", pages, f"chapter {i}")
+
+    ETagHandler.downloads = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(ETagHandler, directory=str(served)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield served, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(tmp_path, base_url, names=(2, 3, 4), **kwargs):
+    urls = {f"chapter_{i}": f"{base_url}{i}.pdf" for i in names}
+    return fetch_all_slp3_content(urls, tmp_path / "pdf", tmp_path / "txt", max_workers=3, extraction_workers=2, **kwargs)
+
+
+class TestExtractText:
+    """Page-range extraction is identical to the sequential page loop."""
+
+    def test_matches_sequential_extraction(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(fetch_jurafsky_slp3, "PAGES_PER_TASK", 3)
+        path = tmp_path / "book.pdf"
+        make_pdf(path, 10, "book")
+        with fitz.open(path) as doc:
+            expected = "".join(page.get_text() for page in doc)
+
+        assert extract_text(path) == expected
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            assert extract_text(path, executor) == expected
+
+
+class TestFetchAll:
+    """Concurrent download with conditional GET against a local server."""
+
+    def test_downloads_and_extracts_all_chapters(self, tmp_path, pdf_server):
+        _, base_url = pdf_server
+        texts = fetch(tmp_path, base_url)
+
+        assert list(texts) == ["chapter_2", "chapter_3", "chapter_4"]
+        assert "chapter 3 page 19" in texts["chapter_3"]
+        assert (tmp_path / "txt" / "chapter_3.txt").read_text(encoding="utf-8") == texts["chapter_3"]
+        assert (tmp_path / "pdf" / "chapter_3.pdf.meta.json").exists()
+        assert sorted(ETagHandler.downloads) == ["/2.pdf", "/3.pdf", "/4.pdf"]
+
+    def test_rerun_downloads_only_changed_pdfs(self, tmp_path, pdf_server):
+        served, base_url = pdf_server
+        fetch(tmp_path, base_url)
+        make_pdf(served / "3.pdf", 5, "revised chapter 3")
+        ETagHandler.downloads = []
+
+        texts = fetch(tmp_path, base_url)
+
+        assert ETagHandler.downloads == ["/3.pdf"]
+        assert "revised chapter 3 page 4" in texts["chapter_3"]
+        assert "chapter 2 page 2" in texts["chapter_2"]
+
+    def test_missing_pdf_is_skipped(self, tmp_path, pdf_server):
+        _, base_url = pdf_server
+        texts = fetch(tmp_path, base_url, names=(2, 99))
+
+        assert list(texts) == ["chapter_2"]
+        assert not (tmp_path / "pdf" / "chapter_99.pdf").exists()
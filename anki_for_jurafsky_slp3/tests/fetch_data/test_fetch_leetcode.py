@@ -0,0 +1,96 @@
+"""
+Tests for the targeted LeetCode problem fetcher.
+
+A fake GraphQL API serves a paged problem list and problem details and counts
+requests, so no network access or LeetCode session is needed.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.fetch_data import fetch_leetcode
+from src.fetch_data.fetch_leetcode import LeetcodeProblemFetcher
+from src.utils.rate_limiter import RateLimiter
+
+
+def question(problem_id: int, title: str | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        question_frontend_id=str(problem_id),
+        title=title or f"Problem {problem_id}",
+        title_slug=f"problem-{problem_id}",
+        category_title="Algorithms",
+        content=f"<p>Statement of problem {problem_id}</p>",
+        is_paid_only=False,
+        difficulty="Medium",
+        topic_tags=[SimpleNamespace(name="Array", slug="array")],
+    )
+
+
+class FakeLeetcodeApi:
+    """Serves problemsetQuestionList pages and getQuestionDetail from a dict of questions."""
+
+    def __init__(self, count: int):
+        self.questions = {f"problem-{i}": question(i) for i in range(1, count + 1)}
+        self.lock = threading.Lock()
+        self.list_requests = 0
+        self.detail_requests = []
+
+    def graphql_post(self, body):
+        variables = body.variables
+        with self.lock:
+            if body.operation_name == "getQuestionDetail":
+                self.detail_requests.append(variables.title_slug)
+                return SimpleNamespace(data=SimpleNamespace(question=self.questions.get(variables.title_slug)))
+            self.list_requests += 1
+        questions = list(self.questions.values())[variables.skip : variables.skip + variables.limit]
+        page = SimpleNamespace(total_num=len(self.questions), questions=questions)
+        return SimpleNamespace(data=SimpleNamespace(problemset_question_list=page))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(fetch_leetcode, "INDEX_PAGE_SIZE", 10)
+    return FakeLeetcodeApi(count=35)
+
+
+def make_fetcher(api, tmp_path, **kwargs):
+    return LeetcodeProblemFetcher(api, cache_dir=str(tmp_path), rate_limiter=RateLimiter(), **kwargs)
+
+
+class TestTargetedFetch:
+    """Only the requested problems are downloaded, by ID or slug."""
+
+    def test_fetch_by_id_and_slug(self, api, tmp_path):
+        fetcher = make_fetcher(api, tmp_path)
+
+        problems = fetcher.fetch(["12", "problem-3", "999"])
+
+        assert [problem.problem_id for problem in problems] == ["12", "3"]
+        assert problems[0].tags == ["array", "difficulty-medium-tag"]
+        assert sorted(api.detail_requests) == ["problem-12", "problem-3"]
+        assert api.list_requests == 4
+
+    def test_refresh_downloads_only_changed_problems(self, api, tmp_path):
+        make_fetcher(api, tmp_path).fetch(["1", "2", "3"])
+        api.detail_requests.clear()
+        api.questions["problem-2"] = question(2, title="Renamed problem")
+
+        fetcher = make_fetcher(api, tmp_path)
+        unchanged = fetcher.fetch(["1", "2", "3"])
+        assert api.detail_requests == [] and fetcher.reused == 3
+
+        refreshed = make_fetcher(api, tmp_path).fetch(["1", "2", "3"], refresh_index=True)
+        assert api.detail_requests == ["problem-2"]
+        assert [problem.title for problem in refreshed] == ["Problem 1", "Renamed problem", "Problem 3"]
+        assert unchanged[1].title == "Problem 2"
+
+    def test_expired_problems_are_downloaded_again(self, api, tmp_path):
+        make_fetcher(api, tmp_path, ttl=0.1).fetch(["1"])
+        time.sleep(0.2)
+
+        make_fetcher(api, tmp_path, ttl=0.1).fetch(["1"])
+
+        assert api.detail_requests == ["problem-1", "problem-1"]
@@ -0,0 +1,82 @@
+"""
+Tests for layout-aware PDF extraction.
+
+Builds a small PDF shaped like an SLP3 chapter (running headers, page-number
+footers, sized headings, hyphenated line wraps) and checks the markdown.
+"""
+
+import fitz  # PyMuPDF
+import pytest
+
+from src.fetch_data.pdf_layout import compare_with_cleaned, extract_layout_markdown
+
+
+@pytest.fixture
+def chapter_pdf(tmp_path):
+    doc = fitz.open()
+    for page_number in range(1, 5):
+        page = doc.new_page()
+        header = "CHAPTER 8 • TRANSFORMERS" if page_number % 2 == 0 else "8.1 • ATTENTION"
+        page.insert_text((72, 40), f"{page_number} {header}", fontsize=9)
+        page.insert_text((300, 815), str(page_number), fontsize=9)
+
+        y = 100
+        if page_number == 1:
+            page.insert_text((72, y), "Transformers", fontsize=20)
+            y += 40
+        if page_number in (1, 3):
+            page.insert_text((72, y), f"8.{page_number} Attention part {page_number}", fontsize=14)
+            y += 30
+        lines = [
+            f"Page {page_number} explains how the atten-",
+            "tion weights are computed from queries",
+            "and keys of every token.",
+        ]
+        for line in lines:
+            page.insert_text((72, y), line, fontsize=10)
+            y += 13
+        if page_number == 2:
+            page.insert_text((72, 780), "This paragraph continues on the", fontsize=10)
+        if page_number == 3:
+            # Continuation line at the top of the next page, in its own text block
+            page.insert_text((72, 85), "following page without a break.", fontsize=10)
+
+    path = tmp_path / "chapter_8.pdf"
+    doc.save(path)
+    return path
+
+
+class TestExtractLayoutMarkdown:
+    """Header/footer removal, line rejoining and headings."""
+
+    def test_removes_running_headers_and_page_numbers(self, chapter_pdf):
+        text = extract_layout_markdown(chapter_pdf)
+
+        assert "TRANSFORMERS" not in text and "• ATTENTION" not in text
+        assert not any(line.strip().isdigit() for line in text.splitlines())
+
+    def test_rejoins_lines_and_dehyphenates(self, chapter_pdf):
+        text = extract_layout_markdown(chapter_pdf)
+
+        assert "Page 1 explains how the attention weights are computed from queries and keys of every token." in text
+        assert "continues on the following page without a break." in text
+
+    def test_headings_from_font_sizes(self, chapter_pdf):
+        text = extract_layout_markdown(chapter_pdf)
+
+        assert "# Transformers" in text.splitlines()
+        assert "## 8.1 Attention part 1" in text.splitlines()
+        assert "## 8.3 Attention part 3" in text.splitlines()
+
+
+class TestCompareWithCleaned:
+    """Shingle comparison against LLM-cleaned text."""
+
+    def test_identical_and_disjoint(self):
+        text = "# Title\n\nthe attention weights are computed from queries and keys of every token"
+        same = compare_with_cleaned(text, text)
+        other = compare_with_cleaned(text, "completely different words appear in this cleaned reference text")
+
+        assert same["recall"] == 1.0 and same["precision"] == 1.0
+        assert same["layout_headings"] == 1
+        assert other["recall"] == 0.0
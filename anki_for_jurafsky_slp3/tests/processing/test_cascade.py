@@ -0,0 +1,70 @@
+"""
+Tests for the fix_content cascade validators.
+
+Each validator must flag its kind of broken fast-model output and accept
+well-formed cards, including cloze deletions containing MathJax.
+"""
+
+from src.models.cards import ClozeCard, EnumerationCard, QACard
+from src.processing.cascade import (
+    CascadeRecord,
+    CascadeStats,
+    cloze_errors,
+    estimate_cost,
+    mathjax_errors,
+    validate_fixed_card,
+)
+
+
+def cloze(text: str) -> ClozeCard:
+    return ClozeCard(type="Cloze", text=text)
+
+
+class TestValidators:
+    """Single checks on card text."""
+
+    def test_cloze_errors(self):
+        assert cloze_errors("Attention uses a {{c1::softmax}} over {{c2::scores}}.") == []
+        assert cloze_errors("Attention uses a softmax.") == ["no cloze deletion"]
+        assert "malformed cloze opener" in cloze_errors("A {{c1:softmax}} and {{c2::scores}}.")
+        assert "unterminated cloze deletion" in cloze_errors("A {{c1::softmax}} and {{c2::scores.")
+
+    def test_mathjax_errors(self):
+        assert mathjax_errors(r"Scores are \( \frac{QK^T}{\sqrt{d_k}} \) and \[ x_{i} \]") == []
+        assert mathjax_errors(r"Literal braces \( \{a\} \) are fine") == []
+        assert mathjax_errors(r"Missing \( \frac{a}{b} end") == ["unbalanced MathJax delimiters"]
+        assert mathjax_errors(r"Broken \( \frac{a}{b \)") == ["unbalanced braces in math"]
+
+    def test_accepts_small_edit(self):
+        original = cloze(r"The attention weights are {{c1::\( \text{softmax}(QK^T) \)}}.")
+        fixed = cloze(r"The attention weights are {{c1::\( \text{softmax}(QK^T / \sqrt{d_k}) \)}}.")
+        assert validate_fixed_card(original, fixed) == []
+
+    def test_flags_schema_and_semantic_drift(self):
+        original = QACard(type="Q&A", q="Why scale dot products in attention?", a="To keep the softmax gradients stable.")
+
+        assert validate_fixed_card(original, cloze("Dot products are {{c1::scaled}}.")) == [
+            "schema drift: card type changed"
+        ]
+        assert "schema drift: empty field" in validate_fixed_card(original, QACard(type="Q&A", q=original.q, a=" "))
+        unrelated = QACard(type="Q&A", q="What is beam search?", a="A decoding algorithm keeping k hypotheses.")
+        assert validate_fixed_card(original, unrelated) == ["semantic drift"]
+
+    def test_flags_empty_enumeration(self):
+        original = EnumerationCard(type="Enumeration", prompt="Name the LSTM gates", items=["input", "forget", "output"])
+        fixed = EnumerationCard(type="Enumeration", prompt="Name the LSTM gates", items=[])
+        assert "schema drift: empty field" in validate_fixed_card(original, fixed)
+
+
+class TestCascadeStats:
+    """Escalation rate and cost summary."""
+
+    def test_summary(self):
+        stats = CascadeStats()
+        stats.add(CascadeRecord(escalated=False, issues=[], latency=1.0, cost=0.001))
+        stats.add(CascadeRecord(escalated=True, issues=["semantic drift"], latency=3.0, cost=0.004))
+
+        assert stats.escalation_rate == 0.5
+        assert "1/2 cards on gemini-2.5-flash, 1 escalated to gemini-2.5-pro (50%)" in stats.summary()
+        assert "mean latency 2.0s" in stats.summary()
+        assert estimate_cost("gemini-2.5-pro", 4000, 400) > estimate_cost("gemini-2.5-flash", 4000, 400)
@@ -0,0 +1,81 @@
+"""
+Tests for near-duplicate card detection.
+
+Checks text normalization, that the MinHash/LSH candidates find the pairs an
+exhaustive Jaccard comparison finds, representative choice and the index kept
+across batches.
+"""
+
+import itertools
+import random
+
+from src.models.cards import ClozeCard, EnumerationCard, QACard
+from src.processing.dedup import CardDeduplicator, card_text, jaccard, shingles
+
+
+def qa(q: str, a: str) -> QACard:
+    return QACard(type="Q&A", q=q, a=a)
+
+
+class TestCardText:
+    """Normalization of the different card types."""
+
+    def test_strips_cloze_markup_and_punctuation(self):
+        card = ClozeCard(type="Cloze", text="The {{c1::softmax::function}} turns scores into {{c2::probabilities}}.")
+        assert card_text(card) == "the softmax turns scores into probabilities"
+
+    def test_enumeration_includes_items(self):
+        card = EnumerationCard(type="Enumeration", prompt="Name the gates of an LSTM", items=["Input", "Forget"])
+        assert card_text(card) == "name the gates of an lstm input forget"
+
+
+class TestCardDeduplicator:
+    """Clustering within a batch and against previously kept cards."""
+
+    def test_finds_all_pairs_above_threshold(self):
+        rng = random.Random(0)
+        words = "attention token vector layer softmax weight corpus grammar decoder encoder head query key".split()
+        base = [" ".join(rng.choice(words) for _ in range(15)) for _ in range(20)]
+        cards = []
+        for text in base:
+            cards.append(qa(text, "answer"))
+            words_copy = text.split()
+            words_copy[rng.randrange(len(words_copy))] = "changed"
+            cards.append(qa(" ".join(words_copy), "answer"))
+
+        kept, duplicates = CardDeduplicator(threshold=0.7).deduplicate(cards)
+
+        # Every exhaustively found pair ends up with at most one card kept
+        sets = [shingles(card_text(card)) for card in cards]
+        for i, j in itertools.combinations(range(len(cards)), 2):
+            if jaccard(sets[i], sets[j]) >= 0.7:
+                assert not (i in kept and j in kept)
+        assert len(kept) + len(duplicates) == len(cards)
+
+    def test_keeps_medoid_of_cluster(self):
+        cards = [
+            qa("What does attention compute over the input tokens?", "Weighted sum of values"),
+            qa("What does attention compute over all the input tokens?", "A weighted sum of values"),
+            qa("What does attention compute over the input tokens?", "A weighted sum of values"),
+            qa("Why use layer normalization?", "Stabilizes training"),
+        ]
+        kept, duplicates = CardDeduplicator(threshold=0.6).deduplicate(cards)
+
+        assert kept == [2, 3]
+        assert sorted(duplicate.index for duplicate in duplicates) == [0, 1]
+
+    def test_drops_cards_kept_in_earlier_batch(self):
+        deduplicator = CardDeduplicator()
+        first = [qa("What is byte pair encoding?", "A subword tokenization algorithm")]
+        second = [
+            qa("What is byte pair encoding?", "A subword tokenization algorithm."),
+            qa("What is a language model?", "A distribution over word sequences"),
+        ]
+
+        assert deduplicator.deduplicate(first)[0] == [0]
+        kept, duplicates = deduplicator.deduplicate(second)
+
+        assert kept == [1]
+        assert duplicates[0].kept == "what is byte pair encoding a subword tokenization algorithm"
+        assert (deduplicator.duplicates_within, deduplicator.duplicates_across) == (0, 1)
+        assert deduplicator.duplicates_removed == 1
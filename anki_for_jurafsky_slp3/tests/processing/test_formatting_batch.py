@@ -0,0 +1,107 @@
+"""
+Tests for batched card formatting.
+
+A fake LLM client (cached like LLMClient.generate) formats a batch of cards in one call, with one item of the
+wrong type and one missing, to check ID matching, individual retries, the
+per-card cache and the local fallback when a retry fails.
+"""
+
+import json
+import re
+
+import pytest
+
+from src.models.cards import ClozeCard, IndexedCard, IndexedCards, QACard
+from src.processing import atomic_chunker
+from src.processing.atomic_chunker import fix_formatting_batch, formatting_prompt
+from src.utils import cache as cache_module
+
+
+class DictCache(dict):
+    def set(self, key, value, tag=None):
+        self[key] = value
+
+
+class FakeFormatter:
+    """Formats cards by bolding the question; the batch answer drops id 2 and breaks id 1."""
+
+    calls = []
+
+    def __init__(self, model=None):
+        self.model = model
+
+    @cache_module.disk_cache
+    def generate(self, text, schema):
+        FakeFormatter.calls.append("batch" if schema is IndexedCards else "single")
+        if schema is IndexedCards:
+            batch = IndexedCards.model_validate_json(re.search(r"<Input Cards>\n(.*)\n</Input Cards>", text).group(1))
+            items = []
+            for item in batch.cards:
+                if item.id == 1:
+                    items.append(IndexedCard(id=1, card=ClozeCard(type="Cloze", text="{{c1::wrong}}")))
+                elif item.id != 2:
+                    items.append(IndexedCard(id=item.id, card=self._format(item.card)))
+            return IndexedCards(cards=items)
+        card = QACard(**json.loads(re.search(r"<Input Card>\n(.*)\n</Input Card>", text).group(1)))
+        return self._format(card)
+
+    @staticmethod
+    def _format(card):
+        return QACard(type="Q&A", q=f"<b>{card.q}</b>", a=card.a)
+
+
+@pytest.fixture
+def formatter(monkeypatch):
+    FakeFormatter.calls = []
+    monkeypatch.setattr(cache_module, "cache", DictCache())
+    monkeypatch.setattr(atomic_chunker, "LLMClient", FakeFormatter)
+    return FakeFormatter
+
+
+def cards(n: int):
+    return [QACard(type="Q&A", q=f"What is concept {i}?", a=f"Concept {i} is explained here.") for i in range(n)]
+
+
+class TestFixFormattingBatch:
+    """One call per batch, individual retries, per-card cache."""
+
+    def test_formats_batch_and_retries_bad_items(self, formatter):
+        formatted = fix_formatting_batch(cards(5))
+
+        assert [card.q for card in formatted] == [f"<b>What is concept {i}?</b>" for i in range(5)]
+        # One batch call, then single calls for the wrong-type and the missing item
+        assert formatter.calls == ["batch", "single", "single"]
+
+    def test_cards_are_cached_individually(self, formatter):
+        fix_formatting_batch(cards(5))
+        formatter.calls = []
+
+        # Cached cards are not sent again; only the new one is in the batch
+        formatted = fix_formatting_batch(cards(6))
+
+        assert formatter.calls == ["batch"]
+        assert formatted[5].q == "<b>What is concept 5?</b>"
+        prompt = formatting_prompt(cards(6)[3])
+        hit, cached = cache_module.get_cached("gemini-2.5-flash-lite", prompt, atomic_chunker.CardType)
+        assert hit and cached.q == "<b>What is concept 3?</b>"
+
+    def test_failed_single_call_keeps_locally_cleaned_card(self, formatter, monkeypatch):
+        class FailingFormatter(FakeFormatter):
+            def generate(self, text, schema):
+                if schema is not IndexedCards and "concept 2" in text:
+                    FakeFormatter.calls.append("single failed")
+                    raise RuntimeError("quota exceeded")
+                return super().generate(text, schema)
+
+        monkeypatch.setattr(atomic_chunker, "LLMClient", FailingFormatter)
+        batch = cards(4)
+        batch[2].a = "If a < b then"
+
+        formatted = fix_formatting_batch(batch)
+
+        assert formatter.calls == ["batch", "single", "single failed"]
+        assert formatted[2].q == "What is concept 2?"
+        assert formatted[2].a == atomic_chunker.clean_anki_text("If a < b then")
+        assert formatted[3].q == "<b>What is concept 3?</b>"
+        hit, _ = cache_module.get_cached("gemini-2.5-flash-lite", formatting_prompt(cards(4)[2]), atomic_chunker.CardType)
+        assert not hit
@@ -0,0 +1,141 @@
+"""
+Tests for concurrent LeetCode card generation.
+
+create_leetcode_card is replaced by a fake, so no LLM is called. Checks that
+cards are generated concurrently, checkpointed one line each, retried in a
+later pass when they fail, skipped on resume, and returned ordered by
+problem ID.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.models.leetcode_cards import FetchedLeetcodeProblem, LeetcodeCard
+from src.processing import leetcode_card_creation
+from src.processing.leetcode_card_creation import process_leetcode_problems
+
+
+def make_problem(problem_id: int) -> FetchedLeetcodeProblem:
+    return FetchedLeetcodeProblem(
+        slug=f"problem-{problem_id}",
+        title=f"Problem {problem_id}",
+        problem_id=str(problem_id),
+        description=f"Description of problem {problem_id}",
+        difficulty="Easy",
+        category="Algorithms",
+        tags=["Array"],
+    )
+
+
+class FakeCardCreator:
+    """Stand-in for create_leetcode_card that tracks concurrency and fails on demand."""
+
+    def __init__(self, latency: float = 0.0, failures: dict | None = None):
+        self.latency = latency
+        # Problem title -> number of calls that fail before one succeeds
+        self.failures = dict(failures or {})
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, problem_text: str) -> LeetcodeCard:
+        title = problem_text.strip().splitlines()[0]
+        with self._lock:
+            self.calls.append(title)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            with self._lock:
+                if self.failures.get(title, 0) > 0:
+                    self.failures[title] -= 1
+                    raise RuntimeError(f"injected failure for {title}")
+            return LeetcodeCard(problem_description=title, solutions=[])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def fake_creator(monkeypatch):
+    def install(**kwargs) -> FakeCardCreator:
+        creator = FakeCardCreator(**kwargs)
+        monkeypatch.setattr(leetcode_card_creation, "create_leetcode_card", creator)
+        return creator
+
+    return install
+
+
+class TestProcessLeetcodeProblems:
+    def test_generates_concurrently_ordered_by_problem_id(self, fake_creator, tmp_path):
+        creator = fake_creator(latency=0.05)
+        problems = [make_problem(problem_id) for problem_id in (42, 3, 121, 1, 20, 7)]
+
+        cards = process_leetcode_problems(problems, max_concurrency=3, checkpoint_path=tmp_path / "cards.jsonl")
+
+        assert list(cards) == [f"problem-{problem_id}" for problem_id in (1, 3, 7, 20, 42, 121)]
+        assert cards["problem-42"].problem_description == "42. Problem 42"
+        assert 1 < creator.max_active <= 3
+
+    def test_checkpoints_every_card(self, fake_creator, tmp_path):
+        fake_creator()
+        checkpoint_path = tmp_path / "cards.jsonl"
+
+        process_leetcode_problems([make_problem(problem_id) for problem_id in range(1, 6)], checkpoint_path=checkpoint_path)
+
+        records = [json.loads(line) for line in checkpoint_path.read_text(encoding="utf-8").splitlines()]
+        assert len(records) == 5
+        assert {record["stage"] for record in records} == {"card"}
+        assert {record["data"]["problem_description"] for record in records} == {
+            f"{problem_id}. Problem {problem_id}" for problem_id in range(1, 6)
+        }
+
+    def test_failures_are_retried_in_a_later_pass(self, fake_creator):
+        creator = fake_creator(failures={"2. Problem 2": 1, "4. Problem 4": 5})
+        problems = [make_problem(problem_id) for problem_id in range(1, 5)]
+
+        cards = process_leetcode_problems(problems, retry_passes=2, retry_delay=0)
+
+        assert list(cards) == ["problem-1", "problem-2", "problem-3"]
+        assert creator.calls.count("2. Problem 2") == 2
+        assert creator.calls.count("4. Problem 4") == 3
+
+    def test_resume_skips_checkpointed_cards(self, fake_creator, tmp_path):
+        checkpoint_path = tmp_path / "cards.jsonl"
+        problems = [make_problem(problem_id) for problem_id in range(1, 5)]
+        # An interrupted run: problem 3 never finished
+        fake_creator(failures={"3. Problem 3": 1})
+        process_leetcode_problems(problems, checkpoint_path=checkpoint_path, retry_passes=0)
+
+        creator = fake_creator()
+        cards = process_leetcode_problems(problems, checkpoint_path=checkpoint_path, resume=True)
+
+        assert creator.calls == ["3. Problem 3"]
+        assert list(cards) == [f"problem-{problem_id}" for problem_id in range(1, 5)]
+        assert len(checkpoint_path.read_text(encoding="utf-8").splitlines()) == 4
+
+    def test_without_resume_the_checkpoint_is_discarded(self, fake_creator, tmp_path):
+        checkpoint_path = tmp_path / "cards.jsonl"
+        problems = [make_problem(problem_id) for problem_id in range(1, 3)]
+        fake_creator()
+        process_leetcode_problems(problems, checkpoint_path=checkpoint_path)
+
+        creator = fake_creator()
+        process_leetcode_problems(problems, checkpoint_path=checkpoint_path)
+
+        assert len(creator.calls) == 2
+
+    def test_edited_problem_is_regenerated_on_resume(self, fake_creator, tmp_path):
+        checkpoint_path = tmp_path / "cards.jsonl"
+        fake_creator()
+        process_leetcode_problems([make_problem(1)], checkpoint_path=checkpoint_path)
+
+        edited = make_problem(1).model_copy(update={"description": "New constraints"})
+        creator = fake_creator()
+        process_leetcode_problems([edited], checkpoint_path=checkpoint_path, resume=True)
+
+        assert creator.calls == ["1. Problem 1"]
@@ -0,0 +1,124 @@
+"""
+Tests for the chunk merger.
+
+Checks that the k-gram anchor search agrees with SequenceMatcher, that the
+banded edit distance matches full Levenshtein inside its band, and that
+merging split chunks reconstructs the text without calling the LLM.
+"""
+
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from src.processing import merger
+from src.processing.merger import banded_edit_distance, find_longest_anchor, merge_chunks, merge_overlapping_chunks
+from src.processing.splitter import split_to_chunks
+
+
+def levenshtein_to_prefix(a: str, b: str) -> int:
+    """Reference: edit distance between a and the best prefix of b (full DP)."""
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j - 1] + (a[i - 1] != b[j - 1]), previous[j] + 1, current[j - 1] + 1)
+        previous = current
+    return min(previous)
+
+
+def random_text(rng: random.Random, length: int, alphabet: str = "abcd ") -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    calls = []
+
+    def fake_llm_merge(overlap1, overlap2):
+        calls.append((overlap1, overlap2))
+        return overlap1
+
+    monkeypatch.setattr(merger, "_llm_merge_overlap", fake_llm_merge)
+    return calls
+
+
+class TestAnchorSearch:
+    """find_longest_anchor must pick the same block as SequenceMatcher."""
+
+    def test_matches_sequence_matcher(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            shared = random_text(rng, rng.randint(20, 60))
+            a = random_text(rng, rng.randint(0, 150)) + shared + random_text(rng, rng.randint(0, 150))
+            b = random_text(rng, rng.randint(0, 150)) + shared + random_text(rng, rng.randint(0, 150))
+
+            expected = SequenceMatcher(None, a, b, autojunk=False).find_longest_match(0, len(a), 0, len(b))
+            anchor = find_longest_anchor(a, b)
+
+            assert (anchor.a, anchor.b, anchor.size) == (expected.a, expected.b, expected.size)
+
+    def test_no_anchor_below_threshold(self):
+        assert find_longest_anchor("abcdefghij" * 3, "0123456789" * 3).size == 0
+
+
+class TestBandedEditDistance:
+    """Banded DP equals the full DP when the optimal path stays in the band."""
+
+    def test_equals_full_levenshtein(self):
+        rng = random.Random(2)
+        for _ in range(200):
+            a = random_text(rng, rng.randint(0, 40))
+            b = random_text(rng, rng.randint(0, 40))
+            assert banded_edit_distance(a, b, band=40) == levenshtein_to_prefix(a, b)
+
+    def test_small_edits(self):
+        assert banded_edit_distance("the attention layer", "the  attention layr and more", band=4) == 2
+
+    def test_no_alignment_when_b_is_far_shorter(self):
+        assert banded_edit_distance("a" * 100, "a" * 10) == 100
+        assert banded_edit_distance("a" * 100, "", band=4) == 100
+
+
+class TestMergeChunks:
+    """merge_chunks rebuilds split text and avoids the LLM where possible."""
+
+    def test_reconstructs_identical_chunks(self, no_llm):
+        rng = random.Random(3)
+        text = " ".join(random_text(rng, rng.randint(2, 9), "abcdefghijklmnop") for _ in range(5000))
+        chunks = list(split_to_chunks(text, 6000, 3000))
+
+        assert merge_chunks(chunks, 3000) == text
+        assert no_llm == []
+
+    def test_fuzzy_alignment_without_exact_anchor(self, no_llm):
+        words = [f"w{i}" for i in range(60)]
+        chunk1 = "intro text " + " ".join(words)
+        # Cleaner doubled every fourth space: no 20-character exact match remains
+        chunk2 = "".join(word + ("  " if i % 4 == 3 else " ") for i, word in enumerate(words)) + "tail text"
+
+        merged = merge_overlapping_chunks(chunk1, chunk2, len(chunk2))
+
+        assert no_llm == []
+        assert merged.startswith("intro text w0")
+        assert merged.endswith("tail text")
+        assert merged.count("w59") == 1
+
+    def test_llm_fallback_when_alignment_leaves_band(self, no_llm):
+        # The only shared phrase sits 110 characters further into the second overlap
+        rng = random.Random(4)
+        phrase = "shared phrase 16"
+        overlap1 = random_text(rng, 10, "ABCD") + phrase + random_text(rng, 174, "ABCD")
+        overlap2 = random_text(rng, 120, "wxyz") + phrase + random_text(rng, 64, "wxyz")
+
+        merged = merge_overlapping_chunks("intro " + overlap1, overlap2 + " tail", 200)
+
+        assert len(no_llm) == 1
+        assert merged.startswith("intro ")
+        assert merged.endswith(" tail")
+
+    def test_llm_fallback_for_unrelated_overlap(self, no_llm):
+        merged = merge_overlapping_chunks("a" * 50 + "xyz" * 30, "0123456789" * 20, 100)
+
+        assert len(no_llm) == 1
+        assert merged.startswith("a" * 50)
@@ -0,0 +1,92 @@
+"""
+Tests for retrieval-scoped fix_content context.
+
+Checks passage splitting, BM25 ranking, the fallbacks to the full section and
+the token accounting of SourceContextSelector.
+"""
+
+from src.models.cards import ClozeCard, QACard
+from src.processing.retrieval import (
+    BM25Index,
+    SectionRetriever,
+    SourceContextSelector,
+    split_passages,
+    tokenize,
+)
+
+TOPICS = [
+    "Byte pair encoding merges the most frequent pair of adjacent symbols into a new subword token.",
+    "The softmax function turns attention scores into a probability distribution over the values.",
+    "Layer normalization rescales the activations of each token to zero mean and unit variance.",
+    "Residual connections add the input of a sublayer to its output so gradients flow directly.",
+    "Positional embeddings give the transformer information about the order of the tokens.",
+    "Beam search keeps the k most probable partial hypotheses at every decoding step.",
+]
+SECTION = "# 8.1 Transformers\n\n" + "\n\n".join(f"{topic} Filler words about models follow here." for topic in TOPICS)
+
+
+class TestPassages:
+    """Passage splitting and BM25 ranking."""
+
+    def test_splits_long_paragraphs_on_sentences(self):
+        paragraph = " ".join(f"Sentence number {i} is here." for i in range(40))
+        passages = split_passages(f"Short one.\n\n{paragraph}", max_chars=200)
+
+        assert passages[0] == "Short one."
+        assert all(len(passage) <= 200 for passage in passages)
+        assert " ".join(passages[1:]) == paragraph
+
+    def test_bm25_ranks_matching_passage_first(self):
+        index = BM25Index(TOPICS)
+        scores = index.scores(tokenize("How does beam search decode?"))
+
+        assert max(range(len(TOPICS)), key=scores.__getitem__) == 5
+        assert scores[0] == 0
+
+
+class TestSectionRetriever:
+    """Top-k passages with fallback to the full section."""
+
+    def test_selects_relevant_passages_and_heading(self):
+        retriever = SectionRetriever(SECTION, top_k=2)
+        card = QACard(type="Q&A", q="What does the softmax turn attention scores into?", a="A probability distribution.")
+
+        context, full = retriever.context_for(card)
+
+        assert not full
+        assert context.startswith("# 8.1 Transformers")
+        assert "softmax function" in context
+        assert "Beam search" not in context
+        assert len(context) < len(SECTION) / 2
+
+    def test_falls_back_when_terms_are_not_covered(self):
+        retriever = SectionRetriever(SECTION, top_k=1)
+        # Terms spread over four passages: one passage cannot cover them
+        card = ClozeCard(
+            type="Cloze", text="{{c1::Softmax}}, {{c2::residual}} connections, beam search and positional embeddings."
+        )
+
+        context, full = retriever.context_for(card)
+
+        assert full and context == SECTION
+
+    def test_falls_back_for_short_sections_and_unknown_terms(self):
+        short = "# Heading\n\nOne paragraph only."
+        assert SectionRetriever(short).context_for(QACard(type="Q&A", q="paragraph?", a="one"))[1]
+        assert SectionRetriever(SECTION).context_for(QACard(type="Q&A", q="Zebra?", a="Quokka"))[1]
+
+
+class TestSourceContextSelector:
+    """Token accounting over many cards of one section."""
+
+    def test_reports_savings(self):
+        selector = SourceContextSelector(top_k=1)
+        cards = [QACard(type="Q&A", q=f"What is described by: {topic[:40]}?", a="See text.") for topic in TOPICS]
+
+        for card in cards:
+            selector.select(SECTION, card)
+
+        assert len(selector.retrievers) == 1
+        assert selector.stats.cards == 6 and selector.stats.fallbacks == 0
+        assert selector.stats.saved_fraction > 0.6
+        assert "saved, 0/6 cards used the full section" in selector.stats.summary()
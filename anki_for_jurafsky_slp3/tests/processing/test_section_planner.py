@@ -0,0 +1,90 @@
+"""
+Tests for the section planner.
+
+Builds a heading tree of SLP3-like sections and checks breadcrumbs, packing
+of small siblings, splitting of oversized sections and that no content is
+lost.
+"""
+
+import re
+
+from src.processing.section_planner import plan_sections, plan_stats, section_breadcrumbs
+from src.processing.semantic_chunker import split_markdown_into_sections
+from src.processing.splitter import CHARS_PER_TOKEN
+
+CHAPTER = """# 8 Transformers
+
+Transformers are the standard architecture for language models.
+
+## 8.1 Attention
+
+Attention weighs the tokens of the context.
+
+### 8.1.1 Scaled dot product
+
+The dot products are divided by the square root of the dimension.
+
+### 8.1.2 Multi-head attention
+
+Several heads attend in parallel.
+
+## 8.2 Transformer blocks
+
+""" + "\n\n".join(f"Paragraph {i} about residual streams and layer norms in the block." for i in range(60)) + """
+
+## 8.3 Summary
+
+Short.
+"""
+
+
+def paragraphs(text: str) -> set:
+    return {p.strip() for p in re.split(r"\n\s*\n", text) if p.strip() and not p.lstrip().startswith("#")}
+
+
+class TestBreadcrumbs:
+    """Heading tree from section levels."""
+
+    def test_paths(self):
+        sections = split_markdown_into_sections(CHAPTER)
+        breadcrumbs = section_breadcrumbs(sections)
+
+        assert breadcrumbs[3] == ["8 Transformers", "8.1 Attention", "8.1.2 Multi-head attention"]
+        assert breadcrumbs[4] == ["8 Transformers", "8.2 Transformer blocks"]
+
+
+class TestPlanSections:
+    """Packing and splitting under a token budget."""
+
+    def test_packs_small_siblings_and_splits_large_sections(self):
+        sections = split_markdown_into_sections(CHAPTER)
+        requests = plan_sections(sections, max_tokens=300)
+
+        assert all(request.content_chars <= 300 * CHARS_PER_TOKEN for request in requests)
+        # Chapter intro and all of 8.1 fit into one request
+        first = requests[0].render()
+        assert "# 8 Transformers > 8.1 Attention > 8.1.1 Scaled dot product\n\nThe dot products" in first
+        assert "Several heads attend in parallel." in first
+        # 8.2 is split, every part keeps its breadcrumb
+        block_parts = [request for request in requests if "residual streams" in request.render()]
+        assert len(block_parts) > 1
+        assert all(request.render().startswith("# 8 Transformers > 8.2 Transformer blocks") for request in block_parts)
+
+    def test_no_content_lost(self):
+        sections = split_markdown_into_sections(CHAPTER)
+        requests = plan_sections(sections, max_tokens=300)
+
+        planned = set().union(*(paragraphs(request.render()) for request in requests))
+        assert paragraphs(CHAPTER) <= planned
+
+    def test_fewer_calls_than_sections(self):
+        sections = split_markdown_into_sections(CHAPTER)
+        requests = plan_sections(sections)
+        stats = plan_stats(sections, requests)
+
+        # Three sections are under 50 characters and were skipped as separate calls
+        assert stats["section_calls"] == 3
+        assert stats["planned_calls"] == 1
+        # Packed with their siblings they are kept
+        assert "Several heads attend in parallel." in requests[0].render()
+        assert "Short." in requests[0].render()
@@ -0,0 +1,99 @@
+"""
+Tests for the structure-aware chunk splitter.
+
+Uses PyMuPDF-like text (running page headers, numbered headings, hard line
+breaks) to check chunk sizes, cut positions and the characters sent to the
+cleaning LLM compared with fixed windows.
+"""
+
+import random
+
+import pytest
+
+from src.processing import merger
+from src.processing.merger import merge_chunks
+from src.processing.splitter import (
+    CHARS_PER_TOKEN,
+    STRUCTURED_OVERLAP,
+    chunking_stats,
+    find_boundaries,
+    split_to_chunks,
+    split_to_structured_chunks,
+)
+
+
+def pdf_like_chapter(pages: int = 20, seed: int = 0) -> str:
+    """Chapter text shaped like page.get_text() output of an SLP3 PDF."""
+    rng = random.Random(seed)
+    words = "attention model token vector layer softmax weight corpus grammar sequence decoder".split()
+    lines, section = [], 0
+    for page in range(1, pages + 1):
+        lines.append(f"{page}\nCHAPTER 8 • TRANSFORMERS" if page % 2 == 0 else f"8.{section} • ATTENTION")
+        for _ in range(45):
+            if rng.random() < 0.03:
+                section += 1
+                lines.append(f"8.{section}\nSection about {rng.choice(words)}")
+            line = " ".join(rng.choice(words) for _ in range(rng.randint(8, 12)))
+            lines.append(line + ("." if rng.random() < 0.2 else ""))
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    monkeypatch.setattr(merger, "_llm_merge_overlap", lambda overlap1, overlap2: pytest.fail("LLM merge"))
+
+
+class TestBoundaries:
+    """Boundary detection on PyMuPDF text."""
+
+    def test_scores_headings_pages_and_paragraphs(self):
+        text = "intro line\n8.1\nAttention\nfirst sentence.\nnext line\n4\nCHAPTER 8 • TRANSFORMERS\nmore\n"
+        boundaries = find_boundaries(text)
+
+        assert boundaries[text.index("8.1")] == 4
+        assert boundaries[text.index("4\nCHAPTER")] == 3
+        assert boundaries[text.index("next line")] == 2
+        assert boundaries[text.index("more")] == 1
+
+
+class TestStructuredChunks:
+    """split_to_structured_chunks against the fixed-window splitter."""
+
+    def test_chunks_respect_token_budget_and_boundaries(self):
+        text = pdf_like_chapter()
+        chunks = list(split_to_structured_chunks(text, max_tokens=1000))
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 1000 * CHARS_PER_TOKEN for chunk in chunks)
+        position = 0
+        for chunk in chunks[1:]:
+            start = text.index(chunk, position)
+            assert text[start - 1] == "\n", "chunks start at a line"
+            position = start + 1
+        assert text.endswith(chunks[-1])
+
+    def test_halves_characters_sent(self):
+        text = pdf_like_chapter(pages=40)
+
+        structured = chunking_stats(text, list(split_to_structured_chunks(text, max_tokens=1500)))
+        fixed = chunking_stats(text, list(split_to_chunks(text, 6000, 3000)))
+
+        assert structured["ratio"] < 1.15
+        assert fixed["ratio"] > 1.9
+        assert structured["max_chunk_tokens"] <= 1500
+
+    def test_merge_rebuilds_text(self, no_llm, capsys):
+        text = pdf_like_chapter(seed=1)
+        chunks = list(split_to_structured_chunks(text, max_tokens=800))
+
+        assert merge_chunks(chunks, 2 * STRUCTURED_OVERLAP) == text
+
+    def test_short_text_is_single_chunk(self):
+        assert list(split_to_structured_chunks("short text", max_tokens=100)) == ["short text"]
+
+    def test_text_without_line_breaks(self):
+        text = "word " * 3000
+        chunks = list(split_to_structured_chunks(text, max_tokens=500))
+
+        assert all(len(chunk) <= 2000 for chunk in chunks)
+        assert all(chunk.startswith("word") for chunk in chunks)
@@ -0,0 +1,329 @@
+"""
+Tests for the concurrent SLP3 chapter pipeline.
+
+The LLM stages are replaced by slow fakes to check ordering, concurrency
+bounds, that cards are fixed while other sections are still extracting,
+that near-duplicate cards never reach fix_content (earlier chapters keep
+shared cards), the flash → pro cascade, section packing and resuming from
+checkpoints. Tests of per-section behaviour disable packing.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+import slp3_pipeline
+from src.models.cards import QACard
+
+
+class StageRecorder:
+    """Fake LLM stages that sleep and record concurrency and call order."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.events = []
+
+    def _call(self, name: str):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.events.append(name)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+    def clean(self, chapter_name, chunk):
+        self._call("clean")
+        return chunk
+
+    def extract(self, section_text):
+        self._call("extract")
+        if "broken" in section_text:
+            raise ValueError("bad response")
+        heading = section_text.splitlines()[0].lstrip("# ")
+        # Later sections take longer, so fixes of early cards overlap with them
+        time.sleep(self.delay * int(heading.split()[-1]))
+        return [QACard(type="Q&A", q=f"{heading} q{i}", a=f"{heading} a{i}") for i in range(3)]
+
+    def fix_content(self, section_text, card):
+        self._call("fix_content")
+        return QACard(type="Q&A", q=card.q, a=card.a + " fixed")
+
+    def fix_formatting(self, card):
+        self._call("fix_formatting")
+        card.a = card.a + " formatted"
+        return card
+
+
+def chapter_text(section_count: int) -> str:
+    sections = [f"# Section {i}\n\n" + f"Content of section {i}. " * 10 for i in range(1, section_count + 1)]
+    return "\n\n".join(sections)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    stages = StageRecorder()
+    monkeypatch.setattr(slp3_pipeline, "clean_chapter_text", stages.clean)
+    monkeypatch.setattr(slp3_pipeline, "merge_chunks", lambda chunks, overlap: chunks[0])
+    monkeypatch.setattr(slp3_pipeline, "extract_atomic_cards", stages.extract)
+    monkeypatch.setattr(slp3_pipeline, "fix_content", stages.fix_content)
+    monkeypatch.setattr(slp3_pipeline, "fix_formatting", stages.fix_formatting)
+    return stages
+
+
+class TestChapterPipeline:
+    """Test ordering and concurrency of chapter_pipeline."""
+
+    def test_output_keeps_section_and_card_order(self, recorder, tmp_path):
+        cards = slp3_pipeline.chapter_pipeline(
+            chapter_text(4), "chapter_1", data_dir=tmp_path, max_concurrency=8, pack_sections=False
+        )
+
+        expected = [f"Section {s} q{i}" for s in range(1, 5) for i in range(3)]
+        assert [card.q for card in cards] == expected
+        assert all(card.a.endswith(" fixed formatted") for card in cards)
+
+        raw = json.loads((tmp_path / "tmp_fix_cards_step" / "chapter_1_01_raw.json").read_text())
+        content_fixed = json.loads((tmp_path / "tmp_fix_cards_step" / "chapter_1_02_fixed_content_card.json").read_text())
+        assert [card["q"] for card in raw] == expected
+        assert not raw[0]["a"].endswith("fixed")
+        # Snapshot is taken before fix_formatting edits the card in place
+        assert content_fixed[0]["a"] == "Section 1 a0 fixed"
+        assert (tmp_path / "cleaned_txt" / "chapter_1.txt").exists()
+
+    def test_fixes_overlap_with_extraction(self, recorder, tmp_path):
+        slp3_pipeline.chapter_pipeline(
+            chapter_text(4), "chapter_1", data_dir=tmp_path, max_concurrency=8, deduplicate=False, pack_sections=False
+        )
+
+        last_extract = max(i for i, name in enumerate(recorder.events) if name == "extract")
+        first_fix = recorder.events.index("fix_content")
+        assert first_fix < last_extract or recorder.events.count("extract") == 4
+        assert recorder.max_in_flight > 1
+
+    def test_concurrency_is_bounded(self, recorder, tmp_path):
+        slp3_pipeline.chapter_pipeline(
+            chapter_text(6), "chapter_1", data_dir=tmp_path, max_concurrency=3, pack_sections=False
+        )
+        assert recorder.max_in_flight <= 3
+
+    def test_fix_content_gets_whole_section_by_default(self, recorder, monkeypatch, tmp_path):
+        sources = []
+
+        def fix_content(section_text, card):
+            sources.append(section_text)
+            return recorder.fix_content(section_text, card)
+
+        monkeypatch.setattr(slp3_pipeline, "fix_content", fix_content)
+        slp3_pipeline.chapter_pipeline(chapter_text(2), "chapter_1", data_dir=tmp_path, pack_sections=False)
+
+        assert sorted(set(sources)) == [f"# Section {i}\n\n" + (f"Content of section {i}. " * 10).strip() for i in (1, 2)]
+
+    def test_failed_section_is_skipped(self, recorder, tmp_path):
+        text = chapter_text(2) + "\n\n# broken 3\n\n" + "This section cannot be extracted. " * 5
+        cards = slp3_pipeline.chapter_pipeline(text, "chapter_1", data_dir=tmp_path, pack_sections=False)
+        assert len(cards) == 6
+
+
+class TestCreateCardsForChapters:
+    """Test that several chapters run concurrently under one bound."""
+
+    def test_chapters_share_concurrency_bound(self, recorder, tmp_path):
+        (tmp_path / "txt").mkdir()
+        for chapter in (1, 2, 3):
+            (tmp_path / "txt" / f"chapter_{chapter}.txt").write_text(chapter_text(2), encoding="utf-8")
+
+        start = time.monotonic()
+        # Identical chapters: keep their cards to count the calls
+        slp3_pipeline.create_cards_for_chapters(
+            [1, 2, 3], data_dir=tmp_path, max_concurrency=4, deduplicate=False, pack_sections=False
+        )
+        elapsed = time.monotonic() - start
+
+        assert recorder.max_in_flight <= 4
+        for chapter in (1, 2, 3):
+            saved = json.loads((tmp_path / "cards" / f"chapter_{chapter}" / "atomic_cards.json").read_text())
+            assert saved["total_cards"] == 6
+        # 3 chapters x (1 clean + 2 extract + 12 fix calls) would take > 2s sequentially
+        assert elapsed < 1.5
+
+
+class TestDeduplication:
+    """Near-duplicate cards are dropped before fix_content."""
+
+    def test_duplicates_within_chapter_skip_fix_content(self, recorder, monkeypatch, tmp_path):
+        def extract(section_text):
+            recorder._call("extract")
+            return [
+                QACard(type="Q&A", q="What does the softmax in attention normalize?", a="The attention scores per query."),
+                QACard(type="Q&A", q="What does the softmax in attention normalize?", a="The attention scores per query"),
+                QACard(type="Q&A", q=f"What is {section_text.splitlines()[0]} about?", a="A unique topic."),
+            ]
+
+        monkeypatch.setattr(slp3_pipeline, "extract_atomic_cards", extract)
+        cards = slp3_pipeline.chapter_pipeline(chapter_text(3), "chapter_1", data_dir=tmp_path, pack_sections=False)
+
+        # 9 extracted: one softmax card survives from all sections, plus 3 unique cards
+        assert len(cards) == 4
+        assert recorder.events.count("fix_content") == 4
+        duplicates = json.loads((tmp_path / "tmp_fix_cards_step" / "chapter_1_00_duplicates.json").read_text())
+        assert len(duplicates) == 5
+
+    def test_duplicates_across_chapters(self, recorder, tmp_path, capsys):
+        (tmp_path / "txt").mkdir()
+        for chapter in (1, 2):
+            (tmp_path / "txt" / f"chapter_{chapter}.txt").write_text(chapter_text(2), encoding="utf-8")
+
+        slp3_pipeline.create_cards_for_chapters([1, 2], data_dir=tmp_path, max_concurrency=4, pack_sections=False)
+
+        assert recorder.events.count("fix_content") == 6
+        assert "6 gemini-2.5-pro fix_content calls avoided" in capsys.readouterr().out
+
+    def test_earlier_chapter_keeps_shared_cards(self, recorder, monkeypatch, tmp_path):
+        def extract(section_text):
+            recorder._call("extract")
+            # Chapter 1 finishes extraction last
+            if "slow" in section_text:
+                time.sleep(0.3)
+            return [QACard(type="Q&A", q="What does the softmax in attention normalize?", a="The attention scores.")]
+
+        monkeypatch.setattr(slp3_pipeline, "extract_atomic_cards", extract)
+        (tmp_path / "txt").mkdir()
+        (tmp_path / "txt" / "chapter_1.txt").write_text("# Section 1\n\n" + "A slow section. " * 10, encoding="utf-8")
+        (tmp_path / "txt" / "chapter_2.txt").write_text("# Section 1\n\n" + "A fast section. " * 10, encoding="utf-8")
+
+        slp3_pipeline.create_cards_for_chapters([2, 1], data_dir=tmp_path, max_concurrency=4, pack_sections=False)
+
+        assert (tmp_path / "cards" / "chapter_1" / "atomic_cards.json").exists()
+        assert not (tmp_path / "cards" / "chapter_2").exists()
+        duplicates = json.loads((tmp_path / "tmp_fix_cards_step" / "chapter_2_00_duplicates.json").read_text())
+        assert len(duplicates) == 1
+
+    def test_missing_chapter_does_not_block_later_chapters(self, recorder, tmp_path):
+        (tmp_path / "txt").mkdir()
+        (tmp_path / "txt" / "chapter_2.txt").write_text(chapter_text(1), encoding="utf-8")
+
+        slp3_pipeline.create_cards_for_chapters([1, 2], data_dir=tmp_path, max_concurrency=4, pack_sections=False)
+
+        assert json.loads((tmp_path / "cards" / "chapter_2" / "atomic_cards.json").read_text())["total_cards"] == 3
+
+
+class TestCascade:
+    """fix_content runs on the fast model and escalates flagged cards."""
+
+    def test_escalates_only_flagged_cards(self, recorder, monkeypatch, tmp_path, capsys):
+        models = []
+
+        def fix_content(section_text, card, model="gemini-2.5-pro"):
+            recorder._call("fix_content")
+            models.append(model)
+            if model == "gemini-2.5-flash" and card.q.endswith("q0"):
+                # Fast model rewrote the card into something unrelated
+                return QACard(type="Q&A", q="Unrelated question", a="Unrelated answer")
+            return QACard(type="Q&A", q=card.q, a=card.a + " fixed")
+
+        monkeypatch.setattr(slp3_pipeline, "fix_content", fix_content)
+        cards = slp3_pipeline.chapter_pipeline(
+            chapter_text(2), "chapter_1", data_dir=tmp_path, cascade=True, pack_sections=False
+        )
+
+        assert all(card.a.endswith(" fixed formatted") for card in cards)
+        assert models.count("gemini-2.5-flash") == 6
+        assert models.count("gemini-2.5-pro") == 2
+        log = json.loads((tmp_path / "tmp_fix_cards_step" / "chapter_1_cascade_log.json").read_text())
+        assert [record["escalated"] for record in log].count(True) == 2
+        assert all(record["issues"] == ["semantic drift"] for record in log if record["escalated"])
+        assert "2 escalated to gemini-2.5-pro (33%)" in capsys.readouterr().out
+
+
+class TestSectionPacking:
+    """Small sections share one extraction call."""
+
+    def test_packs_small_sections(self, recorder, monkeypatch, tmp_path):
+        requests = []
+
+        def extract(section_text):
+            recorder._call("extract")
+            requests.append(section_text)
+            return [QACard(type="Q&A", q=f"q{len(requests)}", a="a")]
+
+        monkeypatch.setattr(slp3_pipeline, "extract_atomic_cards", extract)
+        slp3_pipeline.chapter_pipeline(chapter_text(6), "chapter_1", data_dir=tmp_path)
+
+        assert len(requests) == 1
+        assert all(f"# Section {i}\n\nContent of section {i}." in requests[0] for i in range(1, 7))
+
+
+class TestBatchedFormatting:
+    """LLM formatting runs once per FORMAT_BATCH_SIZE cards."""
+
+    def test_formats_in_batches(self, recorder, monkeypatch, tmp_path):
+        batches = []
+
+        def fix_formatting_batch(cards):
+            batches.append(len(cards))
+            for card in cards:
+                card.a = card.a + " formatted"
+            return cards
+
+        monkeypatch.setattr(slp3_pipeline, "FORMAT_BATCH_SIZE", 4)
+        monkeypatch.setattr(slp3_pipeline, "fix_formatting_batch", fix_formatting_batch)
+        cards = slp3_pipeline.chapter_pipeline(
+            chapter_text(3), "chapter_1", data_dir=tmp_path, pack_sections=False, llm_formatting=True
+        )
+
+        assert batches == [4, 4, 1]
+        assert "fix_formatting" not in recorder.events
+        assert [card.q for card in cards] == [f"Section {s} q{i}" for s in range(1, 4) for i in range(3)]
+        final = json.loads((tmp_path / "tmp_fix_cards_step" / "chapter_1_03_fixed_card.json").read_text())
+        assert all(card["a"].endswith(" fixed formatted") for card in final)
+
+
+class TestResume:
+    """Interrupted runs continue from the JSONL checkpoint."""
+
+    def test_resume_skips_checkpointed_stages(self, recorder, monkeypatch, tmp_path):
+        def crashing_fix_formatting(card):
+            if card.q == "Section 2 q1":
+                raise KeyboardInterrupt
+            return recorder.fix_formatting(card)
+
+        monkeypatch.setattr(slp3_pipeline, "fix_formatting", crashing_fix_formatting)
+        with pytest.raises(KeyboardInterrupt):
+            slp3_pipeline.chapter_pipeline(chapter_text(3), "chapter_1", data_dir=tmp_path, pack_sections=False)
+        assert (tmp_path / "tmp_fix_cards_step" / "chapter_1_checkpoint.jsonl").exists()
+
+        fixed = []
+
+        def fix_content(section_text, card):
+            fixed.append(card.q)
+            return recorder.fix_content(section_text, card)
+
+        monkeypatch.setattr(slp3_pipeline, "fix_formatting", recorder.fix_formatting)
+        monkeypatch.setattr(slp3_pipeline, "fix_content", fix_content)
+        recorder.events.clear()
+        cards = slp3_pipeline.chapter_pipeline(
+            chapter_text(3), "chapter_1", data_dir=tmp_path, pack_sections=False, resume=True
+        )
+
+        assert "clean" not in recorder.events and "extract" not in recorder.events
+        assert "Section 2 q1" not in fixed
+        expected = [f"Section {s} q{i}" for s in range(1, 4) for i in range(3)]
+        assert [card.q for card in cards] == expected
+        assert all(card.a.endswith(" fixed formatted") for card in cards)
+        for suffix in ("01_raw", "02_fixed_content_card", "03_fixed_card"):
+            stage = json.loads((tmp_path / "tmp_fix_cards_step" / f"chapter_1_{suffix}.json").read_text())
+            assert [card["q"] for card in stage] == expected
+
+    def test_run_without_resume_starts_over(self, recorder, tmp_path):
+        slp3_pipeline.chapter_pipeline(chapter_text(2), "chapter_1", data_dir=tmp_path, pack_sections=False)
+        recorder.events.clear()
+        slp3_pipeline.chapter_pipeline(chapter_text(2), "chapter_1", data_dir=tmp_path, pack_sections=False)
+
+        assert recorder.events.count("extract") == 2
+        assert recorder.events.count("fix_content") == 6
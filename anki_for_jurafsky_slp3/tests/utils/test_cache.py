@@ -0,0 +1,108 @@
+"""
+Tests for the LLM response cache.
+
+Templated prompts are keyed on their template version and variables, fall
+back to entries stored under the full prompt, and stale versions are pruned
+by tag. Runs against a temporary diskcache.
+"""
+
+import diskcache as dc
+import pytest
+
+import src.utils.cache as cache_module
+from src.models.cards import CardType, QACard
+from src.utils.cache import (
+    PromptTemplate,
+    configure_memory_cache,
+    create_cache_key,
+    get_cached,
+    is_stale,
+    prune_cache,
+    schema_info,
+    set_cached,
+    template_report,
+)
+
+CARD = QACard(type="Q&A", q="What is BPE?", a="Byte pair encoding.")
+
+
+@pytest.fixture
+def test_cache(tmp_path, monkeypatch):
+    test_cache = dc.Cache(str(tmp_path / "llm_cache"))
+    monkeypatch.setattr(cache_module, "cache", test_cache)
+    monkeypatch.setattr(cache_module, "PROMPT_TEMPLATES", {})
+    yield test_cache
+    configure_memory_cache(0)
+    test_cache.close()
+
+
+class TestTemplateKeys:
+    """Templated prompts are keyed on template version, variables and schema."""
+
+    def test_template_text_edit_keeps_entries(self, test_cache):
+        template = PromptTemplate("review", 1)
+        set_cached("gemini-test", template.prompt("Review this card: bpe", card="bpe"), QACard, CARD)
+
+        hit, card = get_cached("gemini-test", template.prompt("Review carefully this card: bpe", card="bpe"), QACard)
+
+        assert hit and card == CARD
+
+    def test_version_and_variables_change_the_key(self, test_cache):
+        set_cached("gemini-test", PromptTemplate("review", 1).prompt("bpe", card="bpe"), QACard, CARD)
+        cache_module.PROMPT_TEMPLATES.clear()
+
+        assert not get_cached("gemini-test", PromptTemplate("review", 2).prompt("bpe", card="bpe"), QACard)[0]
+        assert not get_cached("gemini-test", PromptTemplate("review", 2).prompt("bpe", card="wordpiece"), QACard)[0]
+
+    def test_conflicting_registration_raises(self, test_cache):
+        PromptTemplate("review", 1)
+
+        with pytest.raises(ValueError):
+            PromptTemplate("review", 2)
+
+    def test_full_prompt_entry_is_migrated(self, test_cache):
+        set_cached("gemini-test", "Review this card: bpe", QACard, CARD)
+        prompt = PromptTemplate("review", 1).prompt("Review this card: bpe", card="bpe")
+
+        hit, card = get_cached("gemini-test", prompt, QACard)
+        test_cache.delete(create_cache_key("gemini-test", "Review this card: bpe", QACard))
+
+        assert hit and card == CARD
+        assert get_cached("gemini-test", prompt, QACard)[0]
+
+    def test_schema_info_is_memoized(self):
+        assert schema_info(CardType) is schema_info(CardType)
+        assert schema_info(str).adapter is None
+
+
+class TestMemoryCache:
+    """The in-process LRU serves hits without reading the disk cache."""
+
+    def test_hits_are_served_from_memory(self, test_cache):
+        configure_memory_cache(1)
+        set_cached("gemini-test", "first", str, "one")
+        test_cache.clear()
+
+        assert get_cached("gemini-test", "first", str) == (True, "one")
+        set_cached("gemini-test", "second", str, "two")
+        test_cache.clear()
+        assert not get_cached("gemini-test", "first", str)[0]
+
+
+class TestPrune:
+    """Entries are reported and pruned by template version tag."""
+
+    def test_prunes_stale_versions(self, test_cache):
+        set_cached("gemini-test", PromptTemplate("review", 1).prompt("a", card="a"), str, "old")
+        cache_module.PROMPT_TEMPLATES.clear()
+        current = PromptTemplate("review", 2)
+        set_cached("gemini-test", current.prompt("a", card="a"), str, "new")
+        set_cached("gemini-test", "plain prompt", str, "untagged")
+
+        assert {usage.tag: usage.entries for usage in template_report()} == {"review@v1": 1, "review@v2": 1, None: 1}
+        assert is_stale("review@v1") and not is_stale("review@v2")
+
+        assert prune_cache() == 1
+        assert get_cached("gemini-test", current.prompt("a", card="a"), str) == (True, "new")
+        assert prune_cache(untagged=True) == 1
+        assert len(test_cache) == 1
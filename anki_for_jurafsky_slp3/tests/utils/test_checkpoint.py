@@ -0,0 +1,53 @@
+"""
+Tests for the JSONL pipeline checkpoints.
+
+Checks that finished stages are read back on resume, that a truncated last
+line (a crash mid-write) is ignored and that a fresh run starts over.
+"""
+
+from src.utils.checkpoint import Checkpoint, stable_id, stream_records
+
+
+class TestCheckpoint:
+    """Recording and resuming stage results."""
+
+    def test_stable_id(self):
+        assert stable_id("section", "card") == stable_id("section", "card")
+        assert stable_id("section", "card") != stable_id("sectioncard")
+
+    def test_resume_reads_finished_stages(self, tmp_path):
+        path = tmp_path / "chapter_1_checkpoint.jsonl"
+        with Checkpoint(path) as checkpoint:
+            checkpoint.record("extracted", "s1", [{"q": "q"}])
+            checkpoint.record("content", "c1", {"q": "fixed"})
+
+        with Checkpoint(path, resume=True) as checkpoint:
+            assert checkpoint.resumed == 2
+            assert checkpoint.get("extracted", "s1") == [{"q": "q"}]
+            assert checkpoint.get("final", "c1") is None
+            checkpoint.record("final", "c1", {"q": "formatted"})
+
+        assert [record["stage"] for record in stream_records(path)] == ["extracted", "content", "final"]
+
+    def test_truncated_line_is_ignored(self, tmp_path):
+        path = tmp_path / "checkpoint.jsonl"
+        with Checkpoint(path) as checkpoint:
+            checkpoint.record("content", "c1", {"q": "fixed"})
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"stage": "final", "key": "c1", "da')
+
+        with Checkpoint(path, resume=True) as checkpoint:
+            assert checkpoint.resumed == 1
+            assert checkpoint.get("final", "c1") is None
+            checkpoint.record("final", "c1", {"q": "formatted"})
+
+        assert [record["stage"] for record in stream_records(path)] == ["content", "final"]
+
+    def test_fresh_run_starts_over(self, tmp_path):
+        path = tmp_path / "checkpoint.jsonl"
+        with Checkpoint(path) as checkpoint:
+            checkpoint.record("content", "c1", {"q": "fixed"})
+
+        with Checkpoint(path) as checkpoint:
+            assert checkpoint.resumed == 0
+        assert list(stream_records(path)) == []
@@ -0,0 +1,29 @@
+"""
+Tests for the shared request rate limiter.
+
+Requests are only reserved (RateLimiter._reserve), so no test sleeps.
+"""
+
+import pytest
+
+from src.utils.rate_limiter import RateLimiter
+
+
+class TestTokenBucket:
+    """Saved-up slots allow a burst, then requests are spaced again."""
+
+    def test_spacing_without_burst(self):
+        limiter = RateLimiter(600)
+
+        assert [limiter._reserve() for _ in range(3)] == pytest.approx([0.0, 0.1, 0.2], abs=0.01)
+
+    def test_burst_then_spacing(self):
+        limiter = RateLimiter(600, burst=3)
+
+        assert [limiter._reserve() for _ in range(5)] == pytest.approx([0.0, 0.0, 0.0, 0.1, 0.2], abs=0.01)
+
+    def test_backoff_applies_to_burst(self):
+        limiter = RateLimiter(600, burst=3)
+        limiter.backoff(1.0)
+
+        assert limiter._reserve() == pytest.approx(1.0, abs=0.01)
@@ -0,0 +1,74 @@
+"""
+Tests for LLM call telemetry.
+
+Calls are aggregated per stage and model, priced from token counts, written
+as a run summary and, when enabled, as OpenTelemetry-style spans.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.telemetry import CACHED_TOKEN_PRICE, LLMCall, Telemetry
+
+
+def api_call(stage: str, model: str = "gemini-2.5-pro", attempts: int = 1) -> LLMCall:
+    call = LLMCall(model, stage, attempts=attempts)
+    usage = SimpleNamespace(
+        prompt_token_count=1_000_000, cached_content_token_count=400_000, candidates_token_count=90_000, thoughts_token_count=10_000
+    )
+    call.add_response(2.0, SimpleNamespace(usage_metadata=usage))
+    return call.finish()
+
+
+class TestLLMCall:
+    """Token counts and cost of one call."""
+
+    def test_cost_counts_cached_and_thinking_tokens(self):
+        call = api_call("fix_content")
+
+        assert call.output_tokens == 100_000
+        assert call.cost == pytest.approx(1.25 * (0.6 + 0.4 * CACHED_TOKEN_PRICE) + 10.0 * 0.1)
+
+    def test_unknown_model_and_missing_usage(self):
+        call = LLMCall("gemini-test", "other")
+        call.add_response(0.5, SimpleNamespace(usage_metadata=None))
+
+        assert call.latency == 0.5 and call.cost == 0 and call.retries == 0
+
+
+class TestTelemetry:
+    """Calls of a run are aggregated and exported."""
+
+    def test_totals_postfix_and_summary(self, tmp_path):
+        telemetry = Telemetry()
+        telemetry.record(api_call("fix_content", attempts=3))
+        telemetry.record(api_call("extract_atomic_cards", model="gemini-2.5-flash"))
+        telemetry.record(LLMCall("gemini-2.5-pro", "fix_content", cache_hit=True).finish())
+
+        stages = telemetry.totals("stage")
+        assert (stages["fix_content"].calls, stages["fix_content"].cache_hits, stages["fix_content"].retries) == (2, 1, 2)
+        assert telemetry.postfix()["llm"] == "2 calls/1 hits"
+        assert "extract_atomic_cards" in telemetry.report()
+
+        summary = json.loads(telemetry.write_summary(tmp_path).read_text())
+        assert summary["total"]["calls"] == 3
+        assert summary["models"]["gemini-2.5-flash"]["api_calls"] == 1
+        assert summary["stages"]["fix_content"]["cache_hit_rate"] == 0.5
+
+        telemetry.reset()
+        assert telemetry.calls == [] and telemetry.total.calls == 0
+
+    def test_spans_file(self, tmp_path):
+        spans_path = tmp_path / "spans.jsonl"
+        telemetry = Telemetry(spans_path)
+        telemetry.record(api_call("fix_content"))
+        telemetry.record_spans(None)
+        telemetry.record(api_call("fix_content"))
+
+        (span,) = [json.loads(line) for line in spans_path.read_text().splitlines()]
+        assert span["name"] == "llm fix_content"
+        assert span["trace_id"] == telemetry.trace_id
+        assert span["attributes"]["gen_ai.usage.output_tokens"] == 100_000
+        assert span["end_time_unix_nano"] >= span["start_time_unix_nano"]
@@ -3,10 +3,15 @@ Tests for text processing utilities.
 
 This module tests the text cleaning functions for Anki card content,
 including HTML escaping, MathJax operator spacing, and MathJax/Cloze conflicts.
+The single-pass clean_anki_text is checked against the three separate passes
+on random inputs.
 """
 
+import random
+
 import pytest
 from src.utils.text_processing import (
+    MATHJAX_OPERATORS,
     escape_html_operators,
     fix_mathjax_operator_spacing,
     fix_mathjax_cloze_conflicts,
@@ -235,4 +240,42 @@ class TestIntegrationScenarios:
         assert '&lt;' in result                # HTML escaping
         assert r'\hat w_t' in result           # Operator spacing  
         assert r'\frac { 1 }' in result        # Brace spacing
-        assert r'w_ { &lt;i }' in result       # Complex brace spacing with HTML escaping
\ No newline at end of file
+        assert r'w_ { &lt;i }' in result       # Complex brace spacing with HTML escaping
+
+class TestSinglePassEquivalence:
+    """clean_anki_text gives the same output as the three passes applied in order."""
+
+    ATOMS = [
+        "\\(", "\\)", "\\[", "\\]", "{", "}", "\\{", "\\}", "<", ">", "<b>", "</b>", '<span class="x">',
+        "<b \\)", " ", "\n", "x", "w_t", "\\\\", "\\sinh", "\\inf", "{{c1::", "}}", "&lt;", "a<b",
+        *sorted(MATHJAX_OPERATORS),
+    ]
+    CHARS = "\\()[]{}<>/ \n\tabhilnstx,;_=\""
+
+    @staticmethod
+    def three_passes(text):
+        return fix_mathjax_cloze_conflicts(fix_mathjax_operator_spacing(escape_html_operators(text)))
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_token_sequences(self, seed):
+        rng = random.Random(seed)
+        for _ in range(2000):
+            text = "".join(rng.choice(self.ATOMS) for _ in range(rng.randint(1, 25)))
+            assert clean_anki_text(text) == self.three_passes(text), text
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_characters(self, seed):
+        rng = random.Random(seed)
+        for _ in range(2000):
+            text = "".join(rng.choice(self.CHARS) for _ in range(rng.randint(1, 30)))
+            assert clean_anki_text(text) == self.three_passes(text), text
+
+    def test_changes_are_logged(self, caplog):
+        with caplog.at_level("DEBUG", logger="src.utils.text_processing"):
+            clean_anki_text(r"x < 5, \(\hatw\frac{1}{2}\)")
+
+        assert caplog.messages == [
+            "Applied HTML escaping.",
+            "Applied MathJax operator spacing.",
+            "Applied MathJax/Cloze conflict fixes.",
+        ]